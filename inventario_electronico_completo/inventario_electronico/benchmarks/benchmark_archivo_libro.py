@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Benchmark del archivo mensual del libro de transacciones
+Genera un libro sintético de ``--dias`` días, lo archiva dejando ``--conservar-meses``
+meses en la base mientras otro hilo sigue registrando ventas, y mide:
+
+- transacciones archivadas por segundo y bloqueo de escritura más largo
+- latencia de las ventas concurrentes durante el archivado (p50/p99/máx)
+- tamaño de la base y de los archivos
+- movimientos de un producto que cruzan meses archivados
+
+y comprueba que el resumen diario sigue coincidiendo con base + archivos, que
+ninguna transacción se pierde ni se duplica y que reconstruir el resumen de los
+meses archivados da el mismo resultado.
+
+Uso:
+    python benchmarks/benchmark_archivo_libro.py
+    python benchmarks/benchmark_archivo_libro.py --filas 5000000 --dias 730 --lote 10000
+"""
+
+import argparse
+import glob
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, 'ns3_simulation'))
+
+from database.archivo_libro import ArchivadorLibro, meses_archivados
+from database.database_manager import DatabaseManager
+from database.resumen_diario import reconstruir, verificar
+from estadisticas_simulacion import HistogramaLatencia
+from benchmark_resumen_diario import generar_libro
+
+
+def ventas_concurrentes(db_manager: DatabaseManager, detener: threading.Event,
+                        histograma: HistogramaLatencia, productos: int):
+    """Registra reposiciones y ventas de una unidad hasta que se pida parar"""
+    n = 0
+    while not detener.is_set():
+        id_producto = n % productos + 1
+        for tipo, precio in (('entrada', None), ('salida', 10.0)):
+            inicio = time.perf_counter()
+            db_manager.registrar_transaccion(id_producto, tipo, 1, precio_unitario=precio)
+            histograma.registrar((time.perf_counter() - inicio) * 1000)
+        n += 1
+
+
+def contar_libro(conn: sqlite3.Connection, archivos: dict) -> tuple:
+    """Transacciones distintas y total de filas entre base y archivos"""
+    ids = {fila[0] for fila in conn.execute("SELECT id_transaccion FROM transacciones")}
+    filas = len(ids)
+    for ruta in archivos.values():
+        archivo = sqlite3.connect(ruta)
+        for fila in archivo.execute("SELECT id_transaccion FROM transacciones"):
+            ids.add(fila[0])
+            filas += 1
+        archivo.close()
+    return len(ids), filas
+
+
+def megabytes(*rutas) -> float:
+    return sum(os.path.getsize(r) for r in rutas if os.path.exists(r)) / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del archivo mensual del libro de transacciones')
+    parser.add_argument('--filas', type=int, default=1_000_000, help='Transacciones en el libro')
+    parser.add_argument('--dias', type=int, default=365, help='Días que cubre el libro')
+    parser.add_argument('--productos', type=int, default=2000)
+    parser.add_argument('--conservar-meses', type=int, default=3)
+    parser.add_argument('--lote', type=int, default=2000, help='Transacciones por lote')
+    parser.add_argument('--pausa-ms', type=float, default=5.0, help='Pausa entre lotes')
+    parser.add_argument('--semilla', type=int, default=7)
+    args = parser.parse_args()
+
+    print("=== Benchmark del Archivo del Libro ===")
+    print(f"{args.filas:,} transacciones | {args.dias} días | conservar {args.conservar_meses} meses | "
+          f"lotes de {args.lote:,}")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'inventario.db')
+        directorio = os.path.join(tmp, 'archivo')
+        generar_libro(db_path, args.filas, args.dias, args.productos, args.semilla)
+        antes_mb = megabytes(db_path, db_path + '-wal')
+        conn = sqlite3.connect(db_path)
+        total_antes = conn.execute("SELECT COUNT(*) FROM transacciones").fetchone()[0]
+
+        db_manager = DatabaseManager(db_path, archivo_dir=directorio)
+        detener = threading.Event()
+        histograma = HistogramaLatencia()
+        hilo = threading.Thread(target=ventas_concurrentes,
+                                args=(db_manager, detener, histograma, args.productos))
+        hilo.start()
+        archivador = ArchivadorLibro(db_path, directorio, args.conservar_meses, args.lote, args.pausa_ms)
+        try:
+            archivadas = archivador.archivar()
+        finally:
+            detener.set()
+            hilo.join()
+        m = archivador.metricas
+        latencia = histograma.resumen()
+        print(f"\nArchivadas {m['filas']:,} transacciones de {len(archivadas)} meses en {m['lotes']} lotes: "
+              f"{m['segundos']:.1f} s ({m['filas'] / max(m['segundos'], 1e-9):,.0f}/s)")
+        print(f"Bloqueo de escritura máximo: {m['bloqueo_max_ms']:.1f} ms")
+        print(f"Ventas concurrentes: {histograma.conteo:,} (p50 {latencia['p50']:.2f} ms, "
+              f"p99 {latencia['p99']:.2f} ms, máx {latencia['max']:.1f} ms)")
+
+        archivos = meses_archivados(conn, directorio)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        print(f"Base: {antes_mb:.1f} MB antes, {megabytes(db_path):.1f} MB después "
+              f"(páginas libres: {conn.execute('PRAGMA freelist_count').fetchone()[0]:,}); "
+              f"archivos: {megabytes(*glob.glob(os.path.join(directorio, '*.db'))):.1f} MB")
+
+        distintas, filas = contar_libro(conn, archivos)
+        total_despues = total_antes + histograma.conteo
+        print(f"\nTransacciones: {total_despues:,} esperadas, {distintas:,} distintas, "
+              f"{filas - distintas} duplicadas")
+        comprobacion = verificar(conn, archivos=archivos)
+        print(f"Resumen frente a base + archivos: {comprobacion['filas']:,} filas, "
+              f"{len(comprobacion['diferencias'])} diferencias")
+        datos = reconstruir(conn, archivos=archivos)
+        comprobacion_reconstruida = verificar(conn, archivos=archivos)
+        print(f"Reconstrucción con archivos: {datos['filas']:,} filas en {datos['segundos']:.1f} s, "
+              f"{len(comprobacion_reconstruida['diferencias'])} diferencias")
+
+        # El producto menos vendido: sus movimientos recientes no llenan la página sin los archivos
+        inicio = time.perf_counter()
+        movimientos = db_manager.movimientos_producto(args.productos, limite=1000)
+        ms = (time.perf_counter() - inicio) * 1000
+        meses = sorted({m['fecha_transaccion'][:7] for m in movimientos})
+        ordenados = all(a['id_transaccion'] > b['id_transaccion'] for a, b in zip(movimientos, movimientos[1:]))
+        print(f"Movimientos del producto {args.productos}: {len(movimientos):,} en {ms:.1f} ms, "
+              f"de {meses[0] if meses else '-'} a {meses[-1] if meses else '-'} "
+              f"({'orden correcto' if ordenados else 'ORDEN INCORRECTO'})")
+        conn.close()
+
+    fallos = (distintas != total_despues or filas != distintas or comprobacion['diferencias']
+              or comprobacion_reconstruida['diferencias'] or not ordenados)
+    return 1 if fallos else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark del catálogo en memoria frente a la ruta SQLite
+Compara la serialización completa del catálogo (GET /api/productos) leyendo
+de SQLite fila por fila contra el catálogo columnar de DatabaseManager
+
+Uso:
+    python benchmarks/benchmark_catalogo_memoria.py --productos 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Añadir la raíz del proyecto al sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+from database.database_manager import DatabaseManager
+
+CATEGORIAS = ['Electrónicos', 'Computadoras', 'Accesorios']
+PROVEEDORES = ['Samsung', 'Dell', 'Sony', 'Apple', 'Logitech']
+
+
+def poblar_catalogo(db_manager: DatabaseManager, total: int, semilla: int = 42):
+    """Inserta ``total`` productos sintéticos en una sola transacción"""
+    rnd = random.Random(semilla)
+    filas = (
+        (f'Producto_{i:07d}', f'Descripción del producto {i}', rnd.randint(0, 500),
+         round(rnd.uniform(5.0, 2000.0), 2), rnd.choice(CATEGORIAS), rnd.choice(PROVEEDORES))
+        for i in range(total)
+    )
+    with db_manager.get_connection() as conn:
+        conn.executemany("""
+            INSERT INTO productos (nombre_producto, descripcion, cantidad,
+                                   precio, categoria, proveedor)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, filas)
+        conn.commit()
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Devuelve las ejecuciones por segundo de ``funcion``"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return repeticiones / (time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del catálogo en memoria')
+    parser.add_argument('--productos', type=int, default=100000, help='Tamaño del catálogo')
+    parser.add_argument('--repeticiones', type=int, default=20, help='Lecturas por ruta')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'inventario.db')
+        sqlite_manager = DatabaseManager(db_path)
+        poblar_catalogo(sqlite_manager, args.productos)
+
+        inicio = time.perf_counter()
+        memoria_manager = DatabaseManager(db_path, catalogo_memoria=True)
+        carga_s = time.perf_counter() - inicio
+        total = len(memoria_manager.catalogo)
+
+        # Primera serialización: construye los fragmentos JSON por fila
+        memoria_manager.obtener_productos_json()
+
+        sqlite_rps = medir(sqlite_manager.obtener_productos_json, args.repeticiones)
+        memoria_rps = medir(memoria_manager.obtener_productos_json, args.repeticiones)
+        tamano = len(memoria_manager.obtener_productos_json())
+
+        id_escritura = random.randint(1, total)
+        inicio = time.perf_counter()
+        for _ in range(args.repeticiones):
+            memoria_manager.registrar_transaccion(id_escritura, 'entrada', 1)
+            memoria_manager.obtener_productos_json()
+        mixto_rps = args.repeticiones / (time.perf_counter() - inicio)
+
+        print("=== Benchmark Catálogo en Memoria ===")
+        print(f"Productos: {total}")
+        print(f"Tamaño del JSON: {tamano / 1024:.1f} KB")
+        print(f"Carga inicial del catálogo: {carga_s * 1000:.1f} ms")
+        print(f"Memoria por SKU: {memoria_manager.catalogo.memoria_por_sku():.0f} bytes")
+        print(f"GET catálogo vía SQLite:  {sqlite_rps:8.2f} lecturas/s "
+              f"({sqlite_rps * total:,.0f} filas/s)")
+        print(f"GET catálogo en memoria: {memoria_rps:8.2f} lecturas/s "
+              f"({memoria_rps * total:,.0f} filas/s)")
+        print(f"Aceleración: x{memoria_rps / sqlite_rps:.1f}")
+        print(f"Escritura + lectura en memoria: {mixto_rps:8.2f} ciclos/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Prueba de estrés del stock bajo ventas y reservas concurrentes
+Varios procesos, cada uno con su DatabaseManager (como varias instancias del
+servidor sobre la misma base) y varios hilos, compiten por pocos productos con
+poco stock:
+
+- venta:      registrar_transaccion 'salida' de 1 a 3 unidades
+- reposicion: registrar_transaccion 'entrada' de 1 a 5 unidades
+- pedido:     reservar de 2 a 4 productos distintos y después confirmar la
+              reserva o liberarla
+
+Al terminar comprueba los invariantes sobre la base:
+
+- stock_negativo:   productos con cantidad < 0
+- libro:            cantidad != inicial + entradas - salidas - reservado en reservas activas
+- contabilidad:     cantidad != inicial + lo que los hilos vieron confirmado
+- reservas_parciales: reservas con distinto número de líneas que las pedidas
+                      o que ningún hilo vio confirmadas (todas o ninguna)
+
+y sale con código 1 si alguno falla.
+
+Uso:
+    python benchmarks/benchmark_estres_stock.py
+    python benchmarks/benchmark_estres_stock.py --procesos 4 --hilos 16 --escritura directa
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, 'ns3_simulation'))
+
+from database.database_manager import DatabaseManager, StockInsuficiente, ReservaNoActiva
+from estadisticas_simulacion import HistogramaLatencia
+
+OPERACIONES = ('venta', 'reposicion', 'pedido')
+
+
+def preparar_base(db_path: str, productos: int, stock: int):
+    """Crea la base con ``productos`` productos de ``stock`` unidades y devuelve {id: stock}"""
+    db_manager = DatabaseManager(db_path)
+    with db_manager.get_connection() as conn:
+        conn.execute("DELETE FROM productos")
+        conn.executemany(
+            "INSERT INTO productos (nombre_producto, cantidad, precio) VALUES (?, ?, ?)",
+            ((f'Estres_{i:03d}', stock, 10.0) for i in range(productos)))
+        conn.commit()
+        return {fila[0]: fila[1] for fila in conn.execute("SELECT id_producto, cantidad FROM productos")}
+
+
+def trabajar(db_path: str, indice: int, ids: list, args, cola):
+    """Proceso de carga: ``args.hilos`` hilos repiten operaciones hasta agotar la duración"""
+    db_manager = DatabaseManager(db_path, escritura_agrupada=args.escritura == 'agrupada')
+    fin = time.perf_counter() + args.duracion
+    lock = threading.Lock()
+    total = {
+        'ok': Counter(), 'rechazos': Counter(), 'errores': Counter(),
+        'delta': Counter(), 'reservas': {}, 'histograma': HistogramaLatencia(),
+    }
+
+    def hilo(n):
+        rnd = random.Random(args.semilla * 1000003 + indice * 1009 + n)
+        ok, rechazos, errores, delta = Counter(), Counter(), Counter(), Counter()
+        reservas = {}
+        histograma = HistogramaLatencia()
+        while time.perf_counter() < fin:
+            operacion = rnd.choices(OPERACIONES, weights=(4, 3, 4))[0]
+            inicio = time.perf_counter()
+            try:
+                if operacion == 'venta':
+                    id_producto, cantidad = rnd.choice(ids), rnd.randint(1, 3)
+                    db_manager.registrar_transaccion(id_producto, 'salida', cantidad, precio_unitario=10.0)
+                    delta[id_producto] -= cantidad
+                elif operacion == 'reposicion':
+                    id_producto, cantidad = rnd.choice(ids), rnd.randint(1, 5)
+                    db_manager.registrar_transaccion(id_producto, 'entrada', cantidad)
+                    delta[id_producto] += cantidad
+                else:
+                    lineas = [(id_producto, rnd.randint(1, 3))
+                              for id_producto in rnd.sample(ids, rnd.randint(2, 4))]
+                    id_reserva = db_manager.reservar(lineas, observaciones=f'estres {indice}/{n}')
+                    reservas[id_reserva] = len(lineas)
+                    for id_producto, cantidad in lineas:
+                        delta[id_producto] -= cantidad
+                    if rnd.random() < 0.7:
+                        db_manager.confirmar_reserva(id_reserva)
+                    else:
+                        db_manager.liberar_reserva(id_reserva)
+                        for id_producto, cantidad in lineas:
+                            delta[id_producto] += cantidad
+            except StockInsuficiente:
+                rechazos[operacion] += 1
+            except ReservaNoActiva as e:
+                errores[f'ReservaNoActiva ({e.estado})'] += 1
+            except Exception as e:
+                errores[type(e).__name__] += 1
+                continue
+            else:
+                ok[operacion] += 1
+            histograma.registrar((time.perf_counter() - inicio) * 1000)
+        with lock:
+            for clave, valor in (('ok', ok), ('rechazos', rechazos), ('errores', errores), ('delta', delta)):
+                total[clave].update(valor)
+            total['reservas'].update(reservas)
+            total['histograma'].fusionar(histograma)
+
+    hilos = [threading.Thread(target=hilo, args=(n,)) for n in range(args.hilos)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    if db_manager.escritor is not None:
+        db_manager.escritor.cerrar()
+    total['reintentos'] = db_manager.reintentos.resumen()
+    cola.put(total)
+
+
+def comprobar(db_path: str, iniciales: dict, delta: Counter, reservas: dict) -> dict:
+    """Cuenta las violaciones de cada invariante sobre el estado final de la base"""
+    db_manager = DatabaseManager(db_path)
+    with db_manager.get_connection() as conn:
+        actuales = dict(conn.execute("SELECT id_producto, cantidad FROM productos").fetchall())
+        movimientos = dict(conn.execute("""
+            SELECT id_producto,
+                   SUM(CASE tipo_transaccion WHEN 'entrada' THEN cantidad
+                                             WHEN 'salida' THEN -cantidad ELSE 0 END)
+            FROM transacciones GROUP BY id_producto
+        """).fetchall())
+        reservado = dict(conn.execute("""
+            SELECT l.id_producto, SUM(l.cantidad)
+            FROM reservas_lineas l JOIN reservas r ON r.id_reserva = l.id_reserva
+            WHERE r.estado = 'activa' GROUP BY l.id_producto
+        """).fetchall())
+        lineas = dict(conn.execute("""
+            SELECT r.id_reserva, COUNT(l.id_reserva)
+            FROM reservas r LEFT JOIN reservas_lineas l ON l.id_reserva = r.id_reserva
+            GROUP BY r.id_reserva
+        """).fetchall())
+
+    violaciones = {
+        'stock_negativo': [p for p, cantidad in actuales.items() if cantidad < 0],
+        'libro': [p for p, cantidad in actuales.items()
+                  if cantidad != iniciales[p] + movimientos.get(p, 0) - reservado.get(p, 0)],
+        'contabilidad': [p for p, cantidad in actuales.items() if cantidad != iniciales[p] + delta[p]],
+        'reservas_parciales': [r for r, n in lineas.items() if reservas.get(r) != n],
+    }
+    return {nombre: {'total': len(casos), 'ejemplos': casos[:10]} for nombre, casos in violaciones.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de estrés de ventas y reservas concurrentes')
+    parser.add_argument('--procesos', type=int, default=2, help='Procesos (instancias) sobre la misma base')
+    parser.add_argument('--hilos', type=int, default=8, help='Hilos por proceso')
+    parser.add_argument('--duracion', type=float, default=5.0, help='Segundos de carga')
+    parser.add_argument('--productos', type=int, default=20, help='Productos en disputa')
+    parser.add_argument('--stock', type=int, default=30, help='Stock inicial de cada producto')
+    parser.add_argument('--escritura', choices=('agrupada', 'directa'), default='agrupada',
+                        help='Commit agrupado o una conexión por escritura')
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--salida', help='Archivo JSON de resultados')
+    args = parser.parse_args()
+
+    print("=== Estrés de Stock ===")
+    print(f"{args.procesos} procesos x {args.hilos} hilos | {args.productos} productos con "
+          f"{args.stock} unidades | escritura {args.escritura} | {args.duracion:g} s")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'inventario.db')
+        iniciales = preparar_base(db_path, args.productos, args.stock)
+
+        contexto = multiprocessing.get_context('spawn')
+        cola = contexto.Queue()
+        procesos = [contexto.Process(target=trabajar, args=(db_path, i, list(iniciales), args, cola))
+                    for i in range(args.procesos)]
+        inicio = time.perf_counter()
+        for p in procesos:
+            p.start()
+        partes = [cola.get() for _ in procesos]
+        for p in procesos:
+            p.join()
+        segundos = time.perf_counter() - inicio
+
+        ok, rechazos, errores, delta, reintentos = Counter(), Counter(), Counter(), Counter(), Counter()
+        reservas = {}
+        histograma = HistogramaLatencia()
+        for parte in partes:
+            ok.update(parte['ok'])
+            rechazos.update(parte['rechazos'])
+            errores.update(parte['errores'])
+            delta.update(parte['delta'])
+            reservas.update(parte['reservas'])
+            histograma.fusionar(parte['histograma'])
+            reintentos.update({k: v for k, v in parte['reintentos'].items()
+                               if k in ('bloqueos', 'reintentos_exitosos', 'agotados', 'espera_ms')})
+        violaciones = comprobar(db_path, iniciales, delta, reservas)
+
+    resumen = histograma.resumen()
+    operaciones = sum(ok.values()) + sum(rechazos.values())
+    print(f"\n{'Operación':<12}{'ok':>9}{'sin stock':>11}")
+    for operacion in OPERACIONES:
+        print(f"{operacion:<12}{ok[operacion]:>9}{rechazos[operacion]:>11}")
+    print(f"\nRendimiento: {operaciones / segundos:,.0f} ops/s "
+          f"(p50 {resumen['p50']:.2f} ms, p99 {resumen['p99']:.2f} ms, máx {resumen['max']:.1f} ms)")
+    print(f"Bloqueos: {reintentos['bloqueos']} | reintentos con éxito: {reintentos['reintentos_exitosos']} | "
+          f"agotados: {reintentos['agotados']} | espera total {reintentos['espera_ms']:.0f} ms")
+    if errores:
+        print(f"Errores: {dict(errores)}")
+    print("\nInvariantes:")
+    for nombre, datos in violaciones.items():
+        estado = 'OK' if not datos['total'] else f"{datos['total']} violaciones (p. ej. {datos['ejemplos']})"
+        print(f"  {nombre:<20}{estado}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump({
+                'parametros': {k: getattr(args, k) for k in ('procesos', 'hilos', 'duracion', 'productos',
+                                                              'stock', 'escritura', 'semilla')},
+                'ops_por_segundo': operaciones / segundos,
+                'ok': dict(ok), 'rechazos': dict(rechazos), 'errores': dict(errores),
+                'p50_ms': resumen['p50'], 'p99_ms': resumen['p99'], 'max_ms': resumen['max'],
+                'reintentos': dict(reintentos),
+                'violaciones': violaciones,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.salida}")
+    return 1 if any(datos['total'] for datos in violaciones.values()) or errores else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Benchmark de extremo a extremo: cliente, switch y servidor
+Arranca las tres aplicaciones con ``comun/lanzador.py`` sobre un
+``inventario.db`` temporal con un catálogo sintético de cada tamaño pedido y mide:
+
+- catalogo_switch: GET /api/productos a través del switch
+- alta_cliente:    POST /api/productos en el cliente (que lo reenvía al servidor)
+- estadisticas:    GET /api/estadisticas del servidor
+- difusion:        alta en el servidor hasta que todos los suscriptores Socket.IO
+                   reciben 'inventario_actualizado' (incluye la ventana de agrupación)
+- transacciones:   DatabaseManager.registrar_transaccion desde varios hilos sobre la
+                   misma base (no hay ruta HTTP de transacciones)
+
+Guarda rendimiento y latencias p50/p99 en JSON y, si existe una línea base,
+marca como regresión toda caída de rendimiento o subida de p99 por encima de la
+tolerancia (código de salida 1).
+
+Uso:
+    python benchmarks/benchmark_extremo_a_extremo.py --productos 1000 100000
+    python benchmarks/benchmark_extremo_a_extremo.py --guardar-linea-base
+    python benchmarks/benchmark_extremo_a_extremo.py --productos 1000000 --escenarios catalogo_switch estadisticas
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, 'ns3_simulation'))
+
+from database.database_manager import DatabaseManager, StockInsuficiente
+from estadisticas_simulacion import HistogramaLatencia
+from benchmark_catalogo_memoria import poblar_catalogo
+from benchmark_lanzador import detener, esperar_disponible
+from generador_carga import ClienteHTTP, SuscriptorSocketIO, cuerpo_producto
+
+ESCENARIOS = ['catalogo_switch', 'alta_cliente', 'estadisticas', 'difusion', 'transacciones']
+PUERTOS = {'servidor': 5000, 'cliente': 5001, 'switch': 5002}
+LINEA_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'linea_base_extremo_a_extremo.json')
+ERRORES_RED = (OSError, ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError)
+
+
+def url(aplicacion: str) -> str:
+    return f'http://127.0.0.1:{PUERTOS[aplicacion]}'
+
+
+def arrancar(aplicacion: str, db_path: str, modo: str, escritura: str = 'agrupada') -> subprocess.Popen:
+    """Arranca una aplicación con el lanzador de producción, en su propio grupo de procesos"""
+    entorno = dict(os.environ, INVENTARIO_DB_PATH=db_path,
+                   SWITCH_SERVIDORES=url('servidor'), INVENTARIO_SERVIDOR_URL=url('servidor'),
+                   INVENTARIO_ESCRITURA_AGRUPADA='1' if escritura == 'agrupada' else '0')
+    return subprocess.Popen(
+        [sys.executable, '-m', 'comun.lanzador', aplicacion, '--host', '127.0.0.1', '--modo', modo],
+        cwd=project_root, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True)
+
+
+def resultado(histograma: HistogramaLatencia, segundos: float, errores: Counter) -> dict:
+    resumen = histograma.resumen()
+    return {
+        'n': resumen['n'],
+        'rps': resumen['n'] / segundos if segundos else 0.0,
+        'p50_ms': resumen['p50'],
+        'p99_ms': resumen['p99'],
+        'max_ms': resumen['max'],
+        'errores': dict(errores),
+    }
+
+
+async def bucle_cerrado(peticion, concurrencia: int, duracion: float) -> dict:
+    """``concurrencia`` trabajadores repiten ``peticion(i)`` hasta agotar la duración"""
+    bucle = asyncio.get_running_loop()
+    histograma = HistogramaLatencia()
+    errores = Counter()
+    fin = bucle.time() + duracion
+
+    async def trabajador(i):
+        while bucle.time() < fin:
+            inicio = bucle.time()
+            try:
+                estado = await peticion(i)
+            except ERRORES_RED as e:
+                errores[type(e).__name__] += 1
+                continue
+            finally:
+                i += concurrencia
+            if estado >= 400:
+                errores[f'HTTP {estado}'] += 1
+            else:
+                histograma.registrar((bucle.time() - inicio) * 1000)
+
+    inicio = bucle.time()
+    await asyncio.gather(*(trabajador(i) for i in range(concurrencia)))
+    return resultado(histograma, bucle.time() - inicio, errores)
+
+
+async def medir_http(escenario: str, args) -> dict:
+    if escenario == 'catalogo_switch':
+        cliente = ClienteHTTP(url('switch'), args.concurrencia, args.timeout)
+        peticion = lambda i: cliente.peticion('GET', '/api/productos')
+    elif escenario == 'alta_cliente':
+        cliente = ClienteHTTP(url('cliente'), args.concurrencia, args.timeout)
+        peticion = lambda i: cliente.peticion('POST', '/api/productos', cuerpo_producto(i, 512))
+    else:
+        cliente = ClienteHTTP(url('servidor'), args.concurrencia, args.timeout)
+        peticion = lambda i: cliente.peticion('GET', '/api/estadisticas')
+
+    async def estado(i):
+        return (await peticion(i))[0]
+
+    try:
+        await bucle_cerrado(estado, min(4, args.concurrencia), args.calentamiento)
+        return await bucle_cerrado(estado, args.concurrencia, args.duracion)
+    finally:
+        cliente.cerrar()
+
+
+async def medir_difusion(args) -> dict:
+    """Latencia de una alta en el servidor hasta que la recibe el último suscriptor"""
+    bucle = asyncio.get_running_loop()
+    suscriptores = [SuscriptorSocketIO(url('servidor'), args.timeout) for _ in range(args.suscriptores)]
+    http = ClienteHTTP(url('servidor'), 2, args.timeout)
+    histograma = HistogramaLatencia()
+    errores = Counter()
+    pendientes = set()
+    completo = asyncio.Event()
+
+    def recibido(suscriptor):
+        pendientes.discard(suscriptor)
+        if not pendientes:
+            completo.set()
+
+    try:
+        await asyncio.gather(*(s.conectar() for s in suscriptores))
+        # Al conectar cada suscriptor recibe el inventario inicial
+        fin = bucle.time() + args.timeout
+        while any(s.recibidos == 0 for s in suscriptores) and bucle.time() < fin:
+            await asyncio.sleep(0.05)
+        for s in suscriptores:
+            s.al_evento = lambda datos, s=s: recibido(s)
+
+        inicio_total = bucle.time()
+        for i in range(args.difusiones):
+            pendientes.update(suscriptores)
+            completo.clear()
+            inicio = bucle.time()
+            cuerpo = json.dumps({'nombre': f'Difusion_{i}', 'cantidad': 1, 'precio': 1.0,
+                                 'categoria': 'Benchmark'}).encode('utf-8')
+            try:
+                estado, _ = await http.peticion('POST', '/api/productos', cuerpo)
+                if estado >= 400:
+                    errores[f'HTTP {estado}'] += 1
+                    continue
+                await asyncio.wait_for(completo.wait(), args.timeout)
+                histograma.registrar((bucle.time() - inicio) * 1000)
+            except ERRORES_RED as e:
+                errores[type(e).__name__] += 1
+            # Separar las altas para que el planificador no las agrupe en una difusión
+            await asyncio.sleep(args.pausa_difusion)
+        segundos = bucle.time() - inicio_total
+    finally:
+        for s in suscriptores:
+            await s.cerrar()
+        http.cerrar()
+    datos = resultado(histograma, segundos, errores)
+    datos['suscriptores'] = args.suscriptores
+    return datos
+
+
+def medir_transacciones(db_path: str, productos: int, args) -> dict:
+    """Ingesta de transacciones con DatabaseManager desde ``hilos_transacciones`` hilos"""
+    db_manager = DatabaseManager(db_path, escritura_agrupada=args.escritura == 'agrupada')
+    fin = time.perf_counter() + args.duracion
+    histogramas = []
+    errores = Counter()
+    lock = threading.Lock()
+
+    def trabajador(n):
+        rnd = random.Random(n)
+        histograma = HistogramaLatencia()
+        fallos = Counter()
+        while time.perf_counter() < fin:
+            id_producto = rnd.randint(1, productos)
+            tipo = rnd.choice(('entrada', 'salida'))
+            inicio = time.perf_counter()
+            try:
+                db_manager.registrar_transaccion(id_producto, tipo, 1, precio_unitario=1.0)
+            except StockInsuficiente:
+                # Salida rechazada sin stock: es una respuesta válida, cuenta como operación
+                pass
+            except Exception as e:
+                fallos[type(e).__name__] += 1
+                continue
+            histograma.registrar((time.perf_counter() - inicio) * 1000)
+        with lock:
+            histogramas.append(histograma)
+            errores.update(fallos)
+
+    inicio = time.perf_counter()
+    hilos = [threading.Thread(target=trabajador, args=(n,)) for n in range(args.hilos_transacciones)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    segundos = time.perf_counter() - inicio
+    if db_manager.escritor is not None:
+        db_manager.escritor.cerrar()
+    total = HistogramaLatencia()
+    for histograma in histogramas:
+        total.fusionar(histograma)
+    return resultado(total, segundos, errores)
+
+
+def ejecutar_tamano(productos: int, args) -> dict:
+    """Levanta las tres aplicaciones sobre un catálogo de ``productos`` y mide cada escenario"""
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'inventario.db')
+        inicio = time.perf_counter()
+        db_manager = DatabaseManager(db_path)
+        poblar_catalogo(db_manager, productos)
+        print(f"  Catálogo de {productos:,} productos en {time.perf_counter() - inicio:.1f} s")
+
+        procesos = {}
+        try:
+            for aplicacion in ('servidor', 'switch', 'cliente'):
+                procesos[aplicacion] = arrancar(aplicacion, db_path, args.modo, args.escritura)
+                if not esperar_disponible(url(aplicacion) + '/api/status', args.arranque):
+                    print(f"  {aplicacion}: no respondió en {args.arranque:g} s")
+                    return resultados
+            for escenario in args.escenarios:
+                try:
+                    if escenario == 'difusion':
+                        resultados[escenario] = asyncio.run(medir_difusion(args))
+                    elif escenario == 'transacciones':
+                        resultados[escenario] = medir_transacciones(db_path, productos, args)
+                    else:
+                        resultados[escenario] = asyncio.run(medir_http(escenario, args))
+                except ERRORES_RED as e:
+                    print(f"  {escenario:<16}error: {e}")
+                    continue
+                r = resultados[escenario]
+                errores = sum(r['errores'].values())
+                print(f"  {escenario:<16}{r['rps']:>10.1f}{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}{errores:>9}")
+        finally:
+            for proceso in procesos.values():
+                detener(proceso)
+    return resultados
+
+
+def comparar(actual: dict, base: dict, tolerancia: float):
+    """
+    Compara resultados con la línea base
+
+    Returns:
+        Lista de (tamaño, escenario, métrica, base, actual, cambio relativo, es regresión)
+    """
+    filas = []
+    for tamano, escenarios in actual.items():
+        for escenario, r in escenarios.items():
+            b = base.get(tamano, {}).get(escenario)
+            if not b:
+                continue
+            for metrica, mas_es_mejor in (('rps', True), ('p99_ms', False)):
+                if not b.get(metrica):
+                    continue
+                cambio = r[metrica] / b[metrica] - 1
+                regresion = cambio < -tolerancia if mas_es_mejor else cambio > tolerancia
+                filas.append((tamano, escenario, metrica, b[metrica], r[metrica], cambio, regresion))
+    return filas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de extremo a extremo del inventario')
+    parser.add_argument('--productos', type=int, nargs='+', default=[1000],
+                        help='Tamaños de catálogo (p. ej. 1000 100000 1000000)')
+    parser.add_argument('--escenarios', nargs='+', choices=ESCENARIOS, default=ESCENARIOS)
+    parser.add_argument('--modo', default='hilos', help='Modo del lanzador (hilos, gevent, eventlet)')
+    parser.add_argument('--concurrencia', type=int, default=16, help='Peticiones simultáneas')
+    parser.add_argument('--duracion', type=float, default=10.0, help='Segundos por escenario')
+    parser.add_argument('--calentamiento', type=float, default=1.0, help='Segundos sin medir')
+    parser.add_argument('--suscriptores', type=int, default=50, help='Clientes Socket.IO en difusion')
+    parser.add_argument('--difusiones', type=int, default=20, help='Altas medidas en difusion')
+    parser.add_argument('--pausa-difusion', type=float, default=0.5,
+                        help='Segundos entre altas (mayor que la ventana de difusión)')
+    parser.add_argument('--hilos-transacciones', type=int, default=4)
+    parser.add_argument('--escritura', choices=('agrupada', 'directa'), default='agrupada',
+                        help='Escrituras del servidor y de transacciones: commit agrupado o una conexión por escritura')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Segundos por petición')
+    parser.add_argument('--arranque', type=float, default=120.0,
+                        help='Segundos de espera al arranque de cada aplicación')
+    parser.add_argument('--salida', default='resultados_extremo_a_extremo.json',
+                        help='Archivo JSON de resultados')
+    parser.add_argument('--linea-base', default=LINEA_BASE, help='Resultados de referencia')
+    parser.add_argument('--guardar-linea-base', action='store_true',
+                        help='Guardar estos resultados como nueva línea base')
+    parser.add_argument('--tolerancia', type=float, default=0.15,
+                        help='Cambio relativo de rps o p99 que se considera regresión')
+    args = parser.parse_args()
+
+    print("=== Benchmark de Extremo a Extremo ===")
+    print(f"Modo: {args.modo} | Concurrencia: {args.concurrencia} | Duración por escenario: {args.duracion:g} s")
+    resultados = {}
+    for productos in args.productos:
+        print(f"\nCatálogo: {productos:,} productos")
+        print(f"  {'Escenario':<16}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errores':>9}")
+        resultados[str(productos)] = ejecutar_tamano(productos, args)
+
+    documento = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'maquina': platform.node(),
+        'parametros': {k: getattr(args, k) for k in ('modo', 'concurrencia', 'duracion', 'suscriptores',
+                                                      'difusiones', 'hilos_transacciones', 'escritura')},
+        'resultados': resultados,
+    }
+    with open(args.salida, 'w', encoding='utf-8') as f:
+        json.dump(documento, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en {args.salida}")
+    if args.guardar_linea_base:
+        with open(args.linea_base, 'w', encoding='utf-8') as f:
+            json.dump(documento, f, indent=2, ensure_ascii=False)
+        print(f"Línea base actualizada: {args.linea_base}")
+        return 0
+
+    if not os.path.exists(args.linea_base):
+        print("Sin línea base con la que comparar (--guardar-linea-base para crearla)")
+        return 0
+    with open(args.linea_base, encoding='utf-8') as f:
+        base = json.load(f)
+    filas = comparar(resultados, base.get('resultados', {}), args.tolerancia)
+    print(f"\n=== Comparación con la línea base del {base.get('fecha', '?')} "
+          f"(tolerancia {args.tolerancia:.0%}) ===")
+    for tamano, escenario, metrica, anterior, actual, cambio, regresion in filas:
+        marca = '  REGRESIÓN' if regresion else ''
+        print(f"{tamano:>8} {escenario:<16}{metrica:<8}{anterior:>10.2f} -> {actual:>10.2f} "
+              f"({cambio:+.1%}){marca}")
+    regresiones = sum(1 for fila in filas if fila[-1])
+    if regresiones:
+        print(f"\n{regresiones} regresiones")
+        return 1
+    print("\nSin regresiones")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga comparativa de los modos de lanzamiento del servidor
+Arranca el servidor de inventario con el servidor de desarrollo original
+(debug=True) y con los perfiles de producción de ``comun/lanzador.py``, y mide
+el rendimiento de GET /api/productos, /api/estadisticas y /api/status.
+
+Uso:
+    python benchmarks/benchmark_lanzador.py --concurrencia 32 --duracion 10
+    python benchmarks/benchmark_lanzador.py --modos desarrollo hilos gevent
+"""
+
+import argparse
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+RUTAS = ['/api/productos', '/api/estadisticas', '/api/status']
+PUERTO = 5000
+
+
+def arrancar(modo: str, db_path: str) -> subprocess.Popen:
+    """Arranca el servidor en el modo pedido, en su propio grupo de procesos"""
+    entorno = dict(os.environ, INVENTARIO_DB_PATH=db_path)
+    comando = [sys.executable, '-m', 'comun.lanzador', 'servidor', '--host', '127.0.0.1']
+    if modo == 'desarrollo':
+        comando += ['--perfil', 'desarrollo']
+    else:
+        comando += ['--modo', modo]
+    return subprocess.Popen(comando, cwd=project_root, env=entorno,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                            start_new_session=True)
+
+
+def esperar_disponible(url: str, limite_s: float = 30) -> bool:
+    fin = time.time() + limite_s
+    while time.time() < fin:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as r:
+                if r.status == 200:
+                    return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def detener(proceso: subprocess.Popen):
+    try:
+        os.killpg(proceso.pid, signal.SIGTERM)
+        proceso.wait(timeout=10)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(proceso.pid, signal.SIGKILL)
+
+
+def generar_carga(base: str, concurrencia: int, duracion: float):
+    """Bucle cerrado: cada hilo repite peticiones hasta agotar la duración"""
+    latencias = []
+    errores = [0]
+    lock = threading.Lock()
+    fin = time.perf_counter() + duracion
+
+    def trabajador(n):
+        propias = []
+        fallos = 0
+        i = n
+        while time.perf_counter() < fin:
+            ruta = RUTAS[i % len(RUTAS)]
+            i += 1
+            inicio = time.perf_counter()
+            try:
+                with urllib.request.urlopen(base + ruta, timeout=10) as r:
+                    r.read()
+                propias.append(time.perf_counter() - inicio)
+            except OSError:
+                fallos += 1
+        with lock:
+            latencias.extend(propias)
+            errores[0] += fallos
+
+    hilos = [threading.Thread(target=trabajador, args=(n,)) for n in range(concurrencia)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    return latencias, errores[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Comparativa de modos de lanzamiento')
+    parser.add_argument('--modos', nargs='+', default=['desarrollo', 'hilos'],
+                        help='desarrollo, hilos, gevent y/o eventlet')
+    parser.add_argument('--concurrencia', type=int, default=32)
+    parser.add_argument('--duracion', type=float, default=10.0, help='Segundos por modo')
+    args = parser.parse_args()
+
+    base = f'http://127.0.0.1:{PUERTO}'
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'inventario.db')
+        for modo in args.modos:
+            proceso = arrancar(modo, db_path)
+            try:
+                if not esperar_disponible(base + '/api/status'):
+                    print(f"{modo}: el servidor no respondió")
+                    continue
+                generar_carga(base, 4, 1.0)  # calentamiento
+                latencias, errores = generar_carga(base, args.concurrencia, args.duracion)
+            finally:
+                detener(proceso)
+            latencias.sort()
+            resultados[modo] = {
+                'rps': len(latencias) / args.duracion,
+                'p50_ms': statistics.median(latencias) * 1000 if latencias else 0,
+                'p99_ms': latencias[int(len(latencias) * 0.99) - 1] * 1000 if latencias else 0,
+                'errores': errores,
+            }
+
+    print("=== Comparativa de Lanzamiento del Servidor ===")
+    print(f"Concurrencia: {args.concurrencia} | Duración por modo: {args.duracion}s")
+    print(f"{'Modo':<12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errores':>10}")
+    for modo, r in resultados.items():
+        print(f"{modo:<12}{r['rps']:>10.1f}{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['errores']:>10}")
+    if 'desarrollo' in resultados and resultados['desarrollo']['rps']:
+        for modo, r in resultados.items():
+            if modo != 'desarrollo':
+                print(f"{modo}: x{r['rps'] / resultados['desarrollo']['rps']:.2f} frente a desarrollo")
+
+
+if __name__ == '__main__':
+    main()
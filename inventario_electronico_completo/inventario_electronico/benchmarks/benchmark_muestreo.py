@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark del muestreo escalar frente al vectorizado (NumPy)
+Mide las muestras por segundo de cada modo y ejecuta la misma simulación en
+los dos, comprobando que los resultados son idénticos para la misma semilla.
+
+Uso:
+    python benchmarks/benchmark_muestreo.py --mensajes 1000000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(project_root, 'ns3_simulation'))
+
+import inventario_network_simulation as sim
+from muestreo import FabricaFlujos
+
+# Mensajes por segundo virtual de los patrones de NETWORK_TOPOLOGY con carga x1
+TASA_BASE = sum(p['frequency_per_minute'] for p in sim.NETWORK_TOPOLOGY['traffic_patterns'].values()) / 60
+
+
+def benchmark_flujos(modo: str, muestras: int) -> dict:
+    """Muestras/s de cada operación de un flujo"""
+    fabrica = FabricaFlujos(42, modo)
+    resultados = {}
+    for operacion, llamada in (('exponencial', lambda f: f.exponencial(0.5)),
+                               ('bernoulli', lambda f: f.bernoulli(0.01))):
+        flujo = fabrica.crear(operacion)
+        inicio = time.perf_counter()
+        for _ in range(muestras):
+            llamada(flujo)
+        resultados[operacion] = muestras / (time.perf_counter() - inicio)
+    return resultados
+
+
+def ejecutar_simulacion(modo: str, carga: float, duracion: float, semilla: int):
+    """Simulación silenciosa; devuelve (huella de resultados, segundos, simulación)"""
+    sim.SIMULATION_CONFIG.update({'duration': duracion, 'verbose': False,
+                                  'load_multiplier': carga, 'sampling': modo})
+    simulacion = sim.NetworkSimulation(semilla=semilla)
+    with contextlib.redirect_stdout(io.StringIO()):
+        simulacion.start_simulation()
+    stats = sim.simulation_stats
+    huella = (
+        stats['packets_sent'], stats['packets_received'], stats['packets_lost'],
+        repr(stats['latency']), simulacion.motor.eventos_procesados,
+        repr(simulacion.enlaces.resumen(duracion)),
+        repr(simulacion.metricas_qos.resumen()),
+    )
+    return huella, simulacion.tiempo_ejecucion, simulacion
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de muestreo escalar y vectorizado')
+    parser.add_argument('--muestras', type=int, default=1_000_000, help='Muestras por operación')
+    parser.add_argument('--mensajes', type=int, default=200_000, help='Mensajes aproximados a simular')
+    parser.add_argument('--duracion', type=float, default=3600, help='Segundos virtuales')
+    parser.add_argument('--semilla', type=int, default=7)
+    args = parser.parse_args()
+    carga = args.mensajes / (TASA_BASE * args.duracion)
+
+    print("=== Benchmark de Muestreo Aleatorio ===")
+    for modo in ('escalar', 'vectorizado'):
+        tasas = benchmark_flujos(modo, args.muestras)
+        print(f"{modo:12s} " + ", ".join(f"{op}: {v:,.0f}/s" for op, v in tasas.items()))
+
+    print(f"\nSimulación: ~{args.mensajes:,} mensajes en {args.duracion:g} s virtuales (carga x{carga:.1f})")
+    huellas = {}
+    for modo in ('escalar', 'vectorizado'):
+        huellas[modo], segundos, simulacion = ejecutar_simulacion(modo, carga, args.duracion, args.semilla)
+        print(f"{modo:12s} {segundos:.2f} s, {simulacion.motor.eventos_procesados:,} eventos, "
+              f"{sim.simulation_stats['packets_sent']:,} paquetes")
+    identicos = huellas['escalar'] == huellas['vectorizado']
+    print(f"Resultados idénticos: {'sí' if identicos else 'NO'}")
+    return 0 if identicos else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Benchmark del resumen diario de transacciones
+Genera un libro sintético de ``--filas`` transacciones repartidas en ``--dias``
+días y ``--productos`` productos y mide:
+
+- el coste del trigger: altas por segundo con y sin ``resumen_diario_transaccion``
+- la reconstrucción completa del resumen (database/resumen_diario.py)
+- historial de un producto, ventas por día y más vendidos: desde el resumen
+  (métodos de DatabaseManager) frente a la misma agregación sobre el libro
+
+y comprueba que resumen y libro coinciden tras la carga y tras reconstruir.
+
+Uso:
+    python benchmarks/benchmark_resumen_diario.py
+    python benchmarks/benchmark_resumen_diario.py --filas 20000000 --dias 730 --productos 5000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+from database.database_manager import DatabaseManager
+from database.resumen_diario import reconstruir, verificar
+
+LOTE = 50000
+
+
+def generar_libro(db_path: str, filas: int, dias: int, productos: int, semilla: int,
+                  con_trigger: bool = True) -> float:
+    """Inserta ``filas`` transacciones en orden de fecha y devuelve las altas por segundo"""
+    db_manager = DatabaseManager(db_path)
+    rnd = random.Random(semilla)
+    conn = db_manager.get_connection()
+    conn.execute("PRAGMA synchronous = OFF")
+    if not con_trigger:
+        conn.execute("DROP TRIGGER resumen_diario_transaccion")
+    conn.execute("DELETE FROM productos")
+    conn.executemany("INSERT INTO productos (id_producto, nombre_producto, cantidad, precio) VALUES (?, ?, 0, ?)",
+                     ((i, f'Producto_{i:05d}', round(rnd.uniform(5, 500), 2)) for i in range(1, productos + 1)))
+    conn.commit()
+    primero = date.today() - timedelta(days=dias - 1)
+    # Popularidad desigual (Zipf aproximada) para que el top-N tenga sentido
+    pesos = [1 / (i ** 0.8) for i in range(1, productos + 1)]
+    ids = list(range(1, productos + 1))
+    segundos_por_fila = dias * 86400 / filas
+    inicio = time.perf_counter()
+    for base in range(0, filas, LOTE):
+        elegidos = rnd.choices(ids, pesos, k=min(LOTE, filas - base))
+        lote = []
+        for n, id_producto in enumerate(elegidos, base):
+            fecha = f"{primero + timedelta(seconds=n * segundos_por_fila):%Y-%m-%d %H:%M:%S}"
+            cantidad = rnd.randint(1, 5)
+            if rnd.random() < 0.7:
+                lote.append((id_producto, 'salida', cantidad, 10.0, cantidad * 10.0, fecha))
+            else:
+                lote.append((id_producto, 'entrada', cantidad, None, None, fecha))
+        conn.executemany("""
+            INSERT INTO transacciones (id_producto, tipo_transaccion, cantidad,
+                                       precio_unitario, total, fecha_transaccion)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, lote)
+        conn.commit()
+    segundos = time.perf_counter() - inicio
+    conn.close()
+    return filas / segundos
+
+
+def mediana_ms(funcion, repeticiones: int) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def consultas_libro(conn: sqlite3.Connection, desde: str, hasta: str, id_producto: int):
+    """Las mismas consultas calculadas sobre ``transacciones``"""
+    hasta_exclusivo = (date.fromisoformat(hasta) + timedelta(days=1)).isoformat()
+    return {
+        'historial': lambda: conn.execute("""
+            SELECT date(fecha_transaccion) AS dia,
+                   SUM(CASE tipo_transaccion WHEN 'entrada' THEN cantidad ELSE 0 END),
+                   SUM(CASE tipo_transaccion WHEN 'salida' THEN cantidad ELSE 0 END),
+                   SUM(CASE tipo_transaccion WHEN 'salida' THEN COALESCE(total, 0) ELSE 0 END), COUNT(*)
+            FROM transacciones
+            WHERE id_producto = ? AND fecha_transaccion >= ? AND fecha_transaccion < ?
+            GROUP BY dia ORDER BY dia
+        """, (id_producto, desde, hasta_exclusivo)).fetchall(),
+        'ventas_por_dia': lambda: conn.execute("""
+            SELECT date(fecha_transaccion) AS dia,
+                   SUM(CASE tipo_transaccion WHEN 'salida' THEN cantidad ELSE 0 END),
+                   SUM(CASE tipo_transaccion WHEN 'salida' THEN COALESCE(total, 0) ELSE 0 END), COUNT(*)
+            FROM transacciones
+            WHERE fecha_transaccion >= ? AND fecha_transaccion < ?
+            GROUP BY dia ORDER BY dia
+        """, (desde, hasta_exclusivo)).fetchall(),
+        'mas_vendidos': lambda: conn.execute("""
+            SELECT id_producto, SUM(cantidad) AS unidades
+            FROM transacciones
+            WHERE tipo_transaccion = 'salida' AND fecha_transaccion >= ? AND fecha_transaccion < ?
+            GROUP BY id_producto ORDER BY unidades DESC LIMIT 10
+        """, (desde, hasta_exclusivo)).fetchall(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del resumen diario de transacciones')
+    parser.add_argument('--filas', type=int, default=1_000_000, help='Transacciones en el libro')
+    parser.add_argument('--dias', type=int, default=365, help='Días que cubre el libro')
+    parser.add_argument('--productos', type=int, default=2000)
+    parser.add_argument('--periodo', type=int, default=90, help='Días consultados')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--semilla', type=int, default=7)
+    args = parser.parse_args()
+
+    print("=== Benchmark del Resumen Diario ===")
+    print(f"{args.filas:,} transacciones | {args.dias} días | {args.productos:,} productos")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'inventario.db')
+        muestra = min(args.filas, 500_000)
+        sin_trigger = generar_libro(os.path.join(tmp, 'sin_trigger.db'), muestra, args.dias,
+                                    args.productos, args.semilla, con_trigger=False)
+        con_trigger = generar_libro(os.path.join(tmp, 'con_trigger.db'), muestra, args.dias,
+                                    args.productos, args.semilla)
+        print(f"\nAltas ({muestra:,} filas): {sin_trigger:,.0f}/s sin trigger, {con_trigger:,.0f}/s con trigger "
+              f"(+{(1 / con_trigger - 1 / sin_trigger) * 1e6:.1f} µs por transacción)")
+
+        inicio = time.perf_counter()
+        generar_libro(db_path, args.filas, args.dias, args.productos, args.semilla)
+        print(f"Libro generado en {time.perf_counter() - inicio:.1f} s")
+
+        conn = sqlite3.connect(db_path)
+        comprobacion = verificar(conn)
+        print(f"Resumen mantenido por el trigger: {comprobacion['filas']:,} filas, "
+              f"{len(comprobacion['diferencias'])} diferencias con el libro")
+        conn.execute("DELETE FROM resumen_diario")
+        conn.commit()
+        datos = reconstruir(conn, dias_por_lote=7)
+        comprobacion = verificar(conn)
+        print(f"Reconstrucción: {datos['filas']:,} filas en {datos['segundos']:.1f} s "
+              f"({args.filas / datos['segundos']:,.0f} transacciones/s), "
+              f"{len(comprobacion['diferencias'])} diferencias")
+
+        db_manager = DatabaseManager(db_path)
+        hasta = date.today().isoformat()
+        desde = (date.today() - timedelta(days=args.periodo - 1)).isoformat()
+        resumen = {
+            'historial': lambda: db_manager.historial_producto(1, desde, hasta),
+            'ventas_por_dia': lambda: db_manager.ventas_por_dia(desde, hasta),
+            'mas_vendidos': lambda: db_manager.mas_vendidos(desde, hasta, 10),
+        }
+        libro = consultas_libro(db_manager.get_connection(), desde, hasta, 1)
+        print(f"\nConsultas de los últimos {args.periodo} días (mediana de {args.repeticiones}):")
+        print(f"  {'consulta':<16}{'resumen ms':>12}{'libro ms':>12}{'x':>8}")
+        for nombre in resumen:
+            ms_resumen = mediana_ms(resumen[nombre], args.repeticiones)
+            ms_libro = mediana_ms(libro[nombre], args.repeticiones)
+            print(f"  {nombre:<16}{ms_resumen:>12.2f}{ms_libro:>12.1f}{ms_libro / ms_resumen:>8.0f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+Generador de carga real a partir de los patrones de tráfico de la topología
+Reproduce los ``traffic_patterns`` de NETWORK_TOPOLOGY, multiplicados por
+``--carga``, como tráfico HTTP y Socket.IO contra los servicios en marcha:
+
+- product_creation  -> POST /api/productos del cliente (5001)
+- inventory_query   -> GET /api/productos del switch (5002)
+- health_check      -> GET /api/status del servidor (5000)
+- websocket_updates -> 'solicitar_inventario' por Socket.IO al servidor, hasta
+                       recibir su confirmación (ack), que llega tras la
+                       respuesta 'inventario_actualizado'
+
+Las llegadas son de bucle abierto (Poisson a la frecuencia del patrón): cada
+petición sale a su hora aunque las anteriores no hayan terminado, y su latencia
+se mide desde esa hora, así que una cola en el servicio se ve en la latencia en
+lugar de frenar la carga. Todo corre en un único bucle asyncio con conexiones
+HTTP/1.1 persistentes y Socket.IO por long-polling, sin dependencias externas.
+
+Las creaciones de producto se escriben de verdad en la base de datos (categoría
+'Carga', proveedor 'generador_carga').
+
+Uso:
+    python benchmarks/generador_carga.py --carga 100 --duracion 60
+    python benchmarks/generador_carga.py --carga 500 --patrones inventory_query --json carga.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import urllib.parse
+from collections import Counter
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(project_root, 'ns3_simulation'))
+
+from estadisticas_simulacion import HistogramaLatencia
+from inventario_network_simulation import PATTERN_MESSAGE_TYPES
+from network_topology import NETWORK_TOPOLOGY
+
+# Tipo de mensaje del patrón -> (tipo de nodo que lo atiende, método, ruta)
+PETICIONES = {
+    'product_create': ('client', 'POST', '/api/productos'),
+    'product_list': ('switch', 'GET', '/api/productos'),
+    'health_check': ('server', 'GET', '/api/status'),
+    'inventory_update': ('server', 'SOCKETIO', 'solicitar_inventario'),
+}
+EVENTO_INVENTARIO = 'inventario_actualizado'
+
+
+class ClienteHTTP:
+    """Conexiones HTTP/1.1 persistentes a un servicio, sobre asyncio"""
+
+    def __init__(self, url_base: str, conexiones: int = 100, timeout: float = 10.0):
+        """
+        Args:
+            url_base: p. ej. http://127.0.0.1:5000
+            conexiones: Máximo de conexiones simultáneas con el servicio
+            timeout: Segundos máximos por petición
+        """
+        partes = urllib.parse.urlsplit(url_base)
+        self.host = partes.hostname
+        self.puerto = partes.port or 80
+        self.timeout = timeout
+        self._libres = []
+        self._cupo = asyncio.Semaphore(conexiones)
+
+    async def peticion(self, metodo: str, ruta: str, cuerpo: bytes = b'',
+                       tipo: str = 'application/json', timeout: float = None):
+        """
+        Envía una petición y espera la respuesta completa
+
+        Returns:
+            (código de estado, cuerpo en bytes)
+        """
+        async with self._cupo:
+            for intento in range(2):
+                reutilizada = bool(self._libres)
+                conexion = self._libres.pop() if reutilizada else await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.puerto), timeout or self.timeout)
+                try:
+                    estado, datos, persistente = await asyncio.wait_for(
+                        self._intercambio(conexion, metodo, ruta, cuerpo, tipo),
+                        timeout or self.timeout)
+                except (asyncio.IncompleteReadError, ConnectionResetError, BrokenPipeError):
+                    conexion[1].close()
+                    # El servicio cerró una conexión ociosa: se reintenta con una nueva
+                    if reutilizada and intento == 0:
+                        continue
+                    raise
+                except BaseException:
+                    conexion[1].close()
+                    raise
+                if persistente:
+                    self._libres.append(conexion)
+                else:
+                    conexion[1].close()
+                return estado, datos
+
+    async def _intercambio(self, conexion, metodo, ruta, cuerpo, tipo):
+        lector, escritor = conexion
+        cabecera = (f'{metodo} {ruta} HTTP/1.1\r\nHost: {self.host}:{self.puerto}\r\n'
+                    f'User-Agent: generador-carga\r\nAccept: */*\r\n')
+        if cuerpo or metodo == 'POST':
+            cabecera += f'Content-Type: {tipo}\r\nContent-Length: {len(cuerpo)}\r\n'
+        escritor.write(cabecera.encode('latin-1') + b'\r\n' + cuerpo)
+        await escritor.drain()
+
+        linea = await lector.readline()
+        if not linea:
+            raise asyncio.IncompleteReadError(b'', None)
+        version, estado = linea.split(None, 2)[:2]
+        cabeceras = {}
+        while True:
+            linea = await lector.readline()
+            if linea in (b'\r\n', b'\n', b''):
+                break
+            nombre, _, valor = linea.decode('latin-1').partition(':')
+            cabeceras[nombre.strip().lower()] = valor.strip()
+
+        persistente = cabeceras.get('connection', '').lower() != 'close' and version == b'HTTP/1.1'
+        if 'chunked' in cabeceras.get('transfer-encoding', '').lower():
+            partes = []
+            while True:
+                tamano = int((await lector.readline()).split(b';')[0], 16)
+                if tamano == 0:
+                    await lector.readline()
+                    break
+                partes.append(await lector.readexactly(tamano))
+                await lector.readexactly(2)
+            datos = b''.join(partes)
+        elif 'content-length' in cabeceras:
+            datos = await lector.readexactly(int(cabeceras['content-length']))
+        elif metodo == 'HEAD' or estado in (b'204', b'304'):
+            datos = b''
+        else:
+            datos = await lector.read()
+            persistente = False
+        return int(estado), datos, persistente
+
+    def cerrar(self):
+        for _, escritor in self._libres:
+            escritor.close()
+        self._libres.clear()
+
+
+class SuscriptorSocketIO:
+    """
+    Cliente Socket.IO mínimo (Engine.IO 4 por long-polling)
+
+    ``solicitar()`` emite el evento con un id de ack (``42<id>[...]``) y espera
+    el ``43<id>`` correspondiente, que el servidor envía al terminar el
+    manejador, ya emitida su respuesta; las difusiones que lleguen mientras
+    tanto no cierran ninguna petición. Cada versión recibida se confirma con
+    'inventario_recibido' como hace el cliente web.
+    """
+
+    def __init__(self, url_base: str, timeout: float = 10.0):
+        # Una conexión para el sondeo largo y otra para los envíos
+        self.http = ClienteHTTP(url_base, conexiones=2, timeout=timeout)
+        self.timeout = timeout
+        self.sid = None
+        self.recibidos = 0
+        self.al_evento = None      # función (datos) para cada 'inventario_actualizado'
+        self._acks = {}            # id de ack -> Future de solicitar()
+        self._siguiente_ack = 0
+        self._tarea = None
+        self._espera_sondeo = 60.0
+
+    def _ruta(self):
+        ruta = f'/socket.io/?EIO=4&transport=polling&t={time.time_ns()}'
+        return f'{ruta}&sid={self.sid}' if self.sid else ruta
+
+    async def conectar(self):
+        estado, datos = await self.http.peticion('GET', self._ruta())
+        texto = datos.decode('utf-8')
+        if estado != 200 or not texto.startswith('0'):
+            raise ConnectionError(f'Handshake Socket.IO fallido (HTTP {estado})')
+        apertura = json.loads(texto[1:])
+        self.sid = apertura['sid']
+        self._espera_sondeo = (apertura.get('pingInterval', 25000) + apertura.get('pingTimeout', 20000)) / 1000 + 5
+        await self._enviar('40')
+        self._tarea = asyncio.ensure_future(self._sondear())
+
+    async def _enviar(self, paquete: str):
+        estado, _ = await self.http.peticion('POST', self._ruta(), paquete.encode('utf-8'),
+                                             'text/plain;charset=UTF-8')
+        if estado != 200:
+            raise ConnectionError(f'Envío Socket.IO rechazado (HTTP {estado})')
+
+    async def emitir(self, evento: str, datos=None, id_ack: int = None):
+        argumentos = [evento] if datos is None else [evento, datos]
+        await self._enviar('42' + ('' if id_ack is None else str(id_ack)) + json.dumps(argumentos))
+
+    async def _sondear(self):
+        while self.sid:
+            try:
+                estado, datos = await self.http.peticion('GET', self._ruta(), timeout=self._espera_sondeo)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                self._fallar(e)
+                return
+            if estado != 200:
+                self._fallar(ConnectionError(f'Sondeo Socket.IO rechazado (HTTP {estado})'))
+                return
+            for paquete in datos.decode('utf-8').split('\x1e'):
+                if paquete == '2':
+                    asyncio.ensure_future(self._enviar('3'))
+                elif paquete.startswith('42'):
+                    evento, *argumentos = json.loads(paquete[2:])
+                    if evento == EVENTO_INVENTARIO:
+                        self._al_recibir(argumentos[0] if argumentos else {})
+                elif paquete.startswith('43'):
+                    self._al_confirmar(paquete[2:])
+                elif paquete.startswith('41') or paquete == '1':
+                    self._fallar(ConnectionError('El servidor cerró la sesión Socket.IO'))
+                    return
+
+    def _al_recibir(self, datos):
+        self.recibidos += 1
+        if self.al_evento:
+            self.al_evento(datos)
+        version = datos.get('version') if isinstance(datos, dict) else None
+        if version is not None:
+            asyncio.ensure_future(self.emitir('inventario_recibido', {'version': version}))
+
+    def _al_confirmar(self, resto: str):
+        # '43<id>[...]': solo la petición con ese id queda respondida
+        cifras = len(resto) - len(resto.lstrip('0123456789'))
+        if not cifras:
+            return
+        futuro = self._acks.pop(int(resto[:cifras]), None)
+        if futuro is not None and not futuro.done():
+            futuro.set_result(True)
+
+    def _fallar(self, error):
+        self.sid = None
+        acks, self._acks = self._acks, {}
+        for futuro in acks.values():
+            if not futuro.done():
+                futuro.set_exception(error)
+
+    async def solicitar(self, evento: str):
+        if not self.sid:
+            raise ConnectionError('Sesión Socket.IO cerrada')
+        id_ack = self._siguiente_ack
+        self._siguiente_ack += 1
+        futuro = asyncio.get_running_loop().create_future()
+        self._acks[id_ack] = futuro
+        try:
+            await self.emitir(evento, id_ack=id_ack)
+            await asyncio.wait_for(futuro, self.timeout)
+        finally:
+            self._acks.pop(id_ack, None)
+
+    async def cerrar(self):
+        if self.sid:
+            try:
+                await self._enviar('41')
+            except (OSError, ConnectionError, asyncio.TimeoutError):
+                pass
+            self.sid = None
+        if self._tarea:
+            self._tarea.cancel()
+        self.http.cerrar()
+
+
+class Patron:
+    """Un patrón de tráfico y sus resultados"""
+
+    def __init__(self, patron_id: str, config: dict, carga: float, url: str):
+        self.id = patron_id
+        self.config = config
+        self.tipo = config.get('message_type') or PATTERN_MESSAGE_TYPES.get(patron_id, patron_id)
+        _, self.metodo, self.ruta = PETICIONES[self.tipo]
+        self.url = url
+        self.tasa = config['frequency_per_minute'] / 60 * carga
+        self.latencias = HistogramaLatencia()
+        self.programadas = 0
+        self.omitidas = 0
+        self.errores = Counter()
+
+    def descripcion(self) -> str:
+        if self.metodo == 'SOCKETIO':
+            return f'Socket.IO {self.url} {self.ruta}'
+        return f'{self.metodo} {self.url}{self.ruta}'
+
+
+def cuerpo_producto(numero: int, tamano: int) -> bytes:
+    """JSON de creación de producto de unos ``tamano`` bytes"""
+    producto = {
+        'nombre_producto': f'Carga_{numero}',
+        'cantidad': 1 + numero % 100,
+        'precio': 10.0 + numero % 990,
+        'categoria': 'Carga',
+        'proveedor': 'generador_carga',
+        'descripcion': '',
+    }
+    relleno = tamano - len(json.dumps(producto))
+    producto['descripcion'] = 'x' * max(relleno, 0)
+    return json.dumps(producto).encode('utf-8')
+
+
+class GeneradorCarga:
+    """Lanza las llegadas de bucle abierto de cada patrón y mide sus latencias"""
+
+    def __init__(self, patrones, host='127.0.0.1', conexiones=100, max_en_vuelo=1000,
+                 timeout=10.0, suscriptores=1, semilla=None):
+        self.patrones = patrones
+        self.conexiones = conexiones
+        self.max_en_vuelo = max_en_vuelo
+        self.timeout = timeout
+        self.numero_suscriptores = suscriptores
+        self.rnd = random.Random(semilla)
+        self.en_vuelo = 0
+        self.retraso_max = 0.0
+        self._clientes = {}
+        self._suscriptores = []
+        self._tareas = set()
+
+    def _cliente(self, url):
+        if url not in self._clientes:
+            self._clientes[url] = ClienteHTTP(url, self.conexiones, self.timeout)
+        return self._clientes[url]
+
+    async def ejecutar(self, duracion: float):
+        bucle = asyncio.get_running_loop()
+        urls_socketio = {p.url for p in self.patrones if p.metodo == 'SOCKETIO'}
+        for url in urls_socketio:
+            for _ in range(self.numero_suscriptores):
+                suscriptor = SuscriptorSocketIO(url, self.timeout)
+                await suscriptor.conectar()
+                self._suscriptores.append(suscriptor)
+
+        self.inicio = bucle.time()
+        try:
+            await asyncio.gather(*(self._llegadas(p, self.inicio + duracion) for p in self.patrones))
+            if self._tareas:
+                await asyncio.wait(self._tareas, timeout=self.timeout + 1)
+        finally:
+            self.duracion = bucle.time() - self.inicio
+            for suscriptor in self._suscriptores:
+                await suscriptor.cerrar()
+            for cliente in self._clientes.values():
+                cliente.cerrar()
+
+    async def _llegadas(self, patron: Patron, fin: float):
+        """Llegadas de Poisson: cada petición sale a su hora, haya o no respuestas pendientes"""
+        if patron.tasa <= 0:
+            return
+        bucle = asyncio.get_running_loop()
+        rnd = random.Random(self.rnd.getrandbits(64))
+        hora = self.inicio
+        while True:
+            hora += rnd.expovariate(patron.tasa)
+            if hora >= fin:
+                return
+            espera = hora - bucle.time()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            else:
+                self.retraso_max = max(self.retraso_max, -espera)
+            patron.programadas += 1
+            if self.en_vuelo >= self.max_en_vuelo:
+                patron.omitidas += 1
+                continue
+            tarea = asyncio.ensure_future(self._peticion(patron, hora))
+            self._tareas.add(tarea)
+            tarea.add_done_callback(self._tareas.discard)
+
+    async def _peticion(self, patron: Patron, hora: float):
+        bucle = asyncio.get_running_loop()
+        self.en_vuelo += 1
+        try:
+            if patron.metodo == 'SOCKETIO':
+                suscriptor = self._suscriptores[patron.programadas % len(self._suscriptores)]
+                await suscriptor.solicitar(patron.ruta)
+            else:
+                cuerpo = b''
+                if patron.metodo == 'POST':
+                    cuerpo = cuerpo_producto(patron.programadas, patron.config.get('payload_size_bytes', 256))
+                estado, _ = await self._cliente(patron.url).peticion(patron.metodo, patron.ruta, cuerpo)
+                if estado >= 400:
+                    patron.errores[f'HTTP {estado}'] += 1
+                    return
+            patron.latencias.registrar((bucle.time() - hora) * 1000)
+        except (OSError, ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+            patron.errores[type(e).__name__] += 1
+        finally:
+            self.en_vuelo -= 1
+
+    def resumen(self) -> dict:
+        resultado = {}
+        for p in self.patrones:
+            resultado[p.id] = {
+                'peticion': p.descripcion(),
+                'tasa_objetivo': p.tasa,
+                'programadas': p.programadas,
+                'completadas': p.latencias.conteo,
+                'omitidas': p.omitidas,
+                'errores': dict(p.errores),
+                'tasa_lograda': p.latencias.conteo / self.duracion if self.duracion else 0.0,
+                'latencia_ms': p.latencias.resumen(),
+            }
+        return resultado
+
+
+def crear_patrones(topologia: dict, carga: float, host: str, seleccion=None):
+    """Patrones de ``topologia`` con la URL del servicio que atiende cada uno"""
+    puertos = {}
+    for nodo in topologia['nodes'].values():
+        puertos.setdefault(nodo['type'], nodo['port'])
+    patrones = []
+    for patron_id, config in topologia.get('traffic_patterns', {}).items():
+        if seleccion and patron_id not in seleccion:
+            continue
+        tipo = config.get('message_type') or PATTERN_MESSAGE_TYPES.get(patron_id, patron_id)
+        if tipo not in PETICIONES:
+            print(f"Patrón {patron_id} omitido: tipo de mensaje sin petición real ({tipo})")
+            continue
+        tipo_nodo = PETICIONES[tipo][0]
+        patrones.append(Patron(patron_id, config, carga, f'http://{host}:{puertos[tipo_nodo]}'))
+    return patrones
+
+
+def imprimir_resumen(resumen: dict, duracion: float, retraso_max: float):
+    print(f"\n=== Resultados ({duracion:.1f} s) ===")
+    for patron_id, r in resumen.items():
+        lat = r['latencia_ms']
+        print(f"\n{patron_id}: {r['peticion']}")
+        print(f"  Objetivo {r['tasa_objetivo']:.2f}/s | logrado {r['tasa_lograda']:.2f}/s | "
+              f"{r['completadas']} completadas de {r['programadas']} "
+              f"({r['omitidas']} omitidas por exceso de peticiones en vuelo)")
+        if lat['n']:
+            print(f"  Latencia: p50 {lat['p50']:.1f} / p95 {lat['p95']:.1f} / p99 {lat['p99']:.1f} / "
+                  f"máx. {lat['max']:.1f} ms")
+        if r['errores']:
+            print("  Errores: " + ", ".join(f"{k} x{v}" for k, v in r['errores'].items()))
+    if retraso_max > 0.05:
+        print(f"\nAviso: el generador llegó a ir {retraso_max*1000:.0f} ms por detrás de su programa; "
+              f"las latencias lo incluyen")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Carga real desde los patrones de tráfico de la topología')
+    parser.add_argument('--carga', type=float, default=1.0,
+                        help='Multiplicador de frequency_per_minute de cada patrón')
+    parser.add_argument('--duracion', type=float, default=60, help='Segundos de carga')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='Host de los servicios (puertos de la topología)')
+    parser.add_argument('--patrones', nargs='+', metavar='PATRON', help='Solo estos patrones')
+    parser.add_argument('--conexiones', type=int, default=100,
+                        help='Conexiones HTTP simultáneas por servicio')
+    parser.add_argument('--max-en-vuelo', type=int, default=1000,
+                        help='Peticiones pendientes a partir de las cuales se omiten llegadas')
+    parser.add_argument('--suscriptores', type=int, default=1,
+                        help='Clientes Socket.IO que reparten las solicitudes de inventario')
+    parser.add_argument('--timeout', type=float, default=10.0, help='Segundos por petición')
+    parser.add_argument('--semilla', type=int, default=None)
+    parser.add_argument('--json', metavar='ARCHIVO', help='Guardar el resumen en JSON')
+    args = parser.parse_args()
+
+    patrones = crear_patrones(NETWORK_TOPOLOGY, args.carga, args.host, args.patrones)
+    if not patrones:
+        print("No hay patrones que generar")
+        return 1
+    print("=== Generador de Carga ===")
+    for p in patrones:
+        print(f"  {p.id}: {p.tasa:.2f}/s -> {p.descripcion()}")
+
+    generador = GeneradorCarga(patrones, args.host, args.conexiones, args.max_en_vuelo,
+                               args.timeout, args.suscriptores, args.semilla)
+    try:
+        asyncio.run(generador.ejecutar(args.duracion))
+    except (OSError, ConnectionError) as e:
+        print(f"Error conectando con los servicios: {e}")
+        return 1
+    except KeyboardInterrupt:
+        print("\nCarga interrumpida")
+        return 1
+
+    resumen = generador.resumen()
+    imprimir_resumen(resumen, generador.duracion, generador.retraso_max)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'carga': args.carga, 'duracion': generador.duracion,
+                       'retraso_max_s': generador.retraso_max, 'patrones': resumen},
+                      f, indent=2, ensure_ascii=False)
+        print(f"\nResumen guardado en {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
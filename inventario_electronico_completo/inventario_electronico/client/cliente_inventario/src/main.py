@@ -1,13 +1,25 @@
+import logging
 import os
 import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+# Raíz del proyecto para los módulos compartidos (comun/)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.append(project_root)
 
 from flask import Flask, send_from_directory, request, jsonify
 from flask_socketio import SocketIO, emit
 from flask_cors import CORS
 import requests
 from datetime import datetime
+from comun.configuracion import opciones_socketio, modo_debug
+from comun.instrumentacion import Instrumentacion
+from comun.trazado import Trazador
+from comun.registro import configurar_registro
+
+# Registro estructurado y asíncrono (variables INVENTARIO_LOG_*, ver comun/registro.py)
+configurar_registro('cliente')
+logger = logging.getLogger('inventario.cliente')
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'inventario-electronico-2024-cliente'
@@ -15,11 +27,17 @@ app.config['SECRET_KEY'] = 'inventario-electronico-2024-cliente'
 # Configurar CORS para permitir conexiones desde cualquier origen
 CORS(app, origins="*")
 
-# Configurar Socket.IO con CORS
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+# Configurar Socket.IO con CORS (modo asíncrono y cola según el entorno)
+socketio = SocketIO(app, cors_allowed_origins="*", **opciones_socketio())
+
+# Tiempos por ruta (las llamadas al servidor cuentan como 'upstream')
+instrumentacion = Instrumentacion('cliente').instalar(app)
+# Trazado distribuido (INVENTARIO_TRAZAS_DIR): las llamadas al servidor llevan traceparent
+trazador = Trazador('cliente').instalar(app)
 
 # Configuración del servidor de inventario (Máquina 1)
-SERVIDOR_INVENTARIO_URL = 'http://localhost:5000'  # URL del servidor de inventario
+# INVENTARIO_SERVIDOR_URL permite pasar por el switch o por comun/proxy_degradacion.py
+SERVIDOR_INVENTARIO_URL = os.environ.get('INVENTARIO_SERVIDOR_URL', 'http://localhost:5000')  # URL del servidor de inventario
 SERVIDOR_INVENTARIO_SOCKET_URL = 'http://localhost:5000'  # URL para Socket.IO
 
 # IPs permitidas para el cliente (Máquina 2)
@@ -53,21 +71,24 @@ def crear_producto():
         }
         
         # Enviar al servidor de inventario via API
-        response = requests.post(
-            f'{SERVIDOR_INVENTARIO_URL}/api/productos',
-            json=producto_data,
-            timeout=10
-        )
+        with instrumentacion.cronometrar('upstream'), trazador.span('POST /api/productos', 'http'):
+            response = requests.post(
+                f'{SERVIDOR_INVENTARIO_URL}/api/productos',
+                json=producto_data,
+                headers=trazador.propagar(),
+                timeout=10
+            )
         
         if response.status_code == 200 or response.status_code == 201:
             result = response.json()
             
             # Notificar via Socket.IO al servidor
-            socketio.emit('producto_creado', {
-                'producto': producto_data,
-                'nombre': producto_data['nombre'],
-                'timestamp': datetime.now().isoformat()
-            }, namespace='/', room=None)
+            with trazador.span('emit producto_creado', 'emit'):
+                socketio.emit('producto_creado', {
+                    'producto': producto_data,
+                    'nombre': producto_data['nombre'],
+                    'timestamp': datetime.now().isoformat()
+                }, namespace='/', room=None)
             
             return jsonify({
                 'success': True,
@@ -83,7 +104,8 @@ def crear_producto():
     except requests.exceptions.RequestException as e:
         # Si falla la comunicación HTTP, intentar via Socket.IO
         try:
-            socketio.emit('crear_producto', producto_data)
+            with trazador.span('emit crear_producto', 'emit'):
+                socketio.emit('crear_producto', producto_data)
             return jsonify({
                 'success': True,
                 'mensaje': f'Producto "{producto_data["nombre"]}" enviado via Socket.IO',
@@ -127,22 +149,25 @@ def actualizar_producto(id_producto):
         }
         
         # Enviar al servidor de inventario via API
-        response = requests.put(
-            f'{SERVIDOR_INVENTARIO_URL}/api/productos/{id_producto}',
-            json=producto_data,
-            timeout=10
-        )
+        with instrumentacion.cronometrar('upstream'), trazador.span('PUT /api/productos/<id>', 'http'):
+            response = requests.put(
+                f'{SERVIDOR_INVENTARIO_URL}/api/productos/{id_producto}',
+                json=producto_data,
+                headers=trazador.propagar(),
+                timeout=10
+            )
         
         if response.status_code == 200:
             result = response.json()
             
             # Notificar via Socket.IO al servidor
-            socketio.emit('producto_actualizado', {
-                'id_producto': id_producto,
-                'producto': producto_data,
-                'nombre': producto_data['nombre'],
-                'timestamp': datetime.now().isoformat()
-            }, namespace='/', room=None)
+            with trazador.span('emit producto_actualizado', 'emit'):
+                socketio.emit('producto_actualizado', {
+                    'id_producto': id_producto,
+                    'producto': producto_data,
+                    'nombre': producto_data['nombre'],
+                    'timestamp': datetime.now().isoformat()
+                }, namespace='/', room=None)
             
             return jsonify({
                 'success': True,
@@ -158,7 +183,8 @@ def actualizar_producto(id_producto):
     except requests.exceptions.RequestException as e:
         # Si falla la comunicación HTTP, intentar via Socket.IO
         try:
-            socketio.emit('modificar_producto', producto_data)
+            with trazador.span('emit modificar_producto', 'emit'):
+                socketio.emit('modificar_producto', producto_data)
             return jsonify({
                 'success': True,
                 'mensaje': f'Actualización del producto ID {id_producto} enviada via Socket.IO',
@@ -179,10 +205,12 @@ def actualizar_producto(id_producto):
 def obtener_productos_servidor():
     """Obtener productos del servidor de inventario"""
     try:
-        response = requests.get(
-            f'{SERVIDOR_INVENTARIO_URL}/api/productos',
-            timeout=10
-        )
+        with instrumentacion.cronometrar('upstream'), trazador.span('GET /api/productos', 'http'):
+            response = requests.get(
+                f'{SERVIDOR_INVENTARIO_URL}/api/productos',
+                headers=trazador.propagar(),
+                timeout=10
+            )
         
         if response.status_code == 200:
             productos_data = response.json()
@@ -211,7 +239,9 @@ def status():
         # Verificar conexión con el servidor
         servidor_disponible = False
         try:
-            response = requests.get(f'{SERVIDOR_INVENTARIO_URL}/api/status', timeout=5)
+            with instrumentacion.cronometrar('upstream'), trazador.span('GET /api/status', 'http'):
+                response = requests.get(f'{SERVIDOR_INVENTARIO_URL}/api/status',
+                                        headers=trazador.propagar(), timeout=5)
             servidor_disponible = response.status_code == 200
         except:
             pass
@@ -237,7 +267,7 @@ def status():
 @socketio.on('connect')
 def handle_connect():
     """Maneja nuevas conexiones Socket.IO"""
-    print(f'Cliente conectado: {request.sid}')
+    logger.info('Cliente conectado: %s', request.sid)
     emit('cliente_conectado', {
         'mensaje': 'Conectado al cliente de inventario',
         'timestamp': datetime.now().isoformat()
@@ -246,7 +276,7 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     """Maneja desconexiones Socket.IO"""
-    print(f'Cliente desconectado: {request.sid}')
+    logger.info('Cliente desconectado: %s', request.sid)
 
 @socketio.on('test_servidor')
 def handle_test_servidor():
@@ -299,4 +329,4 @@ if __name__ == '__main__':
     print("IPs permitidas:", IPS_PERMITIDAS_CLIENTE)
     print("=========================================")
     
-    socketio.run(app, host='0.0.0.0', port=5001, debug=True, allow_unsafe_werkzeug=True)
+    socketio.run(app, host='0.0.0.0', port=5001, debug=modo_debug(), allow_unsafe_werkzeug=True)
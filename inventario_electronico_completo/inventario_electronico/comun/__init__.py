@@ -0,0 +1,4 @@
+"""
+Módulo Común para las aplicaciones del Sistema de Inventario Electrónico
+Configuración compartida, bus de mensajes local y lanzador de producción
+"""
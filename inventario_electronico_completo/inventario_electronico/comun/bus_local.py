@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Bus de Mensajes Local (publicación/suscripción)
+Sustituto mínimo de Redis Pub/Sub para una sola máquina: un broker TCP que
+reenvía cada mensaje publicado en un canal a todos los suscriptores del canal.
+
+Formato de trama: 4 bytes de longitud (big-endian) + cuerpo. El cuerpo empieza
+con un byte de operación ('P' publicar, 'S' suscribir, 'M' mensaje entregado),
+2 bytes con la longitud del canal, el canal en UTF-8 y los datos.
+
+Uso:
+    python -m comun.bus_local --puerto 6380
+"""
+
+import argparse
+import socket
+import socketserver
+import struct
+import threading
+import time
+from typing import Callable, Dict, Iterator, Set, Tuple
+from urllib.parse import urlparse
+
+URL_BUS_DEFECTO = 'bus://127.0.0.1:6380'
+
+_CABECERA = struct.Struct('>I')
+_CANAL = struct.Struct('>H')
+
+
+def parsear_url(url: str) -> Tuple[str, int]:
+    """Convierte ``bus://host:puerto`` en (host, puerto)"""
+    partes = urlparse(url)
+    return partes.hostname or '127.0.0.1', partes.port or 6380
+
+
+def _codificar(operacion: bytes, canal: str, datos: bytes = b'') -> bytes:
+    canal_b = canal.encode('utf-8')
+    cuerpo = operacion + _CANAL.pack(len(canal_b)) + canal_b + datos
+    return _CABECERA.pack(len(cuerpo)) + cuerpo
+
+
+def _leer_exacto(conexion: socket.socket, n: int) -> bytes:
+    partes = []
+    while n:
+        parte = conexion.recv(n)
+        if not parte:
+            raise ConnectionError('Conexión cerrada por el otro extremo')
+        partes.append(parte)
+        n -= len(parte)
+    return b''.join(partes)
+
+
+def _leer_trama(conexion: socket.socket) -> Tuple[bytes, str, bytes]:
+    (longitud,) = _CABECERA.unpack(_leer_exacto(conexion, _CABECERA.size))
+    cuerpo = _leer_exacto(conexion, longitud)
+    (largo_canal,) = _CANAL.unpack_from(cuerpo, 1)
+    inicio = 1 + _CANAL.size
+    canal = cuerpo[inicio:inicio + largo_canal].decode('utf-8')
+    return cuerpo[:1], canal, cuerpo[inicio + largo_canal:]
+
+
+# ==================== BROKER ====================
+
+class _ManejadorBus(socketserver.BaseRequestHandler):
+    def handle(self):
+        broker = self.server
+        conexion = self.request
+        conexion.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        lock_envio = threading.Lock()
+        canales: Set[str] = set()
+        try:
+            while True:
+                operacion, canal, datos = _leer_trama(conexion)
+                if operacion == b'S':
+                    canales.add(canal)
+                    broker.suscribir(canal, conexion, lock_envio)
+                elif operacion == b'P':
+                    broker.difundir(canal, datos)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            for canal in canales:
+                broker.desuscribir(canal, conexion)
+
+
+class BrokerBus(socketserver.ThreadingTCPServer):
+    """Broker pub/sub en memoria; un hilo por conexión"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = '127.0.0.1', puerto: int = 6380):
+        super().__init__((host, puerto), _ManejadorBus)
+        self._lock = threading.Lock()
+        self._suscriptores: Dict[str, Dict[socket.socket, threading.Lock]] = {}
+        self.mensajes_difundidos = 0
+
+    def suscribir(self, canal: str, conexion: socket.socket, lock_envio: threading.Lock):
+        with self._lock:
+            self._suscriptores.setdefault(canal, {})[conexion] = lock_envio
+
+    def desuscribir(self, canal: str, conexion: socket.socket):
+        with self._lock:
+            self._suscriptores.get(canal, {}).pop(conexion, None)
+
+    def difundir(self, canal: str, datos: bytes):
+        trama = _codificar(b'M', canal, datos)
+        with self._lock:
+            destinos = list(self._suscriptores.get(canal, {}).items())
+            self.mensajes_difundidos += 1
+        for conexion, lock_envio in destinos:
+            try:
+                with lock_envio:
+                    conexion.sendall(trama)
+            except OSError:
+                self.desuscribir(canal, conexion)
+
+
+# ==================== CLIENTE ====================
+
+class ClienteBus:
+    """
+    Cliente del bus local
+
+    Usa una conexión para publicar y otra (creada por ``escuchar``) para
+    recibir, igual que un cliente Redis Pub/Sub.
+    """
+
+    def __init__(self, url: str = URL_BUS_DEFECTO, reintento_s: float = 1.0):
+        self.host, self.puerto = parsear_url(url)
+        self.reintento_s = reintento_s
+        self._conexion_pub = None
+        self._lock = threading.Lock()
+
+    def _conectar(self) -> socket.socket:
+        conexion = socket.create_connection((self.host, self.puerto), timeout=5)
+        conexion.settimeout(None)
+        conexion.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return conexion
+
+    def publicar(self, canal: str, datos: bytes):
+        """Publica ``datos`` en ``canal``; reconecta una vez si la conexión cayó"""
+        trama = _codificar(b'P', canal, datos)
+        with self._lock:
+            for intento in range(2):
+                try:
+                    if self._conexion_pub is None:
+                        self._conexion_pub = self._conectar()
+                    self._conexion_pub.sendall(trama)
+                    return
+                except OSError:
+                    if self._conexion_pub is not None:
+                        self._conexion_pub.close()
+                    self._conexion_pub = None
+                    if intento:
+                        raise
+
+    def escuchar(self, *canales: str, al_conectar: Callable[[], None] = None) -> Iterator[Tuple[str, bytes]]:
+        """
+        Genera (canal, datos) para cada mensaje recibido en los canales
+
+        Si el broker se reinicia, vuelve a conectar y suscribirse. ``al_conectar``
+        se llama tras cada suscripción: los mensajes publicados mientras no
+        había conexión se han perdido.
+        """
+        while True:
+            try:
+                conexion = self._conectar()
+            except OSError:
+                time.sleep(self.reintento_s)
+                continue
+            try:
+                for canal in canales:
+                    conexion.sendall(_codificar(b'S', canal))
+                if al_conectar is not None:
+                    al_conectar()
+                while True:
+                    operacion, canal, datos = _leer_trama(conexion)
+                    if operacion == b'M':
+                        yield canal, datos
+            except (ConnectionError, OSError):
+                time.sleep(self.reintento_s)
+            finally:
+                conexion.close()
+
+    def cerrar(self):
+        with self._lock:
+            if self._conexion_pub is not None:
+                self._conexion_pub.close()
+                self._conexion_pub = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bus de mensajes local (pub/sub)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=6380)
+    args = parser.parse_args()
+
+    broker = BrokerBus(args.host, args.puerto)
+    print(f"Bus local escuchando en bus://{args.host}:{args.puerto}")
+    try:
+        broker.serve_forever()
+    except KeyboardInterrupt:
+        print("\nBus detenido")
+    finally:
+        broker.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Clúster Local de Servidores de Inventario
+Arranca el bus de cambios, N instancias del servidor sobre una misma base de
+datos y el switch apuntando a todas ellas. Con ``--escenario failover`` ejecuta
+una prueba guiada:
+
+    1. Una escritura en la instancia 1 aparece en el catálogo de todas.
+    2. Se detiene la instancia 1 y las escrituras vía switch siguen funcionando.
+    3. Las escrituras hechas sin la instancia 1 se propagan al resto.
+    4. La instancia 1 vuelve a arrancar y ve el catálogo completo.
+
+Uso:
+    python -m comun.cluster_local --instancias 3
+    python -m comun.cluster_local --instancias 3 --escenario failover
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Puertos de las instancias: 5000, 5003, 5004, ... (5001 y 5002 son cliente y switch)
+PUERTO_SWITCH = 5002
+PUERTO_BUS = 6380
+
+
+def puertos_instancias(n: int):
+    return [5000] + [5003 + i for i in range(n - 1)]
+
+
+class ClusterLocal:
+    """Procesos del clúster: bus, instancias del servidor y switch"""
+
+    def __init__(self, instancias: int, db_path: str, modo: str = 'hilos'):
+        self.puertos = puertos_instancias(instancias)
+        self.db_path = db_path
+        self.modo = modo
+        self.bus_url = f'bus://127.0.0.1:{PUERTO_BUS}'
+        self.bus = None
+        self.servidores = {}
+        self.switch = None
+
+    def _popen(self, comando, entorno=None):
+        return subprocess.Popen(comando, cwd=project_root, env=dict(os.environ, **(entorno or {})),
+                                start_new_session=True)
+
+    def arrancar_bus(self):
+        self.bus = self._popen([sys.executable, '-m', 'comun.bus_local', '--puerto', str(PUERTO_BUS)])
+        time.sleep(0.5)
+
+    def arrancar_servidor(self, puerto: int):
+        self.servidores[puerto] = self._popen(
+            [sys.executable, '-m', 'comun.lanzador', 'servidor', '--host', '127.0.0.1',
+             '--puerto', str(puerto), '--modo', self.modo, '--bus-cambios', self.bus_url],
+            {'INVENTARIO_DB_PATH': self.db_path, 'INVENTARIO_INSTANCIA': f'servidor-{puerto}'})
+
+    def arrancar_switch(self):
+        urls = ','.join(f'http://127.0.0.1:{p}' for p in self.puertos)
+        self.switch = self._popen(
+            [sys.executable, '-m', 'comun.lanzador', 'switch', '--host', '127.0.0.1'],
+            {'SWITCH_SERVIDORES': urls})
+
+    def arrancar(self):
+        self.arrancar_bus()
+        # La primera instancia crea el esquema antes de que arranquen las demás
+        self.arrancar_servidor(self.puertos[0])
+        esperar_disponible(self.puertos[0])
+        for puerto in self.puertos[1:]:
+            self.arrancar_servidor(puerto)
+        self.arrancar_switch()
+        for puerto in self.puertos + [PUERTO_SWITCH]:
+            if not esperar_disponible(puerto):
+                raise RuntimeError(f'El proceso en el puerto {puerto} no arrancó')
+
+    def detener_servidor(self, puerto: int):
+        _detener(self.servidores.pop(puerto))
+
+    def detener(self):
+        for proceso in list(self.servidores.values()) + [self.switch, self.bus]:
+            if proceso is not None:
+                _detener(proceso)
+        self.servidores.clear()
+
+
+def _detener(proceso: subprocess.Popen):
+    try:
+        os.killpg(proceso.pid, signal.SIGTERM)
+        proceso.wait(timeout=10)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        try:
+            os.killpg(proceso.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+def _pedir(puerto: int, ruta: str, datos=None, timeout: float = 5):
+    peticion = urllib.request.Request(
+        f'http://127.0.0.1:{puerto}{ruta}',
+        data=json.dumps(datos).encode('utf-8') if datos is not None else None,
+        headers={'Content-Type': 'application/json'} if datos is not None else {})
+    with urllib.request.urlopen(peticion, timeout=timeout) as r:
+        return r.status, json.loads(r.read() or b'null')
+
+
+def esperar_disponible(puerto: int, limite_s: float = 30) -> bool:
+    ruta = '/api/switch/status' if puerto == PUERTO_SWITCH else '/api/status'
+    fin = time.time() + limite_s
+    while time.time() < fin:
+        try:
+            if _pedir(puerto, ruta, timeout=1)[0] == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def esperar_producto(puerto: int, nombre: str, limite_s: float = 5) -> bool:
+    """Espera a que ``nombre`` aparezca en el catálogo servido por ``puerto``"""
+    fin = time.time() + limite_s
+    while time.time() < fin:
+        _, productos = _pedir(puerto, '/api/productos')
+        if any(p['nombre_producto'] == nombre for p in productos):
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def _crear(puerto: int, nombre: str):
+    estado, cuerpo = _pedir(puerto, '/api/productos',
+                            {'nombre': nombre, 'cantidad': 5, 'precio': 9.99})
+    if estado != 201:
+        raise RuntimeError(f'Alta de {nombre} en {puerto} devolvió {estado}: {cuerpo}')
+
+
+def escenario_failover(cluster: ClusterLocal) -> bool:
+    """Ejecuta la prueba guiada de propagación y failover; True si todo pasa"""
+    resultados = []
+
+    def comprobar(descripcion, ok):
+        resultados.append(ok)
+        print(f"  [{'OK' if ok else 'FALLO'}] {descripcion}")
+
+    primera, resto = cluster.puertos[0], cluster.puertos[1:]
+    sufijo = int(time.time())
+
+    print("1) Propagación de escrituras entre instancias")
+    nombre = f'Cluster_A_{sufijo}'
+    inicio = time.perf_counter()
+    _crear(primera, nombre)
+    for puerto in resto:
+        comprobar(f"instancia {puerto} ve '{nombre}'", esperar_producto(puerto, nombre))
+    print(f"     propagado en {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+    print(f"2) Failover: se detiene la instancia {primera}")
+    cluster.detener_servidor(primera)
+    nombres = [f'Cluster_B_{sufijo}_{i}' for i in range(5)]
+    fallos = 0
+    for nombre in nombres:
+        try:
+            _crear(PUERTO_SWITCH, nombre)
+        except (OSError, RuntimeError) as e:
+            fallos += 1
+            print(f"     error: {e}")
+    comprobar(f"{len(nombres) - fallos}/{len(nombres)} altas vía switch con una instancia caída",
+              fallos == 0)
+    _, estado_switch = _pedir(PUERTO_SWITCH, '/api/switch/status')
+    print(f"     failovers del switch: {estado_switch['estadisticas'].get('failovers', 0)}")
+
+    print("3) Propagación sin la instancia caída")
+    for puerto in resto:
+        comprobar(f"instancia {puerto} ve las altas hechas durante la caída",
+                  all(esperar_producto(puerto, n) for n in nombres))
+
+    print(f"4) Recuperación: vuelve la instancia {primera}")
+    cluster.arrancar_servidor(primera)
+    comprobar("la instancia arranca", esperar_disponible(primera))
+    comprobar("su catálogo incluye las altas de la caída",
+              all(esperar_producto(primera, n) for n in nombres))
+    nombre = f'Cluster_C_{sufijo}'
+    _crear(resto[0] if resto else primera, nombre)
+    comprobar(f"recibe de nuevo cambios remotos ('{nombre}')", esperar_producto(primera, nombre))
+
+    return all(resultados)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Clúster local de servidores de inventario')
+    parser.add_argument('--instancias', type=int, default=2)
+    parser.add_argument('--modo', default='hilos', choices=['hilos', 'gevent', 'eventlet'])
+    parser.add_argument('--db', default=None, help='Base compartida (por defecto, temporal)')
+    parser.add_argument('--escenario', choices=['failover'], default=None)
+    args = parser.parse_args()
+    if args.instancias < 2 and args.escenario:
+        parser.error('el escenario de failover necesita al menos 2 instancias')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db or os.path.join(tmp, 'inventario.db')
+        cluster = ClusterLocal(args.instancias, db_path, args.modo)
+        try:
+            cluster.arrancar()
+            print(f"Clúster listo: instancias {cluster.puertos}, switch {PUERTO_SWITCH}, "
+                  f"bus {cluster.bus_url}, base {db_path}")
+            if args.escenario == 'failover':
+                ok = escenario_failover(cluster)
+                print("Escenario superado" if ok else "Escenario con fallos")
+                return 0 if ok else 1
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            return 0
+        finally:
+            cluster.detener()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,35 @@
+"""
+Configuración compartida de las aplicaciones Flask del inventario
+Lee del entorno las opciones que fija el lanzador de producción
+(``comun/lanzador.py``) para que el mismo código sirva en desarrollo.
+"""
+
+import os
+from typing import Dict
+
+
+def opciones_socketio() -> Dict:
+    """
+    Opciones de Flask-SocketIO según el entorno
+
+    - ``INVENTARIO_ASYNC_MODE``: threading (defecto), gevent o eventlet
+    - ``INVENTARIO_SOCKETIO_MQ``: cola para difundir entre workers/procesos,
+      ``bus://host:puerto`` (bus local) o una URL de Redis/Kombu
+
+    Returns:
+        Diccionario de argumentos para ``SocketIO(app, ...)``
+    """
+    opciones = {'async_mode': os.environ.get('INVENTARIO_ASYNC_MODE', 'threading')}
+    cola = os.environ.get('INVENTARIO_SOCKETIO_MQ')
+    if cola:
+        if cola.startswith('bus://'):
+            from .gestor_socketio_bus import GestorBusSocketIO
+            opciones['client_manager'] = GestorBusSocketIO(cola)
+        else:
+            opciones['message_queue'] = cola
+    return opciones
+
+
+def modo_debug() -> bool:
+    """Modo debug de Flask (activo salvo ``INVENTARIO_DEBUG=0``)"""
+    return os.environ.get('INVENTARIO_DEBUG', '1') == '1'
@@ -0,0 +1,37 @@
+"""
+Gestor de clientes Socket.IO sobre el bus local
+Permite que varios workers/procesos compartan las difusiones Socket.IO usando
+``comun.bus_local`` en lugar de Redis.
+"""
+
+import socketio
+from socketio import packet
+
+from .bus_local import ClienteBus
+
+
+class GestorBusSocketIO(socketio.PubSubManager):
+    """``PubSubManager`` de python-socketio que publica en el bus local"""
+
+    name = 'bus_local'
+
+    def __init__(self, url: str, channel: str = 'socketio', write_only: bool = False,
+                 logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.url = url
+        self._publicador = ClienteBus(url)
+
+    @staticmethod
+    def _json():
+        # El módulo JSON del servidor (``SocketIO(json=...)`` lo instala en Packet):
+        # incrusta los snapshots pre-codificados igual que en las emisiones locales.
+        # Nunca pickle: cualquiera que alcance el bus podría ejecutar código aquí
+        return packet.Packet.json
+
+    def _publish(self, data):
+        self._publicador.publicar(self.channel, self._json().dumps(data).encode('utf-8'))
+
+    def _listen(self):
+        for _canal, datos in ClienteBus(self.url).escuchar(self.channel):
+            # Ya decodificado: PubSubManager usa los dict tal cual, sin probar pickle
+            yield self._json().loads(datos.decode('utf-8'))
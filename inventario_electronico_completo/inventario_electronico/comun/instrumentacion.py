@@ -0,0 +1,239 @@
+"""
+Instrumentación de peticiones compartida por servidor, cliente y switch
+Mide por ruta el tiempo total de cada petición, la parte pasada esperando a
+otro servicio (``upstream``) y a la base de datos (``db``), y el tamaño de la
+respuesta. Cada respuesta lleva una cabecera ``Server-Timing`` y las peticiones
+más lentas que el umbral quedan en un registro acotado:
+
+- GET /api/instrumentacion          resumen por ruta
+- GET /api/instrumentacion/lentas   últimas peticiones lentas
+
+Variables de entorno:
+
+- ``INVENTARIO_UMBRAL_LENTO_MS``: umbral del registro de lentas (defecto 500)
+- ``INVENTARIO_MAX_LENTAS``: peticiones lentas retenidas (defecto 200)
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from functools import wraps
+
+from .registro import estado_registro
+
+CATEGORIAS = ('upstream', 'db')
+
+# Acumuladores de la petición en curso: [inicio, upstream, db, anidamiento upstream, anidamiento db]
+# (con gevent/eventlet, threading.local es local a cada greenlet)
+_peticion = threading.local()
+_reloj = time.perf_counter
+
+
+class _Cronometro:
+    """Suma a ``categoria`` el tiempo pasado dentro del bloque ``with``"""
+
+    __slots__ = ('indice', 'tiempos', 'inicio')
+
+    def __init__(self, indice: int):
+        self.indice = indice
+
+    def __enter__(self):
+        tiempos = getattr(_peticion, 'tiempos', None)
+        # Fuera de una petición, o dentro de otra medida de la misma categoría, no se suma
+        if tiempos is None or tiempos[self.indice + 2]:
+            self.tiempos = None
+            return self
+        tiempos[self.indice + 2] = 1
+        self.tiempos = tiempos
+        self.inicio = _reloj()
+        return self
+
+    def __exit__(self, *exc):
+        tiempos = self.tiempos
+        if tiempos is not None:
+            tiempos[self.indice] += _reloj() - self.inicio
+            tiempos[self.indice + 2] = 0
+        return False
+
+
+class Instrumentacion:
+    """Tiempos por ruta, cabecera Server-Timing y registro de peticiones lentas"""
+
+    def __init__(self, servicio: str, umbral_lento_ms: float = None, max_lentas: int = None):
+        """
+        Args:
+            servicio: Nombre del servicio en el resumen ('servidor', 'cliente', 'switch')
+            umbral_lento_ms: Peticiones más lentas que esto van al registro
+            max_lentas: Tamaño máximo del registro de lentas
+        """
+        if umbral_lento_ms is None:
+            umbral_lento_ms = float(os.environ.get('INVENTARIO_UMBRAL_LENTO_MS', '500'))
+        if max_lentas is None:
+            max_lentas = int(os.environ.get('INVENTARIO_MAX_LENTAS', '200'))
+        self.servicio = servicio
+        self.umbral_lento = umbral_lento_ms / 1000
+        self.lentas = deque(maxlen=max_lentas)
+        # ruta -> [peticiones, total, upstream, db, bytes, máximo, errores]
+        self.rutas = {}
+        self._lock = threading.Lock()
+
+    # ==================== MEDIDAS ====================
+
+    def iniciar(self):
+        """Empieza a medir la petición en curso"""
+        _peticion.tiempos = [_reloj(), 0.0, 0.0, 0, 0]
+
+    def cronometrar(self, categoria: str) -> _Cronometro:
+        """
+        Bloque ``with`` cuyo tiempo cuenta como ``categoria`` ('upstream' o 'db')
+
+        Las medidas anidadas de la misma categoría solo cuentan una vez.
+        """
+        return _Cronometro(CATEGORIAS.index(categoria) + 1)
+
+    def medir(self, categoria: str):
+        """Decorador: el tiempo de la función cuenta como ``categoria``"""
+        indice = CATEGORIAS.index(categoria) + 1
+
+        def decorador(funcion):
+            @wraps(funcion)
+            def envuelta(*args, **kwargs):
+                with _Cronometro(indice):
+                    return funcion(*args, **kwargs)
+            return envuelta
+        return decorador
+
+    def envolver_metodos(self, objeto, categoria: str, excluir=()):
+        """
+        Mide como ``categoria`` todos los métodos públicos de ``objeto``
+
+        Args:
+            objeto: Instancia cuyos métodos se sustituyen (p. ej. el DatabaseManager)
+            categoria: 'upstream' o 'db'
+            excluir: Nombres de métodos que no se envuelven
+        """
+        decorador = self.medir(categoria)
+        for nombre in dir(type(objeto)):
+            if nombre.startswith('_') or nombre in excluir:
+                continue
+            metodo = getattr(objeto, nombre)
+            if callable(metodo):
+                setattr(objeto, nombre, decorador(metodo))
+        return objeto
+
+    def finalizar(self, metodo: str, ruta: str, regla: str, estado: int, tamano: int):
+        """
+        Cierra la medida de la petición en curso
+
+        Args:
+            metodo: Método HTTP
+            ruta: Ruta pedida (para el registro de lentas)
+            regla: Regla de la ruta que la atendió (clave del resumen)
+            estado: Código de estado de la respuesta
+            tamano: Bytes del cuerpo de la respuesta
+
+        Returns:
+            Valor de la cabecera Server-Timing, o None si no se estaba midiendo
+        """
+        tiempos = getattr(_peticion, 'tiempos', None)
+        if tiempos is None:
+            return None
+        _peticion.tiempos = None
+        total = _reloj() - tiempos[0]
+        upstream, db = tiempos[1], tiempos[2]
+        clave = f'{metodo} {regla}'
+        with self._lock:
+            datos = self.rutas.get(clave)
+            if datos is None:
+                datos = self.rutas[clave] = [0, 0.0, 0.0, 0.0, 0, 0.0, 0]
+            datos[0] += 1
+            datos[1] += total
+            datos[2] += upstream
+            datos[3] += db
+            datos[4] += tamano
+            if total > datos[5]:
+                datos[5] = total
+            if estado >= 500:
+                datos[6] += 1
+        if total >= self.umbral_lento:
+            self.lentas.append({
+                'timestamp': datetime.now().isoformat(),
+                'metodo': metodo,
+                'ruta': ruta,
+                'regla': regla,
+                'estado': estado,
+                'total_ms': round(total * 1000, 3),
+                'upstream_ms': round(upstream * 1000, 3),
+                'db_ms': round(db * 1000, 3),
+                'bytes': tamano,
+            })
+        cabecera = f'total;dur={total * 1000:.2f}'
+        if upstream:
+            cabecera += f', upstream;dur={upstream * 1000:.2f}'
+        if db:
+            cabecera += f', db;dur={db * 1000:.2f}'
+        return f'{cabecera}, app;dur={(total - upstream - db) * 1000:.2f}'
+
+    # ==================== CONSULTA ====================
+
+    def resumen(self) -> dict:
+        """Peticiones, tiempos medios y máximo por ruta (y el estado de comun/registro.py)"""
+        with self._lock:
+            copia = {clave: list(datos) for clave, datos in self.rutas.items()}
+        rutas = {}
+        for clave, (n, total, upstream, db, tamano, maximo, errores) in sorted(copia.items()):
+            rutas[clave] = {
+                'peticiones': n,
+                'errores_5xx': errores,
+                'total_ms_medio': total * 1000 / n,
+                'upstream_ms_medio': upstream * 1000 / n,
+                'db_ms_medio': db * 1000 / n,
+                'app_ms_medio': (total - upstream - db) * 1000 / n,
+                'max_ms': maximo * 1000,
+                'bytes_medio': tamano / n,
+            }
+        return {'servicio': self.servicio, 'umbral_lento_ms': self.umbral_lento * 1000,
+                'lentas_registradas': len(self.lentas), 'rutas': rutas,
+                'registro': estado_registro()}
+
+    # ==================== FLASK ====================
+
+    def instalar(self, app):
+        """
+        Registra los hooks y las rutas de consulta en una aplicación Flask
+
+        Conviene llamarlo justo después de crear ``app`` para que sus hooks
+        ``before_request`` se ejecuten antes que los de la aplicación.
+        """
+        from flask import jsonify, request
+
+        @app.before_request
+        def _iniciar_medida():
+            self.iniciar()
+
+        @app.after_request
+        def _cerrar_medida(respuesta):
+            regla = request.url_rule.rule if request.url_rule is not None else '(sin ruta)'
+            cabecera = self.finalizar(request.method, request.path, regla,
+                                      respuesta.status_code, respuesta.content_length or 0)
+            if cabecera:
+                respuesta.headers['Server-Timing'] = cabecera
+            return respuesta
+
+        @app.teardown_request
+        def _descartar_medida(error=None):
+            # Si la petición terminó en una excepción no hubo after_request
+            _peticion.tiempos = None
+
+        @app.get('/api/instrumentacion')
+        def resumen_instrumentacion():
+            return jsonify(self.resumen())
+
+        @app.get('/api/instrumentacion/lentas')
+        def peticiones_lentas():
+            return jsonify({'servicio': self.servicio, 'umbral_lento_ms': self.umbral_lento * 1000,
+                            'lentas': list(reversed(self.lentas))})
+
+        return self
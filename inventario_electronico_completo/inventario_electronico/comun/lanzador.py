@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Lanzador de Producción para Servidor, Cliente y Switch
+Sirve las aplicaciones Flask con Gunicorn (sin depurador ni recargador) en
+lugar del servidor de desarrollo de Werkzeug.
+
+Modos de concurrencia:
+    hilos    worker gthread con N hilos (Flask-SocketIO en modo threading)
+    gevent   worker gevent (requiere el paquete gevent)
+    eventlet worker eventlet (requiere el paquete eventlet)
+
+Con más de un worker en servidor/cliente las difusiones Socket.IO se reparten
+por una cola de mensajes (``--cola``): el bus local ``bus://127.0.0.1:6380`` o
+una URL de Redis. El servidor con varios workers necesita además el bus de
+cambios (``--bus-cambios``, o la misma ``--cola`` si es ``bus://``) para que
+las escrituras de un worker lleguen al catálogo en memoria de los demás.
+Socket.IO necesita además sesiones fijas (sticky) o que los navegadores usen
+solo el transporte websocket.
+
+Uso:
+    python -m comun.lanzador servidor --modo gevent
+    python -m comun.lanzador switch --workers 4 --threads 16
+    python -m comun.lanzador todos --workers 2 --cola bus://127.0.0.1:6380
+    python -m comun.lanzador servidor --perfil desarrollo
+"""
+
+import argparse
+import importlib.util
+import os
+import subprocess
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# nombre -> (ruta de main.py, puerto por defecto, usa Socket.IO)
+APLICACIONES = {
+    'servidor': ('server/servidor_inventario/src/main.py', 5000, True),
+    'cliente': ('client/cliente_inventario/src/main.py', 5001, True),
+    'switch': ('switch/switch_inventario/src/main.py', 5002, False),
+}
+
+MODOS = {
+    # modo -> (worker de gunicorn, async_mode de Flask-SocketIO)
+    'hilos': ('gthread', 'threading'),
+    'gevent': ('gevent', 'gevent'),
+    'eventlet': ('eventlet', 'eventlet'),
+}
+
+
+def cargar_aplicacion(nombre: str):
+    """
+    Importa el ``main.py`` de una aplicación y devuelve su objeto Flask
+
+    Args:
+        nombre: 'servidor', 'cliente' o 'switch'
+    """
+    ruta = os.path.join(project_root, APLICACIONES[nombre][0])
+    nombre_modulo = f'inventario_{nombre}_main'
+    spec = importlib.util.spec_from_file_location(nombre_modulo, ruta)
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules[nombre_modulo] = modulo
+    spec.loader.exec_module(modulo)
+    return modulo.app
+
+
+def bus_cambios(args):
+    """
+    Bus de cambios del servidor: ``--bus-cambios`` o, con varios workers, la cola si es el bus local
+
+    Cada worker tiene su propio catálogo en memoria y sus snapshots; sin bus, las
+    escrituras de un worker no los invalidan en los demás.
+    """
+    if args.bus_cambios:
+        return args.bus_cambios
+    if args.workers > 1 and args.cola and args.cola.startswith('bus://'):
+        return args.cola
+    return None
+
+
+def comprobar_bus_cambios(args):
+    """Termina si el servidor tendría varios workers sin bus de cambios"""
+    if args.workers > 1 and not bus_cambios(args):
+        sys.exit("servidor: con más de un worker necesita un bus de cambios (--bus-cambios "
+                 "o --cola bus://...); si no, cada worker serviría su catálogo sin las "
+                 "escrituras de los demás")
+
+
+def preparar_entorno(args, nombre: str) -> dict:
+    """Variables de entorno que leen las aplicaciones (comun/configuracion.py)"""
+    entorno = {
+        'INVENTARIO_DEBUG': '0' if args.perfil == 'produccion' else '1',
+        'INVENTARIO_ASYNC_MODE': MODOS[args.modo][1],
+    }
+    if args.puerto:
+        entorno['INVENTARIO_PUERTO'] = str(args.puerto)
+    if args.cola and APLICACIONES[nombre][2]:
+        entorno['INVENTARIO_SOCKETIO_MQ'] = args.cola
+    if nombre == 'servidor':
+        # Cada worker tiene su propio catálogo en memoria: con varios workers
+        # sus escrituras se propagan por el bus de cambios
+        bus = bus_cambios(args)
+        if bus:
+            entorno['INVENTARIO_BUS_CAMBIOS'] = bus
+    return entorno
+
+
+def servir_gunicorn(nombre: str, args):
+    """Arranca Gunicorn en este proceso con la aplicación indicada"""
+    from gunicorn.app.base import BaseApplication
+
+    usa_socketio = APLICACIONES[nombre][2]
+    if usa_socketio and args.workers > 1 and not args.cola:
+        sys.exit(f"{nombre}: con más de un worker Socket.IO necesita --cola "
+                 f"(p. ej. bus://127.0.0.1:6380)")
+    if nombre == 'servidor':
+        comprobar_bus_cambios(args)
+
+    os.environ.update(preparar_entorno(args, nombre))
+    puerto = args.puerto or APLICACIONES[nombre][1]
+
+    class AplicacionInventario(BaseApplication):
+        def load_config(self):
+            opciones = {
+                'bind': f'{args.host}:{puerto}',
+                'workers': args.workers,
+                'worker_class': MODOS[args.modo][0],
+                'threads': args.threads,
+                'worker_connections': args.conexiones,
+                'timeout': 120,
+                'graceful_timeout': 10,
+                'keepalive': 5,
+                'accesslog': None,
+                'loglevel': 'warning',
+                'proc_name': f'inventario-{nombre}',
+            }
+            for clave, valor in opciones.items():
+                self.cfg.set(clave, valor)
+
+        def load(self):
+            # Se importa dentro de cada worker, tras el monkey patching de gevent/eventlet
+            return cargar_aplicacion(nombre)
+
+    print(f"=== {nombre} ({args.perfil}) en http://{args.host}:{puerto} ===")
+    print(f"Modo: {args.modo} | Workers: {args.workers} | Hilos: {args.threads}"
+          + (f" | Cola: {args.cola}" if args.cola and usa_socketio else ""))
+    AplicacionInventario().run()
+
+
+def servir_desarrollo(nombre: str, args):
+    """Ejecuta el ``main.py`` original (servidor de desarrollo de Werkzeug)"""
+    entorno = dict(os.environ, **preparar_entorno(args, nombre))
+    ruta = os.path.join(project_root, APLICACIONES[nombre][0])
+    os.execvpe(sys.executable, [sys.executable, ruta], entorno)
+
+
+def lanzar_todos(args):
+    """Arranca bus (si hace falta), servidor, switch y cliente como subprocesos"""
+    comprobar_bus_cambios(args)
+    procesos = []
+    comando_base = [sys.executable, '-m', 'comun.lanzador']
+    opciones = ['--perfil', args.perfil, '--modo', args.modo, '--host', args.host,
+                '--workers', str(args.workers), '--threads', str(args.threads),
+                '--conexiones', str(args.conexiones)]
+    if args.cola:
+        opciones += ['--cola', args.cola]
+    if args.bus_cambios:
+        opciones += ['--bus-cambios', args.bus_cambios]
+
+    try:
+        bus = args.cola if args.cola and args.cola.startswith('bus://') else args.bus_cambios
+        if bus:
+            from .bus_local import parsear_url
+            host, puerto = parsear_url(bus)
+            procesos.append(subprocess.Popen(
+                [sys.executable, '-m', 'comun.bus_local', '--host', host, '--puerto', str(puerto)],
+                cwd=project_root))
+            time.sleep(0.5)
+        for nombre in ('servidor', 'switch', 'cliente'):
+            procesos.append(subprocess.Popen(comando_base + [nombre] + opciones, cwd=project_root))
+        while all(p.poll() is None for p in procesos):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for proceso in procesos:
+            if proceso.poll() is None:
+                proceso.terminate()
+        for proceso in procesos:
+            proceso.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lanzador de producción del inventario')
+    parser.add_argument('aplicacion', choices=list(APLICACIONES) + ['todos'])
+    parser.add_argument('--perfil', choices=['produccion', 'desarrollo'], default='produccion',
+                        help='produccion: Gunicorn sin debug; desarrollo: main.py original')
+    parser.add_argument('--modo', choices=list(MODOS), default='hilos')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--puerto', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=1, help='Procesos worker')
+    parser.add_argument('--threads', type=int, default=32, help='Hilos por worker (modo hilos)')
+    parser.add_argument('--conexiones', type=int, default=1000,
+                        help='Conexiones simultáneas por worker (gevent/eventlet)')
+    parser.add_argument('--cola', default=os.environ.get('INVENTARIO_SOCKETIO_MQ'),
+                        help='Cola Socket.IO entre workers: bus://host:puerto o redis://...')
+    parser.add_argument('--bus-cambios', default=os.environ.get('INVENTARIO_BUS_CAMBIOS'),
+                        help='Bus para propagar escrituras entre instancias del servidor')
+    args = parser.parse_args()
+
+    if args.aplicacion == 'todos':
+        lanzar_todos(args)
+    elif args.perfil == 'desarrollo':
+        servir_desarrollo(args.aplicacion, args)
+    else:
+        servir_gunicorn(args.aplicacion, args)
+
+
+if __name__ == '__main__':
+    main()
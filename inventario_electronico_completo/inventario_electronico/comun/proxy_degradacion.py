@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Proxy de Degradación de Red
+Aplica a los servicios reales, que hablan por loopback, los parámetros de los
+enlaces de la topología. Cada enlace es un proxy TCP en un puerto local que
+reenvía al puerto del nodo destino añadiendo, en cada sentido:
+
+- retardo de propagación (``latency_ms``) con jitter,
+- límite de ancho de banda (``bandwidth_mbps``) con una cubeta de fichas
+  compartida por todas las conexiones del enlace,
+- pérdidas (``packet_loss_rate``) por segmento.
+
+Sobre TCP no se pueden tirar bytes sin romper el flujo, así que un segmento
+perdido se modela como lo vería la aplicación: llega retransmitido más tarde.
+En una ráfaga larga el emisor lo detecta por ACK duplicados (un RTT de más);
+en un mensaje corto tiene que esperar al RTO, que se dobla con cada nueva
+pérdida del mismo segmento.
+Con ``--fallo`` un enlace deja de entregar datos durante un intervalo (agujero
+negro), para observar los timeouts de cliente y switch.
+
+Uso:
+    python -m comun.proxy_degradacion
+    python -m comun.proxy_degradacion --enlaces cliente_to_switch --fallo link_2:30:60
+
+Y los servicios apuntando a los puertos del proxy, p. ej.:
+    INVENTARIO_SERVIDOR_URL=http://127.0.0.1:7000   (cliente -> switch)
+    SWITCH_SERVIDORES=http://127.0.0.1:7001         (switch -> servidor)
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(project_root, 'ns3_simulation'))
+
+from network_topology import NETWORK_TOPOLOGY, load_topology_from_file
+
+PUERTO_BASE = 7000
+TROZO = 16384           # bytes leídos de una vez
+MSS = 1460              # bytes por segmento a efectos de pérdidas
+ACK_DUPLICADOS = 3      # segmentos posteriores necesarios para retransmitir sin RTO
+VENTANA = 16            # trozos en vuelo por sentido antes de dejar de leer
+RTO_MS = 200.0          # RTO mínimo de Linux
+
+
+class CubetaFichas:
+    """Límite de ancho de banda: bytes por segundo con una ráfaga máxima"""
+
+    def __init__(self, bytes_por_segundo: float, rafaga: int):
+        self.tasa = bytes_por_segundo
+        self.rafaga = rafaga
+        self.fichas = float(rafaga)
+        self.ultimo = time.monotonic()
+
+    def reservar(self, n: int) -> float:
+        """Consume ``n`` bytes; devuelve los segundos que hay que esperar para enviarlos"""
+        ahora = time.monotonic()
+        self.fichas = min(self.rafaga, self.fichas + (ahora - self.ultimo) * self.tasa)
+        self.ultimo = ahora
+        self.fichas -= n
+        return -self.fichas / self.tasa if self.fichas < 0 else 0.0
+
+
+class EnlaceDegradado:
+    """Proxy TCP de un enlace de la topología"""
+
+    def __init__(self, nombre: str, link: dict, puerto: int, destino: tuple,
+                 jitter: float = 0.1, rto_ms: float = RTO_MS, rafaga: int = 65536,
+                 semilla: int = None):
+        """
+        Args:
+            nombre: Clave del enlace en ``links``
+            link: Configuración del enlace (latency_ms, bandwidth_mbps, packet_loss_rate)
+            puerto: Puerto local en el que escucha el proxy
+            destino: (host, puerto) del servicio del nodo destino
+            jitter: Desviación del retardo como fracción de ``latency_ms``
+            rto_ms: Retraso añadido por la retransmisión de un segmento perdido
+            rafaga: Bytes que la cubeta deja pasar de golpe
+        """
+        self.nombre = nombre
+        self.id = link.get('id', nombre)
+        self.puerto = puerto
+        self.destino = destino
+        self.latencia = link['latency_ms'] / 1000
+        self.jitter = link.get('jitter_ms', jitter * link['latency_ms']) / 1000
+        self.perdida = link.get('packet_loss_rate', 0.0)
+        self.rto = rto_ms / 1000
+        tasa = link['bandwidth_mbps'] * 1e6 / 8
+        self.cubetas = {'ida': CubetaFichas(tasa, rafaga), 'vuelta': CubetaFichas(tasa, rafaga)}
+        self.random = random.Random(semilla)
+        self.activo = True
+        self._reanudar = None
+        self.servidor = None
+        self.stats = {'conexiones': 0, 'activas': 0, 'errores': 0, 'segmentos': 0,
+                      'perdidos': 0, 'bytes_ida': 0, 'bytes_vuelta': 0}
+
+    def descripcion(self) -> str:
+        return (f"{self.nombre} ({self.id}): 127.0.0.1:{self.puerto} -> {self.destino[0]}:{self.destino[1]} "
+                f"[{self.cubetas['ida'].tasa * 8 / 1e6:g} Mbps, {self.latencia * 1000:g} ms, "
+                f"{self.perdida:.1%} pérdida]")
+
+    async def iniciar(self, host: str = '127.0.0.1'):
+        self._reanudar = asyncio.Event()
+        self._reanudar.set()
+        self.servidor = await asyncio.start_server(self._conexion, host, self.puerto)
+
+    def caer(self):
+        """El enlace deja de entregar datos (las conexiones quedan colgadas)"""
+        self.activo = False
+        self._reanudar.clear()
+
+    def restaurar(self):
+        self.activo = True
+        self._reanudar.set()
+
+    def _retardo(self, n: int, en_rafaga: bool = False) -> float:
+        """
+        Propagación con jitter más las retransmisiones de los segmentos perdidos
+
+        ``en_rafaga``: el trozo sigue a otro leído hace menos de un RTT, de modo
+        que hay segmentos detrás que provocarán ACK duplicados.
+        """
+        rnd = self.random
+        retardo = self.latencia
+        if self.jitter:
+            retardo = max(0.0, retardo + rnd.gauss(0.0, self.jitter))
+        segmentos = math.ceil(n / MSS)
+        self.stats['segmentos'] += segmentos
+        if self.perdida:
+            extra = 0.0
+            for i in range(segmentos):
+                # Con suficientes segmentos detrás, retransmisión rápida tras un RTT
+                rapida = en_rafaga or segmentos - i > ACK_DUPLICADOS
+                rto = 2 * self.latencia if rapida else self.rto
+                penalizacion = 0.0
+                while rnd.random() < self.perdida:
+                    self.stats['perdidos'] += 1
+                    penalizacion += rto
+                    rto = self.rto if rapida else rto * 2
+                    rapida = False
+                extra = max(extra, penalizacion)
+            retardo += extra
+        return retardo
+
+    async def _conexion(self, lector_origen, escritor_origen):
+        self.stats['conexiones'] += 1
+        self.stats['activas'] += 1
+        escritor_destino = None
+        tareas = []
+        try:
+            # Establecer la conexión cuesta un viaje de ida y vuelta por el enlace
+            await asyncio.sleep(2 * self.latencia)
+            await self._reanudar.wait()
+            lector_destino, escritor_destino = await asyncio.open_connection(*self.destino)
+            ida, vuelta = asyncio.Queue(VENTANA), asyncio.Queue(VENTANA)
+            tareas = [asyncio.ensure_future(c) for c in (
+                self._leer(lector_origen, ida, 'ida'), self._entregar(ida, escritor_destino),
+                self._leer(lector_destino, vuelta, 'vuelta'), self._entregar(vuelta, escritor_origen))]
+            hechas, _ = await asyncio.wait(tareas, return_when=asyncio.FIRST_EXCEPTION)
+            if any(t.exception() for t in hechas):
+                self.stats['errores'] += 1
+        except OSError:
+            self.stats['errores'] += 1
+        finally:
+            for tarea in tareas:
+                tarea.cancel()
+            self.stats['activas'] -= 1
+            escritor_origen.close()
+            if escritor_destino:
+                escritor_destino.close()
+
+    async def _leer(self, lector, cola, sentido: str):
+        """Un sentido de la conexión: lee y fecha cada trozo según el enlace"""
+        bucle = asyncio.get_running_loop()
+        cubeta = self.cubetas[sentido]
+        contador = 'bytes_' + sentido
+        ultima = leido = 0.0
+        while True:
+            datos = await lector.read(TROZO)
+            if not datos:
+                break
+            ahora = bucle.time()
+            self.stats[contador] += len(datos)
+            en_rafaga = ahora - leido < 2 * self.latencia
+            leido = ahora
+            # TCP entrega en orden: un trozo nunca adelanta al anterior
+            hora = ahora + cubeta.reservar(len(datos)) + self._retardo(len(datos), en_rafaga)
+            ultima = max(hora, ultima)
+            await cola.put((ultima, datos))
+        await cola.put((ultima, None))
+
+    async def _entregar(self, cola, escritor):
+        bucle = asyncio.get_running_loop()
+        while True:
+            hora, datos = await cola.get()
+            espera = hora - bucle.time()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            if not self.activo:
+                await self._reanudar.wait()
+            if datos is None:
+                if escritor.can_write_eof():
+                    escritor.write_eof()
+                return
+            escritor.write(datos)
+            await escritor.drain()
+
+    async def cerrar(self):
+        if self.servidor:
+            self.servidor.close()
+            await self.servidor.wait_closed()
+
+
+def crear_enlaces(topologia: dict, seleccion=None, puerto_base: int = PUERTO_BASE,
+                  host_destino: str = '127.0.0.1', **opciones):
+    """
+    Un EnlaceDegradado por enlace de ``topologia`` hacia el puerto de su nodo destino
+
+    Args:
+        topologia: Topología con ``nodes`` y ``links``
+        seleccion: Claves o ids de los enlaces a degradar (todos si es None)
+        puerto_base: Puerto local del primer enlace; los demás, consecutivos
+        host_destino: Host en el que escuchan los servicios
+        **opciones: jitter, rto_ms, rafaga y semilla de EnlaceDegradado
+
+    Returns:
+        Lista de enlaces en el orden de la topología
+    """
+    semilla = opciones.pop('semilla', None)
+    enlaces = []
+    for nombre, link in topologia['links'].items():
+        if seleccion and nombre not in seleccion and link.get('id') not in seleccion:
+            continue
+        puerto_destino = topologia['nodes'][link['target']]['port']
+        enlaces.append(EnlaceDegradado(
+            nombre, link, puerto_base + len(enlaces), (host_destino, puerto_destino),
+            semilla=None if semilla is None else semilla + len(enlaces), **opciones))
+    return enlaces
+
+
+def _parse_fallo(texto):
+    """'enlace:inicio[:fin]' -> (enlace, inicio, fin o None)"""
+    partes = texto.split(':')
+    if len(partes) not in (2, 3):
+        raise ValueError(texto)
+    fin = float(partes[2]) if len(partes) == 3 else None
+    return partes[0], float(partes[1]), fin
+
+
+def imprimir_estadisticas(enlaces, titulo='Estadísticas'):
+    print(f"\n=== {titulo} ===")
+    for enlace in enlaces:
+        s = enlace.stats
+        estado = '' if enlace.activo else ' [CAÍDO]'
+        print(f"{enlace.nombre}{estado}: {s['conexiones']} conexiones ({s['activas']} activas, "
+              f"{s['errores']} errores), {s['bytes_ida'] / 1e6:.2f} MB ida / "
+              f"{s['bytes_vuelta'] / 1e6:.2f} MB vuelta, "
+              f"{s['perdidos']} de {s['segmentos']} segmentos retransmitidos")
+
+
+async def ejecutar(enlaces, fallos=(), intervalo: float = 0, duracion: float = None):
+    """Arranca los proxies, programa los fallos y espera (``duracion`` segundos o indefinidamente)"""
+    bucle = asyncio.get_running_loop()
+    por_nombre = {}
+    for enlace in enlaces:
+        await enlace.iniciar()
+        por_nombre[enlace.nombre] = por_nombre[enlace.id] = enlace
+    for nombre, inicio, fin in fallos:
+        enlace = por_nombre[nombre]
+        bucle.call_later(inicio, _cambiar, enlace, False)
+        if fin is not None:
+            bucle.call_later(fin, _cambiar, enlace, True)
+    inicio = bucle.time()
+    try:
+        while duracion is None or bucle.time() - inicio < duracion:
+            espera = intervalo or 3600
+            if duracion is not None:
+                espera = min(espera, duracion - (bucle.time() - inicio))
+            await asyncio.sleep(espera)
+            if intervalo:
+                imprimir_estadisticas(enlaces, f'Estadísticas a los {bucle.time() - inicio:.0f} s')
+    finally:
+        for enlace in enlaces:
+            await enlace.cerrar()
+
+
+def _cambiar(enlace, activo):
+    if activo:
+        enlace.restaurar()
+        print(f"Enlace restaurado: {enlace.nombre}")
+    else:
+        enlace.caer()
+        print(f"Enlace caído: {enlace.nombre}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Proxy TCP que aplica los enlaces de la topología')
+    parser.add_argument('--topologia', metavar='ARCHIVO', default=None,
+                        help='Topología JSON (por defecto NETWORK_TOPOLOGY)')
+    parser.add_argument('--enlaces', nargs='+', metavar='ENLACE', help='Solo estos enlaces (clave o id)')
+    parser.add_argument('--puerto-base', type=int, default=PUERTO_BASE,
+                        help='Puerto del primer enlace; los demás, consecutivos')
+    parser.add_argument('--host-destino', default='127.0.0.1', help='Host de los servicios')
+    parser.add_argument('--jitter', type=float, default=0.1,
+                        help='Desviación del retardo como fracción de la latencia del enlace')
+    parser.add_argument('--rto', type=float, default=RTO_MS, help='ms por retransmisión de un segmento perdido')
+    parser.add_argument('--rafaga', type=int, default=65536, help='Ráfaga de la cubeta de fichas en bytes')
+    parser.add_argument('--fallo', action='append', default=[], metavar='ENLACE:INICIO[:FIN]',
+                        help='Dejar el enlace sin entregar datos entre INICIO y FIN (segundos)')
+    parser.add_argument('--duracion', type=float, default=None, help='Segundos hasta parar (por defecto, Ctrl+C)')
+    parser.add_argument('--intervalo', type=float, default=0, help='Imprimir estadísticas cada N segundos')
+    parser.add_argument('--semilla', type=int, default=None)
+    args = parser.parse_args()
+
+    topologia = load_topology_from_file(args.topologia) if args.topologia else NETWORK_TOPOLOGY
+    if topologia is None:
+        return 1
+    try:
+        fallos = [_parse_fallo(f) for f in args.fallo]
+    except ValueError as e:
+        print(f"Fallo mal formado (ENLACE:INICIO[:FIN]): {e}")
+        return 1
+
+    enlaces = crear_enlaces(topologia, args.enlaces, args.puerto_base, args.host_destino,
+                            jitter=args.jitter, rto_ms=args.rto, rafaga=args.rafaga, semilla=args.semilla)
+    if not enlaces:
+        print("No hay enlaces que degradar")
+        return 1
+    conocidos = {e.nombre for e in enlaces} | {e.id for e in enlaces}
+    for nombre, _, _ in fallos:
+        if nombre not in conocidos:
+            print(f"Enlace desconocido en --fallo: {nombre}")
+            return 1
+
+    print("=== Proxy de Degradación de Red ===")
+    for enlace in enlaces:
+        print(f"  {enlace.descripcion()}")
+    try:
+        asyncio.run(ejecutar(enlaces, fallos, args.intervalo, args.duracion))
+    except OSError as e:
+        print(f"Error abriendo los puertos del proxy: {e}")
+        return 1
+    except KeyboardInterrupt:
+        pass
+    imprimir_estadisticas(enlaces, 'Resumen')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""
+Registro estructurado y no bloqueante compartido por las aplicaciones
+Los hilos que atienden peticiones solo formatean el mensaje y lo dejan en una
+cola acotada; un hilo aparte lo escribe como JSON Lines en un archivo con
+rotación por tamaño (o como texto en stderr si no hay directorio). Si la cola
+se llena, el registro se descarta y se cuenta en lugar de esperar.
+
+Los módulos usan ``logging`` estándar (``logging.getLogger('inventario.db')``) y
+cada aplicación llama una vez a ``configurar_registro('servidor')``. También se
+recogen los registros de Werkzeug, Engine.IO, etc.
+
+Variables de entorno:
+
+- ``INVENTARIO_LOG_NIVEL``: nivel mínimo (defecto INFO)
+- ``INVENTARIO_LOG_NIVELES``: niveles por registro, p. ej. ``werkzeug=WARNING``
+- ``INVENTARIO_LOG_DIR``: directorio de ``<servicio>-<pid>.jsonl`` (sin ella, stderr)
+- ``INVENTARIO_LOG_FORMATO``: ``json`` o ``texto`` (defecto json en archivo, texto en stderr)
+- ``INVENTARIO_LOG_MAX_MB`` / ``INVENTARIO_LOG_COPIAS``: rotación (defecto 10 MB, 5 copias)
+- ``INVENTARIO_LOG_REPETIDOS``: mensajes iguales por ventana de 10 s (defecto 20);
+  el primero de la ventana siguiente lleva ``suprimidos`` con los descartados
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from .trazado import traza_actual
+
+_CAMPOS_ESTANDAR = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+_NUMEROS = re.compile(r'\d+')
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_manejador: Optional['ManejadorCola'] = None
+
+
+class FiltroRepetidos(logging.Filter):
+    """
+    Deja pasar como máximo ``maximo`` mensajes iguales por ventana
+
+    Dos mensajes son iguales si coinciden registro, nivel y texto salvo los
+    números (ids, puertos, tiempos). Corre en el hilo que registra, antes de
+    encolar, así que los descartados no cuestan más que esta comprobación.
+    """
+
+    def __init__(self, maximo: int = 20, ventana: float = 10.0):
+        super().__init__()
+        self.maximo = maximo
+        self.ventana = ventana
+        # clave -> [ventana, emitidos, suprimidos, último mensaje]
+        self._contadores = {}
+        self._lock = threading.Lock()
+        self.suprimidos = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.maximo <= 0:
+            return True
+        record.message = record.getMessage()
+        clave = (record.name, record.levelno, _NUMEROS.sub('#', record.message))
+        actual = int(time.monotonic() // self.ventana)
+        with self._lock:
+            contador = self._contadores.get(clave)
+            if contador is None or contador[0] != actual:
+                if contador is not None and contador[2]:
+                    record.suprimidos = contador[2]
+                if len(self._contadores) > 10000:
+                    self._contadores = {c: v for c, v in self._contadores.items() if v[0] == actual}
+                self._contadores[clave] = [actual, 1, 0, None]
+                return True
+            if contador[1] < self.maximo:
+                contador[1] += 1
+                return True
+            contador[2] += 1
+            contador[3] = record.message
+            self.suprimidos += 1
+            return False
+
+    def pendientes(self):
+        """Saca los mensajes con supresiones aún no informadas: (registro, nivel, mensaje, veces)"""
+        with self._lock:
+            contadores, self._contadores = self._contadores, {}
+        return [(nombre, nivel, c[3], c[2]) for (nombre, nivel, _), c in contadores.items() if c[2]]
+
+
+class ManejadorCola(logging.handlers.QueueHandler):
+    """QueueHandler que nunca espera: con la cola llena descarta y cuenta"""
+
+    def __init__(self, cola: queue.Queue):
+        super().__init__(cola)
+        self.descartados = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Se resuelve aquí lo que depende del hilo o de objetos vivos (argumentos,
+        # excepción); el formato final se hace en el hilo del listener
+        # (el filtro de repetidos ya deja el mensaje formateado en record.message)
+        if 'message' not in record.__dict__:
+            record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if not hasattr(record, 'traza'):
+            traza = traza_actual()
+            if traza is not None:
+                record.traza = traza
+        return record
+
+
+class FormateadorJSON(logging.Formatter):
+    """Una línea JSON por registro con los campos ``extra`` incluidos"""
+
+    def __init__(self, servicio: str):
+        super().__init__()
+        self.servicio = servicio
+        self.pid = os.getpid()
+
+    def format(self, record: logging.LogRecord) -> str:
+        datos = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'servicio': self.servicio,
+            'pid': self.pid,
+            'registro': record.name,
+            'mensaje': record.getMessage(),
+        }
+        for clave, valor in vars(record).items():
+            if clave not in _CAMPOS_ESTANDAR:
+                datos[clave] = valor
+        if record.exc_text:
+            datos['excepcion'] = record.exc_text
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class FormateadorTexto(logging.Formatter):
+    """Texto legible en consola, con los campos ``extra`` al final"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s: %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        linea = super().format(record)
+        extra = ' '.join(f'{clave}={valor}' for clave, valor in vars(record).items()
+                         if clave not in _CAMPOS_ESTANDAR)
+        return f'{linea} [{extra}]' if extra else linea
+
+
+def configurar_registro(servicio: str, nivel: str = None, directorio: str = None,
+                        formato: str = None, max_cola: int = 10000):
+    """
+    Dirige todo ``logging`` del proceso a la cola y arranca el hilo escritor
+
+    Llamadas repetidas no hacen nada (devuelve el listener ya creado).
+
+    Args:
+        servicio: Nombre del servicio en cada registro y en el archivo
+        nivel: Nivel mínimo; por defecto ``INVENTARIO_LOG_NIVEL`` o INFO
+        directorio: Directorio de los archivos; por defecto ``INVENTARIO_LOG_DIR``
+        formato: 'json' o 'texto'; por defecto ``INVENTARIO_LOG_FORMATO``
+        max_cola: Registros pendientes como máximo
+
+    Returns:
+        El ``QueueListener`` en marcha
+    """
+    global _listener, _manejador
+    if _listener is not None:
+        return _listener
+
+    nivel = (nivel or os.environ.get('INVENTARIO_LOG_NIVEL', 'INFO')).upper()
+    if directorio is None:
+        directorio = os.environ.get('INVENTARIO_LOG_DIR', '')
+    formato = formato or os.environ.get('INVENTARIO_LOG_FORMATO') or ('json' if directorio else 'texto')
+
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+        destino = logging.handlers.RotatingFileHandler(
+            os.path.join(directorio, f'{servicio}-{os.getpid()}.jsonl'),
+            maxBytes=int(float(os.environ.get('INVENTARIO_LOG_MAX_MB', '10')) * 1024 * 1024),
+            backupCount=int(os.environ.get('INVENTARIO_LOG_COPIAS', '5')),
+            encoding='utf-8')
+    else:
+        destino = logging.StreamHandler(sys.stderr)
+    destino.setFormatter(FormateadorJSON(servicio) if formato == 'json' else FormateadorTexto())
+
+    _manejador = ManejadorCola(queue.Queue(max_cola))
+    _manejador.addFilter(FiltroRepetidos(int(os.environ.get('INVENTARIO_LOG_REPETIDOS', '20'))))
+
+    # Datos que no se escriben: evita buscar el llamador y consultar hilo/proceso en cada registro
+    # (optimizaciones documentadas en el HOWTO de logging)
+    logging._srcfile = None
+    logging.logThreads = logging.logProcesses = logging.logMultiprocessing = False
+
+    raiz = logging.getLogger()
+    for manejador in list(raiz.handlers):
+        raiz.removeHandler(manejador)
+    raiz.addHandler(_manejador)
+    raiz.setLevel(nivel)
+    for par in os.environ.get('INVENTARIO_LOG_NIVELES', '').split(','):
+        if '=' in par:
+            nombre, nivel_registro = par.split('=', 1)
+            logging.getLogger(nombre.strip()).setLevel(nivel_registro.strip().upper())
+
+    _listener = logging.handlers.QueueListener(_manejador.queue, destino)
+    _listener.start()
+    atexit.register(vaciar_registro)
+    return _listener
+
+
+def vaciar_registro():
+    """Espera a que se escriba todo lo encolado y detiene el hilo escritor"""
+    global _listener
+    if _listener is not None:
+        # Las supresiones de la última ventana no tendrían otro mensaje que las informe
+        for filtro in _manejador.filters:
+            if isinstance(filtro, FiltroRepetidos):
+                for nombre, nivel, mensaje, veces in filtro.pendientes():
+                    logging.getLogger(nombre).log(nivel, '%s', mensaje, extra={'suprimidos': veces})
+        _listener.stop()
+        _listener = None
+        logging.getLogger().removeHandler(_manejador)
+
+
+def estado_registro() -> dict:
+    """Registros pendientes, descartados por cola llena y suprimidos por repetidos"""
+    if _manejador is None:
+        return {'activo': False}
+    repetidos = next((f for f in _manejador.filters if isinstance(f, FiltroRepetidos)), None)
+    return {
+        'activo': _listener is not None,
+        'pendientes': _manejador.queue.qsize(),
+        'descartados': _manejador.descartados,
+        'suprimidos': repetidos.suprimidos if repetidos else 0,
+    }
@@ -0,0 +1,574 @@
+"""
+Trazado distribuido entre cliente, switch y servidor
+Propaga el contexto de traza con la cabecera W3C ``traceparent`` y registra
+spans de los saltos HTTP, las llamadas a la base de datos y las emisiones
+Socket.IO. Cada proceso escribe sus spans, en lotes y desde un hilo aparte,
+en ``<directorio>/<servicio>-<pid>.jsonl``. Ese directorio hace de colector:
+
+    python -m comun.trazado /tmp/trazas               # tiempo propio por salto
+    python -m comun.trazado /tmp/trazas --lentas 10   # árbol de las trazas más lentas
+    python -m comun.trazado /tmp/trazas --traza <id>  # una traza concreta
+
+Variables de entorno:
+
+- ``INVENTARIO_TRAZAS_DIR``: directorio de salida (sin ella no se traza ni se
+  tocan las cabeceras, que pasan tal cual)
+- ``INVENTARIO_TRAZAS_MUESTREO``: fracción de peticiones raíz muestreadas (defecto 0.1)
+- ``INVENTARIO_TRAZAS_MAX_SEG``: tope de trazas raíz nuevas por segundo (defecto 50)
+
+El muestreo se decide una sola vez en la raíz y viaja en la bandera de
+``traceparent``: los saltos siguientes la respetan, así que una traza queda
+completa o no se registra. Una petición no muestreada solo paga el análisis
+de la cabecera; sus llamadas a la base de datos no crean spans.
+"""
+
+import argparse
+import atexit
+import glob
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from functools import wraps
+from typing import Dict, List, Optional
+
+CABECERA = 'traceparent'
+_TRACEPARENT = re.compile(r'([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})(-.*)?')
+
+# Contexto de la petición en curso: un Span muestreado o un _Contexto que solo se propaga
+# (con gevent/eventlet, threading.local es local a cada greenlet)
+_local = threading.local()
+_reloj = time.perf_counter
+logger = logging.getLogger('inventario.trazado')
+
+
+def _id_traza() -> str:
+    return f'{random.getrandbits(128) or 1:032x}'
+
+
+def _id_span() -> str:
+    return f'{random.getrandbits(64) or 1:016x}'
+
+
+def traza_actual() -> Optional[str]:
+    """Id de la traza de la petición en curso en este hilo, o None"""
+    actual = getattr(_local, 'actual', None)
+    return actual.traza if actual is not None else None
+
+
+def parsear_traceparent(valor: Optional[str]):
+    """
+    Interpreta una cabecera ``traceparent``
+
+    Returns:
+        (id de traza, id del span padre, muestreado) o None si falta o no es válida
+    """
+    if not valor:
+        return None
+    m = _TRACEPARENT.fullmatch(valor.strip().lower())
+    if m is None:
+        return None
+    version, traza, padre, banderas, resto = m.groups()
+    if version == 'ff' or (version == '00' and resto):
+        return None
+    if traza == '0' * 32 or padre == '0' * 16:
+        return None
+    return traza, padre, bool(int(banderas, 16) & 1)
+
+
+class _Contexto:
+    """Contexto no muestreado: solo sirve para propagar la traza aguas abajo"""
+
+    __slots__ = ('traza', 'id')
+    muestreado = False
+
+    def __init__(self, traza: str, id_span: str):
+        self.traza = traza
+        self.id = id_span
+
+
+class _SpanNulo:
+    """Span que no registra nada (sin contexto o traza no muestreada)"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def atributo(self, clave: str, valor):
+        pass
+
+
+_NULO = _SpanNulo()
+
+
+class Span:
+    """Operación medida dentro de una traza muestreada"""
+
+    __slots__ = ('trazador', 'traza', 'id', 'padre', 'nombre', 'tipo', 'inicio_us',
+                 'atributos', '_t0', '_anterior')
+    muestreado = True
+
+    def __init__(self, trazador: 'Trazador', traza: str, padre: Optional[str],
+                 nombre: str, tipo: str, atributos: Dict = None):
+        self.trazador = trazador
+        self.traza = traza
+        self.id = _id_span()
+        self.padre = padre
+        self.nombre = nombre
+        self.tipo = tipo
+        self.atributos = atributos or {}
+        self.inicio_us = time.time_ns() // 1000
+        self._t0 = _reloj()
+        self._anterior = None
+
+    def atributo(self, clave: str, valor):
+        self.atributos[clave] = valor
+
+    def terminar(self, error: bool = False):
+        """Cierra el span y lo entrega al exportador"""
+        duracion_us = int((_reloj() - self._t0) * 1e6)
+        self.trazador.exportar({
+            'traza': self.traza,
+            'span': self.id,
+            'padre': self.padre,
+            'servicio': self.trazador.servicio,
+            'nombre': self.nombre,
+            'tipo': self.tipo,
+            'inicio_us': self.inicio_us,
+            'duracion_us': duracion_us,
+            'error': error,
+            'atributos': self.atributos,
+        })
+
+    def __enter__(self):
+        self._anterior = getattr(_local, 'actual', None)
+        _local.actual = self
+        return self
+
+    def __exit__(self, tipo_exc, exc, tb):
+        _local.actual = self._anterior
+        if exc is not None:
+            self.atributos['excepcion'] = f'{tipo_exc.__name__}: {exc}'
+        self.terminar(exc is not None)
+        return False
+
+
+class ExportadorArchivo:
+    """Escribe los spans en JSON Lines por lotes desde un hilo en segundo plano"""
+
+    def __init__(self, ruta: str, intervalo: float = 1.0, max_cola: int = 20000):
+        """
+        Args:
+            ruta: Archivo .jsonl de salida (se añade al final)
+            intervalo: Segundos entre escrituras
+            max_cola: Spans pendientes como máximo; los que no caben se descartan
+        """
+        self.ruta = ruta
+        self.intervalo = intervalo
+        self.max_cola = max_cola
+        self.cola = deque()
+        self.escritos = 0
+        self.descartados = 0
+        self._lock = threading.Lock()
+        self._hilo = None
+
+    def exportar(self, registro: Dict):
+        if len(self.cola) >= self.max_cola:
+            self.descartados += 1
+            return
+        self.cola.append(registro)
+        if self._hilo is None:
+            self._arrancar()
+
+    def _arrancar(self):
+        with self._lock:
+            if self._hilo is not None:
+                return
+            self._hilo = threading.Thread(target=self._bucle, name='exportador-trazas', daemon=True)
+            self._hilo.start()
+            atexit.register(self.vaciar)
+
+    def _bucle(self):
+        while True:
+            time.sleep(self.intervalo)
+            self.vaciar()
+
+    def vaciar(self):
+        """Escribe todos los spans pendientes"""
+        with self._lock:
+            lineas = []
+            cola = self.cola
+            while cola:
+                lineas.append(json.dumps(cola.popleft(), ensure_ascii=False, default=str))
+            if not lineas:
+                return
+            try:
+                with open(self.ruta, 'a', encoding='utf-8') as f:
+                    f.write('\n'.join(lineas) + '\n')
+                self.escritos += len(lineas)
+            except OSError as e:
+                self.descartados += len(lineas)
+                logger.error("Error escribiendo trazas en %s: %s", self.ruta, e)
+
+
+class Trazador:
+    """Contexto de traza, muestreo y creación de spans de un servicio"""
+
+    def __init__(self, servicio: str, directorio: str = None, muestreo: float = None,
+                 max_por_segundo: float = None):
+        """
+        Args:
+            servicio: Nombre del servicio en los spans ('cliente', 'switch', 'servidor')
+            directorio: Directorio de salida; None o vacío desactiva el trazado
+            muestreo: Fracción de trazas raíz que se registran (0 a 1)
+            max_por_segundo: Tope de trazas raíz nuevas por segundo
+        """
+        if directorio is None:
+            directorio = os.environ.get('INVENTARIO_TRAZAS_DIR', '')
+        if muestreo is None:
+            muestreo = float(os.environ.get('INVENTARIO_TRAZAS_MUESTREO', '0.1'))
+        if max_por_segundo is None:
+            max_por_segundo = float(os.environ.get('INVENTARIO_TRAZAS_MAX_SEG', '50'))
+        self.servicio = servicio
+        self.activo = bool(directorio)
+        self.muestreo = muestreo
+        self.max_por_segundo = max_por_segundo
+        self.exportador = None
+        if self.activo:
+            os.makedirs(directorio, exist_ok=True)
+            self.exportador = ExportadorArchivo(
+                os.path.join(directorio, f'{servicio}-{os.getpid()}.jsonl'))
+        # Ventana de un segundo del tope de muestreo (aproximado, sin lock)
+        self._ventana = 0
+        self._en_ventana = 0
+        self.raices = 0
+        self.raices_muestreadas = 0
+
+    # ==================== MUESTREO ====================
+
+    def _muestrear(self) -> bool:
+        self.raices += 1
+        if random.random() >= self.muestreo:
+            return False
+        segundo = int(time.monotonic())
+        if segundo != self._ventana:
+            self._ventana = segundo
+            self._en_ventana = 0
+        if self._en_ventana >= self.max_por_segundo:
+            return False
+        self._en_ventana += 1
+        self.raices_muestreadas += 1
+        return True
+
+    # ==================== SPANS ====================
+
+    def contexto(self):
+        """Contexto de traza en curso (para continuar la traza desde otro hilo)"""
+        return getattr(_local, 'actual', None)
+
+    def span(self, nombre: str, tipo: str, padre=None, **atributos):
+        """
+        Span hijo del contexto en curso, para usar en un bloque ``with``
+
+        Args:
+            nombre: Operación ('POST /api/productos', 'db.crear_producto', ...)
+            tipo: 'http', 'db' o 'emit'
+            padre: Contexto capturado con ``contexto()``; por defecto el actual
+            atributos: Atributos iniciales del span
+
+        Returns:
+            El span, o uno nulo si no hay contexto o la traza no está muestreada
+        """
+        if padre is None:
+            padre = getattr(_local, 'actual', None)
+        if padre is None or not padre.muestreado:
+            return _NULO
+        return Span(self, padre.traza, padre.id, nombre, tipo, atributos)
+
+    def propagar(self, cabeceras: Dict = None) -> Dict:
+        """
+        Añade ``traceparent`` del contexto en curso a las cabeceras de una petición saliente
+
+        Sustituye cualquier ``traceparent`` recibido. Con el trazado desactivado
+        devuelve las cabeceras sin tocar.
+        """
+        if cabeceras is None:
+            cabeceras = {}
+        if not self.activo:
+            return cabeceras
+        actual = getattr(_local, 'actual', None)
+        if actual is None:
+            return cabeceras
+        for clave in [c for c in cabeceras if c.lower() == CABECERA]:
+            del cabeceras[clave]
+        cabeceras[CABECERA] = f'00-{actual.traza}-{actual.id}-{"01" if actual.muestreado else "00"}'
+        return cabeceras
+
+    def exportar(self, registro: Dict):
+        if self.exportador is not None:
+            self.exportador.exportar(registro)
+
+    def medir(self, nombre: str, tipo: str):
+        """Decorador: cada llamada a la función es un span"""
+        def decorador(funcion):
+            @wraps(funcion)
+            def envuelta(*args, **kwargs):
+                with self.span(nombre, tipo):
+                    return funcion(*args, **kwargs)
+            return envuelta
+        return decorador
+
+    def envolver_metodos(self, objeto, tipo: str, excluir=()):
+        """
+        Crea un span por llamada a cada método público de ``objeto``
+
+        Args:
+            objeto: Instancia cuyos métodos se sustituyen (p. ej. el DatabaseManager)
+            tipo: Tipo de los spans; el nombre es ``<tipo>.<método>``
+            excluir: Nombres de métodos que no se envuelven
+        """
+        if not self.activo:
+            return objeto
+        for nombre in dir(type(objeto)):
+            if nombre.startswith('_') or nombre in excluir:
+                continue
+            metodo = getattr(objeto, nombre)
+            if callable(metodo):
+                setattr(objeto, nombre, self.medir(f'{tipo}.{nombre}', tipo)(metodo))
+        return objeto
+
+    # ==================== PETICIONES ENTRANTES ====================
+
+    def abrir(self, nombre: str, traceparent: Optional[str] = None, **atributos):
+        """
+        Abre el contexto de una petición entrante
+
+        Continúa la traza de ``traceparent`` si es válida; si no, empieza una
+        nueva y decide si se muestrea.
+        """
+        remoto = parsear_traceparent(traceparent)
+        if remoto is None:
+            traza, padre, muestreado = _id_traza(), None, self._muestrear()
+        else:
+            traza, padre, muestreado = remoto
+        if muestreado:
+            _local.actual = Span(self, traza, padre, nombre, 'servidor', atributos)
+        else:
+            _local.actual = _Contexto(traza, padre or _id_span())
+
+    def cerrar(self, estado: int = None, error: bool = False):
+        """Cierra el contexto de la petición en curso"""
+        actual = getattr(_local, 'actual', None)
+        _local.actual = None
+        if actual is not None and actual.muestreado:
+            if estado is not None:
+                actual.atributos['http.estado'] = estado
+            actual.terminar(error or (estado is not None and estado >= 500))
+
+    def estado(self) -> Dict:
+        return {
+            'servicio': self.servicio,
+            'activo': self.activo,
+            'muestreo': self.muestreo,
+            'max_por_segundo': self.max_por_segundo,
+            'raices': self.raices,
+            'raices_muestreadas': self.raices_muestreadas,
+            'archivo': self.exportador.ruta if self.exportador else None,
+            'spans_escritos': self.exportador.escritos if self.exportador else 0,
+            'spans_pendientes': len(self.exportador.cola) if self.exportador else 0,
+            'spans_descartados': self.exportador.descartados if self.exportador else 0,
+        }
+
+    # ==================== FLASK ====================
+
+    def instalar(self, app):
+        """
+        Registra los hooks de trazado y GET /api/trazas/estado en una aplicación Flask
+
+        Conviene llamarlo justo después de crear ``app``. Sin directorio de
+        salida solo se registra la ruta de estado.
+        """
+        from flask import jsonify, request
+
+        if self.activo:
+            @app.before_request
+            def _abrir_traza():
+                regla = request.url_rule.rule if request.url_rule is not None else '(sin ruta)'
+                self.abrir(f'{request.method} {regla}', request.headers.get(CABECERA),
+                           **{'http.ruta': request.path})
+
+            @app.after_request
+            def _cerrar_traza(respuesta):
+                self.cerrar(respuesta.status_code)
+                return respuesta
+
+            @app.teardown_request
+            def _descartar_traza(error=None):
+                # Si la petición terminó en una excepción no hubo after_request
+                if getattr(_local, 'actual', None) is not None:
+                    self.cerrar(500, error=True)
+
+        @app.get('/api/trazas/estado')
+        def estado_trazas():
+            return jsonify(self.estado())
+
+        return self
+
+
+# ==================== INFORME ====================
+
+def cargar_spans(rutas: List[str]) -> List[Dict]:
+    """Lee los spans de archivos .jsonl o de todos los de un directorio"""
+    archivos = []
+    for ruta in rutas:
+        archivos.extend(sorted(glob.glob(os.path.join(ruta, '*.jsonl'))) if os.path.isdir(ruta) else [ruta])
+    spans = []
+    for archivo in archivos:
+        with open(archivo, encoding='utf-8') as f:
+            for linea in f:
+                linea = linea.strip()
+                if linea:
+                    try:
+                        spans.append(json.loads(linea))
+                    except ValueError:
+                        pass  # línea cortada por un proceso que terminó a mitad de escritura
+    return spans
+
+
+def _tiempos_propios(spans: List[Dict]) -> Dict[str, int]:
+    """
+    Tiempo propio de cada span: su duración menos la de sus hijos solapada con él
+
+    Para un span 'http' el tiempo propio es la red y las colas entre los dos
+    procesos; para uno 'servidor', el trabajo de la aplicación en ese salto.
+    """
+    hijos = defaultdict(list)
+    for s in spans:
+        if s.get('padre'):
+            hijos[s['padre']].append(s)
+    propios = {}
+    for s in spans:
+        inicio, fin = s['inicio_us'], s['inicio_us'] + s['duracion_us']
+        # Intervalos de los hijos recortados al padre y fusionados (los hijos pueden solaparse)
+        tramos = sorted((max(inicio, h['inicio_us']), min(fin, h['inicio_us'] + h['duracion_us']))
+                        for h in hijos.get(s['span'], ()))
+        cubierto, hasta = 0, inicio
+        for a, b in tramos:
+            a = max(a, hasta)
+            if b > a:
+                cubierto += b - a
+                hasta = b
+        propios[s['span']] = max(0, s['duracion_us'] - cubierto)
+    return propios
+
+
+def _percentil(ordenados: List[float], p: float) -> float:
+    if not ordenados:
+        return 0.0
+    return ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))]
+
+
+def resumen_saltos(spans: List[Dict]) -> List[Dict]:
+    """Duración y tiempo propio por (servicio, tipo, nombre), de mayor a menor tiempo propio total"""
+    propios = _tiempos_propios(spans)
+    grupos = defaultdict(lambda: ([], [], [0]))
+    for s in spans:
+        duraciones, tiempos, errores = grupos[(s['servicio'], s['tipo'], s['nombre'])]
+        duraciones.append(s['duracion_us'] / 1000)
+        tiempos.append(propios[s['span']] / 1000)
+        errores[0] += bool(s.get('error'))
+    filas = []
+    for (servicio, tipo, nombre), (duraciones, tiempos, errores) in grupos.items():
+        duraciones.sort()
+        tiempos.sort()
+        n = len(duraciones)
+        filas.append({
+            'servicio': servicio, 'tipo': tipo, 'nombre': nombre, 'spans': n, 'errores': errores[0],
+            'media_ms': sum(duraciones) / n, 'p95_ms': _percentil(duraciones, 0.95),
+            'max_ms': duraciones[-1],
+            'propio_media_ms': sum(tiempos) / n, 'propio_p95_ms': _percentil(tiempos, 0.95),
+            'propio_total_ms': sum(tiempos),
+        })
+    filas.sort(key=lambda f: f['propio_total_ms'], reverse=True)
+    return filas
+
+
+def imprimir_traza(spans: List[Dict]):
+    """Árbol de una traza con el desfase, la duración y el tiempo propio de cada span"""
+    propios = _tiempos_propios(spans)
+    ids = {s['span'] for s in spans}
+    hijos = defaultdict(list)
+    for s in spans:
+        hijos[s['padre'] if s.get('padre') in ids else None].append(s)
+    inicio = min(s['inicio_us'] for s in spans)
+    fin = max(s['inicio_us'] + s['duracion_us'] for s in spans)
+    print(f"traza {spans[0]['traza']}  {(fin - inicio) / 1000:.2f} ms  {len(spans)} spans")
+    print(f"  {'desde ms':>9} {'dur ms':>8} {'propio':>8}  operación")
+
+    def recorrer(s, nivel):
+        marca = ' !' if s.get('error') else ''
+        print(f"  {(s['inicio_us'] - inicio) / 1000:9.2f} {s['duracion_us'] / 1000:8.2f} "
+              f"{propios[s['span']] / 1000:8.2f}  {'  ' * nivel}[{s['servicio']}] {s['nombre']}{marca}")
+        for h in sorted(hijos.get(s['span'], ()), key=lambda h: h['inicio_us']):
+            recorrer(h, nivel + 1)
+
+    for raiz in sorted(hijos[None], key=lambda s: s['inicio_us']):
+        recorrer(raiz, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Informe de las trazas distribuidas exportadas')
+    parser.add_argument('rutas', nargs='+', help='Directorio de INVENTARIO_TRAZAS_DIR o archivos .jsonl')
+    parser.add_argument('--lentas', type=int, default=3, help='Trazas más lentas a mostrar en árbol')
+    parser.add_argument('--traza', help='Mostrar solo esta traza')
+    parser.add_argument('--limite', type=int, default=25, help='Filas del resumen por salto')
+    parser.add_argument('--json', action='store_true', help='Resumen en JSON')
+    args = parser.parse_args()
+
+    spans = cargar_spans(args.rutas)
+    if not spans:
+        print("No hay spans en", ', '.join(args.rutas))
+        sys.exit(1)
+    trazas = defaultdict(list)
+    for s in spans:
+        trazas[s['traza']].append(s)
+
+    if args.traza:
+        if args.traza not in trazas:
+            print(f"No existe la traza {args.traza}")
+            sys.exit(1)
+        imprimir_traza(trazas[args.traza])
+        return
+
+    filas = resumen_saltos(spans)
+    if args.json:
+        print(json.dumps({'trazas': len(trazas), 'spans': len(spans), 'saltos': filas[:args.limite]},
+                         indent=2, ensure_ascii=False))
+        return
+
+    print(f"=== {len(trazas)} trazas, {len(spans)} spans ===")
+    print(f"{'servicio':<9} {'tipo':<8} {'spans':>6} {'media ms':>9} {'p95 ms':>8} {'propio ms':>10} "
+          f"{'propio p95':>10} {'errores':>7}  operación")
+    for f in filas[:args.limite]:
+        print(f"{f['servicio']:<9} {f['tipo']:<8} {f['spans']:>6} {f['media_ms']:9.2f} {f['p95_ms']:8.2f} "
+              f"{f['propio_media_ms']:10.2f} {f['propio_p95_ms']:10.2f} {f['errores']:>7}  {f['nombre']}")
+
+    def duracion(grupo):
+        return (max(s['inicio_us'] + s['duracion_us'] for s in grupo) - min(s['inicio_us'] for s in grupo))
+
+    for grupo in sorted(trazas.values(), key=duracion, reverse=True)[:args.lentas]:
+        print()
+        imprimir_traza(grupo)
+
+
+if __name__ == '__main__':
+    main()
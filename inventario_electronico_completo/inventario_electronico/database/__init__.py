@@ -2,7 +2,6 @@
 Módulo de Base de Datos para Sistema de Inventario Electrónico
 """
 
-from .database_manager import DatabaseManager, inicializar_base_datos
-
-__all__ = ['DatabaseManager', 'inicializar_base_datos']
+from .database_manager import DatabaseManager, inicializar_base_datos, StockInsuficiente, ReservaNoActiva
 
+__all__ = ['DatabaseManager', 'inicializar_base_datos', 'StockInsuficiente', 'ReservaNoActiva']
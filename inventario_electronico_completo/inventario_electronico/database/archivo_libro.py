@@ -0,0 +1,264 @@
+"""
+Archivo mensual del libro de transacciones
+Los meses cerrados de ``transacciones`` salen de ``inventario.db`` a un archivo
+SQLite por mes (``<directorio>/transacciones_AAAA-MM.db``) y quedan registrados
+en ``libro_archivado``. La base principal conserva los meses recientes y el
+``resumen_diario`` completo, así que el historial por día, las ventas y los más
+vendidos no cambian; ``DatabaseManager.movimientos_producto`` adjunta con
+``ATTACH`` los archivos de los meses que necesita.
+
+El traslado es incremental, por lotes de ``lote`` transacciones:
+
+1. Copia el lote al archivo del mes (solo se bloquea el archivo para escribir)
+2. Borra de la base principal las del lote que ya están en el archivo, en una
+   transacción corta
+
+Si el proceso se interrumpe entre los dos pasos, las filas quedan en los dos
+sitios hasta la siguiente ejecución, que las vuelve a copiar (``INSERT OR
+IGNORE``) y las borra. Las consultas de movimientos no las repiten.
+
+Variables de entorno:
+
+- ``INVENTARIO_ARCHIVO_DIR``: directorio de los archivos (defecto ``archivo/`` junto a la base)
+
+Uso:
+    python -m database.archivo_libro --db database/inventario.db --conservar-meses 3
+    python -m database.archivo_libro --db database/inventario.db --estado
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import time
+from datetime import date
+from typing import Dict, List, Optional
+
+try:
+    from .reintentos import PoliticaReintentos
+except ImportError:  # Ejecución directa como script
+    from reintentos import PoliticaReintentos
+
+logger = logging.getLogger('inventario.archivo')
+
+COLUMNAS = ('id_transaccion, id_producto, id_cliente, tipo_transaccion, cantidad, '
+            'precio_unitario, total, fecha_transaccion, observaciones')
+
+_ESQUEMA_ARCHIVO = """
+    CREATE TABLE IF NOT EXISTS {alias}.transacciones (
+        id_transaccion INTEGER PRIMARY KEY,
+        id_producto INTEGER NOT NULL,
+        id_cliente INTEGER,
+        tipo_transaccion TEXT NOT NULL,
+        cantidad INTEGER NOT NULL,
+        precio_unitario DECIMAL(10,2),
+        total DECIMAL(10,2),
+        fecha_transaccion DATETIME,
+        observaciones TEXT
+    );
+    CREATE INDEX IF NOT EXISTS {alias}.idx_transacciones_producto ON transacciones(id_producto);
+    CREATE INDEX IF NOT EXISTS {alias}.idx_transacciones_fecha ON transacciones(fecha_transaccion);
+"""
+
+
+def directorio_archivo(db_path: str) -> str:
+    """Directorio de los archivos mensuales de una base"""
+    return os.environ.get('INVENTARIO_ARCHIVO_DIR') or os.path.join(
+        os.path.dirname(os.path.abspath(db_path)), 'archivo')
+
+
+def meses_archivados(conn: sqlite3.Connection, directorio: str) -> Dict[str, str]:
+    """Meses archivados ('AAAA-MM') y la ruta de su archivo, del más antiguo al más reciente"""
+    return {mes: os.path.join(directorio, archivo) for mes, archivo in conn.execute(
+        "SELECT mes, archivo FROM libro_archivado ORDER BY mes")}
+
+
+def limites_mes(mes: str):
+    """Primer día del mes y del siguiente ('AAAA-MM-DD')"""
+    anio, numero = map(int, mes.split('-'))
+    siguiente = date(anio + numero // 12, numero % 12 + 1, 1)
+    return f'{mes}-01', siguiente.isoformat()
+
+
+class ArchivadorLibro:
+    """Mueve los meses cerrados de ``transacciones`` a archivos mensuales"""
+
+    def __init__(self, db_path: str, directorio: str = None, conservar_meses: int = 3,
+                 lote: int = 2000, pausa_ms: float = 5.0,
+                 reintentos: Optional[PoliticaReintentos] = None):
+        """
+        Args:
+            db_path: Ruta de la base principal
+            directorio: Directorio de los archivos; por defecto ``directorio_archivo``
+            conservar_meses: Meses completos que se quedan en la base además del actual
+            lote: Transacciones movidas en cada transacción
+            pausa_ms: Pausa entre lotes para dejar paso a las demás escrituras
+            reintentos: Política ante bloqueos de otros procesos
+        """
+        self.db_path = db_path
+        self.directorio = directorio or directorio_archivo(db_path)
+        self.conservar_meses = conservar_meses
+        self.lote = lote
+        self.pausa = pausa_ms / 1000
+        self.reintentos = reintentos or PoliticaReintentos()
+        self.metricas = {'filas': 0, 'lotes': 0, 'meses': 0, 'bloqueo_max_ms': 0.0, 'segundos': 0.0}
+
+    def _conectar(self) -> sqlite3.Connection:
+        conn = self.reintentos.preparar(sqlite3.connect(self.db_path))
+        # BEGIN/COMMIT explícitos: cada paso de un lote es su propia transacción
+        conn.isolation_level = None
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS archivo_lote (id_transaccion INTEGER PRIMARY KEY)")
+        return conn
+
+    def meses_cerrados(self, conn: sqlite3.Connection) -> List[str]:
+        """Meses anteriores al periodo conservado que aún tienen transacciones en la base"""
+        limite = conn.execute("SELECT date('now', 'start of month', ?)",
+                              (f'-{int(self.conservar_meses)} months',)).fetchone()[0]
+        meses = []
+        desde = ''
+        # Salta de mes con datos en mes con datos por idx_transacciones_fecha
+        while True:
+            primera = conn.execute(
+                "SELECT MIN(fecha_transaccion) FROM transacciones WHERE fecha_transaccion >= ?",
+                (desde,)).fetchone()[0]
+            if primera is None or primera >= limite:
+                return meses
+            meses.append(primera[:7])
+            desde = limites_mes(primera[:7])[1]
+
+    def archivar(self) -> Dict:
+        """
+        Archiva todos los meses cerrados
+
+        Returns:
+            Filas archivadas por mes
+        """
+        os.makedirs(self.directorio, exist_ok=True)
+        inicio = time.perf_counter()
+        conn = self._conectar()
+        try:
+            archivadas = {}
+            for mes in self.meses_cerrados(conn):
+                filas = self.archivar_mes(conn, mes)
+                if filas:
+                    archivadas[mes] = filas
+                    self.metricas['meses'] += 1
+                    logger.info("Mes %s archivado: %d transacciones", mes, filas)
+        finally:
+            conn.close()
+        self.metricas['segundos'] += time.perf_counter() - inicio
+        return archivadas
+
+    def archivar_mes(self, conn: sqlite3.Connection, mes: str) -> int:
+        """Mueve por lotes las transacciones de ``mes`` a su archivo; devuelve cuántas"""
+        desde, hasta = limites_mes(mes)
+        nombre = f'transacciones_{mes}.db'
+        conn.execute("ATTACH DATABASE ? AS archivo", (os.path.join(self.directorio, nombre),))
+        try:
+            conn.execute("PRAGMA archivo.journal_mode=WAL")
+            conn.executescript(_ESQUEMA_ARCHIVO.format(alias='archivo'))
+            total = 0
+            while True:
+                conn.execute("DELETE FROM temp.archivo_lote")
+                # Lote por idx_transacciones_fecha, fuera de transacción (solo lectura)
+                conn.execute("""
+                    INSERT INTO temp.archivo_lote
+                    SELECT id_transaccion FROM main.transacciones
+                    WHERE fecha_transaccion >= ? AND fecha_transaccion < ?
+                    LIMIT ?
+                """, (desde, hasta, self.lote))
+                if not conn.execute("SELECT 1 FROM temp.archivo_lote LIMIT 1").fetchone():
+                    return total
+                # La copia solo escribe en el archivo: la base principal no se bloquea para escribir
+                self.reintentos.ejecutar(lambda: self._transaccion(conn, "BEGIN", self._copiar))
+                total += self.reintentos.ejecutar(
+                    lambda: self._transaccion(conn, "BEGIN IMMEDIATE", self._borrar, mes, nombre))
+                self.metricas['lotes'] += 1
+                if self.pausa:
+                    time.sleep(self.pausa)
+        finally:
+            conn.execute("DETACH DATABASE archivo")
+
+    def _transaccion(self, conn: sqlite3.Connection, inicio: str, paso, *args):
+        try:
+            conn.execute(inicio)
+            # Desde que se obtiene el bloqueo (la espera de BEGIN IMMEDIATE no cuenta)
+            reloj = time.perf_counter()
+            resultado = paso(conn, *args)
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        if inicio == "BEGIN IMMEDIATE":
+            self.metricas['bloqueo_max_ms'] = max(self.metricas['bloqueo_max_ms'],
+                                                  (time.perf_counter() - reloj) * 1000)
+        return resultado
+
+    @staticmethod
+    def _copiar(conn: sqlite3.Connection):
+        conn.execute(f"""
+            INSERT OR IGNORE INTO archivo.transacciones ({COLUMNAS})
+            SELECT {COLUMNAS} FROM main.transacciones
+            WHERE id_transaccion IN (SELECT id_transaccion FROM temp.archivo_lote)
+        """)
+
+    def _borrar(self, conn: sqlite3.Connection, mes: str, nombre: str) -> int:
+        # Solo se borra lo que ya está confirmado en el archivo
+        filas = conn.execute("""
+            DELETE FROM main.transacciones
+            WHERE id_transaccion IN (
+                SELECT l.id_transaccion FROM temp.archivo_lote l
+                JOIN archivo.transacciones a ON a.id_transaccion = l.id_transaccion
+            )
+        """).rowcount
+        conn.execute("""
+            INSERT INTO main.libro_archivado (mes, archivo, filas) VALUES (?, ?, ?)
+            ON CONFLICT (mes) DO UPDATE SET
+                filas = filas + excluded.filas, actualizado = CURRENT_TIMESTAMP
+        """, (mes, nombre, filas))
+        self.metricas['filas'] += filas
+        return filas
+
+    def estado(self) -> Dict:
+        """Meses archivados, transacciones que siguen en la base y métricas"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            meses = [{'mes': mes, 'archivo': archivo, 'filas': filas, 'actualizado': actualizado}
+                     for mes, archivo, filas, actualizado in conn.execute(
+                         "SELECT mes, archivo, filas, actualizado FROM libro_archivado ORDER BY mes")]
+            en_base = conn.execute("SELECT COUNT(*) FROM transacciones").fetchone()[0]
+        finally:
+            conn.close()
+        return {'directorio': self.directorio, 'conservar_meses': self.conservar_meses,
+                'meses': meses, 'transacciones_en_base': en_base, 'metricas': dict(self.metricas)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archiva los meses cerrados del libro de transacciones')
+    parser.add_argument('--db', default='inventario.db', help='Ruta a la base SQLite')
+    parser.add_argument('--directorio', help='Directorio de los archivos mensuales')
+    parser.add_argument('--conservar-meses', type=int, default=3,
+                        help='Meses completos que se quedan en la base además del actual')
+    parser.add_argument('--lote', type=int, default=2000, help='Transacciones por lote')
+    parser.add_argument('--pausa-ms', type=float, default=5.0, help='Pausa entre lotes')
+    parser.add_argument('--estado', action='store_true', help='Solo mostrar lo ya archivado')
+    args = parser.parse_args()
+
+    archivador = ArchivadorLibro(args.db, args.directorio, args.conservar_meses, args.lote, args.pausa_ms)
+    if not args.estado:
+        archivadas = archivador.archivar()
+        m = archivador.metricas
+        print(f"Archivadas {m['filas']:,} transacciones de {len(archivadas)} meses en {m['lotes']} lotes "
+              f"({m['segundos']:.1f} s, bloqueo máximo {m['bloqueo_max_ms']:.1f} ms)")
+    estado = archivador.estado()
+    print(f"Directorio: {estado['directorio']}")
+    for mes in estado['meses']:
+        print(f"  {mes['mes']}  {mes['filas']:>12,}  {mes['archivo']}")
+    print(f"Transacciones en la base: {estado['transacciones_en_base']:,}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
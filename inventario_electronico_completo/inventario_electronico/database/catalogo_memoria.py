@@ -0,0 +1,229 @@
+"""
+Catálogo de productos en memoria para el Servidor de Inventario
+Mantiene el catálogo en arreglos compactos (columnas) para servir lecturas
+sin consultar SQLite ni construir un diccionario por fila
+"""
+
+import sys
+import threading
+from array import array
+from json.encoder import encode_basestring_ascii
+from typing import Dict, Iterable, List, Optional
+
+def _texto_json(valor) -> str:
+    """Codifica un valor de texto (o NULL) como literal JSON"""
+    if valor is None:
+        return 'null'
+    return encode_basestring_ascii(str(valor))
+
+
+class CatalogoMemoria:
+    """
+    Catálogo columnar de productos
+
+    Los campos numéricos se guardan en arreglos ``array`` (8 bytes por valor)
+    y los de texto en listas paralelas. SQLite devuelve el precio como entero
+    o como real según el valor (afinidad NUMERIC); un byte por fila recuerda
+    cuál era para devolver el mismo tipo que la consulta (``600``, no
+    ``600.0``). Cada fila conserva además su fragmento JSON ya codificado, que
+    solo se regenera cuando la fila cambia.
+    """
+
+    __slots__ = (
+        '_lock', '_posicion', '_ids', '_cantidades', '_precios', '_precios_enteros', '_activos',
+        '_nombres', '_descripciones', '_categorias', '_proveedores',
+        '_fechas_creacion', '_fechas_actualizacion', '_json_filas', '_orden'
+    )
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self._posicion: Dict[int, int] = {}
+        self._ids = array('q')
+        self._cantidades = array('q')
+        self._precios = array('d')
+        self._precios_enteros = array('b')
+        self._activos = array('b')
+        self._nombres: List[str] = []
+        self._descripciones: List[Optional[str]] = []
+        self._categorias: List[Optional[str]] = []
+        self._proveedores: List[Optional[str]] = []
+        self._fechas_creacion: List[Optional[str]] = []
+        self._fechas_actualizacion: List[Optional[str]] = []
+        self._json_filas: List[Optional[str]] = []
+        self._orden: Optional[List[int]] = None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    # ==================== CARGA Y ACTUALIZACIÓN ====================
+
+    def cargar(self, filas: Iterable) -> int:
+        """
+        Carga el catálogo completo a partir de filas de la tabla productos
+
+        Args:
+            filas: Filas ``sqlite3.Row`` (o diccionarios) con todas las columnas
+
+        Returns:
+            Número de productos cargados
+        """
+        with self._lock:
+            self._reiniciar()
+            for fila in filas:
+                self._agregar(fila)
+            return len(self._ids)
+
+    def actualizar(self, fila) -> None:
+        """
+        Inserta o reemplaza un producto a partir de su fila actual en la base
+
+        Args:
+            fila: Fila ``sqlite3.Row`` (o diccionario) del producto
+        """
+        with self._lock:
+            i = self._posicion.get(fila['id_producto'])
+            if i is None:
+                self._agregar(fila)
+                self._orden = None
+                return
+
+            if self._nombres[i] != fila['nombre_producto']:
+                self._orden = None
+            self._cantidades[i] = fila['cantidad']
+            self._precios[i] = fila['precio']
+            self._precios_enteros[i] = isinstance(fila['precio'], int)
+            self._activos[i] = 1 if fila['activo'] else 0
+            self._nombres[i] = fila['nombre_producto']
+            self._descripciones[i] = fila['descripcion']
+            self._categorias[i] = fila['categoria']
+            self._proveedores[i] = fila['proveedor']
+            self._fechas_creacion[i] = fila['fecha_creacion']
+            self._fechas_actualizacion[i] = fila['fecha_actualizacion']
+            self._json_filas[i] = None
+
+    def _agregar(self, fila):
+        self._posicion[fila['id_producto']] = len(self._ids)
+        self._ids.append(fila['id_producto'])
+        self._cantidades.append(fila['cantidad'])
+        self._precios.append(fila['precio'])
+        self._precios_enteros.append(isinstance(fila['precio'], int))
+        self._activos.append(1 if fila['activo'] else 0)
+        self._nombres.append(fila['nombre_producto'])
+        self._descripciones.append(fila['descripcion'])
+        self._categorias.append(fila['categoria'])
+        self._proveedores.append(fila['proveedor'])
+        self._fechas_creacion.append(fila['fecha_creacion'])
+        self._fechas_actualizacion.append(fila['fecha_actualizacion'])
+        self._json_filas.append(None)
+
+    # ==================== LECTURAS ====================
+
+    def _indices_ordenados(self) -> List[int]:
+        """Índices de fila ordenados como ``ORDER BY nombre_producto``"""
+        orden = self._orden
+        if orden is None:
+            nombres, ids = self._nombres, self._ids
+            orden = sorted(range(len(ids)), key=lambda i: (nombres[i], ids[i]))
+            self._orden = orden
+        return orden
+
+    def _precio(self, i: int):
+        """Precio con el tipo (int o float) que tenía en la base"""
+        precio = self._precios[i]
+        return int(precio) if self._precios_enteros[i] else precio
+
+    def _json_fila(self, i: int) -> str:
+        """Fragmento JSON de la fila con las claves en el orden de jsonify"""
+        fragmento = self._json_filas[i]
+        if fragmento is None:
+            fragmento = (
+                f'{{"activo":{self._activos[i]},'
+                f'"cantidad":{self._cantidades[i]},'
+                f'"categoria":{_texto_json(self._categorias[i])},'
+                f'"descripcion":{_texto_json(self._descripciones[i])},'
+                f'"fecha_actualizacion":{_texto_json(self._fechas_actualizacion[i])},'
+                f'"fecha_creacion":{_texto_json(self._fechas_creacion[i])},'
+                f'"id_producto":{self._ids[i]},'
+                f'"nombre_producto":{_texto_json(self._nombres[i])},'
+                f'"precio":{self._precio(i)!r},'
+                f'"proveedor":{_texto_json(self._proveedores[i])}}}'
+            )
+            self._json_filas[i] = fragmento
+        return fragmento
+
+    def a_json(self, activos_solo: bool = True) -> bytes:
+        """
+        Serializa el catálogo como un arreglo JSON listo para responder
+
+        Args:
+            activos_solo: Si True, omite los productos desactivados
+
+        Returns:
+            Documento JSON codificado en UTF-8
+        """
+        with self._lock:
+            activos = self._activos
+            fragmentos = [
+                self._json_fila(i) for i in self._indices_ordenados()
+                if activos[i] or not activos_solo
+            ]
+        return ('[' + ','.join(fragmentos) + ']').encode('utf-8')
+
+    def a_lista(self, activos_solo: bool = True) -> List[Dict]:
+        """
+        Devuelve el catálogo con el mismo formato que ``obtener_productos``
+
+        Args:
+            activos_solo: Si True, omite los productos desactivados
+
+        Returns:
+            Lista de diccionarios con información de productos
+        """
+        with self._lock:
+            return [
+                {
+                    'id_producto': self._ids[i],
+                    'nombre_producto': self._nombres[i],
+                    'descripcion': self._descripciones[i],
+                    'cantidad': self._cantidades[i],
+                    'precio': self._precio(i),
+                    'categoria': self._categorias[i],
+                    'proveedor': self._proveedores[i],
+                    'fecha_creacion': self._fechas_creacion[i],
+                    'fecha_actualizacion': self._fechas_actualizacion[i],
+                    'activo': self._activos[i],
+                }
+                for i in self._indices_ordenados()
+                if self._activos[i] or not activos_solo
+            ]
+
+    def memoria_por_sku(self) -> float:
+        """
+        Estima los bytes ocupados por producto (arreglos, textos y JSON cacheado)
+
+        Returns:
+            Bytes promedio por SKU, 0 si el catálogo está vacío
+        """
+        with self._lock:
+            total = len(self._ids)
+            if not total:
+                return 0.0
+            tamano = sum(sys.getsizeof(col) for col in (
+                self._ids, self._cantidades, self._precios, self._precios_enteros, self._activos,
+                self._nombres, self._descripciones, self._categorias,
+                self._proveedores, self._fechas_creacion,
+                self._fechas_actualizacion, self._json_filas, self._posicion
+            ))
+            # Los textos repetidos (categorías, proveedores) se comparten
+            vistos = set()
+            for columna in (self._nombres, self._descripciones, self._categorias,
+                            self._proveedores, self._fechas_creacion,
+                            self._fechas_actualizacion, self._json_filas):
+                for valor in columna:
+                    if valor is not None and id(valor) not in vistos:
+                        vistos.add(id(valor))
+                        tamano += sys.getsizeof(valor)
+            return tamano / total
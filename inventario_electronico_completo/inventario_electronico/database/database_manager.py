@@ -1,23 +1,108 @@
 """
 Gestor de Base de Datos para Sistema de Inventario Electrónico
-Maneja todas las operaciones CRUD para productos, clientes y transacciones
+Maneja todas las operaciones CRUD para productos, clientes y transacciones,
+y las reservas de stock para pedidos de varias líneas
 """
 
+import logging
 import sqlite3
 import os
+import threading
+import json
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, Iterable, List, Dict, Optional, Set, Tuple, TypeVar
+
+try:
+    from .archivo_libro import directorio_archivo, meses_archivados
+    from .catalogo_memoria import CatalogoMemoria
+    from .escritor_agrupado import EscritorAgrupado
+    from .perfilador_sql import PerfiladorSQL, conectar
+    from .reintentos import PoliticaReintentos
+    from .resumen_diario import reconstruir as reconstruir_resumen_diario
+except ImportError:  # Ejecución directa como script
+    from archivo_libro import directorio_archivo, meses_archivados
+    from catalogo_memoria import CatalogoMemoria
+    from escritor_agrupado import EscritorAgrupado
+    from perfilador_sql import PerfiladorSQL, conectar
+    from reintentos import PoliticaReintentos
+    from resumen_diario import reconstruir as reconstruir_resumen_diario
+
+logger = logging.getLogger('inventario.db')
+T = TypeVar('T')
+
+# Plazo máximo de una reserva (minutos)
+RESERVA_MAX_MINUTOS = 24 * 60
+
+
+class StockInsuficiente(ValueError):
+    """Una salida o una línea de reserva pide más unidades de las disponibles"""
+
+    def __init__(self, id_producto: int, solicitada: int, disponible: Optional[int]):
+        self.id_producto = id_producto
+        self.solicitada = solicitada
+        self.disponible = disponible
+        if disponible is None:
+            mensaje = f"El producto {id_producto} no existe"
+        else:
+            mensaje = (f"Stock insuficiente del producto {id_producto}: "
+                       f"se piden {solicitada} y hay {disponible}")
+        super().__init__(mensaje)
+
+
+class ReservaNoActiva(ValueError):
+    """La reserva no existe, ya se confirmó o liberó, o ha vencido"""
+
+    def __init__(self, id_reserva: int, estado: Optional[str]):
+        self.id_reserva = id_reserva
+        self.estado = estado
+        super().__init__(f"La reserva {id_reserva} no existe" if estado is None
+                         else f"La reserva {id_reserva} no está activa ({estado})")
+
 
 class DatabaseManager:
-    def __init__(self, db_path: str = "inventario.db"):
+    def __init__(self, db_path: str = "inventario.db", catalogo_memoria: bool = False,
+                 perfilador: Optional[PerfiladorSQL] = None,
+                 escritura_agrupada: bool = False, espera_grupo_ms: float = 0.0,
+                 reintentos: Optional[PoliticaReintentos] = None,
+                 archivo_dir: str = None):
         """
         Inicializa el gestor de base de datos
         
         Args:
             db_path: Ruta al archivo de base de datos SQLite
+            catalogo_memoria: Si True, sirve las lecturas de productos desde
+                un catálogo en memoria que se actualiza en cada escritura
+            perfilador: Si se indica, mide cada sentencia ejecutada a través
+                de ``get_connection`` (ver perfilador_sql.py)
+            escritura_agrupada: Si True, las escrituras pasan por un hilo
+                escritor que confirma varias en cada transacción
+                (ver escritor_agrupado.py)
+            espera_grupo_ms: Espera máxima del escritor a más operaciones
+                antes de confirmar un lote incompleto
+            reintentos: Política ante bloqueos de otros procesos que comparten
+                la base (por defecto según INVENTARIO_DB_*, ver reintentos.py)
+            archivo_dir: Directorio de los meses archivados del libro de
+                transacciones (por defecto ``archivo/`` junto a la base,
+                ver archivo_libro.py)
         """
         self.db_path = db_path
+        self.archivo_dir = archivo_dir or directorio_archivo(db_path)
+        self.perfilador = perfilador
+        self.catalogo = None
+        # Serializa lectura y copia al catálogo: sin él, un refresco con una
+        # lectura anterior podría aplicarse después de uno más reciente
+        self._lock_catalogo = threading.Lock()
+        self._suscriptores: List[Callable[[str, int], None]] = []
         self.init_database()
+        self.reintentos = reintentos or PoliticaReintentos()
+        self.escritor = None
+        if escritura_agrupada:
+            self.escritor = EscritorAgrupado(self.get_connection, espera_ms=espera_grupo_ms,
+                                             reintentos=self.reintentos)
+        if catalogo_memoria:
+            self.catalogo = CatalogoMemoria()
+            with self.get_connection() as conn:
+                self.catalogo.cargar(conn.execute("SELECT * FROM productos"))
     
     def init_database(self):
         """Inicializa la base de datos ejecutando el esquema SQL"""
@@ -29,20 +114,156 @@ class DatabaseManager:
             
             # Ejecutar el esquema
             with sqlite3.connect(self.db_path) as conn:
+                # WAL: lectores concurrentes mientras otro proceso escribe
+                conn.execute("PRAGMA journal_mode=WAL")
+                resumen_nuevo = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'resumen_diario'"
+                ).fetchone() is None
                 conn.executescript(schema_sql)
                 conn.commit()
+                # Una base anterior al resumen diario ya tiene transacciones sin resumir
+                if resumen_nuevo:
+                    datos = reconstruir_resumen_diario(conn)
+                    if datos['filas']:
+                        logger.info("Resumen diario reconstruido: %d filas en %.1f s",
+                                    datos['filas'], datos['segundos'])
             
-            print(f"Base de datos inicializada correctamente: {self.db_path}")
+            logger.info("Base de datos inicializada correctamente: %s", self.db_path)
         except Exception as e:
-            print(f"Error al inicializar la base de datos: {e}")
+            logger.error("Error al inicializar la base de datos: %s", e)
             raise
     
     def get_connection(self) -> sqlite3.Connection:
         """Obtiene una conexión a la base de datos"""
-        conn = sqlite3.connect(self.db_path)
+        if self.perfilador is not None:
+            conn = conectar(self.db_path, self.perfilador)
+        else:
+            conn = sqlite3.connect(self.db_path)
         conn.row_factory = sqlite3.Row  # Para acceder a columnas por nombre
         return conn
     
+    def _escribir(self, operacion: Callable[[sqlite3.Connection], T]) -> T:
+        """
+        Ejecuta una escritura y la confirma
+
+        Con el escritor agrupado la operación se encola y se espera a que su
+        lote esté confirmado; si no, usa una conexión propia. En los dos casos
+        la transacción empieza con BEGIN IMMEDIATE y, si otro proceso tiene la
+        base bloqueada, se reintenta según ``self.reintentos``.
+
+        Args:
+            operacion: Función que recibe la conexión y devuelve el resultado;
+                puede ejecutarse más de una vez si la base está bloqueada
+        """
+        if self.escritor is not None:
+            return self.escritor.ejecutar(operacion)
+        return self.reintentos.ejecutar(lambda: self._transaccion_inmediata(operacion))
+    
+    def _transaccion_inmediata(self, operacion: Callable[[sqlite3.Connection], T]) -> T:
+        """Ejecuta ``operacion`` en una conexión propia entre BEGIN IMMEDIATE y COMMIT"""
+        # BEGIN IMMEDIATE toma el bloqueo de escritura al empezar: una transacción
+        # diferida que lee y luego escribe puede fallar con SQLITE_BUSY a mitad
+        # sin pasar por el manejador de espera de SQLite
+        conn = self.reintentos.preparar(self.get_connection())
+        conn.isolation_level = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            resultado = operacion(conn)
+            conn.execute("COMMIT")
+            return resultado
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _descontar_stock(conn: sqlite3.Connection, id_producto: int, cantidad: int):
+        """
+        Resta ``cantidad`` del stock solo si hay unidades suficientes
+
+        La comprobación y la resta son la misma sentencia, así que dos ventas
+        simultáneas nunca dejan el stock en negativo.
+
+        Raises:
+            StockInsuficiente: Si no hay unidades suficientes o el producto no existe
+        """
+        if cantidad <= 0:
+            raise ValueError(f"La cantidad a descontar debe ser positiva: {cantidad}")
+        cursor = conn.execute("""
+            UPDATE productos 
+            SET cantidad = cantidad - ? 
+            WHERE id_producto = ? AND cantidad >= ?
+        """, (cantidad, id_producto, cantidad))
+        if cursor.rowcount == 0:
+            fila = conn.execute(
+                "SELECT cantidad FROM productos WHERE id_producto = ?", (id_producto,)
+            ).fetchone()
+            raise StockInsuficiente(id_producto, cantidad, fila[0] if fila else None)
+    
+    def suscribir_cambios(self, callback: Callable[[str, int], None]):
+        """
+        Registra una función que se invoca tras cada escritura confirmada
+        
+        Args:
+            callback: Función que recibe la tabla modificada y el ID del registro
+        """
+        self._suscriptores.append(callback)
+    
+    def notificar_cambio_externo(self, tabla: str, id_registro: int):
+        """
+        Aplica una escritura hecha por otro proceso sobre la misma base
+        
+        Refresca el catálogo en memoria y avisa a los suscriptores igual que
+        una escritura local.
+        
+        Args:
+            tabla: Tabla modificada ('productos' o 'clientes')
+            id_registro: ID del registro modificado
+        """
+        self._registrar_cambio(tabla, id_registro)
+    
+    def resincronizar(self):
+        """
+        Recarga el estado derivado de la base tras perder cambios de otros procesos
+        
+        Vuelve a cargar el catálogo en memoria completo y avisa a los
+        suscriptores de cada tabla con ``id_registro`` None, para que invaliden
+        todo lo que derivan de ella (snapshots, difusiones).
+        """
+        if self.catalogo is not None:
+            with self._lock_catalogo, self.get_connection() as conn:
+                self.catalogo.cargar(conn.execute("SELECT * FROM productos"))
+        for tabla in ('productos', 'clientes'):
+            self._avisar_suscriptores(tabla, None)
+    
+    def _registrar_cambio(self, tabla: str, id_registro: int):
+        """Propaga una escritura al catálogo en memoria y a los suscriptores"""
+        if tabla == 'productos':
+            self._refrescar_catalogo(id_registro)
+        self._avisar_suscriptores(tabla, id_registro)
+    
+    def _avisar_suscriptores(self, tabla: str, id_registro: Optional[int]):
+        for callback in list(self._suscriptores):
+            try:
+                callback(tabla, id_registro)
+            except Exception as e:
+                logger.error("Error al notificar cambio en %s: %s", tabla, e)
+    
+    def _refrescar_catalogo(self, id_producto: int):
+        """Vuelve a leer un producto y lo copia al catálogo en memoria"""
+        if self.catalogo is None:
+            return
+        with self._lock_catalogo:
+            with self.get_connection() as conn:
+                row = conn.execute(
+                    "SELECT * FROM productos WHERE id_producto = ?",
+                    (id_producto,)
+                ).fetchone()
+            if row:
+                self.catalogo.actualizar(row)
+    
     # ==================== OPERACIONES DE PRODUCTOS ====================
     
     def obtener_productos(self, activos_solo: bool = True) -> List[Dict]:
@@ -55,6 +276,8 @@ class DatabaseManager:
         Returns:
             Lista de diccionarios con información de productos
         """
+        if self.catalogo is not None:
+            return self.catalogo.a_lista(activos_solo)
         try:
             with self.get_connection() as conn:
                 query = "SELECT * FROM productos"
@@ -66,9 +289,24 @@ class DatabaseManager:
                 productos = [dict(row) for row in cursor.fetchall()]
                 return productos
         except Exception as e:
-            print(f"Error al obtener productos: {e}")
+            logger.error("Error al obtener productos: %s", e)
             return []
     
+    def obtener_productos_json(self, activos_solo: bool = True) -> bytes:
+        """
+        Obtiene todos los productos ya serializados como JSON
+        
+        Args:
+            activos_solo: Si True, solo devuelve productos activos
+            
+        Returns:
+            Arreglo JSON codificado en UTF-8
+        """
+        if self.catalogo is not None:
+            return self.catalogo.a_json(activos_solo)
+        return json.dumps(self.obtener_productos(activos_solo),
+                          separators=(',', ':'), sort_keys=True).encode('utf-8')
+    
     def obtener_producto_por_id(self, id_producto: int) -> Optional[Dict]:
         """
         Obtiene un producto específico por ID
@@ -88,7 +326,7 @@ class DatabaseManager:
                 row = cursor.fetchone()
                 return dict(row) if row else None
         except Exception as e:
-            print(f"Error al obtener producto {id_producto}: {e}")
+            logger.error("Error al obtener producto %s: %s", id_producto, e)
             return None
     
     def crear_producto(self, nombre: str, cantidad: int, precio: float, 
@@ -108,18 +346,19 @@ class DatabaseManager:
         Returns:
             ID del producto creado
         """
+        def operacion(conn):
+            return conn.execute("""
+                INSERT INTO productos (nombre_producto, descripcion, cantidad, 
+                                     precio, categoria, proveedor)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (nombre, descripcion, cantidad, precio, categoria, proveedor)).lastrowid
+        
         try:
-            with self.get_connection() as conn:
-                cursor = conn.execute("""
-                    INSERT INTO productos (nombre_producto, descripcion, cantidad, 
-                                         precio, categoria, proveedor)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (nombre, descripcion, cantidad, precio, categoria, proveedor))
-                
-                conn.commit()
-                return cursor.lastrowid
+            id_producto = self._escribir(operacion)
+            self._registrar_cambio('productos', id_producto)
+            return id_producto
         except Exception as e:
-            print(f"Error al crear producto: {e}")
+            logger.error("Error al crear producto: %s", e)
             raise
     
     def actualizar_producto(self, id_producto: int, nombre: str, cantidad: int, 
@@ -140,20 +379,21 @@ class DatabaseManager:
         Returns:
             True si se actualizó correctamente, False en caso contrario
         """
+        def operacion(conn):
+            return conn.execute("""
+                UPDATE productos 
+                SET nombre_producto = ?, descripcion = ?, cantidad = ?, 
+                    precio = ?, categoria = ?, proveedor = ?
+                WHERE id_producto = ?
+            """, (nombre, descripcion, cantidad, precio, categoria, 
+                  proveedor, id_producto)).rowcount
+        
         try:
-            with self.get_connection() as conn:
-                cursor = conn.execute("""
-                    UPDATE productos 
-                    SET nombre_producto = ?, descripcion = ?, cantidad = ?, 
-                        precio = ?, categoria = ?, proveedor = ?
-                    WHERE id_producto = ?
-                """, (nombre, descripcion, cantidad, precio, categoria, 
-                      proveedor, id_producto))
-                
-                conn.commit()
-                return cursor.rowcount > 0
+            filas = self._escribir(operacion)
+            self._registrar_cambio('productos', id_producto)
+            return filas > 0
         except Exception as e:
-            print(f"Error al actualizar producto {id_producto}: {e}")
+            logger.error("Error al actualizar producto %s: %s", id_producto, e)
             return False
     
     def eliminar_producto(self, id_producto: int) -> bool:
@@ -166,16 +406,18 @@ class DatabaseManager:
         Returns:
             True si se eliminó correctamente, False en caso contrario
         """
+        def operacion(conn):
+            return conn.execute(
+                "UPDATE productos SET activo = 0 WHERE id_producto = ?",
+                (id_producto,)
+            ).rowcount
+        
         try:
-            with self.get_connection() as conn:
-                cursor = conn.execute(
-                    "UPDATE productos SET activo = 0 WHERE id_producto = ?",
-                    (id_producto,)
-                )
-                conn.commit()
-                return cursor.rowcount > 0
+            filas = self._escribir(operacion)
+            self._registrar_cambio('productos', id_producto)
+            return filas > 0
         except Exception as e:
-            print(f"Error al eliminar producto {id_producto}: {e}")
+            logger.error("Error al eliminar producto %s: %s", id_producto, e)
             return False
     
     # ==================== OPERACIONES DE CLIENTES ====================
@@ -201,7 +443,7 @@ class DatabaseManager:
                 clientes = [dict(row) for row in cursor.fetchall()]
                 return clientes
         except Exception as e:
-            print(f"Error al obtener clientes: {e}")
+            logger.error("Error al obtener clientes: %s", e)
             return []
     
     def crear_cliente(self, nombre: str, email: str = "", telefono: str = "", 
@@ -218,17 +460,18 @@ class DatabaseManager:
         Returns:
             ID del cliente creado
         """
+        def operacion(conn):
+            return conn.execute("""
+                INSERT INTO clientes (nombre_cliente, email, telefono, direccion)
+                VALUES (?, ?, ?, ?)
+            """, (nombre, email, telefono, direccion)).lastrowid
+        
         try:
-            with self.get_connection() as conn:
-                cursor = conn.execute("""
-                    INSERT INTO clientes (nombre_cliente, email, telefono, direccion)
-                    VALUES (?, ?, ?, ?)
-                """, (nombre, email, telefono, direccion))
-                
-                conn.commit()
-                return cursor.lastrowid
+            id_cliente = self._escribir(operacion)
+            self._registrar_cambio('clientes', id_cliente)
+            return id_cliente
         except Exception as e:
-            print(f"Error al crear cliente: {e}")
+            logger.error("Error al crear cliente: %s", e)
             raise
     
     # ==================== OPERACIONES DE TRANSACCIONES ====================
@@ -249,45 +492,417 @@ class DatabaseManager:
             
         Returns:
             ID de la transacción creada
+            
+        Raises:
+            StockInsuficiente: Si es una salida y no hay unidades suficientes
         """
+        # Calcular total si se proporciona precio unitario
+        total = (precio_unitario * cantidad) if precio_unitario else None
+        
+        def operacion(conn):
+            # La salida se descuenta primero: si no hay stock no se registra nada
+            if tipo == 'salida':
+                self._descontar_stock(conn, id_producto, cantidad)
+            
+            cursor = conn.execute("""
+                INSERT INTO transacciones 
+                (id_producto, id_cliente, tipo_transaccion, cantidad, 
+                 precio_unitario, total, observaciones)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (id_producto, id_cliente, tipo, cantidad, 
+                  precio_unitario, total, observaciones))
+            
+            # Actualizar cantidad en inventario según el tipo de transacción
+            if tipo == 'entrada':
+                conn.execute("""
+                    UPDATE productos 
+                    SET cantidad = cantidad + ? 
+                    WHERE id_producto = ?
+                """, (cantidad, id_producto))
+            elif tipo == 'ajuste':
+                conn.execute("""
+                    UPDATE productos 
+                    SET cantidad = ? 
+                    WHERE id_producto = ?
+                """, (cantidad, id_producto))
+            return cursor.lastrowid
+        
         try:
-            with self.get_connection() as conn:
-                # Calcular total si se proporciona precio unitario
-                total = (precio_unitario * cantidad) if precio_unitario else None
-                
+            id_transaccion = self._escribir(operacion)
+            self._registrar_cambio('productos', id_producto)
+            return id_transaccion
+        except StockInsuficiente:
+            raise
+        except Exception as e:
+            logger.error("Error al registrar transacción: %s", e)
+            raise
+    
+    # ==================== OPERACIONES DE RESERVAS ====================
+    
+    def reservar(self, lineas: Iterable[Tuple[int, int]], id_cliente: int = None,
+                 minutos: float = 15, observaciones: str = "") -> int:
+        """
+        Aparta stock para un pedido de varias líneas: se reservan todas o ninguna
+        
+        Las unidades se descuentan ya del stock y vuelven a él si la reserva se
+        libera o vence sin confirmarse.
+        
+        Args:
+            lineas: Pares (id_producto, cantidad)
+            id_cliente: ID del cliente (opcional)
+            minutos: Minutos hasta que la reserva vence (0 < minutos <= RESERVA_MAX_MINUTOS)
+            observaciones: Observaciones adicionales
+            
+        Returns:
+            ID de la reserva creada
+            
+        Raises:
+            StockInsuficiente: Si alguna línea no tiene unidades suficientes
+                (no se reserva ninguna)
+            ValueError: Si las líneas o el plazo no son válidos
+        """
+        minutos = float(minutos)
+        # Las comparaciones con NaN son falsas: también se rechaza
+        if not 0 < minutos <= RESERVA_MAX_MINUTOS:
+            raise ValueError(f"Plazo de reserva no válido: {minutos} (entre 0 y {RESERVA_MAX_MINUTOS} minutos)")
+        lineas = [(int(id_producto), int(cantidad)) for id_producto, cantidad in lineas]
+        if not lineas:
+            raise ValueError("La reserva necesita al menos una línea")
+        for id_producto, cantidad in lineas:
+            if cantidad <= 0:
+                raise ValueError(f"Cantidad no válida para el producto {id_producto}: {cantidad}")
+        
+        def operacion(conn):
+            cursor = conn.execute("""
+                INSERT INTO reservas (id_cliente, expira, observaciones)
+                VALUES (?, datetime('now', ?), ?)
+            """, (id_cliente, f'{minutos:+} minutes', observaciones))
+            id_reserva = cursor.lastrowid
+            for id_producto, cantidad in lineas:
+                # Un fallo aquí deshace la transacción entera (o su SAVEPOINT en el escritor)
+                self._descontar_stock(conn, id_producto, cantidad)
+                conn.execute("""
+                    INSERT INTO reservas_lineas (id_reserva, id_producto, cantidad, precio_unitario)
+                    SELECT ?, id_producto, ?, precio FROM productos WHERE id_producto = ?
+                """, (id_reserva, cantidad, id_producto))
+            return id_reserva
+        
+        try:
+            id_reserva = self._escribir(operacion)
+        except StockInsuficiente:
+            raise
+        except Exception as e:
+            logger.error("Error al crear reserva: %s", e)
+            raise
+        for id_producto in dict.fromkeys(id_producto for id_producto, _ in lineas):
+            self._registrar_cambio('productos', id_producto)
+        return id_reserva
+    
+    @staticmethod
+    def _cerrar_reserva(conn: sqlite3.Connection, id_reserva: int, estado: str) -> sqlite3.Row:
+        """
+        Pasa una reserva activa y no vencida a ``estado``
+        
+        Returns:
+            La fila de la reserva
+            
+        Raises:
+            ReservaNoActiva: Si no existe, no está activa o ha vencido
+        """
+        cursor = conn.execute("""
+            UPDATE reservas SET estado = ?
+            WHERE id_reserva = ? AND estado = 'activa' AND expira > datetime('now')
+        """, (estado, id_reserva))
+        fila = conn.execute(
+            "SELECT id_reserva, id_cliente, estado, observaciones FROM reservas WHERE id_reserva = ?",
+            (id_reserva,)
+        ).fetchone()
+        if cursor.rowcount == 0:
+            if fila is None:
+                raise ReservaNoActiva(id_reserva, None)
+            raise ReservaNoActiva(id_reserva, 'vencida' if fila['estado'] == 'activa' else fila['estado'])
+        return fila
+    
+    @staticmethod
+    def _devolver_stock(conn: sqlite3.Connection, id_reserva: int) -> Set[int]:
+        """Suma al stock las unidades de una reserva y devuelve los productos afectados"""
+        lineas = conn.execute(
+            "SELECT id_producto, cantidad FROM reservas_lineas WHERE id_reserva = ?",
+            (id_reserva,)
+        ).fetchall()
+        for id_producto, cantidad in lineas:
+            conn.execute(
+                "UPDATE productos SET cantidad = cantidad + ? WHERE id_producto = ?",
+                (cantidad, id_producto)
+            )
+        return {id_producto for id_producto, _ in lineas}
+    
+    def confirmar_reserva(self, id_reserva: int) -> List[int]:
+        """
+        Convierte una reserva activa en salidas de inventario
+        
+        El stock ya se descontó al reservar; aquí solo se registran las
+        transacciones de salida, una por línea.
+        
+        Args:
+            id_reserva: ID de la reserva
+            
+        Returns:
+            IDs de las transacciones creadas
+            
+        Raises:
+            ReservaNoActiva: Si la reserva no existe, no está activa o ha vencido
+        """
+        def operacion(conn):
+            reserva = self._cerrar_reserva(conn, id_reserva, 'confirmada')
+            observaciones = f"Reserva {id_reserva}" + (
+                f": {reserva['observaciones']}" if reserva['observaciones'] else "")
+            ids = []
+            for linea in conn.execute("""
+                SELECT id_producto, cantidad, precio_unitario FROM reservas_lineas WHERE id_reserva = ?
+            """, (id_reserva,)).fetchall():
+                precio = linea['precio_unitario']
                 cursor = conn.execute("""
                     INSERT INTO transacciones 
                     (id_producto, id_cliente, tipo_transaccion, cantidad, 
                      precio_unitario, total, observaciones)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (id_producto, id_cliente, tipo, cantidad, 
-                      precio_unitario, total, observaciones))
-                
-                # Actualizar cantidad en inventario según el tipo de transacción
-                if tipo == 'entrada':
-                    conn.execute("""
-                        UPDATE productos 
-                        SET cantidad = cantidad + ? 
-                        WHERE id_producto = ?
-                    """, (cantidad, id_producto))
-                elif tipo == 'salida':
-                    conn.execute("""
-                        UPDATE productos 
-                        SET cantidad = cantidad - ? 
-                        WHERE id_producto = ?
-                    """, (cantidad, id_producto))
-                elif tipo == 'ajuste':
-                    conn.execute("""
-                        UPDATE productos 
-                        SET cantidad = ? 
-                        WHERE id_producto = ?
-                    """, (cantidad, id_producto))
-                
-                conn.commit()
-                return cursor.lastrowid
+                    VALUES (?, ?, 'salida', ?, ?, ?, ?)
+                """, (linea['id_producto'], reserva['id_cliente'], linea['cantidad'],
+                      precio, precio * linea['cantidad'] if precio else None, observaciones))
+                ids.append(cursor.lastrowid)
+            return ids
+        
+        try:
+            return self._escribir(operacion)
+        except ReservaNoActiva:
+            raise
+        except Exception as e:
+            logger.error("Error al confirmar reserva: %s", e)
+            raise
+    
+    def liberar_reserva(self, id_reserva: int):
+        """
+        Cancela una reserva activa y devuelve sus unidades al stock
+        
+        Args:
+            id_reserva: ID de la reserva
+            
+        Raises:
+            ReservaNoActiva: Si la reserva no existe, no está activa o ha vencido
+                (las vencidas las libera ``liberar_reservas_vencidas``)
+        """
+        def operacion(conn):
+            self._cerrar_reserva(conn, id_reserva, 'liberada')
+            return self._devolver_stock(conn, id_reserva)
+        
+        try:
+            productos = self._escribir(operacion)
+        except ReservaNoActiva:
+            raise
         except Exception as e:
-            print(f"Error al registrar transacción: {e}")
+            logger.error("Error al liberar reserva: %s", e)
             raise
+        for id_producto in productos:
+            self._registrar_cambio('productos', id_producto)
+    
+    def liberar_reservas_vencidas(self) -> int:
+        """
+        Devuelve al stock las unidades de las reservas activas ya vencidas
+        
+        Returns:
+            Número de reservas liberadas
+        """
+        def operacion(conn):
+            vencidas = [fila[0] for fila in conn.execute(
+                "SELECT id_reserva FROM reservas WHERE estado = 'activa' AND expira <= datetime('now')"
+            ).fetchall()]
+            productos = set()
+            for id_reserva in vencidas:
+                conn.execute("UPDATE reservas SET estado = 'liberada' WHERE id_reserva = ?", (id_reserva,))
+                productos |= self._devolver_stock(conn, id_reserva)
+            return len(vencidas), productos
+        
+        try:
+            liberadas, productos = self._escribir(operacion)
+        except Exception as e:
+            logger.error("Error al liberar reservas vencidas: %s", e)
+            raise
+        if liberadas:
+            logger.info("Reservas vencidas liberadas: %d", liberadas)
+        for id_producto in productos:
+            self._registrar_cambio('productos', id_producto)
+        return liberadas
+    
+    # ==================== HISTORIAL Y VENTAS ====================
+    
+    def meses_archivados(self) -> Dict[str, str]:
+        """Meses del libro movidos a su archivo ('AAAA-MM' -> ruta)"""
+        with self.get_connection() as conn:
+            return meses_archivados(conn, self.archivo_dir)
+    
+    def movimientos_producto(self, id_producto: int, limite: int = 100,
+                             antes_de: int = None) -> List[Dict]:
+        """
+        Transacciones de un producto, de la más reciente a la más antigua
+        
+        Si la base no tiene suficientes, sigue por los meses archivados en que
+        el producto tuvo movimientos (según ``resumen_diario``), adjuntando
+        cada archivo solo mientras se lee.
+        
+        La base y cada archivo se recorren por ID descendente y los archivos van
+        del mes más reciente al más antiguo, así que el orden global solo es
+        cronológico si los IDs crecen con ``fecha_transaccion`` (el caso normal:
+        transacciones registradas en el momento). ``antes_de`` pagina por ID con
+        esa misma suposición; sin él la primera página no pierde filas aunque
+        haya transacciones cargadas con fechas atrasadas.
+        
+        Args:
+            id_producto: ID del producto
+            limite: Transacciones como máximo
+            antes_de: Devuelve solo las de ID menor (paginación: el último ID
+                de la página anterior)
+            
+        Returns:
+            Lista de transacciones
+        """
+        consulta = """
+            SELECT id_transaccion, tipo_transaccion, cantidad, precio_unitario,
+                   total, fecha_transaccion, id_cliente, observaciones
+            FROM {tabla}
+            WHERE id_producto = ? AND id_transaccion < ?{filtro}
+            ORDER BY id_transaccion DESC
+            LIMIT ?
+        """
+        # Las filas que siguen en la base (traslado interrumpido) ya se
+        # devolvieron desde ella: se excluyen del archivo por ID, no con una
+        # cota, porque los archivos se reparten por fecha y no por ID
+        sin_duplicados = """ AND id_transaccion NOT IN (
+                SELECT id_transaccion FROM main.transacciones WHERE id_producto = ?)"""
+        cota = antes_de if antes_de is not None else 2 ** 63 - 1
+        try:
+            with self.get_connection() as conn:
+                # idx_transacciones_producto lleva el rowid: rango y orden sin ordenar aparte
+                movimientos = [dict(row) for row in conn.execute(
+                    consulta.format(tabla='main.transacciones', filtro=''),
+                    (id_producto, cota, limite))]
+                if len(movimientos) == limite:
+                    return movimientos
+                archivos = meses_archivados(conn, self.archivo_dir)
+                if not archivos:
+                    return movimientos
+                meses = [fila[0] for fila in conn.execute("""
+                    SELECT DISTINCT substr(dia, 1, 7) FROM resumen_diario
+                    WHERE id_producto = ? ORDER BY dia DESC
+                """, (id_producto,))]
+                for mes in meses:
+                    ruta = archivos.get(mes)
+                    if ruta is None or not os.path.exists(ruta):
+                        continue
+                    conn.execute("ATTACH DATABASE ? AS archivo", (ruta,))
+                    try:
+                        movimientos += [dict(row) for row in conn.execute(
+                            consulta.format(tabla='archivo.transacciones', filtro=sin_duplicados),
+                            (id_producto, cota, id_producto, limite - len(movimientos)))]
+                    finally:
+                        conn.execute("DETACH DATABASE archivo")
+                    if len(movimientos) == limite:
+                        break
+                return movimientos
+        except Exception as e:
+            logger.error("Error al obtener movimientos: %s", e)
+            return []
+    
+    def historial_producto(self, id_producto: int, desde: str = None,
+                           hasta: str = None) -> List[Dict]:
+        """
+        Movimientos diarios de un producto desde el resumen diario
+        
+        Args:
+            id_producto: ID del producto
+            desde: Primer día (AAAA-MM-DD), opcional
+            hasta: Último día (AAAA-MM-DD), opcional
+            
+        Returns:
+            Lista de días con unidades de entrada y salida, ingresos y transacciones
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.execute("""
+                    SELECT dia, unidades_entrada, unidades_salida, ingresos, transacciones
+                    FROM resumen_diario
+                    WHERE id_producto = ? AND dia BETWEEN ? AND ?
+                    ORDER BY dia
+                """, (id_producto, desde or '0000-01-01', hasta or '9999-12-31'))
+                return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error("Error al obtener historial: %s", e)
+            return []
+    
+    def ventas_por_dia(self, desde: str = None, hasta: str = None) -> List[Dict]:
+        """
+        Totales de todos los productos por día
+        
+        Args:
+            desde: Primer día (AAAA-MM-DD), opcional
+            hasta: Último día (AAAA-MM-DD), opcional
+            
+        Returns:
+            Lista de días con unidades de entrada y salida, ingresos y transacciones
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.execute("""
+                    SELECT dia,
+                           SUM(unidades_entrada) AS unidades_entrada,
+                           SUM(unidades_salida) AS unidades_salida,
+                           SUM(ingresos) AS ingresos,
+                           SUM(transacciones) AS transacciones
+                    FROM resumen_diario
+                    WHERE dia BETWEEN ? AND ?
+                    GROUP BY dia
+                    ORDER BY dia
+                """, (desde or '0000-01-01', hasta or '9999-12-31'))
+                return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error("Error al obtener ventas por día: %s", e)
+            return []
+    
+    def mas_vendidos(self, desde: str = None, hasta: str = None, limite: int = 10,
+                     por: str = 'unidades') -> List[Dict]:
+        """
+        Productos con más salidas en un periodo
+        
+        Args:
+            desde: Primer día (AAAA-MM-DD), opcional
+            hasta: Último día (AAAA-MM-DD), opcional
+            limite: Número de productos
+            por: 'unidades' o 'ingresos'
+            
+        Returns:
+            Lista de productos con unidades vendidas e ingresos, de mayor a menor
+        """
+        if por not in ('unidades', 'ingresos'):
+            raise ValueError(f"Orden no válido: {por}")
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.execute(f"""
+                    SELECT v.id_producto, p.nombre_producto, p.categoria, v.unidades, v.ingresos
+                    FROM (
+                        SELECT id_producto, SUM(unidades_salida) AS unidades, SUM(ingresos) AS ingresos
+                        FROM resumen_diario
+                        WHERE dia BETWEEN ? AND ?
+                        GROUP BY id_producto
+                        HAVING unidades > 0
+                        ORDER BY {por} DESC
+                        LIMIT ?
+                    ) v
+                    LEFT JOIN productos p ON p.id_producto = v.id_producto
+                    ORDER BY v.{por} DESC
+                """, (desde or '0000-01-01', hasta or '9999-12-31', limite))
+                return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error("Error al obtener más vendidos: %s", e)
+            return []
     
     def obtener_estadisticas(self) -> Dict:
         """
@@ -327,7 +942,7 @@ class DatabaseManager:
                 
                 return stats
         except Exception as e:
-            print(f"Error al obtener estadísticas: {e}")
+            logger.error("Error al obtener estadísticas: %s", e)
             return {}
 
 # Función de utilidad para inicializar la base de datos
@@ -0,0 +1,213 @@
+"""
+Escritor único con commit agrupado para SQLite
+Un hilo dedicado recibe las escrituras por una cola y confirma en una sola
+transacción todas las que llegaron mientras se confirmaba la anterior (group
+commit). SQLite solo admite un escritor a la vez: en lugar de que cada hilo
+abra su conexión, compita por el bloqueo y pague su propio fsync, los hilos
+esperan el resultado en un ``Future`` y el coste del commit se reparte entre
+todas las escrituras del lote.
+
+Cada operación corre dentro de su propio SAVEPOINT, así que una que falle
+(p. ej. una restricción CHECK) se deshace sola y su excepción llega a quien la
+pidió; el resto del lote se confirma igualmente.
+
+Si otro proceso tiene el bloqueo de escritura, el ``BEGIN IMMEDIATE`` del lote
+se repite según la ``PoliticaReintentos`` (ver reintentos.py); las operaciones
+aún no se han ejecutado, así que repetirlo no cambia nada.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    from .reintentos import PoliticaReintentos
+except ImportError:  # Ejecución directa como script
+    from reintentos import PoliticaReintentos
+
+_PARAR = object()
+
+
+class EscritorAgrupado:
+    """Hilo escritor que agrupa las operaciones en una transacción por lote"""
+
+    def __init__(self, abrir_conexion: Callable[[], sqlite3.Connection],
+                 max_lote: int = 256, espera_ms: float = 0.0,
+                 reintentos: Optional[PoliticaReintentos] = None):
+        """
+        Args:
+            abrir_conexion: Devuelve la conexión del escritor (se abre en su hilo)
+            max_lote: Operaciones como máximo por transacción
+            espera_ms: Tiempo que se espera a más operaciones antes de confirmar
+                un lote incompleto. Con 0 el lote son las que ya están en cola,
+                que bajo carga son las llegadas durante el commit anterior.
+            reintentos: Política ante bloqueos de otros procesos
+        """
+        self.abrir_conexion = abrir_conexion
+        self.reintentos = reintentos or PoliticaReintentos()
+        self.max_lote = max_lote
+        self.espera = espera_ms / 1000.0
+        self.cola: 'queue.Queue' = queue.Queue()
+        # Tras cerrar() no se aceptan escrituras: nadie las confirmaría
+        self._lock_cierre = threading.Lock()
+        self._cerrado = False
+        self.metricas = {
+            'operaciones': 0,
+            'lotes': 0,
+            'max_lote': 0,
+            'errores_operacion': 0,
+            'lotes_fallidos': 0,
+            'tiempo_commit_ms': 0.0,
+        }
+        # La conexión se abre en el hilo escritor (sqlite3 la ata al hilo que la crea)
+        self._listo = threading.Event()
+        self._error_apertura: Optional[Exception] = None
+        self._hilo = threading.Thread(target=self._bucle, name='escritor-sqlite', daemon=True)
+        self._hilo.start()
+        self._listo.wait()
+        if self._error_apertura is not None:
+            raise self._error_apertura
+
+    # ==================== API ====================
+
+    def enviar(self, operacion: Callable[[sqlite3.Connection], object]) -> Future:
+        """
+        Encola una escritura
+
+        Args:
+            operacion: Función que recibe la conexión del escritor y hace la
+                escritura; no debe confirmar ni volver a llamar al escritor
+
+        Returns:
+            Future con el valor devuelto por ``operacion`` una vez confirmado
+
+        Raises:
+            RuntimeError: Si el escritor ya está cerrado
+        """
+        futuro = Future()
+        with self._lock_cierre:
+            if self._cerrado:
+                raise RuntimeError('El escritor SQLite está cerrado')
+            self.cola.put((operacion, futuro))
+        return futuro
+
+    def ejecutar(self, operacion: Callable[[sqlite3.Connection], object]):
+        """Encola una escritura y espera a que esté confirmada"""
+        return self.enviar(operacion).result()
+
+    def cerrar(self, timeout: float = 5.0):
+        """Confirma lo pendiente y detiene el hilo; después ``enviar`` falla"""
+        with self._lock_cierre:
+            if not self._cerrado:
+                self._cerrado = True
+                self.cola.put(_PARAR)
+        self._hilo.join(timeout)
+
+    def resumen(self) -> Dict:
+        """Métricas acumuladas del escritor"""
+        datos = dict(self.metricas)
+        lotes = datos['lotes']
+        datos['operaciones_por_lote'] = datos['operaciones'] / lotes if lotes else 0.0
+        datos['commit_ms_medio'] = datos['tiempo_commit_ms'] / lotes if lotes else 0.0
+        datos['en_cola'] = self.cola.qsize()
+        datos['reintentos'] = self.reintentos.resumen()
+        return datos
+
+    # ==================== HILO ESCRITOR ====================
+
+    def _recoger(self, primera) -> Tuple[List, bool]:
+        """Junta con ``primera`` las operaciones en cola (y las que lleguen durante ``espera``)"""
+        lote = [primera]
+        limite = time.monotonic() + self.espera
+        while len(lote) < self.max_lote:
+            try:
+                if self.espera:
+                    restante = limite - time.monotonic()
+                    elemento = self.cola.get(timeout=restante) if restante > 0 else self.cola.get_nowait()
+                else:
+                    elemento = self.cola.get_nowait()
+            except queue.Empty:
+                break
+            if elemento is _PARAR:
+                return lote, True
+            lote.append(elemento)
+        return lote, False
+
+    def _bucle(self):
+        try:
+            conn = self.reintentos.preparar(self.abrir_conexion())
+            # Sin transacciones implícitas: BEGIN/COMMIT los pone el escritor
+            conn.isolation_level = None
+        except Exception as e:
+            self._error_apertura = e
+            self._listo.set()
+            return
+        self._listo.set()
+        try:
+            parar = False
+            while not parar:
+                primera = self.cola.get()
+                if primera is _PARAR:
+                    break
+                lote, parar = self._recoger(primera)
+                self._confirmar(conn, lote)
+        finally:
+            conn.close()
+            self._descartar_pendientes()
+
+    def _descartar_pendientes(self):
+        """Falla las operaciones que quedaron en cola al terminar el hilo"""
+        with self._lock_cierre:
+            self._cerrado = True
+        error = RuntimeError('El escritor SQLite se detuvo antes de confirmar la operación')
+        while True:
+            try:
+                elemento = self.cola.get_nowait()
+            except queue.Empty:
+                return
+            if elemento is not _PARAR:
+                elemento[1].set_exception(error)
+
+    def _confirmar(self, conn: sqlite3.Connection, lote: List):
+        inicio = time.perf_counter()
+        resultados: List[Tuple[Future, bool, object]] = []
+        try:
+            self.reintentos.ejecutar(lambda: conn.execute("BEGIN IMMEDIATE"))
+            for operacion, futuro in lote:
+                conn.execute("SAVEPOINT operacion")
+                try:
+                    valor = operacion(conn)
+                except Exception as e:
+                    if not conn.in_transaction:
+                        raise  # SQLite abortó la transacción entera (disco lleno, E/S...)
+                    conn.execute("ROLLBACK TO operacion")
+                    conn.execute("RELEASE operacion")
+                    self.metricas['errores_operacion'] += 1
+                    resultados.append((futuro, False, e))
+                    continue
+                conn.execute("RELEASE operacion")
+                resultados.append((futuro, True, valor))
+            conn.execute("COMMIT")
+        except Exception as e:
+            # Nada del lote quedó escrito: todas las operaciones reciben el error
+            self.metricas['lotes_fallidos'] += 1
+            try:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            for _operacion, futuro in lote:
+                futuro.set_exception(e)
+            return
+        self.metricas['lotes'] += 1
+        self.metricas['operaciones'] += len(lote)
+        self.metricas['max_lote'] = max(self.metricas['max_lote'], len(lote))
+        self.metricas['tiempo_commit_ms'] += (time.perf_counter() - inicio) * 1000
+        for futuro, ok, valor in resultados:
+            if ok:
+                futuro.set_result(valor)
+            else:
+                futuro.set_exception(valor)
@@ -0,0 +1,354 @@
+"""
+Perfilador de consultas SQL para DatabaseManager
+Agrupa cada sentencia ejecutada por ``get_connection`` por su texto normalizado
+(literales sustituidos por ``?``) y acumula llamadas, errores, tiempo total y
+máximo y filas devueltas. El tiempo de una ejecución incluye la lectura de sus
+filas (SQLite las produce al recorrer el cursor). Las ejecuciones más lentas que
+el umbral guardan su ``EXPLAIN QUERY PLAN`` en un registro acotado.
+
+Uso (volcado del perfil de un servidor en marcha o de una base local):
+    python -m database.perfilador_sql --url http://127.0.0.1:5000
+    python -m database.perfilador_sql --db database/inventario.db --repeticiones 20
+"""
+
+import argparse
+import json
+import re
+import sqlite3
+import sys
+import threading
+import time
+import urllib.request
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+_reloj = time.perf_counter
+
+_CADENAS = re.compile(r"'(?:[^']|'')*'")
+_NUMEROS = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])')
+_LISTAS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_ESPACIOS = re.compile(r'\s+')
+
+
+def normalizar_sql(sql: str) -> str:
+    """Texto de la sentencia sin literales ni espacios redundantes"""
+    texto = _CADENAS.sub('?', sql)
+    texto = _NUMEROS.sub('?', texto)
+    texto = _LISTAS.sub('(?, ...)', texto)
+    return _ESPACIOS.sub(' ', texto).strip()
+
+
+class PerfiladorSQL:
+    """Estadísticas por sentencia normalizada y registro de ejecuciones lentas"""
+
+    def __init__(self, umbral_lento_ms: float = 50.0, max_lentas: int = 100):
+        """
+        Args:
+            umbral_lento_ms: Ejecuciones más lentas que esto guardan su plan
+            max_lentas: Tamaño máximo del registro de lentas
+        """
+        self.umbral_lento = umbral_lento_ms / 1000
+        self.lentas = deque(maxlen=max_lentas)
+        # sql normalizado -> [llamadas, errores, total, máximo, filas, lentas]
+        self.sentencias: Dict[str, list] = {}
+        self.planes: Dict[str, List[str]] = {}
+        self.desde = datetime.now()
+        self._normalizadas: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _clave(self, sql: str) -> str:
+        clave = self._normalizadas.get(sql)
+        if clave is None:
+            clave = normalizar_sql(sql)
+            if len(self._normalizadas) < 10000:
+                self._normalizadas[sql] = clave
+        return clave
+
+    def registrar(self, sql: str, segundos: float, filas: int, error: bool = False,
+                  conexion: sqlite3.Connection = None, parametros=()):
+        """
+        Acumula una ejecución terminada
+
+        Args:
+            sql: Texto tal como se ejecutó
+            segundos: Duración, incluida la lectura de filas
+            filas: Filas devueltas (o afectadas, si no es una consulta)
+            error: La sentencia lanzó una excepción
+            conexion: Conexión en la que obtener el plan si la ejecución fue lenta
+            parametros: Parámetros de la ejecución (solo para el plan)
+        """
+        clave = self._clave(sql)
+        lenta = segundos >= self.umbral_lento and not error
+        with self._lock:
+            datos = self.sentencias.get(clave)
+            if datos is None:
+                datos = self.sentencias[clave] = [0, 0, 0.0, 0.0, 0, 0]
+            datos[0] += 1
+            datos[2] += segundos
+            datos[4] += filas
+            if segundos > datos[3]:
+                datos[3] = segundos
+            if error:
+                datos[1] += 1
+            if lenta:
+                datos[5] += 1
+        if lenta:
+            plan = self._plan(conexion, sql, parametros)
+            if plan:
+                self.planes[clave] = plan
+            self.lentas.append({
+                'timestamp': datetime.now().isoformat(),
+                'sql': clave,
+                'ms': round(segundos * 1000, 3),
+                'filas': filas,
+                'plan': plan,
+            })
+
+    @staticmethod
+    def _plan(conexion, sql: str, parametros) -> Optional[List[str]]:
+        """Líneas de EXPLAIN QUERY PLAN (None si no se puede obtener)"""
+        if conexion is None or not sql.lstrip()[:6].upper() in ('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'WITH'):
+            return None
+        try:
+            filas = sqlite3.Connection.execute(conexion, 'EXPLAIN QUERY PLAN ' + sql, parametros).fetchall()
+        except sqlite3.Error:
+            return None
+        return [fila[3] for fila in filas]
+
+    def resumen(self, orden: str = 'total', limite: int = 50) -> dict:
+        """
+        Sentencias ordenadas por ``orden`` ('total', 'max', 'llamadas', 'filas' o 'errores')
+        """
+        with self._lock:
+            copia = {clave: list(datos) for clave, datos in self.sentencias.items()}
+        sentencias = []
+        for clave, (llamadas, errores, total, maximo, filas, lentas) in copia.items():
+            sentencias.append({
+                'sql': clave,
+                'llamadas': llamadas,
+                'errores': errores,
+                'total_ms': total * 1000,
+                'medio_ms': total * 1000 / llamadas,
+                'max_ms': maximo * 1000,
+                'filas': filas,
+                'filas_medias': filas / llamadas,
+                'lentas': lentas,
+                'plan': self.planes.get(clave),
+            })
+        campo = {'total': 'total_ms', 'max': 'max_ms'}.get(orden, orden)
+        sentencias.sort(key=lambda s: s[campo], reverse=True)
+        return {
+            'desde': self.desde.isoformat(),
+            'umbral_lento_ms': self.umbral_lento * 1000,
+            'sentencias_distintas': len(copia),
+            'sentencias': sentencias[:limite],
+            'lentas': list(reversed(self.lentas)),
+        }
+
+    def reiniciar(self):
+        with self._lock:
+            self.sentencias.clear()
+            self.planes.clear()
+            self.lentas.clear()
+            self.desde = datetime.now()
+
+
+class CursorPerfilado(sqlite3.Cursor):
+    """Cursor que mide cada ejecución hasta que se agotan sus filas"""
+
+    _sql = None
+    _parametros = ()
+    _filas = 0
+    _tiempo = 0.0
+
+    def _empezar(self, sql, parametros):
+        self._terminar()
+        self._sql = sql
+        self._parametros = parametros
+        self._filas = 0
+        self._tiempo = 0.0
+
+    def _terminar(self, error: bool = False):
+        sql = self._sql
+        if sql is None:
+            return
+        self._sql = None
+        filas = self._filas if self.description is not None or error else max(self.rowcount, 0)
+        self.connection.perfilador.registrar(sql, self._tiempo, filas, error,
+                                             self.connection, self._parametros)
+
+    def _medir(self, metodo, *args):
+        inicio = _reloj()
+        try:
+            return metodo(self, *args)
+        except Exception:
+            self._tiempo += _reloj() - inicio
+            self._terminar(error=True)
+            raise
+        finally:
+            if self._sql is not None:
+                self._tiempo += _reloj() - inicio
+
+    def execute(self, sql, parametros=()):
+        self._empezar(sql, parametros)
+        self._medir(sqlite3.Cursor.execute, sql, parametros)
+        if self.description is None:
+            self._terminar()
+        return self
+
+    def executemany(self, sql, secuencia):
+        self._empezar(sql, ())
+        self._medir(sqlite3.Cursor.executemany, sql, secuencia)
+        self._terminar()
+        return self
+
+    def executescript(self, script):
+        self._empezar(script, ())
+        self._medir(sqlite3.Cursor.executescript, script)
+        self._terminar()
+        return self
+
+    def fetchone(self):
+        fila = self._medir(sqlite3.Cursor.fetchone)
+        if fila is None:
+            self._terminar()
+        else:
+            self._filas += 1
+        return fila
+
+    def fetchmany(self, size=None):
+        filas = self._medir(sqlite3.Cursor.fetchmany, self.arraysize if size is None else size)
+        self._filas += len(filas)
+        if not filas:
+            self._terminar()
+        return filas
+
+    def fetchall(self):
+        filas = self._medir(sqlite3.Cursor.fetchall)
+        self._filas += len(filas)
+        self._terminar()
+        return filas
+
+    def __next__(self):
+        inicio = _reloj()
+        try:
+            fila = sqlite3.Cursor.__next__(self)
+        except StopIteration:
+            self._tiempo += _reloj() - inicio
+            self._terminar()
+            raise
+        self._tiempo += _reloj() - inicio
+        self._filas += 1
+        return fila
+
+    def close(self):
+        self._terminar()
+        super().close()
+
+    def __del__(self):
+        # Cursores descartados sin agotar sus filas
+        try:
+            self._terminar()
+        except Exception:
+            pass
+
+
+class ConexionPerfilada(sqlite3.Connection):
+    """Conexión cuyas sentencias pasan por un CursorPerfilado"""
+
+    perfilador: PerfiladorSQL = None
+
+    def cursor(self, factory=CursorPerfilado):
+        return super().cursor(factory)
+
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, secuencia):
+        return self.cursor().executemany(sql, secuencia)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+
+def conectar(db_path: str, perfilador: PerfiladorSQL) -> sqlite3.Connection:
+    """Abre una conexión cuyas sentencias acumula ``perfilador``"""
+    conn = sqlite3.connect(db_path, factory=ConexionPerfilada)
+    conn.perfilador = perfilador
+    return conn
+
+
+# ==================== VOLCADO POR CONSOLA ====================
+
+def imprimir_resumen(datos: dict):
+    print(f"=== Perfil SQL desde {datos['desde']} ({datos['sentencias_distintas']} sentencias) ===")
+    print(f"{'llamadas':>9} {'total ms':>10} {'medio ms':>9} {'máx ms':>9} {'filas/ej':>9} {'lentas':>7}  sql")
+    for s in datos['sentencias']:
+        sql = s['sql'] if len(s['sql']) <= 90 else s['sql'][:87] + '...'
+        errores = f"  [{s['errores']} errores]" if s['errores'] else ''
+        print(f"{s['llamadas']:>9} {s['total_ms']:>10.1f} {s['medio_ms']:>9.3f} {s['max_ms']:>9.2f} "
+              f"{s['filas_medias']:>9.1f} {s['lentas']:>7}  {sql}{errores}")
+        for linea in s['plan'] or []:
+            print(f"{'':>58}  plan: {linea}")
+    if datos['lentas']:
+        print(f"\nÚltimas ejecuciones lentas (> {datos['umbral_lento_ms']:g} ms):")
+        for lenta in datos['lentas'][:10]:
+            print(f"  {lenta['timestamp']} {lenta['ms']:>9.1f} ms {lenta['filas']:>8} filas  {lenta['sql'][:80]}")
+
+
+def perfilar_base(db_path: str, repeticiones: int, umbral_ms: float,
+                  orden: str = 'total', limite: int = 50) -> dict:
+    """Ejecuta las lecturas habituales de DatabaseManager sobre ``db_path`` con el perfilador"""
+    try:
+        from .database_manager import DatabaseManager
+    except ImportError:  # Ejecución directa como script
+        from database_manager import DatabaseManager
+    perfilador = PerfiladorSQL(umbral_ms)
+    db_manager = DatabaseManager(db_path, perfilador=perfilador)
+    productos = db_manager.obtener_productos()
+    for i in range(repeticiones):
+        db_manager.obtener_productos()
+        db_manager.obtener_estadisticas()
+        db_manager.obtener_clientes()
+        if productos:
+            db_manager.obtener_producto_por_id(productos[i % len(productos)]['id_producto'])
+    return perfilador.resumen(orden, limite)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Volcado del perfil SQL del inventario')
+    origen = parser.add_mutually_exclusive_group(required=True)
+    origen.add_argument('--url', help='Servidor en marcha (GET /api/sql/perfil)')
+    origen.add_argument('--db', help='Perfilar las lecturas habituales sobre esta base')
+    parser.add_argument('--orden', default='total', choices=['total', 'max', 'llamadas', 'filas', 'errores'])
+    parser.add_argument('--limite', type=int, default=30)
+    parser.add_argument('--repeticiones', type=int, default=10, help='Con --db: vueltas de lecturas')
+    parser.add_argument('--umbral', type=float, default=50.0, help='Con --db: ms de ejecución lenta')
+    parser.add_argument('--json', metavar='ARCHIVO', help='Guardar el perfil en JSON')
+    args = parser.parse_args()
+
+    if args.url:
+        url = f"{args.url.rstrip('/')}/api/sql/perfil?orden={args.orden}&limite={args.limite}"
+        try:
+            with urllib.request.urlopen(url, timeout=10) as r:
+                datos = json.load(r)
+        except OSError as e:
+            print(f"Error consultando {url}: {e}")
+            return 1
+        if 'error' in datos:
+            print(datos['error'])
+            return 1
+    else:
+        datos = perfilar_base(args.db, args.repeticiones, args.umbral, args.orden, args.limite)
+
+    imprimir_resumen(datos)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, indent=2, ensure_ascii=False)
+        print(f"\nPerfil guardado en {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
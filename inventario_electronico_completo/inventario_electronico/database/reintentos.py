@@ -0,0 +1,112 @@
+"""
+Reintentos de escrituras SQLite ante bloqueo (SQLITE_BUSY / SQLITE_LOCKED)
+Varias instancias del servidor comparten la misma base. La escritura que no
+consigue el bloqueo de escritura recibe "database is locked". En lugar de
+dejar que el manejador de SQLite espere varios segundos a intervalos fijos
+(todos los procesos reintentan a la vez), la conexión espera poco
+(``busy_timeout``) y la transacción entera se repite con espera exponencial
+aleatoria ("full jitter"), con un número acotado de intentos.
+
+Variables de entorno:
+
+- ``INVENTARIO_DB_BUSY_MS``: espera del manejador de SQLite por intento (defecto 100)
+- ``INVENTARIO_DB_REINTENTOS``: intentos como máximo por escritura (defecto 8)
+- ``INVENTARIO_DB_ESPERA_MAX_MS``: tope de la espera entre intentos (defecto 200)
+"""
+
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, TypeVar
+
+T = TypeVar('T')
+
+# Códigos primarios de SQLite (los extendidos llevan el primario en el byte bajo)
+_SQLITE_BUSY = 5
+_SQLITE_LOCKED = 6
+
+
+def es_bloqueo(error: BaseException) -> bool:
+    """True si ``error`` es un SQLITE_BUSY o SQLITE_LOCKED, que se puede reintentar"""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    codigo = getattr(error, 'sqlite_errorcode', None)
+    if codigo is not None:
+        return codigo & 0xff in (_SQLITE_BUSY, _SQLITE_LOCKED)
+    return 'locked' in str(error) or 'busy' in str(error)
+
+
+class PoliticaReintentos:
+    """Repite una transacción que falló por bloqueo con espera exponencial aleatoria"""
+
+    def __init__(self, intentos: int = None, busy_ms: float = None,
+                 espera_base_ms: float = 2.0, espera_max_ms: float = None):
+        """
+        Args:
+            intentos: Intentos como máximo (el primero incluido)
+            busy_ms: ``PRAGMA busy_timeout`` de las conexiones de escritura
+            espera_base_ms: Espera máxima tras el primer fallo; se duplica en cada uno
+            espera_max_ms: Tope de la espera entre intentos
+        """
+        self.intentos = max(1, intentos if intentos is not None
+                            else int(os.environ.get('INVENTARIO_DB_REINTENTOS', '8')))
+        self.busy_ms = int(busy_ms if busy_ms is not None
+                           else float(os.environ.get('INVENTARIO_DB_BUSY_MS', '100')))
+        self.espera_base = espera_base_ms / 1000
+        self.espera_max = (espera_max_ms if espera_max_ms is not None
+                           else float(os.environ.get('INVENTARIO_DB_ESPERA_MAX_MS', '200'))) / 1000
+        self.metricas = {'bloqueos': 0, 'reintentos_exitosos': 0, 'agotados': 0, 'espera_ms': 0.0}
+        self._lock = threading.Lock()
+
+    def preparar(self, conn: sqlite3.Connection) -> sqlite3.Connection:
+        """Ajusta la espera de SQLite de una conexión de escritura"""
+        conn.execute(f"PRAGMA busy_timeout = {self.busy_ms}")
+        return conn
+
+    def espera(self, intento: int) -> float:
+        """Segundos a esperar tras el fallo número ``intento`` (desde 1)"""
+        return random.uniform(0, min(self.espera_max, self.espera_base * 2 ** (intento - 1)))
+
+    def ejecutar(self, funcion: Callable[[], T]) -> T:
+        """
+        Llama a ``funcion`` hasta que no falle por bloqueo
+
+        ``funcion`` debe ser una transacción completa que deje la conexión sin
+        transacción abierta al fallar, para poder repetirse desde el principio.
+
+        Returns:
+            Lo que devuelva ``funcion``
+
+        Raises:
+            sqlite3.OperationalError: El último bloqueo, si se agotan los intentos
+        """
+        intento = 1
+        while True:
+            try:
+                resultado = funcion()
+            except sqlite3.OperationalError as e:
+                if not es_bloqueo(e):
+                    raise
+                with self._lock:
+                    self.metricas['bloqueos'] += 1
+                    if intento >= self.intentos:
+                        self.metricas['agotados'] += 1
+                        raise
+                pausa = self.espera(intento)
+                with self._lock:
+                    self.metricas['espera_ms'] += pausa * 1000
+                time.sleep(pausa)
+                intento += 1
+                continue
+            if intento > 1:
+                with self._lock:
+                    self.metricas['reintentos_exitosos'] += 1
+            return resultado
+
+    def resumen(self) -> Dict:
+        with self._lock:
+            datos = dict(self.metricas)
+        datos.update(intentos=self.intentos, busy_ms=self.busy_ms)
+        return datos
@@ -0,0 +1,233 @@
+"""
+Resumen diario por producto de las transacciones de inventario
+La tabla ``resumen_diario`` guarda por día y producto las unidades de entrada y
+salida, los ingresos (``total`` de las salidas) y el número de transacciones.
+El trigger ``resumen_diario_transaccion`` (schema.sql) la actualiza con cada
+alta en ``transacciones`` dentro de la misma transacción, así que las consultas
+de historial, ventas por día y más vendidos leen filas por día y producto en
+lugar de recorrer el libro entero.
+
+Este módulo reconstruye el resumen desde el libro: al crear la tabla en una
+base que ya tenía transacciones, o para corregirlo tras cargas hechas con el
+trigger desactivado. Se procesa por tramos de días, cada uno en su propia
+transacción ``BEGIN IMMEDIATE`` que borra y recalcula el tramo; las altas
+concurrentes esperan al tramo en curso y el resultado es exacto igualmente.
+Los tramos de meses archivados (archivo_libro.py) leen también su archivo.
+
+Uso:
+    python -m database.resumen_diario --db database/inventario.db
+    python -m database.resumen_diario --db database/inventario.db --desde 2024-01-01 --verificar
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+from typing import Dict, Iterator, Optional, Tuple
+
+try:
+    from .archivo_libro import directorio_archivo, limites_mes, meses_archivados
+    from .reintentos import PoliticaReintentos
+except ImportError:  # Ejecución directa como script
+    from archivo_libro import directorio_archivo, limites_mes, meses_archivados
+    from reintentos import PoliticaReintentos
+
+_AGREGADO = """
+    SELECT date(fecha_transaccion) AS dia, id_producto,
+           SUM(CASE tipo_transaccion WHEN 'entrada' THEN cantidad ELSE 0 END),
+           SUM(CASE tipo_transaccion WHEN 'salida' THEN cantidad ELSE 0 END),
+           SUM(CASE tipo_transaccion WHEN 'salida' THEN COALESCE(total, 0) ELSE 0 END),
+           COUNT(*)
+    FROM {origen}
+    GROUP BY dia, id_producto
+"""
+
+_LIBRO = """(
+    SELECT fecha_transaccion, id_producto, tipo_transaccion, cantidad, total
+    FROM main.transacciones
+    WHERE fecha_transaccion >= :desde AND fecha_transaccion < :hasta
+)"""
+
+# Un mes archivado: su archivo más lo que quede en la base (filas de un traslado
+# interrumpido, que están en los dos sitios, o altas posteriores con esa fecha)
+_LIBRO_Y_ARCHIVO = """(
+    SELECT fecha_transaccion, id_producto, tipo_transaccion, cantidad, total
+    FROM main.transacciones
+    WHERE fecha_transaccion >= :desde AND fecha_transaccion < :hasta
+    UNION ALL
+    SELECT fecha_transaccion, id_producto, tipo_transaccion, cantidad, total
+    FROM archivo.transacciones a
+    WHERE fecha_transaccion >= :desde AND fecha_transaccion < :hasta
+      AND NOT EXISTS (SELECT 1 FROM main.transacciones m WHERE m.id_transaccion = a.id_transaccion)
+)"""
+
+
+def rango_libro(conn: sqlite3.Connection,
+                archivos: Dict[str, str] = None) -> Optional[Tuple[date, date]]:
+    """Primer y último día con transacciones en la base o en los meses archivados"""
+    primero, ultimo = conn.execute(
+        "SELECT date(MIN(fecha_transaccion)), date(MAX(fecha_transaccion)) FROM transacciones"
+    ).fetchone()
+    dias = [date.fromisoformat(d) for d in (primero, ultimo) if d is not None]
+    for mes in archivos or ():
+        inicio, siguiente = limites_mes(mes)
+        dias += [date.fromisoformat(inicio), date.fromisoformat(siguiente) - timedelta(days=1)]
+    if not dias:
+        return None
+    return min(dias), max(dias)
+
+
+def _tramos(desde: date, hasta: date, dias_por_lote: int,
+            archivos: Dict[str, str]) -> Iterator[Tuple[date, date, Optional[str]]]:
+    """Tramos [primero, siguiente) sin cruzar meses, con el archivo de su mes si lo hay"""
+    dia = desde
+    while dia <= hasta:
+        fin_mes = date.fromisoformat(limites_mes(f'{dia:%Y-%m}')[1])
+        siguiente = min(dia + timedelta(days=dias_por_lote), hasta + timedelta(days=1), fin_mes)
+        ruta = archivos.get(f'{dia:%Y-%m}')
+        if ruta is not None and not os.path.exists(ruta):
+            # Sin el archivo el tramo se recalcularía solo con la base y perdería el mes
+            raise FileNotFoundError(f"Falta el archivo del mes {dia:%Y-%m}: {ruta}")
+        yield dia, siguiente, ruta
+        dia = siguiente
+
+
+def _agregado(conn: sqlite3.Connection, ruta: Optional[str]) -> str:
+    """Adjunta el archivo del tramo (si lo hay) y devuelve la consulta que lo agrega"""
+    if ruta is None:
+        return _AGREGADO.format(origen=_LIBRO)
+    conn.execute("ATTACH DATABASE ? AS archivo", (ruta,))
+    return _AGREGADO.format(origen=_LIBRO_Y_ARCHIVO)
+
+
+def reconstruir(conn: sqlite3.Connection, desde: date = None, hasta: date = None,
+                dias_por_lote: int = 7, reintentos: PoliticaReintentos = None,
+                progreso=None, archivos: Dict[str, str] = None) -> Dict:
+    """
+    Recalcula ``resumen_diario`` desde el libro entre ``desde`` y ``hasta`` (incluidos)
+
+    Args:
+        conn: Conexión a la base; se usa en modo autocommit
+        desde: Primer día; por defecto el de la transacción más antigua
+        hasta: Último día; por defecto el de la más reciente
+        dias_por_lote: Días recalculados en cada transacción
+        reintentos: Política ante bloqueos de otros procesos
+        progreso: Función opcional que recibe (día procesado, filas de resumen)
+        archivos: Meses archivados y su archivo (``archivo_libro.meses_archivados``)
+
+    Returns:
+        Días, filas de resumen escritas, lotes y segundos
+    """
+    reintentos = reintentos or PoliticaReintentos()
+    reintentos.preparar(conn)
+    conn.isolation_level = None
+    archivos = archivos or {}
+    rango = rango_libro(conn, archivos)
+    resultado = {'dias': 0, 'filas': 0, 'lotes': 0, 'segundos': 0.0}
+    if rango is None:
+        return resultado
+    desde = desde or rango[0]
+    hasta = hasta or rango[1]
+    inicio = time.perf_counter()
+
+    def lote(primero: date, siguiente: date, ruta: Optional[str]) -> int:
+        limites = {'desde': primero.isoformat(), 'hasta': siguiente.isoformat()}
+        agregado = _agregado(conn, ruta)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM resumen_diario WHERE dia >= :desde AND dia < :hasta", limites)
+            cursor = conn.execute(
+                "INSERT INTO resumen_diario (dia, id_producto, unidades_entrada, unidades_salida, "
+                "ingresos, transacciones) " + agregado, limites)
+            conn.execute("COMMIT")
+            return cursor.rowcount
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            if ruta is not None:
+                conn.execute("DETACH DATABASE archivo")
+
+    for primero, siguiente, ruta in _tramos(desde, hasta, dias_por_lote, archivos):
+        filas = reintentos.ejecutar(lambda: lote(primero, siguiente, ruta))
+        resultado['dias'] += (siguiente - primero).days
+        resultado['filas'] += filas
+        resultado['lotes'] += 1
+        if progreso is not None:
+            progreso(siguiente - timedelta(days=1), resultado['filas'])
+    resultado['segundos'] = time.perf_counter() - inicio
+    return resultado
+
+
+def verificar(conn: sqlite3.Connection, desde: date = None, hasta: date = None,
+              archivos: Dict[str, str] = None) -> Dict:
+    """
+    Compara el resumen con una agregación completa del libro (y de los meses archivados)
+
+    Returns:
+        Filas comparadas y lista de (día, producto) que no coinciden
+    """
+    archivos = archivos or {}
+    rango = rango_libro(conn, archivos)
+    if rango is None:
+        return {'filas': 0, 'diferencias': []}
+    desde, hasta = desde or rango[0], hasta or rango[1]
+    libro = {}
+    # Por meses: cada tramo adjunta como mucho un archivo
+    for primero, siguiente, ruta in _tramos(desde, hasta, 31, archivos):
+        agregado = _agregado(conn, ruta)
+        try:
+            for fila in conn.execute(agregado, {'desde': primero.isoformat(), 'hasta': siguiente.isoformat()}):
+                libro[(fila[0], fila[1])] = tuple(fila[2:])
+        finally:
+            if ruta is not None:
+                conn.execute("DETACH DATABASE archivo")
+    resumen = {(fila[0], fila[1]): tuple(fila[2:]) for fila in conn.execute("""
+        SELECT dia, id_producto, unidades_entrada, unidades_salida, ingresos, transacciones
+        FROM resumen_diario WHERE dia >= ? AND dia < ?
+    """, (desde.isoformat(), (hasta + timedelta(days=1)).isoformat()))}
+    diferencias = []
+    for clave in libro.keys() | resumen.keys():
+        a, b = libro.get(clave), resumen.get(clave)
+        if a is None or b is None or a[:2] != b[:2] or a[3] != b[3] or abs(a[2] - b[2]) > 0.005:
+            diferencias.append(clave)
+    return {'filas': len(libro), 'diferencias': sorted(diferencias)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reconstruye el resumen diario de transacciones')
+    parser.add_argument('--db', default='inventario.db', help='Ruta a la base SQLite')
+    parser.add_argument('--desde', type=date.fromisoformat, help='Primer día (AAAA-MM-DD)')
+    parser.add_argument('--hasta', type=date.fromisoformat, help='Último día (AAAA-MM-DD)')
+    parser.add_argument('--dias-por-lote', type=int, default=7, help='Días por transacción')
+    parser.add_argument('--directorio-archivo',
+                        help='Directorio de los meses archivados (defecto: archivo/ junto a la base)')
+    parser.add_argument('--verificar', action='store_true',
+                        help='Solo comparar el resumen con el libro, sin reconstruir')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    archivos = meses_archivados(conn, args.directorio_archivo or directorio_archivo(args.db))
+    if args.verificar:
+        datos = verificar(conn, args.desde, args.hasta, archivos)
+        print(f"Filas de resumen comparadas: {datos['filas']:,}")
+        for dia, id_producto in datos['diferencias'][:20]:
+            print(f"  difiere: {dia} producto {id_producto}")
+        print(f"Diferencias: {len(datos['diferencias'])}")
+        return 1 if datos['diferencias'] else 0
+
+    def progreso(dia, filas):
+        print(f"\r  hasta {dia}: {filas:,} filas", end='', flush=True)
+
+    datos = reconstruir(conn, args.desde, args.hasta, args.dias_por_lote, progreso=progreso,
+                        archivos=archivos)
+    print(f"\nResumen reconstruido: {datos['dias']} días, {datos['filas']:,} filas, "
+          f"{datos['lotes']} lotes en {datos['segundos']:.1f} s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -41,12 +41,56 @@ CREATE TABLE IF NOT EXISTS transacciones (
     FOREIGN KEY (id_cliente) REFERENCES clientes(id_cliente)
 );
 
+-- Tabla de Reservas (stock apartado para un pedido hasta confirmarlo o liberarlo)
+CREATE TABLE IF NOT EXISTS reservas (
+    id_reserva INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_cliente INTEGER,
+    estado TEXT NOT NULL DEFAULT 'activa' CHECK (estado IN ('activa', 'confirmada', 'liberada')),
+    fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP,
+    expira DATETIME NOT NULL,
+    observaciones TEXT,
+    FOREIGN KEY (id_cliente) REFERENCES clientes(id_cliente)
+);
+
+-- Líneas de cada reserva (la cantidad ya está descontada de productos)
+CREATE TABLE IF NOT EXISTS reservas_lineas (
+    id_reserva INTEGER NOT NULL,
+    id_producto INTEGER NOT NULL,
+    cantidad INTEGER NOT NULL CHECK (cantidad > 0),
+    precio_unitario DECIMAL(10,2),
+    FOREIGN KEY (id_reserva) REFERENCES reservas(id_reserva),
+    FOREIGN KEY (id_producto) REFERENCES productos(id_producto)
+);
+
+-- Resumen diario por producto de las transacciones (lo mantiene el trigger
+-- resumen_diario_transaccion; database/resumen_diario.py lo reconstruye)
+CREATE TABLE IF NOT EXISTS resumen_diario (
+    dia TEXT NOT NULL,
+    id_producto INTEGER NOT NULL,
+    unidades_entrada INTEGER NOT NULL DEFAULT 0,
+    unidades_salida INTEGER NOT NULL DEFAULT 0,
+    ingresos REAL NOT NULL DEFAULT 0,
+    transacciones INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (dia, id_producto)
+) WITHOUT ROWID;
+
+-- Meses de transacciones movidos a su archivo SQLite (ver database/archivo_libro.py)
+CREATE TABLE IF NOT EXISTS libro_archivado (
+    mes TEXT PRIMARY KEY,
+    archivo TEXT NOT NULL,
+    filas INTEGER NOT NULL DEFAULT 0,
+    actualizado DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Índices para mejorar el rendimiento
 CREATE INDEX IF NOT EXISTS idx_productos_nombre ON productos(nombre_producto);
 CREATE INDEX IF NOT EXISTS idx_productos_categoria ON productos(categoria);
 CREATE INDEX IF NOT EXISTS idx_clientes_email ON clientes(email);
 CREATE INDEX IF NOT EXISTS idx_transacciones_fecha ON transacciones(fecha_transaccion);
 CREATE INDEX IF NOT EXISTS idx_transacciones_producto ON transacciones(id_producto);
+CREATE INDEX IF NOT EXISTS idx_resumen_diario_producto ON resumen_diario(id_producto, dia);
+CREATE INDEX IF NOT EXISTS idx_reservas_lineas_reserva ON reservas_lineas(id_reserva);
+CREATE INDEX IF NOT EXISTS idx_reservas_activas ON reservas(expira) WHERE estado = 'activa';
 
 -- Trigger para actualizar fecha_actualizacion en productos
 CREATE TRIGGER IF NOT EXISTS actualizar_fecha_producto
@@ -56,16 +100,38 @@ BEGIN
     UPDATE productos SET fecha_actualizacion = CURRENT_TIMESTAMP WHERE id_producto = NEW.id_producto;
 END;
 
+-- Trigger que suma cada transacción a su día en resumen_diario (misma transacción)
+CREATE TRIGGER IF NOT EXISTS resumen_diario_transaccion
+    AFTER INSERT ON transacciones
+    FOR EACH ROW
+BEGIN
+    INSERT INTO resumen_diario (dia, id_producto, unidades_entrada, unidades_salida, ingresos, transacciones)
+    SELECT date(NEW.fecha_transaccion), NEW.id_producto,
+           CASE NEW.tipo_transaccion WHEN 'entrada' THEN NEW.cantidad ELSE 0 END,
+           CASE NEW.tipo_transaccion WHEN 'salida' THEN NEW.cantidad ELSE 0 END,
+           CASE NEW.tipo_transaccion WHEN 'salida' THEN COALESCE(NEW.total, 0) ELSE 0 END,
+           1
+    WHERE date(NEW.fecha_transaccion) IS NOT NULL
+    ON CONFLICT (dia, id_producto) DO UPDATE SET
+        unidades_entrada = unidades_entrada + excluded.unidades_entrada,
+        unidades_salida = unidades_salida + excluded.unidades_salida,
+        ingresos = ingresos + excluded.ingresos,
+        transacciones = transacciones + excluded.transacciones;
+END;
+
 -- Datos de ejemplo para pruebas
 INSERT OR IGNORE INTO clientes (nombre_cliente, email, telefono, direccion) VALUES
 ('Juan Pérez', 'juan.perez@email.com', '555-0101', 'Calle Principal 123'),
 ('María García', 'maria.garcia@email.com', '555-0102', 'Avenida Central 456'),
 ('Carlos López', 'carlos.lopez@email.com', '555-0103', 'Plaza Mayor 789');
 
-INSERT OR IGNORE INTO productos (nombre_producto, descripcion, cantidad, precio, categoria, proveedor) VALUES
+-- (solo en una base vacía: varias instancias del servidor comparten la base)
+INSERT INTO productos (nombre_producto, descripcion, cantidad, precio, categoria, proveedor)
+SELECT * FROM (VALUES
 ('Smartphone Galaxy', 'Teléfono inteligente de última generación', 25, 599.99, 'Electrónicos', 'Samsung'),
 ('Laptop Dell', 'Computadora portátil para trabajo y estudio', 15, 899.99, 'Computadoras', 'Dell'),
 ('Auriculares Bluetooth', 'Auriculares inalámbricos con cancelación de ruido', 50, 149.99, 'Accesorios', 'Sony'),
 ('Tablet iPad', 'Tablet de 10 pulgadas para entretenimiento', 20, 449.99, 'Electrónicos', 'Apple'),
-('Mouse Inalámbrico', 'Mouse ergonómico para oficina', 75, 29.99, 'Accesorios', 'Logitech');
+('Mouse Inalámbrico', 'Mouse ergonómico para oficina', 75, 29.99, 'Accesorios', 'Logitech'))
+WHERE NOT EXISTS (SELECT 1 FROM productos);
 
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Barrido de Parámetros Monte Carlo para la Simulación de Red
+Ejecuta la simulación sobre el producto cartesiano de los rangos indicados
+(pérdida, latencia y ancho de banda de los enlaces, multiplicador de carga y
+número de clientes), con varias réplicas de semilla independiente por
+escenario, repartidas en un pool de procesos. Agrega por escenario la media
+y el intervalo de confianza del 95% de cada métrica y escribe un informe
+CSV y JSON.
+
+Uso:
+    python barrido_parametros.py --perdida 0 0.01 0.05 --clientes 1 4 16 --replicas 10
+    python barrido_parametros.py --ancho-banda 1 10 100 --carga 1 10 --salida capacidad
+
+Autor: Sistema de Inventario Electrónico
+"""
+
+import argparse
+import contextlib
+import copy
+import csv
+import io
+import itertools
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import inventario_network_simulation as sim
+from estadisticas_simulacion import HistogramaLatencia
+from network_topology import NETWORK_TOPOLOGY
+
+# Parámetros que se pueden barrer (argumento CLI -> descripción)
+PARAMETROS = {
+    'perdida': 'packet_loss_rate de todos los enlaces',
+    'latencia': 'latency_ms de todos los enlaces',
+    'ancho_banda': 'bandwidth_mbps de todos los enlaces',
+    'carga': 'multiplicador de frequency_per_minute',
+    'clientes': 'número de nodos cliente conectados como el original',
+}
+
+METRICAS = ('throughput_msg_s', 'throughput_bytes_s', 'tasa_perdida',
+            'latencia_p50_ms', 'latencia_p95_ms', 'latencia_p99_ms', 'utilizacion_max')
+
+# t de Student bilateral al 95% para 1..30 grados de libertad
+T_95 = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042)
+
+
+def topologia_con_clientes(base: dict, clientes: int) -> dict:
+    """
+    Copia la topología replicando cada nodo cliente ``clientes`` veces
+
+    Cada réplica hereda los enlaces y patrones de tráfico del cliente original,
+    con su propia IP (libre en la /24 del original) y MAC (contador global,
+    administrada localmente).
+
+    Raises:
+        ValueError: Si ``clientes`` < 1 o las réplicas no caben en la /24
+    """
+    if clientes < 1:
+        raise ValueError(f'El número de clientes debe ser al menos 1: {clientes}')
+    topologia = copy.deepcopy(base)
+    if clientes == 1:
+        return topologia
+    originales = [n for n, c in base['nodes'].items() if c['type'] == 'client']
+    # Direcciones de los demás nodos y la pasarela: las réplicas no pueden repetirlas
+    ocupadas = {c['ip_address'] for n, c in base['nodes'].items() if n not in originales}
+    ocupadas.add(base.get('network_parameters', {}).get('gateway'))
+    libres = {}
+    contador = 0
+    for original in originales:
+        config = topologia['nodes'].pop(original)
+        red = '.'.join(config['ip_address'].split('.')[:3])
+        if red not in libres:
+            libres[red] = iter([f'{red}.{host}' for host in range(1, 255)
+                                if f'{red}.{host}' not in ocupadas])
+        for i in range(clientes):
+            nuevo = f'{original}_{i + 1}'
+            replica = copy.deepcopy(config)
+            replica['name'] = f"{config['name']} {i + 1}"
+            replica['ip_address'] = next(libres[red], None)
+            if replica['ip_address'] is None:
+                raise ValueError(f'{clientes} clientes por nodo cliente no caben en {red}.0/24')
+            replica['mac_address'] = (f'02:00:00:{(contador >> 16) & 0xff:02X}:'
+                                      f'{(contador >> 8) & 0xff:02X}:{contador & 0xff:02X}')
+            contador += 1
+            topologia['nodes'][nuevo] = replica
+            _renombrar_referencias(topologia, base, original, nuevo, f'_{i + 1}')
+        for seccion in ('links', 'traffic_patterns'):
+            for clave, valor in base[seccion].items():
+                if original in (valor['source'], valor.get('target'), valor.get('destination')):
+                    topologia[seccion].pop(clave, None)
+    topologia['metadata']['nodes_count'] = len(topologia['nodes'])
+    topologia['metadata']['links_count'] = len(topologia['links'])
+    return topologia
+
+
+def _renombrar_referencias(topologia, base, original, nuevo, sufijo):
+    for seccion in ('links', 'traffic_patterns'):
+        for clave, valor in base[seccion].items():
+            campos = [c for c in ('source', 'target', 'destination') if valor.get(c) == original]
+            if campos:
+                copia = copy.deepcopy(valor)
+                if seccion == 'traffic_patterns':
+                    copia.setdefault('message_type', sim.PATTERN_MESSAGE_TYPES.get(clave, clave))
+                for campo in campos:
+                    copia[campo] = nuevo
+                topologia[seccion][clave + sufijo] = copia
+
+
+def construir_topologia(escenario: dict) -> dict:
+    """Topología de un escenario: NETWORK_TOPOLOGY con los valores indicados"""
+    topologia = topologia_con_clientes(NETWORK_TOPOLOGY, escenario.get('clientes') or 1)
+    for link in topologia['links'].values():
+        if escenario.get('perdida') is not None:
+            link['packet_loss_rate'] = escenario['perdida']
+        if escenario.get('latencia') is not None:
+            link['latency_ms'] = escenario['latencia']
+        if escenario.get('ancho_banda') is not None:
+            link['bandwidth_mbps'] = escenario['ancho_banda']
+    return topologia
+
+
+def ejecutar_replica(tarea):
+    """
+    Ejecuta una simulación en silencio (en un proceso del pool)
+
+    Args:
+        tarea: (escenario, semilla, duracion, planificador)
+
+    Returns:
+        Diccionario con las métricas de la réplica
+    """
+    escenario, semilla, duracion, planificador = tarea
+    sim.SIMULATION_CONFIG.update({
+        'duration': duracion,
+        'verbose': False,
+        'link_scheduler': planificador,
+        'load_multiplier': escenario.get('carga') or 1.0,
+    })
+    simulacion = sim.NetworkSimulation(semilla=semilla, topologia=construir_topologia(escenario))
+    with contextlib.redirect_stdout(io.StringIO()):
+        simulacion.start_simulation()
+
+    stats = sim.simulation_stats
+    latencias = HistogramaLatencia()
+    for histograma in simulacion.metricas_qos.latencias.values():
+        latencias.fusionar(histograma)
+    enlaces = simulacion.enlaces.resumen(duracion)
+    return {
+        'semilla': semilla,
+        'throughput_msg_s': latencias.conteo / duracion,
+        'throughput_bytes_s': sum(e['bytes'] for e in enlaces) / duracion,
+        'tasa_perdida': stats['packets_lost'] / stats['packets_sent'] if stats['packets_sent'] else 0.0,
+        'latencia_p50_ms': latencias.percentil(50),
+        'latencia_p95_ms': latencias.percentil(95),
+        'latencia_p99_ms': latencias.percentil(99),
+        'utilizacion_max': max((e['utilizacion'] for e in enlaces), default=0.0),
+        'eventos': simulacion.motor.eventos_procesados,
+    }
+
+
+def intervalo_confianza(valores: list):
+    """Media y semiamplitud del intervalo de confianza del 95% (t de Student)"""
+    n = len(valores)
+    media = sum(valores) / n
+    if n < 2:
+        return media, 0.0
+    desviacion = math.sqrt(sum((v - media) ** 2 for v in valores) / (n - 1))
+    t = T_95[n - 2] if n - 1 <= len(T_95) else 1.96
+    return media, t * desviacion / math.sqrt(n)
+
+
+def generar_escenarios(rangos: dict) -> list:
+    """Producto cartesiano de los rangos; los parámetros sin rango quedan en None"""
+    nombres = list(PARAMETROS)
+    valores = [rangos.get(nombre) or [None] for nombre in nombres]
+    return [dict(zip(nombres, combinacion)) for combinacion in itertools.product(*valores)]
+
+
+def ejecutar_barrido(rangos: dict, replicas: int, duracion: float, semilla: int = 0,
+                     procesos: int = None, planificador: str = 'fifo') -> list:
+    """
+    Ejecuta todas las réplicas de todos los escenarios en un pool de procesos
+
+    Returns:
+        Lista de escenarios con sus parámetros, réplicas y métricas agregadas
+    """
+    escenarios = generar_escenarios(rangos)
+    # Semillas independientes: distintas entre réplicas y entre escenarios
+    tareas = [(escenario, semilla + i * replicas + r, duracion, planificador)
+              for i, escenario in enumerate(escenarios) for r in range(replicas)]
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        resultados = list(pool.map(ejecutar_replica, tareas, chunksize=max(1, len(tareas) // 64)))
+
+    informe = []
+    for i, escenario in enumerate(escenarios):
+        corridas = resultados[i * replicas:(i + 1) * replicas]
+        agregados = {}
+        for metrica in METRICAS:
+            media, ic95 = intervalo_confianza([c[metrica] for c in corridas])
+            agregados[metrica] = {'media': media, 'ic95': ic95}
+        informe.append({'parametros': escenario, 'metricas': agregados, 'replicas': corridas})
+    return informe
+
+
+def guardar_informe(informe: list, salida: str, configuracion: dict):
+    """Escribe ``salida``.json (completo) y ``salida``.csv (una fila por escenario)"""
+    with open(f'{salida}.json', 'w', encoding='utf-8') as f:
+        json.dump({'configuracion': configuracion, 'escenarios': informe}, f, indent=2,
+                  ensure_ascii=False)
+
+    with open(f'{salida}.csv', 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(list(PARAMETROS)
+                          + [f'{m}_{s}' for m in METRICAS for s in ('media', 'ic95')])
+        for escenario in informe:
+            fila = [escenario['parametros'][p] for p in PARAMETROS]
+            for metrica in METRICAS:
+                fila += [escenario['metricas'][metrica]['media'], escenario['metricas'][metrica]['ic95']]
+            escritor.writerow(fila)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Barrido Monte Carlo de la simulación de red')
+    parser.add_argument('--perdida', type=float, nargs='+', help=PARAMETROS['perdida'])
+    parser.add_argument('--latencia', type=float, nargs='+', help=PARAMETROS['latencia'])
+    parser.add_argument('--ancho-banda', type=float, nargs='+', help=PARAMETROS['ancho_banda'])
+    parser.add_argument('--carga', type=float, nargs='+', help=PARAMETROS['carga'])
+    parser.add_argument('--clientes', type=int, nargs='+', help=PARAMETROS['clientes'])
+    parser.add_argument('--replicas', type=int, default=5, help='Réplicas por escenario')
+    parser.add_argument('--duracion', type=float, default=300, help='Segundos virtuales por réplica')
+    parser.add_argument('--semilla', type=int, default=0, help='Semilla base')
+    parser.add_argument('--procesos', type=int, default=None, help='Procesos (por defecto, CPUs)')
+    parser.add_argument('--planificador', default='fifo', choices=['fifo', 'prioridad', 'wfq'])
+    parser.add_argument('--salida', default='barrido', help='Prefijo de los informes .csv/.json')
+    args = parser.parse_args()
+
+    for clientes in args.clientes or ():
+        try:
+            topologia_con_clientes(NETWORK_TOPOLOGY, clientes)
+        except ValueError as e:
+            parser.error(str(e))
+
+    rangos = {nombre: getattr(args, nombre) for nombre in PARAMETROS}
+    escenarios = len(generar_escenarios(rangos))
+    print("=== Barrido de Parámetros de la Simulación de Red ===")
+    print(f"{escenarios} escenarios x {args.replicas} réplicas de {args.duracion:g} s virtuales "
+          f"en {args.procesos or os.cpu_count()} procesos")
+
+    inicio = time.perf_counter()
+    informe = ejecutar_barrido(rangos, args.replicas, args.duracion, args.semilla,
+                               args.procesos, args.planificador)
+    segundos = time.perf_counter() - inicio
+
+    guardar_informe(informe, args.salida, {**vars(args), 'segundos': segundos})
+    for escenario in informe:
+        definidos = {k: v for k, v in escenario['parametros'].items() if v is not None}
+        m = escenario['metricas']
+        print(f"  {definidos or 'topología base'}: "
+              f"{m['throughput_msg_s']['media']:.2f}±{m['throughput_msg_s']['ic95']:.2f} msg/s, "
+              f"pérdida {m['tasa_perdida']['media'] * 100:.2f}%, "
+              f"p95 {m['latencia_p95_ms']['media']:.1f}±{m['latencia_p95_ms']['ic95']:.1f} ms")
+    print(f"Completado en {segundos:.1f} s -> {args.salida}.csv, {args.salida}.json")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Modelo de Enlaces de la Red Simulada
+Cada enlace de NETWORK_TOPOLOGY es full duplex: un canal por sentido con su
+propia cola. Un paquete espera en la cola del canal, ocupa el enlace durante su
+tiempo de transmisión (tamaño / ancho de banda), puede perderse según la tasa
+del enlace y llega al otro extremo tras la latencia de propagación.
+
+Autor: Sistema de Inventario Electrónico
+"""
+
+from collections import deque
+
+from muestreo import FlujoEscalar
+
+# Motivo con el que un canal llama a ``al_perderse``
+PERDIDA = 'perdida'  # Pérdida aleatoria según packet_loss_rate
+DESCARTE_COLA = 'cola'  # Cola llena
+DESCARTE_CAIDA = 'caida'  # Enlace fuera de servicio
+
+
+class ColaFIFO(deque):
+    """
+    Disciplina de cola FIFO (orden de llegada)
+
+    Toda disciplina ofrece ``encolar(paquete)``, ``desencolar()`` y ``len()``;
+    las de qos.py ordenan además por ``paquete.clase``. Esta es directamente
+    un deque para que ``len()`` y las operaciones no pasen por Python.
+    """
+
+    encolar = deque.append
+    desencolar = deque.popleft
+
+
+class Paquete:
+    """Unidad transmitida por un canal"""
+
+    __slots__ = ('mensaje', 'tamano', 'al_llegar', 'al_perderse', 'clase', 'encolado_en')
+
+    def __init__(self, mensaje, tamano, al_llegar, al_perderse, clase=None):
+        self.mensaje = mensaje
+        self.tamano = tamano
+        self.al_llegar = al_llegar
+        self.al_perderse = al_perderse
+        self.clase = clase
+        self.encolado_en = 0.0
+
+
+class CanalEnlace:
+    """Un sentido de un enlace: cola, transmisor y propagación"""
+
+    def __init__(self, motor, enlace_id, origen, destino, bandwidth_mbps,
+                 latency_ms, packet_loss_rate, capacidad_cola=1000, disciplina=ColaFIFO,
+                 flujo_perdidas=None):
+        """
+        Args:
+            motor: MotorEventos de la simulación
+            enlace_id: Clave del enlace en la topología
+            origen: Nodo emisor de este sentido
+            destino: Nodo receptor de este sentido
+            bandwidth_mbps: Ancho de banda del enlace
+            latency_ms: Latencia de propagación
+            packet_loss_rate: Probabilidad de pérdida por paquete
+            capacidad_cola: Paquetes que caben en la cola (descarte por cola llena)
+            disciplina: Fábrica sin argumentos de la cola (FIFO por defecto)
+            flujo_perdidas: Flujo aleatorio de las decisiones de pérdida
+                (por defecto, el generador del motor)
+        """
+        self.motor = motor
+        self.enlace_id = enlace_id
+        self.origen = origen
+        self.destino = destino
+        self.bits_por_segundo = bandwidth_mbps * 1_000_000
+        self.latencia = latency_ms / 1000.0
+        self.packet_loss_rate = packet_loss_rate
+        self.capacidad_cola = capacidad_cola
+        self.cola = disciplina()
+        self.perdidas = flujo_perdidas or FlujoEscalar(motor.random)
+        self.ocupado = False
+        self.activo = True
+        self.stats = {
+            'paquetes': 0,
+            'bytes': 0,
+            'perdidos': 0,
+            'descartados_cola': 0,
+            'descartados_caida': 0,
+            'tiempo_ocupado': 0.0,
+            'espera_total': 0.0,
+            'espera_max': 0.0,
+            'cola_max': 0,
+        }
+
+    def transmitir(self, mensaje, tamano, al_llegar, al_perderse=None, clase=None):
+        """
+        Encola un mensaje para transmitirlo por este canal
+
+        Args:
+            mensaje: Mensaje a transportar
+            tamano: Tamaño en bytes en el cable
+            al_llegar: Función llamada con el mensaje al llegar al destino
+            al_perderse: Función llamada con el mensaje y el motivo si se pierde
+            clase: Clase QoS del mensaje (la usan las disciplinas por clase)
+
+        Returns:
+            False si la cola estaba llena o el enlace caído y el mensaje se descartó
+        """
+        if not self.activo:
+            self.stats['descartados_caida'] += 1
+            if al_perderse:
+                al_perderse(mensaje, DESCARTE_CAIDA)
+            return False
+        paquete = Paquete(mensaje, tamano, al_llegar, al_perderse, clase)
+        if len(self.cola) >= self.capacidad_cola:
+            self.stats['descartados_cola'] += 1
+            if al_perderse:
+                al_perderse(mensaje, DESCARTE_COLA)
+            return False
+        paquete.encolado_en = self.motor.ahora
+        self.cola.encolar(paquete)
+        if len(self.cola) > self.stats['cola_max']:
+            self.stats['cola_max'] = len(self.cola)
+        if not self.ocupado:
+            self._siguiente()
+        return True
+
+    def _siguiente(self):
+        """Empieza a transmitir el siguiente paquete de la cola"""
+        if not len(self.cola):
+            self.ocupado = False
+            return
+        self.ocupado = True
+        paquete = self.cola.desencolar()
+        espera = self.motor.ahora - paquete.encolado_en
+        self.stats['espera_total'] += espera
+        if espera > self.stats['espera_max']:
+            self.stats['espera_max'] = espera
+        transmision = paquete.tamano * 8 / self.bits_por_segundo
+        self.motor.programar(transmision, self._fin_transmision, paquete, transmision)
+
+    def _fin_transmision(self, paquete, transmision):
+        stats = self.stats
+        stats['paquetes'] += 1
+        stats['bytes'] += paquete.tamano
+        stats['tiempo_ocupado'] += transmision
+        if not self.activo:
+            # El enlace cayó durante la transmisión
+            stats['descartados_caida'] += 1
+            if paquete.al_perderse:
+                paquete.al_perderse(paquete.mensaje, DESCARTE_CAIDA)
+            self.ocupado = False
+            return
+        if self.perdidas.bernoulli(self.packet_loss_rate):
+            stats['perdidos'] += 1
+            if paquete.al_perderse:
+                paquete.al_perderse(paquete.mensaje, PERDIDA)
+        else:
+            self.motor.programar(self.latencia, paquete.al_llegar, paquete.mensaje)
+        self._siguiente()
+
+    def caer(self):
+        """Deja el canal fuera de servicio; los paquetes en cola se pierden"""
+        self.activo = False
+        while len(self.cola):
+            paquete = self.cola.desencolar()
+            self.stats['descartados_caida'] += 1
+            if paquete.al_perderse:
+                paquete.al_perderse(paquete.mensaje, DESCARTE_CAIDA)
+
+    def restaurar(self):
+        self.activo = True
+
+    def resumen(self, duracion: float) -> dict:
+        """Utilización y retardos de cola del canal durante ``duracion`` segundos"""
+        stats = self.stats
+        atendidos = stats['paquetes']
+        return {
+            'enlace': self.enlace_id,
+            'sentido': f'{self.origen} -> {self.destino}',
+            'paquetes': atendidos,
+            'bytes': stats['bytes'],
+            'utilizacion': stats['tiempo_ocupado'] / duracion if duracion else 0.0,
+            'espera_media_ms': stats['espera_total'] / atendidos * 1000 if atendidos else 0.0,
+            'espera_max_ms': stats['espera_max'] * 1000,
+            'cola_max': stats['cola_max'],
+            'perdidos': stats['perdidos'],
+            'descartados_cola': stats['descartados_cola'],
+            'descartados_caida': stats['descartados_caida'],
+        }
+
+
+class RedEnlaces:
+    """Todos los canales de la topología, indexados por (origen, destino)"""
+
+    def __init__(self, motor, links: dict, capacidad_cola: int = 1000, disciplina=ColaFIFO,
+                 flujos=None):
+        """
+        Args:
+            motor: MotorEventos de la simulación
+            links: Diccionario ``links`` de NETWORK_TOPOLOGY
+            capacidad_cola: Capacidad de cola de cada canal
+            disciplina: Fábrica de la cola de cada canal
+            flujos: FabricaFlujos para dar a cada canal su flujo de pérdidas
+        """
+        self.canales = {}
+        self.por_enlace = {}
+        for enlace_id, link in links.items():
+            for origen, destino in ((link['source'], link['target']),
+                                    (link['target'], link['source'])):
+                flujo = flujos.crear(f'perdidas/{enlace_id}/{origen}->{destino}') if flujos else None
+                self.canales[(origen, destino)] = CanalEnlace(
+                    motor, enlace_id, origen, destino, link['bandwidth_mbps'],
+                    link['latency_ms'], link['packet_loss_rate'], capacidad_cola, disciplina,
+                    flujo)
+                self.por_enlace.setdefault(enlace_id, []).append(self.canales[(origen, destino)])
+
+    def canal(self, origen: str, destino: str):
+        """Canal directo de ``origen`` a ``destino`` o None si no hay enlace"""
+        return self.canales.get((origen, destino))
+
+    def fallar(self, enlace_id: str):
+        """Cae el enlace en los dos sentidos"""
+        for canal in self.por_enlace[enlace_id]:
+            canal.caer()
+
+    def restaurar(self, enlace_id: str):
+        for canal in self.por_enlace[enlace_id]:
+            canal.restaurar()
+
+    def resumen(self, duracion: float) -> list:
+        return [canal.resumen(duracion) for canal in self.canales.values()]
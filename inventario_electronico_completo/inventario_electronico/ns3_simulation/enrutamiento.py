@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Tablas de Enrutamiento de la Red Simulada
+Calcula al arrancar, con Dijkstra sobre la latencia de los enlaces, el
+siguiente salto de cada nodo hacia cada destino, con todos los caminos de
+igual coste (ECMP). Solo los switches reenvían; un cliente o servidor con un
+único enlace a un switch se alcanza a través de ese switch y comparte su
+tabla, así que con miles de clientes hay tantas tablas como switches.
+
+Cuando cae un enlace o un nodo solo se recalculan los destinos cuyas rutas lo
+usaban; cuando se restaura, solo aquellos a los que acorta (o iguala) el camino.
+
+Autor: Sistema de Inventario Electrónico
+"""
+
+import heapq
+
+EPSILON = 1e-9
+
+
+class TablaRutas:
+    """Siguiente salto de cada nodo hacia cada destino, recalculado ante caídas"""
+
+    def __init__(self, nodos: dict, enlaces: dict, ecmp: bool = True):
+        """
+        Args:
+            nodos: Diccionario ``nodes`` de la topología
+            enlaces: Diccionario ``links`` de la topología (peso: ``latency_ms``)
+            ecmp: Repartir entre caminos de igual coste (si no, solo el primero)
+        """
+        self.ecmp = ecmp
+        self.transito = {n for n, config in nodos.items() if config['type'] == 'switch'}
+        self.indice = {n: i for i, n in enumerate(nodos)}
+        self.enlaces = {enlace_id: (link['source'], link['target'], link['latency_ms'])
+                        for enlace_id, link in enlaces.items()}
+        self.incidentes = {n: [] for n in nodos}
+        for enlace_id, (a, b, _) in self.enlaces.items():
+            self.incidentes[a].append(enlace_id)
+            self.incidentes[b].append(enlace_id)
+        # Nodo sin tránsito con un único enlace a un switch -> ese switch
+        self.anclaje = {}
+        for n, incidentes in self.incidentes.items():
+            if n not in self.transito and len(incidentes) == 1:
+                a, b, _ = self.enlaces[incidentes[0]]
+                vecino = b if a == n else a
+                if vecino in self.transito:
+                    self.anclaje[n] = vecino
+        self.enlaces_caidos = set()
+        self.nodos_caidos = set()
+        self.adyacencia = {n: {} for n in nodos}
+        for a, b, peso in self.enlaces.values():
+            self._unir(a, b, peso)
+        self.tablas = {}
+        self.distancias = {}
+        self.recalculos = 0
+        for destino in nodos:
+            if destino not in self.anclaje:
+                self._calcular(destino)
+
+    def _unir(self, a, b, peso):
+        """El enlace de un nodo anclado solo figura en la adyacencia de ese nodo"""
+        if b not in self.anclaje:
+            self.adyacencia[a][b] = peso
+        if a not in self.anclaje:
+            self.adyacencia[b][a] = peso
+
+    def _separar(self, a, b):
+        self.adyacencia[a].pop(b, None)
+        self.adyacencia[b].pop(a, None)
+
+    def _calcular(self, destino):
+        """Dijkstra desde ``destino``; los siguientes saltos salen de la misma pasada"""
+        adyacencia, transito = self.adyacencia, self.transito
+        distancias = {destino: 0.0}
+        saltos = {destino: []}
+        pendientes = [(0.0, destino)]
+        while pendientes:
+            distancia, nodo = heapq.heappop(pendientes)
+            if distancia > distancias[nodo] or (nodo != destino and nodo not in transito):
+                continue
+            for vecino, peso in adyacencia[nodo].items():
+                nueva = distancia + peso
+                actual = distancias.get(vecino)
+                if actual is None or nueva < actual - EPSILON:
+                    distancias[vecino] = nueva
+                    saltos[vecino] = [nodo]
+                    heapq.heappush(pendientes, (nueva, vecino))
+                elif nueva < actual + EPSILON:
+                    saltos[vecino].append(nodo)
+        del saltos[destino]
+        if self.ecmp:
+            self.tablas[destino] = {nodo: tuple(s) for nodo, s in saltos.items()}
+        else:
+            self.tablas[destino] = {nodo: (s[0],) for nodo, s in saltos.items()}
+        self.distancias[destino] = distancias
+
+    def siguiente_salto(self, desde: str, destino: str, origen: str = None):
+        """
+        Vecino de ``desde`` por el que seguir hacia ``destino`` (None si no hay camino)
+
+        Con varios caminos de igual coste se elige por (origen, destino), de
+        modo que todos los mensajes de un mismo flujo siguen el mismo camino.
+        """
+        objetivo = self.anclaje.get(destino, destino)
+        if objetivo == desde:
+            return destino if desde in self.adyacencia[destino] else None
+        ancla = self.anclaje.get(desde)
+        if ancla is not None:
+            if ancla in self.adyacencia[desde] and (ancla == objetivo or ancla in self.tablas.get(objetivo, ())):
+                return ancla
+            return None
+        tabla = self.tablas.get(objetivo)
+        saltos = tabla.get(desde) if tabla else None
+        if not saltos:
+            return None
+        if len(saltos) == 1:
+            return saltos[0]
+        indice = self.indice
+        return saltos[(indice[origen or desde] * 31 + indice[destino]) % len(saltos)]
+
+    def _quitar(self, a, b):
+        """
+        Retira el enlace a-b de las tablas
+
+        Si el enlace era uno de varios caminos de igual coste basta con quitarlo
+        del reparto (la distancia no cambia). Devuelve los destinos que hay que
+        recalcular: aquellos en los que era el único siguiente salto.
+        """
+        self._separar(a, b)
+        if a in self.anclaje or b in self.anclaje:
+            return set()
+        afectados = set()
+        for destino, tabla in self.tablas.items():
+            for x, y in ((a, b), (b, a)):
+                saltos = tabla.get(x)
+                if saltos and y in saltos:
+                    if len(saltos) > 1:
+                        tabla[x] = tuple(s for s in saltos if s != y)
+                    else:
+                        afectados.add(destino)
+        return afectados
+
+    def _anadir(self, a, b, peso):
+        """
+        Añade el enlace a-b a las tablas
+
+        Un camino de igual coste se suma al reparto; uno más corto (o que
+        conecta nodos antes inalcanzables) obliga a recalcular el destino.
+        """
+        self._unir(a, b, peso)
+        if a in self.anclaje or b in self.anclaje:
+            return set()
+        afectados = set()
+        for destino, distancias in self.distancias.items():
+            for x, y in ((a, b), (b, a)):
+                dx = distancias.get(x)
+                if dx is None or y == destino or (x != destino and x not in self.transito):
+                    continue
+                dy = distancias.get(y)
+                if dy is None or dx + peso < dy - EPSILON:
+                    afectados.add(destino)
+                elif dx + peso < dy + EPSILON and self.ecmp:
+                    self.tablas[destino][y] += (x,)
+        return afectados
+
+    def _anadir_nodo(self, nodo):
+        """Vuelve a poner ``nodo`` en las tablas de los demás destinos"""
+        vecinos = self.adyacencia[nodo]
+        afectados = set()
+        for destino, distancias in self.distancias.items():
+            mejor, saltos = None, []
+            for vecino, peso in vecinos.items():
+                dv = distancias.get(vecino)
+                if dv is None or (vecino != destino and vecino not in self.transito):
+                    continue
+                if mejor is None or dv + peso < mejor - EPSILON:
+                    mejor, saltos = dv + peso, [vecino]
+                elif dv + peso < mejor + EPSILON:
+                    saltos.append(vecino)
+            if mejor is None:
+                continue
+            distancias[nodo] = mejor
+            self.tablas[destino][nodo] = tuple(saltos) if self.ecmp else (saltos[0],)
+            if nodo not in self.transito:
+                continue
+            # Como switch, ``nodo`` puede acortar o igualar el camino de sus vecinos
+            empates = []
+            for vecino, peso in vecinos.items():
+                if vecino == destino:
+                    continue
+                dv = distancias.get(vecino)
+                if dv is None or mejor + peso < dv - EPSILON:
+                    afectados.add(destino)
+                    break
+                if mejor + peso < dv + EPSILON:
+                    empates.append(vecino)
+            else:
+                if self.ecmp:
+                    for vecino in empates:
+                        self.tablas[destino][vecino] += (nodo,)
+        return afectados
+
+    def _recalcular(self, destinos):
+        for destino in destinos:
+            if destino not in self.nodos_caidos:
+                self._calcular(destino)
+        self.recalculos += len(destinos)
+        return len(destinos)
+
+    def fallar_enlace(self, enlace_id: str) -> int:
+        """Quita el enlace; devuelve cuántas tablas de destino se recalcularon"""
+        if enlace_id in self.enlaces_caidos:
+            return 0
+        self.enlaces_caidos.add(enlace_id)
+        a, b, _ = self.enlaces[enlace_id]
+        if a in self.nodos_caidos or b in self.nodos_caidos:
+            return 0
+        return self._recalcular(self._quitar(a, b))
+
+    def restaurar_enlace(self, enlace_id: str) -> int:
+        """Vuelve a añadir el enlace; devuelve cuántas tablas se recalcularon"""
+        if enlace_id not in self.enlaces_caidos:
+            return 0
+        self.enlaces_caidos.discard(enlace_id)
+        a, b, peso = self.enlaces[enlace_id]
+        if a in self.nodos_caidos or b in self.nodos_caidos:
+            return 0
+        return self._recalcular(self._anadir(a, b, peso))
+
+    def _enlaces_vivos(self, nodo):
+        """(vecino, peso) de los enlaces de ``nodo`` no caídos hacia nodos activos"""
+        for enlace_id in self.incidentes[nodo]:
+            a, b, peso = self.enlaces[enlace_id]
+            vecino = b if a == nodo else a
+            if enlace_id not in self.enlaces_caidos and vecino not in self.nodos_caidos:
+                yield vecino, peso
+
+    def fallar_nodo(self, nodo: str) -> int:
+        """Quita el nodo y sus enlaces; devuelve cuántas tablas se recalcularon"""
+        if nodo in self.nodos_caidos:
+            return 0
+        # Primero sus propias entradas, que ya no sirven a nadie
+        self.tablas.pop(nodo, None)
+        self.distancias.pop(nodo, None)
+        for destino in self.tablas:
+            self.tablas[destino].pop(nodo, None)
+            self.distancias[destino].pop(nodo, None)
+        afectados = set()
+        for vecino, _ in list(self._enlaces_vivos(nodo)):
+            afectados |= self._quitar(nodo, vecino)
+        self.nodos_caidos.add(nodo)
+        return self._recalcular(afectados)
+
+    def restaurar_nodo(self, nodo: str) -> int:
+        """Devuelve el nodo a la red; devuelve cuántas tablas se recalcularon"""
+        if nodo not in self.nodos_caidos:
+            return 0
+        self.nodos_caidos.discard(nodo)
+        for vecino, peso in self._enlaces_vivos(nodo):
+            self._unir(nodo, vecino, peso)
+        if nodo in self.anclaje:
+            return 0
+        afectados = self._anadir_nodo(nodo)
+        afectados.add(nodo)
+        return self._recalcular(afectados)
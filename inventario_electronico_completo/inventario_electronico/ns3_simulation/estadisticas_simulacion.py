@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Estadísticas de la Simulación con Memoria Acotada
+- HistogramaLatencia: histograma logarítmico (precisión relativa ~1%) con
+  percentiles p50/p95/p99, mínimo, máximo y media exactos.
+- SerieThroughput: mensajes, bytes y pérdidas por ventana de tiempo virtual;
+  al llenarse, fusiona ventanas de dos en dos y dobla su ancho.
+- Exportación CSV de histogramas y series para graficar.
+
+La memoria de ambos es fija, dure lo que dure la simulación.
+
+Autor: Sistema de Inventario Electrónico
+"""
+
+import csv
+import math
+from array import array
+
+
+class HistogramaLatencia:
+    """Histograma de latencias en ms con cubetas geométricas de ancho fijo relativo"""
+
+    __slots__ = ('minimo_ms', '_log_minimo', '_factor', '_cubetas',
+                 'conteo', 'suma', 'minimo', 'maximo')
+
+    def __init__(self, precision: float = 0.01, minimo_ms: float = 0.001,
+                 maximo_ms: float = 3_600_000.0):
+        """
+        Args:
+            precision: Ancho relativo de cada cubeta (0.01 = 1%)
+            minimo_ms: Latencias menores van a la primera cubeta
+            maximo_ms: Latencias mayores van a la última cubeta
+        """
+        self.minimo_ms = minimo_ms
+        self._log_minimo = math.log(minimo_ms)
+        self._factor = math.log1p(precision)
+        cubetas = int(math.ceil((math.log(maximo_ms) - self._log_minimo) / self._factor)) + 2
+        self._cubetas = array('Q', bytes(8 * cubetas))
+        self.conteo = 0
+        self.suma = 0.0
+        self.minimo = math.inf
+        self.maximo = 0.0
+
+    def _indice(self, valor_ms: float) -> int:
+        if valor_ms <= self.minimo_ms:
+            return 0
+        indice = int((math.log(valor_ms) - self._log_minimo) / self._factor) + 1
+        return min(indice, len(self._cubetas) - 1)
+
+    def limites(self, indice: int):
+        """Intervalo (inferior, superior] en ms que cubre la cubeta ``indice``"""
+        if indice == 0:
+            return 0.0, self.minimo_ms
+        return (math.exp(self._log_minimo + (indice - 1) * self._factor),
+                math.exp(self._log_minimo + indice * self._factor))
+
+    def registrar(self, valor_ms: float):
+        self._cubetas[self._indice(valor_ms)] += 1
+        self.conteo += 1
+        self.suma += valor_ms
+        if valor_ms < self.minimo:
+            self.minimo = valor_ms
+        if valor_ms > self.maximo:
+            self.maximo = valor_ms
+
+    def fusionar(self, otro: 'HistogramaLatencia'):
+        """Suma a este histograma otro con la misma configuración"""
+        if len(otro._cubetas) != len(self._cubetas) or otro._factor != self._factor:
+            raise ValueError('Solo se pueden fusionar histogramas con las mismas cubetas')
+        for i, n in enumerate(otro._cubetas):
+            if n:
+                self._cubetas[i] += n
+        self.conteo += otro.conteo
+        self.suma += otro.suma
+        self.minimo = min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+
+    def percentil(self, p: float) -> float:
+        """Percentil ``p`` (0-100): punto medio de la cubeta que lo contiene"""
+        if not self.conteo:
+            return 0.0
+        objetivo = max(1, math.ceil(p / 100 * self.conteo))
+        acumulado = 0
+        for indice, n in enumerate(self._cubetas):
+            acumulado += n
+            if acumulado >= objetivo:
+                inferior, superior = self.limites(indice)
+                medio = math.sqrt(inferior * superior) if inferior else superior
+                return min(max(medio, self.minimo), self.maximo)
+        return self.maximo
+
+    def resumen(self) -> dict:
+        return {
+            'n': self.conteo,
+            'media': self.suma / self.conteo if self.conteo else 0.0,
+            'p50': self.percentil(50),
+            'p95': self.percentil(95),
+            'p99': self.percentil(99),
+            'max': self.maximo,
+        }
+
+    def cubetas_no_vacias(self):
+        """(inferior, superior, conteo) de cada cubeta con algún valor"""
+        for indice, n in enumerate(self._cubetas):
+            if n:
+                yield (*self.limites(indice), n)
+
+
+class SerieThroughput:
+    """Mensajes entregados, bytes y pérdidas por ventana de tiempo virtual"""
+
+    def __init__(self, ventana_s: float = 10.0, max_ventanas: int = 1024):
+        """
+        Args:
+            ventana_s: Ancho inicial de cada ventana en segundos virtuales
+            max_ventanas: Ventanas retenidas; al superarlas se fusionan por pares
+        """
+        self.ventana_s = ventana_s
+        self.max_ventanas = max_ventanas - max_ventanas % 2
+        self.mensajes = array('Q')
+        self.bytes = array('Q')
+        self.perdidos = array('Q')
+
+    def _ventana(self, tiempo: float) -> int:
+        indice = int(tiempo // self.ventana_s)
+        while indice >= self.max_ventanas:
+            self._compactar()
+            indice = int(tiempo // self.ventana_s)
+        faltan = indice + 1 - len(self.mensajes)
+        if faltan > 0:
+            ceros = array('Q', bytes(8 * faltan))
+            self.mensajes.extend(ceros)
+            self.bytes.extend(ceros)
+            self.perdidos.extend(ceros)
+        return indice
+
+    def _compactar(self):
+        for nombre in ('mensajes', 'bytes', 'perdidos'):
+            serie = getattr(self, nombre)
+            if len(serie) % 2:
+                serie.append(0)
+            setattr(self, nombre, array('Q', (serie[i] + serie[i + 1] for i in range(0, len(serie), 2))))
+        self.ventana_s *= 2
+
+    def registrar_entrega(self, tiempo: float, tamano: int):
+        indice = self._ventana(tiempo)
+        self.mensajes[indice] += 1
+        self.bytes[indice] += tamano
+
+    def registrar_perdida(self, tiempo: float):
+        self.perdidos[self._ventana(tiempo)] += 1
+
+    def filas(self, hasta: float = None):
+        """(inicio, fin, mensajes, bytes, perdidos, mensajes/s, bytes/s) por ventana"""
+        ventanas = len(self.mensajes)
+        if hasta is not None:
+            ventanas = max(ventanas, int(math.ceil(hasta / self.ventana_s)))
+        for i in range(ventanas):
+            inicio = i * self.ventana_s
+            fin = inicio + self.ventana_s if hasta is None else min(inicio + self.ventana_s, hasta)
+            mensajes = self.mensajes[i] if i < len(self.mensajes) else 0
+            octetos = self.bytes[i] if i < len(self.bytes) else 0
+            perdidos = self.perdidos[i] if i < len(self.perdidos) else 0
+            ancho = (fin - inicio) or self.ventana_s
+            yield inicio, fin, mensajes, octetos, perdidos, mensajes / ancho, octetos / ancho
+
+
+def exportar_csv(prefijo: str, histogramas: dict, serie: SerieThroughput, hasta: float = None):
+    """
+    Escribe ``prefijo``_latencias.csv (cubetas de cada histograma) y
+    ``prefijo``_throughput.csv (serie por ventanas)
+
+    Args:
+        histogramas: nombre -> HistogramaLatencia
+        serie: Serie de throughput
+        hasta: Duración simulada, para cerrar la última ventana
+
+    Returns:
+        Rutas de los dos archivos
+    """
+    ruta_latencias = f'{prefijo}_latencias.csv'
+    with open(ruta_latencias, 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(['serie', 'desde_ms', 'hasta_ms', 'conteo'])
+        for nombre, histograma in histogramas.items():
+            for inferior, superior, n in histograma.cubetas_no_vacias():
+                escritor.writerow([nombre, f'{inferior:.6g}', f'{superior:.6g}', n])
+
+    ruta_throughput = f'{prefijo}_throughput.csv'
+    with open(ruta_throughput, 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(['inicio_s', 'fin_s', 'mensajes', 'bytes', 'perdidos',
+                           'mensajes_por_s', 'bytes_por_s'])
+        for fila in serie.filas(hasta):
+            escritor.writerow([f'{v:.6g}' if isinstance(v, float) else v for v in fila])
+    return ruta_latencias, ruta_throughput
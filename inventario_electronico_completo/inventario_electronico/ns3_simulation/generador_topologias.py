@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Generador y Validador de Topologías de Red
+Genera topologías con la misma estructura que NETWORK_TOPOLOGY para N clientes
+de sucursal, M switches y K servidores, con forma de árbol, fat-tree (dos
+niveles, leaf-spine) o aleatoria, y las valida en tiempo lineal:
+
+- enlaces hacia nodos inexistentes, bucles y enlaces duplicados
+- IPs y MACs duplicadas
+- conectividad del grafo completo
+- alcanzabilidad de algún servidor desde cada cliente (atravesando solo switches)
+
+Uso:
+    python generador_topologias.py --clientes 10000 --switches 200 --servidores 8 \\
+        --forma fat-tree --salida sucursales.json
+    python inventario_network_simulation.py --topologia sucursales.json --silencioso
+
+Autor: Sistema de Inventario Electrónico
+"""
+
+import argparse
+import copy
+import json
+import random
+import sys
+import time
+from collections import deque
+from datetime import datetime
+
+from inventario_network_simulation import PATTERN_MESSAGE_TYPES
+from network_topology import NETWORK_TOPOLOGY
+
+FORMAS = ('arbol', 'fat-tree', 'aleatoria')
+
+# Características de cada tipo de enlace generado
+ENLACES = {
+    'acceso': {'bandwidth_mbps': 100, 'latency_ms': 5, 'packet_loss_rate': 0.01},
+    'troncal': {'bandwidth_mbps': 10000, 'latency_ms': 1, 'packet_loss_rate': 0.001},
+    'servidor': {'bandwidth_mbps': 1000, 'latency_ms': 2, 'packet_loss_rate': 0.005},
+}
+
+PUERTOS = {'server': 5000, 'client': 5001, 'switch': 5002}
+SERVICIOS = {
+    'server': ['HTTP Server (Flask)', 'SQLite Database', 'Socket.IO Server', 'REST API'],
+    'client': ['HTTP Client', 'Socket.IO Client', 'Web Interface', 'Data Input Forms'],
+    'switch': ['Load Balancer', 'Reverse Proxy', 'Health Monitor', 'Traffic Router'],
+}
+
+
+GATEWAY = '10.0.0.1'
+
+
+def _ip(indice: int) -> str:
+    """IP única en 10.0.0.0/8 para el nodo ``indice``, a partir de 10.0.0.2 (tras la pasarela)"""
+    indice += 2
+    return f'10.{(indice >> 16) & 0xff}.{(indice >> 8) & 0xff}.{indice & 0xff}'
+
+
+def _mac(indice: int) -> str:
+    """MAC administrada localmente única para el nodo ``indice``"""
+    return '02:00:' + ':'.join(f'{(indice >> s) & 0xff:02X}' for s in (24, 16, 8, 0))
+
+
+class _Constructor:
+    """Acumula nodos y enlaces de una topología en construcción"""
+
+    def __init__(self):
+        self.nodes = {}
+        self.links = {}
+
+    def nodo(self, node_id: str, tipo: str, nombre: str) -> str:
+        indice = len(self.nodes)
+        self.nodes[node_id] = {
+            'id': indice + 1,
+            'name': nombre,
+            'type': tipo,
+            'ip_address': _ip(indice),
+            'subnet_mask': '255.0.0.0',
+            'port': PUERTOS[tipo],
+            'mac_address': _mac(indice),
+            'services': SERVICIOS[tipo],
+        }
+        return node_id
+
+    def enlace(self, origen: str, destino: str, tipo: str):
+        numero = len(self.links) + 1
+        self.links[f'{origen}_to_{destino}'] = {
+            'id': f'link_{numero}',
+            'name': f'{origen} -> {destino}',
+            'source': origen,
+            'target': destino,
+            'type': 'ethernet',
+            'duplex': 'full',
+            'protocol': 'TCP/IP',
+            **ENLACES[tipo],
+        }
+
+
+def generar_topologia(clientes: int, switches: int, servidores: int, forma: str = 'arbol',
+                      grado: int = 4, enlaces_extra: float = 0.5, semilla: int = None) -> dict:
+    """
+    Genera una topología compatible con NetworkSimulation
+
+    Args:
+        clientes: Clientes de sucursal (N)
+        switches: Switches (M)
+        servidores: Servidores de inventario (K)
+        forma: 'arbol' (cada switch cuelga de otro, ``grado`` hijos por switch),
+            'fat-tree' (leaf-spine: cada switch de acceso se une a todos los troncales)
+            o 'aleatoria' (árbol aleatorio más ``enlaces_extra`` x M enlaces al azar)
+        grado: Hijos por switch en la forma árbol
+        enlaces_extra: Enlaces troncales adicionales por switch en la forma aleatoria
+        semilla: Semilla de la forma aleatoria
+
+    Returns:
+        Diccionario con metadata, nodes, links, traffic_patterns,
+        network_parameters y quality_of_service
+    """
+    if forma not in FORMAS:
+        raise ValueError(f"Forma desconocida: {forma} (opciones: {', '.join(FORMAS)})")
+    if min(clientes, switches, servidores) < 1:
+        raise ValueError('Hacen falta al menos un cliente, un switch y un servidor')
+    rnd = random.Random(semilla)
+    t = _Constructor()
+
+    sw = [t.nodo(f'switch_{i + 1}', 'switch', f'Switch {i + 1}') for i in range(switches)]
+
+    # Troncales entre switches; ``acceso`` son los switches donde se conectan clientes
+    # y ``nucleo`` donde se conectan servidores
+    if forma == 'arbol':
+        for i in range(1, switches):
+            t.enlace(sw[(i - 1) // grado], sw[i], 'troncal')
+        con_hijos = {(i - 1) // grado for i in range(1, switches)}
+        acceso = [s for i, s in enumerate(sw) if i not in con_hijos] or sw
+        nucleo = [sw[0]]
+    elif forma == 'fat-tree':
+        n_nucleo = max(1, switches // 4) if switches > 1 else 1
+        nucleo, acceso = sw[:n_nucleo], sw[n_nucleo:] or sw[:n_nucleo]
+        for hoja in sw[n_nucleo:]:
+            for columna in nucleo:
+                t.enlace(hoja, columna, 'troncal')
+    else:
+        orden = sw[:]
+        rnd.shuffle(orden)
+        for i in range(1, switches):
+            t.enlace(orden[rnd.randrange(i)], orden[i], 'troncal')
+        existentes = {frozenset((l['source'], l['target'])) for l in t.links.values()}
+        for _ in range(int(enlaces_extra * switches) if switches > 2 else 0):
+            a, b = rnd.sample(sw, 2)
+            if frozenset((a, b)) not in existentes:
+                existentes.add(frozenset((a, b)))
+                t.enlace(a, b, 'troncal')
+        acceso = nucleo = sw
+
+    srv = []
+    for i in range(servidores):
+        servidor = t.nodo(f'servidor_{i + 1}', 'server', f'Servidor de Inventario {i + 1}')
+        t.enlace(nucleo[i % len(nucleo)], servidor, 'servidor')
+        srv.append((servidor, nucleo[i % len(nucleo)]))
+
+    patrones = {}
+    base = NETWORK_TOPOLOGY['traffic_patterns']
+    for i in range(clientes):
+        cliente = t.nodo(f'cliente_{i + 1}', 'client', f'Cliente de Sucursal {i + 1}')
+        switch_acceso = acceso[i % len(acceso)]
+        t.enlace(cliente, switch_acceso, 'acceso')
+        servidor, switch_servidor = srv[i % len(srv)]
+        for pattern_id in ('product_creation', 'inventory_query'):
+            patrones[f'{pattern_id}_{i + 1}'] = dict(
+                base[pattern_id], source=cliente, destination=servidor, via=switch_acceso,
+                message_type=PATTERN_MESSAGE_TYPES[pattern_id])
+        patrones[f'websocket_updates_{i + 1}'] = dict(
+            base['websocket_updates'], source=servidor, destination=cliente, via=switch_servidor,
+            message_type=PATTERN_MESSAGE_TYPES['websocket_updates'])
+    for servidor, switch_servidor in srv:
+        patrones[f'health_check_{servidor}'] = dict(
+            base['health_check'], source=switch_servidor, destination=servidor, via='direct',
+            message_type=PATTERN_MESSAGE_TYPES['health_check'])
+
+    return {
+        'metadata': {
+            'name': f'Topología {forma} ({clientes} clientes, {switches} switches, {servidores} servidores)',
+            'description': 'Topología generada por generador_topologias.py',
+            'version': '1.0',
+            'created': datetime.now().isoformat(),
+            'nodes_count': len(t.nodes),
+            'links_count': len(t.links),
+            'generator': {'forma': forma, 'clientes': clientes, 'switches': switches,
+                          'servidores': servidores, 'semilla': semilla},
+        },
+        'nodes': t.nodes,
+        'links': t.links,
+        'traffic_patterns': patrones,
+        'network_parameters': dict(NETWORK_TOPOLOGY['network_parameters'], subnet='10.0.0.0/8',
+                                   gateway=GATEWAY),
+        'quality_of_service': copy.deepcopy(NETWORK_TOPOLOGY['quality_of_service']),
+    }
+
+
+def validar_topologia(topologia: dict) -> list:
+    """
+    Valida una topología en O(nodos + enlaces)
+
+    Returns:
+        Lista de errores (vacía si la topología es válida)
+    """
+    errores = []
+    nodes = topologia['nodes']
+    vecinos = {node_id: [] for node_id in nodes}
+
+    vistos = {}
+    for campo, descripcion in (('ip_address', 'IP'), ('mac_address', 'MAC')):
+        vistos.clear()
+        for node_id, config in nodes.items():
+            valor = config.get(campo)
+            if valor is None:
+                continue
+            if valor in vistos:
+                errores.append(f"{descripcion} duplicada {valor}: '{vistos[valor]}' y '{node_id}'")
+            else:
+                vistos[valor] = node_id
+
+    gateway = topologia.get('network_parameters', {}).get('gateway')
+    for node_id, config in nodes.items():
+        if gateway is not None and config.get('ip_address') == gateway:
+            errores.append(f"Nodo '{node_id}': su IP {gateway} es la de la pasarela")
+
+    pares = set()
+    for link_id, link in topologia['links'].items():
+        origen, destino = link['source'], link['target']
+        if origen not in nodes or destino not in nodes:
+            for extremo in (origen, destino):
+                if extremo not in nodes:
+                    errores.append(f"Enlace {link_id}: nodo '{extremo}' no existe")
+            continue
+        if origen == destino:
+            errores.append(f"Enlace {link_id}: une el nodo '{origen}' consigo mismo")
+            continue
+        par = (origen, destino) if origen < destino else (destino, origen)
+        if par in pares:
+            errores.append(f"Enlace {link_id}: duplica otro enlace entre '{origen}' y '{destino}'")
+        pares.add(par)
+        vecinos[origen].append(destino)
+        vecinos[destino].append(origen)
+
+    for pattern_id, pattern in topologia.get('traffic_patterns', {}).items():
+        for campo in ('source', 'destination'):
+            if pattern[campo] not in nodes:
+                errores.append(f"Patrón {pattern_id}: nodo {campo} '{pattern[campo]}' no existe")
+        via = pattern.get('via', 'direct')
+        if via != 'direct' and via not in vecinos.get(pattern['source'], ()):
+            errores.append(f"Patrón {pattern_id}: '{via}' no es vecino de '{pattern['source']}'")
+
+    # Conectividad: un único componente
+    if nodes:
+        inicio = next(iter(nodes))
+        alcanzados = {inicio}
+        pendientes = deque([inicio])
+        while pendientes:
+            for vecino in vecinos[pendientes.popleft()]:
+                if vecino not in alcanzados:
+                    alcanzados.add(vecino)
+                    pendientes.append(vecino)
+        if len(alcanzados) != len(nodes):
+            aislados = [n for n in nodes if n not in alcanzados]
+            errores.append(f"La red no es conexa: {len(aislados)} nodos sin conexión con "
+                           f"'{inicio}' (p. ej. {', '.join(aislados[:5])})")
+
+    # Alcanzabilidad: BFS desde todos los servidores atravesando solo switches
+    servidores = {n for n, c in nodes.items() if c['type'] == 'server'}
+    if not servidores:
+        errores.append('La topología no tiene servidores')
+    else:
+        alcanzados = set(servidores)
+        pendientes = deque(n for n in nodes if n in servidores)
+        while pendientes:
+            actual = pendientes.popleft()
+            if actual not in servidores and nodes[actual]['type'] != 'switch':
+                continue  # Los clientes reciben tráfico pero no lo reenvían
+            for vecino in vecinos[actual]:
+                if vecino not in alcanzados:
+                    alcanzados.add(vecino)
+                    pendientes.append(vecino)
+        sin_servidor = [n for n, c in nodes.items() if c['type'] == 'client' and n not in alcanzados]
+        if sin_servidor:
+            errores.append(f"{len(sin_servidor)} clientes no alcanzan ningún servidor "
+                           f"(p. ej. {', '.join(sin_servidor[:5])})")
+    return errores
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generador de topologías de red del inventario')
+    parser.add_argument('--clientes', type=int, default=100)
+    parser.add_argument('--switches', type=int, default=10)
+    parser.add_argument('--servidores', type=int, default=2)
+    parser.add_argument('--forma', choices=FORMAS, default='arbol')
+    parser.add_argument('--grado', type=int, default=4, help='Hijos por switch (árbol)')
+    parser.add_argument('--enlaces-extra', type=float, default=0.5,
+                        help='Enlaces troncales extra por switch (aleatoria)')
+    parser.add_argument('--semilla', type=int, default=None)
+    parser.add_argument('--salida', default=None, help='Archivo JSON de salida')
+    parser.add_argument('--validar', metavar='ARCHIVO', default=None,
+                        help='Solo validar una topología JSON existente')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    if args.validar:
+        with open(args.validar, 'r', encoding='utf-8') as f:
+            topologia = json.load(f)
+    else:
+        topologia = generar_topologia(args.clientes, args.switches, args.servidores, args.forma,
+                                      args.grado, args.enlaces_extra, args.semilla)
+        print(f"Generada: {topologia['metadata']['name']}")
+        print(f"  {len(topologia['nodes'])} nodos, {len(topologia['links'])} enlaces, "
+              f"{len(topologia['traffic_patterns'])} patrones en {time.perf_counter() - inicio:.2f} s")
+
+    inicio = time.perf_counter()
+    errores = validar_topologia(topologia)
+    print(f"Validación en {time.perf_counter() - inicio:.2f} s: "
+          f"{'correcta' if not errores else f'{len(errores)} errores'}")
+    for error in errores[:20]:
+        print(f"  - {error}")
+
+    if args.salida and not args.validar:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(topologia, f, ensure_ascii=False)
+        print(f"Topología guardada en {args.salida}")
+    return 1 if errores else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
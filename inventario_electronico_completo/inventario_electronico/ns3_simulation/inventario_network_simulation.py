@@ -6,62 +6,84 @@ Simula la comunicación entre 3 máquinas:
 - Máquina 2: Cliente de Ingreso de Datos (Puerto 5001)  
 - Máquina 3: Switch/Balanceador de Carga (Puerto 5002)
 
+Los nodos y enlaces se construyen desde NETWORK_TOPOLOGY (network_topology.py):
+cada mensaje viaja por los enlaces reales de la ruta (cliente -> switch ->
+servidor) con el ancho de banda, latencia y pérdida de cada enlace. La ruta sale
+de tablas de siguiente salto precalculadas (enrutamiento.py), que se actualizan
+cuando cae o vuelve un nodo o un enlace (``--fallo``). El tráfico
+sigue los ``traffic_patterns`` (llegadas de Poisson) y los enlaces pueden
+priorizar las clases de ``quality_of_service`` (véase qos.py).
+
 Autor: Sistema de Inventario Electrónico
 Fecha: 2024
 """
 
-import socket
-import threading
-import time
-import json
+import argparse
+import itertools
+import logging
 import random
-from datetime import datetime
 import sys
 import os
+import time
+from collections import deque
+
+# Raíz del proyecto para los módulos compartidos (comun/)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import trazas
+from comun.registro import configurar_registro
+from enlaces import DESCARTE_CAIDA, DESCARTE_COLA, PERDIDA, RedEnlaces
+from enrutamiento import TablaRutas
+from estadisticas_simulacion import HistogramaLatencia, SerieThroughput, exportar_csv
+from motor_eventos import MotorEventos
+from muestreo import MODOS_MUESTREO, FabricaFlujos
+from network_topology import NETWORK_TOPOLOGY, load_topology_from_file
+from qos import PLANIFICADORES, MetricasQoS, clase_de_prioridad, crear_disciplina
+
+logger = logging.getLogger('inventario.simulacion')
 
 # Configuración de la simulación
 SIMULATION_CONFIG = {
-    'duration': 60,  # Duración en segundos
-    'packet_loss_rate': 0.02,  # 2% de pérdida de paquetes
-    'latency_min': 10,  # Latencia mínima en ms
-    'latency_max': 50,  # Latencia máxima en ms
-    'bandwidth_limit': 1000,  # Límite de ancho de banda en KB/s
+    'duration': 60,  # Duración en segundos (tiempo virtual)
+    'link_queue_packets': 1000,  # Capacidad de la cola de cada sentido de un enlace
+    'link_scheduler': 'fifo',  # Disciplina de cola de los enlaces: fifo, prioridad o wfq
+    'load_multiplier': 1.0,  # Multiplica frequency_per_minute de cada patrón de tráfico
+    'sampling': 'escalar',  # Muestreo aleatorio: escalar o vectorizado (NumPy), mismo resultado
+    'message_size_bytes': 256,  # Tamaño de los mensajes sin payload_size_bytes (respuestas)
+    'stats_window': 10,  # Ancho inicial en segundos de las ventanas de throughput
+    'stats_max_windows': 1024,  # Ventanas retenidas (se fusionan por pares al llenarse)
+    'server_processing_min': 0.1,  # Tiempo de servicio del servidor en segundos
+    'server_processing_max': 0.5,
+    'monitor_interval': 10,  # Intervalo del monitor en segundos
+    'verbose': True,  # Registrar cada mensaje procesado (nivel DEBUG) y el monitor
+    'report_limit': 20,  # Nodos y enlaces listados en los informes (los más activos)
+    'routing_ecmp': True,  # Repartir los flujos entre caminos de igual latencia
+    'failures': [],  # Caídas programadas: (nodo o enlace, inicio, fin o None)
+}
+
+# Tipo de mensaje que genera cada patrón de tráfico de la topología (un patrón
+# puede indicarlo con su propio campo 'message_type')
+PATTERN_MESSAGE_TYPES = {
+    'product_creation': 'product_create',
+    'inventory_query': 'product_list',
+    'health_check': 'health_check',
+    'websocket_updates': 'inventory_update',
 }
 
-# Configuración de nodos
-NODES = {
-    'servidor': {
-        'id': 1,
-        'name': 'Servidor de Inventario',
-        'ip': '192.168.1.1',
-        'port': 5000,
-        'type': 'server',
-        'services': ['inventory_api', 'database', 'websocket']
-    },
-    'cliente': {
-        'id': 2,
-        'name': 'Cliente de Ingreso',
-        'ip': '192.168.1.2',
-        'port': 5001,
-        'type': 'client',
-        'services': ['data_input', 'websocket_client']
-    },
-    'switch': {
-        'id': 3,
-        'name': 'Switch/Balanceador',
-        'ip': '192.168.1.3',
-        'port': 5002,
-        'type': 'switch',
-        'services': ['load_balancer', 'proxy', 'health_check']
-    }
+# Evento de traza de cada motivo de pérdida de un canal
+EVENTO_DE_PERDIDA = {
+    PERDIDA: trazas.PERDIDA,
+    DESCARTE_COLA: trazas.DESCARTE_COLA,
+    DESCARTE_CAIDA: trazas.DESCARTE_CAIDA,
 }
 
-# Estadísticas de la simulación
+# Estadísticas de la simulación: totales agregados de los contadores de cada
+# nodo (NetworkSimulation.actualizar_totales) y resumen de latencia por salto
 simulation_stats = {
     'packets_sent': 0,
     'packets_received': 0,
     'packets_lost': 0,
-    'total_latency': 0,
+    'latency': {},
     'connections': 0,
     'errors': 0,
     'start_time': None,
@@ -71,81 +93,128 @@ simulation_stats = {
 class NetworkNode:
     """Representa un nodo en la red simulada"""
     
-    def __init__(self, node_id, config):
+    def __init__(self, node_id, config, simulacion=None):
         self.id = node_id
         self.config = config
         self.name = config['name']
-        self.ip = config['ip']
+        self.ip = config.get('ip_address', config.get('ip'))
         self.port = config['port']
         self.type = config['type']
-        self.services = config['services']
+        self.services = config.get('services', [])
+        self.simulacion = simulacion
         self.is_active = True
         self.connections = []
-        self.message_queue = []
+        self.message_queue = deque()
+        self.ocupado = False
         self.stats = {
             'messages_sent': 0,
             'messages_received': 0,
+            'messages_lost': 0,
             'bytes_sent': 0,
             'bytes_received': 0,
             'uptime': 0,
             'errors': 0
         }
         
-    def send_message(self, target_node, message_type, data):
-        """Envía un mensaje a otro nodo"""
+    def send_message(self, target_node, message_type, data, destination=None,
+                     priority=None, size=None, created=None, origin=None, message_id=None):
+        """
+        Envía un mensaje a un nodo vecino por el enlace que los une
+
+        Args:
+            target_node: Siguiente salto (debe haber un enlace directo)
+            message_type: Tipo de mensaje
+            data: Contenido del mensaje
+            destination: Nodo final si ``target_node`` solo reenvía
+            priority: Clase QoS del mensaje
+            size: Bytes en el cable (por defecto, message_size_bytes)
+            created: Instante de origen, para la latencia extremo a extremo
+            origin: Nodo que originó el mensaje si este nodo solo reenvía
+            message_id: Identificador del mensaje si este nodo solo reenvía
+        """
         if not self.is_active:
             return False
-            
-        # Simular latencia de red
-        latency = random.randint(SIMULATION_CONFIG['latency_min'], 
-                               SIMULATION_CONFIG['latency_max'])
         
-        # Simular pérdida de paquetes
-        if random.random() < SIMULATION_CONFIG['packet_loss_rate']:
-            simulation_stats['packets_lost'] += 1
+        motor = self.simulacion.motor
+        canal = self.simulacion.enlaces.canal(self.id, target_node.id)
+        if canal is None:
+            logger.warning("[%s] Sin enlace hacia %s", self.name, target_node.name)
             self.stats['errors'] += 1
             return False
         
         message = {
+            'id': next(self.simulacion.ids) if message_id is None else message_id,
             'from': self.id,
+            'origin': origin or self.id,
             'to': target_node.id,
+            'destination': destination or target_node.id,
             'type': message_type,
             'data': data,
-            'timestamp': datetime.now().isoformat(),
-            'latency': latency
+            'priority': priority,
+            'timestamp': motor.ahora,
+            'created': motor.ahora if created is None else created
         }
+        message['size'] = size or SIMULATION_CONFIG['message_size_bytes']
         
-        # Simular envío con latencia
-        def delayed_send():
-            time.sleep(latency / 1000.0)  # Convertir ms a segundos
-            target_node.receive_message(message)
-            
-        threading.Thread(target=delayed_send, daemon=True).start()
+        traza = self.simulacion.traza
+        if traza is not None:
+            traza.registrar(motor.ahora, trazas.ENVIO, message['id'], message_type, priority,
+                            self.id, target_node.id, message['destination'], message['size'],
+                            0.0, motor.ahora - message['created'])
+        
+        # La entrega la programa el canal: cola + transmisión + propagación
+        canal.transmitir(message, message['size'], target_node.receive_message,
+                         self._message_lost, priority)
         
         # Actualizar estadísticas
         self.stats['messages_sent'] += 1
-        self.stats['bytes_sent'] += len(json.dumps(message))
-        simulation_stats['packets_sent'] += 1
-        simulation_stats['total_latency'] += latency
+        self.stats['bytes_sent'] += message['size']
         
         return True
     
+    def _message_lost(self, message, motivo=PERDIDA):
+        """Un enlace perdió o descartó un mensaje enviado por este nodo"""
+        self.stats['messages_lost'] += 1
+        ahora = self.simulacion.motor.ahora
+        self.simulacion.throughput.registrar_perdida(ahora)
+        traza = self.simulacion.traza
+        if traza is not None:
+            traza.registrar(ahora, EVENTO_DE_PERDIDA[motivo], message['id'], message['type'],
+                            message['priority'], message['from'], message['to'],
+                            message['destination'], message['size'],
+                            ahora - message['timestamp'], ahora - message['created'])
+    
     def receive_message(self, message):
         """Recibe un mensaje de otro nodo"""
         if not self.is_active:
+            # Llegó por el cable a un nodo caído: se pierde
+            self.simulacion.nodes[message['from']]._message_lost(message, DESCARTE_CAIDA)
             return
             
         self.message_queue.append(message)
         self.stats['messages_received'] += 1
-        self.stats['bytes_received'] += len(json.dumps(message))
-        simulation_stats['packets_received'] += 1
+        self.stats['bytes_received'] += message['size']
+        # Latencia del salto: espera en cola + transmisión + propagación
+        ahora = self.simulacion.motor.ahora
+        self.simulacion.latencia_salto.registrar((ahora - message['timestamp']) * 1000)
+        traza = self.simulacion.traza
+        if traza is not None:
+            traza.registrar(ahora, trazas.RECEPCION, message['id'], message['type'],
+                            message['priority'], message['from'], self.id,
+                            message['destination'], message['size'],
+                            ahora - message['timestamp'], ahora - message['created'])
+        if message['destination'] == self.id:
+            self.simulacion.registrar_entrega(message)
         
         # Procesar mensaje según el tipo de nodo
         self.process_message(message)
+        if self.simulacion is not None:
+            self.simulacion.mensaje_en_cola(self)
     
     def process_message(self, message):
         """Procesa un mensaje recibido según el tipo de nodo"""
-        msg_type = message['type']
+        if not SIMULATION_CONFIG['verbose'] or not logger.isEnabledFor(logging.DEBUG):
+            return
         
         if self.type == 'server':
             self._process_server_message(message)
@@ -160,25 +229,25 @@ class NetworkNode:
         
         if msg_type == 'product_create':
             # Simular creación de producto
-            print(f"[{self.name}] Creando producto: {message['data']['nombre']}")
+            logger.debug("[%s] Creando producto: %s", self.name, message['data']['nombre'])
             
         elif msg_type == 'product_list':
             # Simular listado de productos
-            print(f"[{self.name}] Enviando lista de productos")
+            logger.debug("[%s] Enviando lista de productos", self.name)
             
         elif msg_type == 'health_check':
             # Responder health check
-            print(f"[{self.name}] Health check recibido")
+            logger.debug("[%s] Health check recibido", self.name)
     
     def _process_client_message(self, message):
         """Procesa mensajes del cliente"""
         msg_type = message['type']
         
         if msg_type == 'product_response':
-            print(f"[{self.name}] Producto procesado correctamente")
+            logger.debug("[%s] Producto procesado correctamente", self.name)
             
         elif msg_type == 'server_status':
-            print(f"[{self.name}] Estado del servidor recibido")
+            logger.debug("[%s] Estado del servidor recibido", self.name)
     
     def _process_switch_message(self, message):
         """Procesa mensajes del switch"""
@@ -186,154 +255,382 @@ class NetworkNode:
         
         if msg_type == 'route_request':
             # Simular enrutamiento
-            print(f"[{self.name}] Enrutando petición a servidor")
+            logger.debug("[%s] Enrutando petición a servidor", self.name)
             
         elif msg_type == 'load_balance':
-            print(f"[{self.name}] Balanceando carga entre servidores")
+            logger.debug("[%s] Balanceando carga entre servidores", self.name)
 
 class NetworkSimulation:
-    """Simulador de red principal"""
+    """
+    Simulador de red principal
+    
+    Funciona sobre un motor de eventos discretos: la actividad de cada nodo
+    son eventos que se reprograman a sí mismos en el reloj virtual, por lo que
+    la duración simulada no depende del tiempo real (salvo con ``tiempo_real``).
+    """
     
-    def __init__(self):
+    def __init__(self, semilla=None, tiempo_real=False, topologia=None, traza=None,
+                 reproducir=None):
+        """
+        Args:
+            semilla: Semilla para que la ejecución sea reproducible
+            tiempo_real: Si True, la simulación avanza al ritmo del reloj de pared
+            topologia: Topología con ``nodes`` y ``links`` (por defecto NETWORK_TOPOLOGY)
+            traza: Archivo donde grabar la traza binaria de la ejecución (trazas.py)
+            reproducir: Traza cuyas generaciones de mensajes sustituyen a las
+                llegadas aleatorias de los patrones
+        """
+        self.topologia = topologia or NETWORK_TOPOLOGY
+        self.semilla = semilla
         self.nodes = {}
         self.running = False
         self.start_time = None
+        self.motor = MotorEventos(semilla)
+        self.tiempo_real = tiempo_real
+        self.tiempo_ejecucion = 0.0
+        # Cada fuente aleatoria (llegadas de un patrón, pérdidas de un canal) tiene
+        # su propio flujo; así el modo vectorizado reproduce el escalar
+        self.flujos = FabricaFlujos(self.motor.random.getrandbits(64), SIMULATION_CONFIG['sampling'])
+        self.random_datos = random.Random(f'{self.flujos.semilla_base}/datos')
         
-        # Crear nodos
-        for node_id, config in NODES.items():
-            self.nodes[node_id] = NetworkNode(node_id, config)
+        # Reiniciar estadísticas globales
+        simulation_stats.update({
+            'packets_sent': 0, 'packets_received': 0, 'packets_lost': 0,
+            'latency': {}, 'connections': 0, 'errors': 0,
+            'start_time': None, 'node_stats': {}
+        })
+        
+        # Histogramas y serie de memoria acotada (estadisticas_simulacion.py)
+        self.latencia_salto = HistogramaLatencia()
+        self.latencia_extremo = HistogramaLatencia()
+        self.throughput = SerieThroughput(SIMULATION_CONFIG['stats_window'],
+                                          SIMULATION_CONFIG['stats_max_windows'])
+        
+        # Crear nodos y enlaces de la topología
+        for node_id, config in self.topologia['nodes'].items():
+            self.nodes[node_id] = NetworkNode(node_id, config, self)
             simulation_stats['node_stats'][node_id] = self.nodes[node_id].stats
+        self.qos = self.topologia.get('quality_of_service', {})
+        planificador = SIMULATION_CONFIG['link_scheduler']
+        if planificador != 'fifo' and not self.qos:
+            raise ValueError(f"El planificador '{planificador}' necesita quality_of_service en la topología")
+        self.enlaces = RedEnlaces(self.motor, self.topologia['links'],
+                                  SIMULATION_CONFIG['link_queue_packets'],
+                                  crear_disciplina(planificador, self.qos), self.flujos)
+        self.metricas_qos = MetricasQoS(self.qos)
+        
+        # Traza binaria de la ejecución y traza a reproducir
+        self.ids = itertools.count()
+        self.traza = None
+        self.reproduccion = trazas.LectorTraza(reproducir) if reproducir else None
+        self.reproducidos = self.omitidos = 0
+        if traza:
+            self.traza = trazas.EscritorTraza(traza, self.nodes, self.qos, {
+                'topologia': self.topologia['metadata']['name'],
+                'semilla': semilla,
+                'duracion': SIMULATION_CONFIG['duration'],
+                'planificador': SIMULATION_CONFIG['link_scheduler'],
+                'carga': SIMULATION_CONFIG['load_multiplier'],
+                'muestreo': SIMULATION_CONFIG['sampling'],
+                'fallos': SIMULATION_CONFIG['failures'],
+                'reproduce': reproducir,
+            })
+        
+        # Siguiente salto hacia cada destino (Dijkstra sobre la latencia de los enlaces)
+        self.rutas = TablaRutas(self.topologia['nodes'], self.topologia['links'],
+                                SIMULATION_CONFIG['routing_ecmp'])
+        self.caidas = []
+    
+    def fallar(self, elemento):
+        """Cae un nodo o un enlace de la topología y recalcula las rutas afectadas"""
+        if elemento in self.nodes:
+            nodo = self.nodes[elemento]
+            nodo.is_active = False
+            nodo.message_queue.clear()
+            for enlace_id in self.rutas.incidentes[elemento]:
+                self.enlaces.fallar(enlace_id)
+            recalculadas = self.rutas.fallar_nodo(elemento)
+        else:
+            self.enlaces.fallar(elemento)
+            recalculadas = self.rutas.fallar_enlace(elemento)
+        self.caidas.append((self.motor.ahora, 'cae', elemento, recalculadas))
+        print(f"[{self.motor.ahora:.1f}s] Cae {elemento}: {recalculadas} tablas de rutas recalculadas")
+    
+    def restaurar(self, elemento):
+        """Devuelve al servicio un nodo o enlace caído"""
+        if elemento in self.nodes:
+            self.nodes[elemento].is_active = True
+            for enlace_id in self.rutas.incidentes[elemento]:
+                a, b, _ = self.rutas.enlaces[enlace_id]
+                vecino = b if a == elemento else a
+                if enlace_id not in self.rutas.enlaces_caidos and vecino not in self.rutas.nodos_caidos:
+                    self.enlaces.restaurar(enlace_id)
+            recalculadas = self.rutas.restaurar_nodo(elemento)
+        else:
+            a, b, _ = self.rutas.enlaces[elemento]
+            if a not in self.rutas.nodos_caidos and b not in self.rutas.nodos_caidos:
+                self.enlaces.restaurar(elemento)
+            recalculadas = self.rutas.restaurar_enlace(elemento)
+        self.caidas.append((self.motor.ahora, 'vuelve', elemento, recalculadas))
+        print(f"[{self.motor.ahora:.1f}s] Vuelve {elemento}: {recalculadas} tablas de rutas recalculadas")
+    
+    def _mas_activos(self, elementos, clave):
+        """Los ``report_limit`` elementos con mayor ``clave`` (todos si son pocos)"""
+        limite = SIMULATION_CONFIG['report_limit']
+        if len(elementos) <= limite:
+            return elementos
+        return sorted(elementos, key=clave, reverse=True)[:limite]
     
     def start_simulation(self):
         """Inicia la simulación"""
         print("=== Iniciando Simulación de Red del Sistema de Inventario ===")
-        print(f"Duración: {SIMULATION_CONFIG['duration']} segundos")
-        print(f"Pérdida de paquetes: {SIMULATION_CONFIG['packet_loss_rate']*100}%")
-        print(f"Latencia: {SIMULATION_CONFIG['latency_min']}-{SIMULATION_CONFIG['latency_max']} ms")
+        print(f"Duración: {SIMULATION_CONFIG['duration']} segundos (virtuales)")
+        print(f"Topología: {self.topologia['metadata']['name']}")
+        print(f"Nodos: {len(self.nodes)} | Enlaces: {len(self.topologia['links'])}")
+        for link in list(self.topologia['links'].values())[:SIMULATION_CONFIG['report_limit']]:
+            print(f"  {link['source']} <-> {link['target']}: {link['bandwidth_mbps']} Mbps, "
+                  f"{link['latency_ms']} ms, pérdida {link['packet_loss_rate']*100:g}%")
+        print(f"Planificador de enlaces: {SIMULATION_CONFIG['link_scheduler']} | "
+              f"Carga: x{SIMULATION_CONFIG['load_multiplier']:g}")
         print("=" * 60)
         
         self.running = True
-        self.start_time = datetime.now()
+        self.start_time = self.motor.ahora
         simulation_stats['start_time'] = self.start_time
         
-        # Iniciar hilos de simulación
-        threads = [
-            threading.Thread(target=self._simulate_client_activity, daemon=True),
-            threading.Thread(target=self._simulate_server_activity, daemon=True),
-            threading.Thread(target=self._simulate_switch_activity, daemon=True),
-            threading.Thread(target=self._monitor_network, daemon=True)
-        ]
-        
-        for thread in threads:
-            thread.start()
+        # Programar la primera llegada de cada patrón de tráfico (o de la traza)
+        if self.reproduccion is not None:
+            print(f"Reproduciendo las llegadas de {self.reproduccion.ruta}")
+            self._programar_reproduccion(self.reproduccion.iterar())
+        else:
+            for pattern_id, pattern in self.topologia.get('traffic_patterns', {}).items():
+                tasa = pattern['frequency_per_minute'] / 60 * SIMULATION_CONFIG['load_multiplier']
+                if tasa > 0:
+                    llegadas = self.flujos.crear(f'llegadas/{pattern_id}')
+                    self.motor.programar(llegadas.exponencial(tasa), self._generate_pattern_message,
+                                         pattern_id, pattern, tasa, llegadas)
+        self.motor.programar(0, self._monitor_network)
+        for elemento, inicio, fin in SIMULATION_CONFIG['failures']:
+            if elemento not in self.nodes and elemento not in self.topologia['links']:
+                raise ValueError(f"Caída programada de un elemento desconocido: {elemento}")
+            self.motor.programar(inicio, self.fallar, elemento)
+            if fin is not None:
+                self.motor.programar(fin, self.restaurar, elemento)
         
         # Ejecutar simulación por el tiempo especificado
-        time.sleep(SIMULATION_CONFIG['duration'])
+        inicio = time.perf_counter()
+        self.motor.ejecutar(hasta=SIMULATION_CONFIG['duration'], tiempo_real=self.tiempo_real)
+        self.tiempo_ejecucion = time.perf_counter() - inicio
         
         self.stop_simulation()
     
-    def _simulate_client_activity(self):
-        """Simula actividad del cliente"""
-        cliente = self.nodes['cliente']
-        servidor = self.nodes['servidor']
-        switch = self.nodes['switch']
-        
-        while self.running:
-            # Simular creación de productos
-            if random.random() < 0.3:  # 30% probabilidad cada ciclo
-                producto_data = {
-                    'nombre': f'Producto_{random.randint(1000, 9999)}',
-                    'cantidad': random.randint(1, 100),
-                    'precio': round(random.uniform(10.0, 1000.0), 2),
-                    'categoria': random.choice(['Electrónicos', 'Computadoras', 'Accesorios'])
-                }
-                
-                # Enviar a través del switch
-                cliente.send_message(switch, 'product_create', producto_data)
-            
-            # Simular consulta de productos
-            if random.random() < 0.2:  # 20% probabilidad
-                cliente.send_message(switch, 'product_list', {})
-            
-            time.sleep(random.uniform(2, 5))  # Esperar entre 2-5 segundos
-    
-    def _simulate_server_activity(self):
-        """Simula actividad del servidor"""
-        servidor = self.nodes['servidor']
-        cliente = self.nodes['cliente']
-        
-        while self.running:
-            # Procesar mensajes en cola
-            if servidor.message_queue:
-                message = servidor.message_queue.pop(0)
-                
-                # Simular procesamiento
-                time.sleep(random.uniform(0.1, 0.5))
-                
-                # Responder al cliente
-                if message['type'] == 'product_create':
-                    response_data = {
-                        'success': True,
-                        'product_id': random.randint(1, 1000),
-                        'message': 'Producto creado exitosamente'
-                    }
-                    servidor.send_message(cliente, 'product_response', response_data)
-            
-            time.sleep(0.5)
-    
-    def _simulate_switch_activity(self):
-        """Simula actividad del switch"""
-        switch = self.nodes['switch']
-        servidor = self.nodes['servidor']
-        
-        while self.running:
-            # Procesar mensajes en cola del switch
-            if switch.message_queue:
-                message = switch.message_queue.pop(0)
-                
-                # Reenviar al servidor apropiado
-                if message['type'] in ['product_create', 'product_list']:
-                    switch.send_message(servidor, message['type'], message['data'])
-            
-            # Simular health checks
-            if random.random() < 0.1:  # 10% probabilidad
-                switch.send_message(servidor, 'health_check', {})
-            
-            time.sleep(1)
+    def mensaje_en_cola(self, nodo):
+        """Reacciona a un mensaje recién encolado en ``nodo``"""
+        if nodo.type == 'server':
+            self._simulate_server_activity(nodo)
+        elif nodo.type == 'switch':
+            self._forward_switch_messages(nodo)
+        else:
+            nodo.message_queue.clear()
+    
+    def _generate_pattern_message(self, pattern_id, pattern, tasa, llegadas):
+        """Genera un mensaje de un patrón de tráfico y programa la siguiente llegada"""
+        if not self.running:
+            return
+        origen = self.nodes[pattern['source']]
+        destino = pattern['destination']
+        message_type = pattern.get('message_type') or PATTERN_MESSAGE_TYPES.get(pattern_id, pattern_id)
+        
+        data = {}
+        if message_type == 'product_create' and SIMULATION_CONFIG['verbose']:
+            # Solo se imprime: no se genera en modo silencioso
+            rnd = self.random_datos
+            data = {
+                'nombre': f'Producto_{rnd.randint(1000, 9999)}',
+                'cantidad': rnd.randint(1, 100),
+                'precio': round(rnd.uniform(10.0, 1000.0), 2),
+                'categoria': rnd.choice(['Electrónicos', 'Computadoras', 'Accesorios'])
+            }
+        
+        priority = clase_de_prioridad(pattern.get('priority', 'medium'), self.qos) if self.qos else None
+        self._emitir(origen, destino, message_type, data, priority, pattern['payload_size_bytes'])
+        
+        # Llegadas de Poisson: tiempo entre mensajes exponencial
+        self.motor.programar(llegadas.exponencial(tasa), self._generate_pattern_message,
+                             pattern_id, pattern, tasa, llegadas)
+    
+    def _emitir(self, origen, destino, message_type, data, priority, size):
+        """Origina un mensaje en ``origen`` y lo envía al primer salto de su ruta"""
+        message_id = next(self.ids)
+        ahora = self.motor.ahora
+        if self.traza is not None:
+            self.traza.registrar(ahora, trazas.GENERACION, message_id, message_type, priority,
+                                 origen.id, origen.id, destino, size)
+        siguiente = self.rutas.siguiente_salto(origen.id, destino)
+        if siguiente is None:
+            if origen.is_active:
+                origen.stats['errors'] += 1
+                if self.traza is not None:
+                    self.traza.registrar(ahora, trazas.SIN_RUTA, message_id, message_type, priority,
+                                         origen.id, origen.id, destino, size)
+        else:
+            origen.send_message(self.nodes[siguiente], message_type, data, destino, priority,
+                                size, message_id=message_id)
+    
+    def _programar_reproduccion(self, registros):
+        """Programa la siguiente generación de mensajes de la traza reproducida"""
+        for registro in registros:
+            if registro[4] == trazas.GENERACION:
+                self.motor.programar_en(max(registro[0], self.motor.ahora), self._reproducir,
+                                        registro, registros)
+                return
+    
+    def _reproducir(self, registro, registros):
+        """Vuelve a originar un mensaje grabado en la traza"""
+        if not self.running:
+            return
+        lector = self.reproduccion
+        origen = self.nodes.get(lector.nodo(registro[7]))
+        destino = lector.nodo(registro[9])
+        if origen is None or destino not in self.nodes:
+            # La topología actual no tiene esos nodos
+            self.omitidos += 1
+        else:
+            clase = lector.clase(registro[5])
+            self._emitir(origen, destino, lector.tipo(registro[6]), {},
+                         clase if clase in self.qos else None, registro[10])
+            self.reproducidos += 1
+        self._programar_reproduccion(registros)
+    
+    def registrar_entrega(self, message):
+        """Un mensaje llegó a su destino final: latencia extremo a extremo y throughput"""
+        latencia = (self.motor.ahora - message['created']) * 1000
+        self.latencia_extremo.registrar(latencia)
+        self.throughput.registrar_entrega(self.motor.ahora, message['size'])
+        if message['priority'] is not None:
+            self.metricas_qos.registrar(message['priority'], latencia)
+    
+    def actualizar_totales(self):
+        """Suma en ``simulation_stats`` los contadores de cada nodo"""
+        enviados = recibidos = perdidos = errores = 0
+        for node in self.nodes.values():
+            enviados += node.stats['messages_sent']
+            recibidos += node.stats['messages_received']
+            perdidos += node.stats['messages_lost']
+            errores += node.stats['errors']
+        simulation_stats.update({
+            'packets_sent': enviados, 'packets_received': recibidos,
+            'packets_lost': perdidos, 'errors': errores,
+            'latency': self.latencia_salto.resumen(),
+        })
+        return simulation_stats
+    
+    def _simulate_server_activity(self, servidor):
+        """Atiende la cola del servidor, un mensaje a la vez"""
+        if servidor.ocupado or not servidor.message_queue:
+            return
+        message = servidor.message_queue.popleft()
+        servidor.ocupado = True
+        
+        # Simular procesamiento
+        servicio = self.motor.random.uniform(SIMULATION_CONFIG['server_processing_min'],
+                                             SIMULATION_CONFIG['server_processing_max'])
+        self.motor.programar(servicio, self._finish_server_processing, servidor, message)
+    
+    def _finish_server_processing(self, servidor, message):
+        """Fin del procesamiento de un mensaje en el servidor"""
+        servidor.ocupado = False
+        
+        # Responder al cliente que originó la petición
+        if self.running and servidor.is_active and message['type'] == 'product_create':
+            response_data = {
+                'success': True,
+                'product_id': self.motor.random.randint(1, 1000),
+                'message': 'Producto creado exitosamente'
+            }
+            siguiente = self.rutas.siguiente_salto(servidor.id, message['origin'])
+            if siguiente is None:
+                servidor.stats['errors'] += 1
+                if self.traza is not None:
+                    self.traza.registrar(self.motor.ahora, trazas.SIN_RUTA, next(self.ids),
+                                         'product_response', message['priority'], servidor.id,
+                                         servidor.id, message['origin'],
+                                         SIMULATION_CONFIG['message_size_bytes'])
+            else:
+                servidor.send_message(self.nodes[siguiente], 'product_response', response_data,
+                                      message['origin'], message['priority'])
+        
+        self._simulate_server_activity(servidor)
+    
+    def _forward_switch_messages(self, switch):
+        """Reenvía cada mensaje encolado en el switch hacia su destino final"""
+        while switch.message_queue:
+            message = switch.message_queue.popleft()
+            destino = message['destination']
+            if destino == switch.id or destino not in self.nodes:
+                continue
+            siguiente = self.rutas.siguiente_salto(switch.id, destino, message['origin'])
+            if siguiente is None:
+                switch.stats['errors'] += 1
+                if self.traza is not None:
+                    ahora = self.motor.ahora
+                    self.traza.registrar(ahora, trazas.SIN_RUTA, message['id'], message['type'],
+                                         message['priority'], switch.id, switch.id, destino,
+                                         message['size'], 0.0, ahora - message['created'])
+                continue
+            switch.send_message(self.nodes[siguiente], message['type'], message['data'], destino,
+                                priority=message['priority'], size=message['size'],
+                                created=message['created'], origin=message['origin'],
+                                message_id=message['id'])
     
     def _monitor_network(self):
         """Monitorea el estado de la red"""
-        while self.running:
-            elapsed = (datetime.now() - self.start_time).total_seconds()
+        if not self.running:
+            return
+        if SIMULATION_CONFIG['verbose']:
+            elapsed = self.motor.ahora - self.start_time
+            totales = self.actualizar_totales()
             
             print(f"\n[{elapsed:.1f}s] Estado de la Red:")
-            print(f"  Paquetes enviados: {simulation_stats['packets_sent']}")
-            print(f"  Paquetes recibidos: {simulation_stats['packets_received']}")
-            print(f"  Paquetes perdidos: {simulation_stats['packets_lost']}")
+            print(f"  Paquetes enviados: {totales['packets_sent']}")
+            print(f"  Paquetes recibidos: {totales['packets_received']}")
+            print(f"  Paquetes perdidos: {totales['packets_lost']}")
             
-            if simulation_stats['packets_received'] > 0:
-                avg_latency = simulation_stats['total_latency'] / simulation_stats['packets_received']
-                print(f"  Latencia promedio: {avg_latency:.1f} ms")
+            if self.latencia_salto.conteo:
+                print(f"  Latencia por salto: {self._formato_latencia(totales['latency'])}")
             
             # Estado de nodos
-            for node_id, node in self.nodes.items():
+            for node in self._mas_activos(list(self.nodes.values()),
+                                          lambda n: n.stats['messages_sent']):
                 print(f"  {node.name}: {node.stats['messages_sent']} enviados, "
                       f"{node.stats['messages_received']} recibidos")
-            
-            time.sleep(10)  # Actualizar cada 10 segundos
+        
+        self.motor.programar(SIMULATION_CONFIG['monitor_interval'], self._monitor_network)
     
     def stop_simulation(self):
         """Detiene la simulación"""
         self.running = False
+        self.motor.detener()
+        self.actualizar_totales()
         print("\n" + "=" * 60)
         print("=== Simulación Completada ===")
         self._print_final_stats()
+        if self.reproduccion is not None:
+            print(f"\nMensajes reproducidos de {self.reproduccion.ruta}: {self.reproducidos}"
+                  f" ({self.omitidos} omitidos por nodos ausentes en la topología)")
+            self.reproduccion.cerrar()
+        if self.traza is not None:
+            self.traza.cerrar()
+            print(f"\nTraza guardada en {self.traza.ruta}: {self.traza.registros} eventos "
+                  f"({os.path.getsize(self.traza.ruta) / 1e6:.1f} MB)")
     
     def _print_final_stats(self):
         """Imprime estadísticas finales"""
-        elapsed = (datetime.now() - self.start_time).total_seconds()
+        elapsed = self.motor.ahora - self.start_time
         
-        print(f"\nDuración total: {elapsed:.1f} segundos")
+        print(f"\nDuración simulada: {elapsed:.1f} segundos")
+        print(f"Tiempo de ejecución: {self.tiempo_ejecucion:.3f} segundos "
+              f"({self.motor.eventos_procesados} eventos)")
         print(f"Paquetes totales enviados: {simulation_stats['packets_sent']}")
         print(f"Paquetes totales recibidos: {simulation_stats['packets_received']}")
         print(f"Paquetes perdidos: {simulation_stats['packets_lost']}")
@@ -342,30 +639,163 @@ class NetworkSimulation:
             loss_rate = (simulation_stats['packets_lost'] / simulation_stats['packets_sent']) * 100
             print(f"Tasa de pérdida real: {loss_rate:.2f}%")
         
-        if simulation_stats['packets_received'] > 0:
-            avg_latency = simulation_stats['total_latency'] / simulation_stats['packets_received']
-            print(f"Latencia promedio: {avg_latency:.1f} ms")
+        if self.latencia_salto.conteo:
+            print(f"Latencia por salto: {self._formato_latencia(simulation_stats['latency'])}")
+        if self.latencia_extremo.conteo:
+            print(f"Latencia extremo a extremo: {self._formato_latencia(self.latencia_extremo.resumen())}")
+        
+        ventanas = list(self.throughput.filas(elapsed))
+        if ventanas:
+            pico = max(ventanas, key=lambda v: v[5])
+            print(f"Throughput: {self.latencia_extremo.conteo / elapsed:.2f} mensajes/s de media, "
+                  f"pico {pico[5]:.2f} mensajes/s en [{pico[0]:g}, {pico[1]:g}) s "
+                  f"(ventanas de {self.throughput.ventana_s:g} s)")
         
         print("\nEstadísticas por nodo:")
-        for node_id, node in self.nodes.items():
+        for node in self._mas_activos(list(self.nodes.values()),
+                                      lambda n: n.stats['messages_sent']):
             stats = node.stats
             print(f"\n{node.name} ({node.ip}:{node.port}):")
             print(f"  Mensajes enviados: {stats['messages_sent']}")
             print(f"  Mensajes recibidos: {stats['messages_received']}")
             print(f"  Bytes enviados: {stats['bytes_sent']}")
             print(f"  Bytes recibidos: {stats['bytes_received']}")
+            print(f"  Mensajes perdidos en enlaces: {stats['messages_lost']}")
             print(f"  Errores: {stats['errors']}")
             print(f"  Servicios: {', '.join(node.services)}")
+        
+        self._print_link_stats(elapsed)
+        self._print_routing_stats()
+        self._print_qos_stats()
+    
+    @staticmethod
+    def _formato_latencia(resumen):
+        return (f"p50 {resumen['p50']:.2f} / p95 {resumen['p95']:.2f} / p99 {resumen['p99']:.2f} / "
+                f"máx. {resumen['max']:.2f} ms (media {resumen['media']:.2f} ms)")
+    
+    def exportar(self, prefijo):
+        """Exporta a CSV los histogramas de latencia y la serie de throughput"""
+        histogramas = {'salto': self.latencia_salto, 'extremo_a_extremo': self.latencia_extremo}
+        histogramas.update(self.metricas_qos.latencias)
+        rutas = exportar_csv(prefijo, histogramas, self.throughput, self.motor.ahora - self.start_time)
+        print(f"Estadísticas exportadas: {', '.join(rutas)}")
+        return rutas
+    
+    def _print_routing_stats(self):
+        """Imprime el tamaño de las tablas de rutas y las caídas de la ejecución"""
+        rutas = self.rutas
+        print(f"\nEnrutamiento: {len(rutas.tablas)} tablas de destino, "
+              f"{sum(len(t) for t in rutas.tablas.values())} entradas, "
+              f"{rutas.recalculos} recálculos incrementales")
+        for instante, suceso, elemento, recalculadas in self.caidas:
+            print(f"  [{instante:.1f}s] {elemento} {suceso} ({recalculadas} tablas de rutas recalculadas)")
+    
+    def _print_link_stats(self, elapsed):
+        """Imprime utilización y retardo de cola de cada sentido de cada enlace"""
+        resumen = self.enlaces.resumen(elapsed)
+        print("\nEstadísticas por enlace:")
+        for canal in self._mas_activos(resumen, lambda c: c['utilizacion']):
+            print(f"\n{canal['enlace']} ({canal['sentido']}):")
+            print(f"  Paquetes: {canal['paquetes']} ({canal['bytes']} bytes)")
+            print(f"  Utilización: {canal['utilizacion']*100:.3f}%")
+            print(f"  Espera en cola: media {canal['espera_media_ms']:.3f} ms, "
+                  f"máxima {canal['espera_max_ms']:.3f} ms (cola máx. {canal['cola_max']})")
+            print(f"  Perdidos: {canal['perdidos']} | Descartados por cola llena: "
+                  f"{canal['descartados_cola']} | Por caída: {canal['descartados_caida']}")
+        
+        usados = [c for c in resumen if c['paquetes']]
+        if usados:
+            cuello = max(usados, key=lambda c: c['utilizacion'])
+            print(f"\nEnlace más cargado: {cuello['enlace']} ({cuello['sentido']}) "
+                  f"al {cuello['utilizacion']*100:.3f}%")
+
+    def _print_qos_stats(self):
+        """Imprime latencia y jitter extremo a extremo por clase frente a su SLA"""
+        if not self.qos:
+            return
+        print(f"\nCalidad de servicio por clase (planificador {SIMULATION_CONFIG['link_scheduler']}):")
+        for clase, r in self.metricas_qos.resumen().items():
+            lat, jit = r['latencia_ms'], r['jitter_ms']
+            print(f"\n{clase}: {r['entregados']} mensajes entregados")
+            print(f"  Latencia p50/p95/p99: {lat['p50']:.2f} / {lat['p95']:.2f} / {lat['p99']:.2f} ms "
+                  f"(máx. {r['max_latency_ms']} ms, {r['violaciones_latencia']} violaciones)")
+            print(f"  Jitter p50/p95/p99: {jit['p50']:.2f} / {jit['p95']:.2f} / {jit['p99']:.2f} ms "
+                  f"(máx. {r['max_jitter_ms']} ms, {r['violaciones_jitter']} violaciones)")
+
+def _parse_fallo(texto):
+    """'elemento:inicio[:fin]' -> (elemento, inicio, fin o None)"""
+    partes = texto.split(':')
+    if len(partes) not in (2, 3):
+        raise ValueError(texto)
+    fin = float(partes[2]) if len(partes) == 3 else None
+    return partes[0], float(partes[1]), fin
 
 def main():
     """Función principal"""
+    parser = argparse.ArgumentParser(description='Simulación de red del inventario')
+    parser.add_argument('--duracion', type=float, default=SIMULATION_CONFIG['duration'],
+                        help='Segundos de tiempo virtual a simular')
+    parser.add_argument('--semilla', type=int, default=None, help='Semilla reproducible')
+    parser.add_argument('--tiempo-real', action='store_true',
+                        help='Avanzar al ritmo del reloj de pared (demostración)')
+    parser.add_argument('--silencioso', action='store_true',
+                        help='No imprimir cada mensaje ni el monitor periódico')
+    parser.add_argument('--planificador', choices=PLANIFICADORES,
+                        default=SIMULATION_CONFIG['link_scheduler'],
+                        help='Disciplina de cola de los enlaces')
+    parser.add_argument('--muestreo', choices=MODOS_MUESTREO, default=SIMULATION_CONFIG['sampling'],
+                        help='vectorizado: genera las muestras aleatorias por bloques con NumPy')
+    parser.add_argument('--topologia', metavar='ARCHIVO', default=None,
+                        help='Topología JSON (p. ej. de generador_topologias.py)')
+    parser.add_argument('--fallo', action='append', default=[], metavar='ELEMENTO:INICIO[:FIN]',
+                        help='Cae un nodo o enlace en INICIO (s) y lo restaura en FIN (repetible)')
+    parser.add_argument('--traza', metavar='ARCHIVO', default=None,
+                        help='Grabar cada envío, recepción y pérdida en una traza binaria')
+    parser.add_argument('--reproducir', metavar='ARCHIVO', default=None,
+                        help='Usar las llegadas de una traza en lugar de las de los patrones')
+    parser.add_argument('--exportar', metavar='PREFIJO', default=None,
+                        help='Exportar histogramas y throughput a PREFIJO_*.csv')
+    parser.add_argument('--carga', type=float, default=SIMULATION_CONFIG['load_multiplier'],
+                        help='Multiplicador de la frecuencia de los patrones de tráfico')
+    args = parser.parse_args()
+    SIMULATION_CONFIG['duration'] = args.duracion
+    SIMULATION_CONFIG['verbose'] = not args.silencioso
+    SIMULATION_CONFIG['link_scheduler'] = args.planificador
+    SIMULATION_CONFIG['load_multiplier'] = args.carga
+    SIMULATION_CONFIG['sampling'] = args.muestreo
+    configurar_registro('simulacion')
+    if SIMULATION_CONFIG['verbose']:
+        # La traza de --verbose es la salida del programa: directa a stdout, sin pasar
+        # por la cola ni por el filtro de repetidos del registro (que la recortarían)
+        salida = logging.StreamHandler(sys.stdout)
+        salida.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(salida)
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+    else:
+        # Solo los avisos, por el registro asíncrono (comun/registro.py)
+        logger.setLevel(logging.INFO)
+    try:
+        SIMULATION_CONFIG['failures'] = [_parse_fallo(fallo) for fallo in args.fallo]
+    except ValueError:
+        print("Formato de --fallo: ELEMENTO:INICIO[:FIN], p. ej. switch_balanceador:60:120")
+        return 1
+    
     print("Sistema de Simulación de Red - Inventario Electrónico")
-    print("Simulando topología de 3 máquinas con comunicación TCP/IP")
+    if not args.topologia:
+        print("Simulando topología de 3 máquinas con comunicación TCP/IP")
     
     try:
         # Crear y ejecutar simulación
-        simulation = NetworkSimulation()
+        topologia = load_topology_from_file(args.topologia) if args.topologia else None
+        if args.topologia and topologia is None:
+            return 1
+        simulation = NetworkSimulation(semilla=args.semilla, tiempo_real=args.tiempo_real,
+                                       topologia=topologia, traza=args.traza,
+                                       reproducir=args.reproducir)
         simulation.start_simulation()
+        if args.exportar:
+            simulation.exportar(args.exportar)
         
     except KeyboardInterrupt:
         print("\nSimulación interrumpida por el usuario")
@@ -377,4 +807,3 @@ def main():
 
 if __name__ == "__main__":
     sys.exit(main())
-
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Flujos Aleatorios de la Simulación (escalar y vectorizado)
+Cada fuente de aleatoriedad (llegadas de un patrón, pérdidas de un canal)
+tiene su propio flujo, derivado de la semilla de la simulación. El modo
+escalar saca cada muestra de ``random.Random``; el vectorizado genera bloques
+con NumPy copiando el estado MT19937 del mismo ``random.Random``, así que
+produce exactamente los mismos números y la simulación da el mismo resultado
+en ambos modos para una semilla dada.
+
+Las exponenciales se calculan con ``math.log`` en los dos modos: el ``log``
+vectorizado de NumPy puede diferir en el último bit y romper la igualdad.
+
+Autor: Sistema de Inventario Electrónico
+"""
+
+import math
+import random
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MODOS_MUESTREO = ('escalar', 'vectorizado')
+
+
+class FlujoEscalar:
+    """Flujo muestra a muestra sobre ``random.Random``"""
+
+    def __init__(self, rnd: random.Random):
+        self.uniforme = rnd.random
+
+    def exponencial(self, tasa: float) -> float:
+        """Tiempo entre llegadas de un proceso de Poisson de ``tasa`` por segundo"""
+        return -math.log(1.0 - self.uniforme()) / tasa
+
+    def bernoulli(self, p: float) -> bool:
+        """True con probabilidad ``p``"""
+        return self.uniforme() < p
+
+
+class FlujoVectorizado(FlujoEscalar):
+    """
+    Mismo flujo que FlujoEscalar, generado por bloques con NumPy
+
+    ``bernoulli`` decide un bloque entero con una sola comparación vectorial,
+    por lo que un flujo debe usar siempre la misma ``p`` (un flujo por canal).
+    """
+
+    def __init__(self, rnd: random.Random, bloque: int = 65536):
+        if np is None:
+            raise RuntimeError("El muestreo vectorizado necesita NumPy (pip install numpy)")
+        version, estado, _ = rnd.getstate()
+        # RandomState.random_sample usa la misma construcción de dobles de 53 bits
+        # que random.random(), así que con el mismo estado da la misma secuencia
+        self._rs = np.random.RandomState()
+        self._rs.set_state(('MT19937', np.array(estado[:-1], dtype=np.uint32), estado[-1]))
+        self._bloque = bloque
+        self._uniformes = iter(())
+        self._decisiones = iter(())
+        self._p = None
+
+    def uniforme(self) -> float:
+        for u in self._uniformes:
+            return u
+        self._uniformes = iter(self._rs.random_sample(self._bloque).tolist())
+        return next(self._uniformes)
+
+    def bernoulli(self, p: float) -> bool:
+        for decision in self._decisiones:
+            return decision
+        if self._p is not None and p != self._p:
+            raise ValueError('Un flujo vectorizado de decisiones usa una única probabilidad')
+        self._p = p
+        self._decisiones = iter((self._rs.random_sample(self._bloque) < p).tolist())
+        return next(self._decisiones)
+
+
+class FabricaFlujos:
+    """Crea los flujos con nombre de una simulación"""
+
+    def __init__(self, semilla_base: int, modo: str = 'escalar'):
+        """
+        Args:
+            semilla_base: Entero del que se derivan las semillas de todos los flujos
+            modo: 'escalar' o 'vectorizado'
+        """
+        if modo not in MODOS_MUESTREO:
+            raise ValueError(f"Modo de muestreo desconocido: {modo} "
+                             f"(opciones: {', '.join(MODOS_MUESTREO)})")
+        if modo == 'vectorizado' and np is None:
+            raise RuntimeError("El muestreo vectorizado necesita NumPy (pip install numpy)")
+        self.semilla_base = semilla_base
+        self.modo = modo
+
+    def crear(self, nombre: str) -> FlujoEscalar:
+        """Flujo independiente y reproducible para la fuente ``nombre``"""
+        rnd = random.Random(f'{self.semilla_base}/{nombre}')
+        return FlujoVectorizado(rnd) if self.modo == 'vectorizado' else FlujoEscalar(rnd)
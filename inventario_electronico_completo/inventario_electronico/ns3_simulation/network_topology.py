@@ -196,7 +196,7 @@ NETWORK_TOPOLOGY = {
     
     "network_parameters": {
         "subnet": "192.168.1.0/24",
-        "gateway": "192.168.1.1",
+        "gateway": "192.168.1.254",
         "dns_servers": ["8.8.8.8", "8.8.4.4"],
         "mtu": 1500,
         "simulation_duration_seconds": 300,
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Calidad de Servicio en los Enlaces Simulados
+Aplica la tabla ``quality_of_service`` de NETWORK_TOPOLOGY: disciplinas de
+cola por clase para los canales de enlaces.py (prioridad estricta y WFQ con
+pesos ``bandwidth_guarantee_percent``) y medición de latencia y jitter por
+clase contra ``max_latency_ms`` / ``max_jitter_ms``.
+
+Autor: Sistema de Inventario Electrónico
+"""
+
+import math
+from collections import deque
+
+from enlaces import ColaFIFO
+from estadisticas_simulacion import HistogramaLatencia
+
+
+def clase_de_prioridad(prioridad: str, qos: dict) -> str:
+    """
+    Clase QoS de un patrón de tráfico ('high' -> 'high_priority')
+
+    Las prioridades desconocidas van a la última clase (la menos prioritaria).
+    """
+    for nombre in (f'{prioridad}_priority', prioridad):
+        if nombre in qos:
+            return nombre
+    return list(qos)[-1]
+
+
+class ColaPrioridadEstricta:
+    """Atiende siempre la clase más prioritaria con paquetes en cola"""
+
+    def __init__(self, clases):
+        """
+        Args:
+            clases: Nombres de clase de mayor a menor prioridad
+        """
+        self._colas = {clase: deque() for clase in clases}
+        self._ultima = clases[-1]
+        self._total = 0
+
+    def __len__(self):
+        return self._total
+
+    def encolar(self, paquete):
+        self._colas.get(paquete.clase, self._colas[self._ultima]).append(paquete)
+        self._total += 1
+
+    def desencolar(self):
+        for cola in self._colas.values():
+            if cola:
+                self._total -= 1
+                return cola.popleft()
+        raise IndexError('desencolar de una cola vacía')
+
+
+class ColaWFQ:
+    """
+    Weighted Fair Queuing (variante auto-temporizada, SCFQ)
+
+    Cada paquete recibe una etiqueta de fin ``max(V, fin_clase) + tamaño/peso``,
+    donde V es la etiqueta del último paquete atendido, y se atiende siempre la
+    menor. Con todas las clases saturadas, cada una obtiene del enlace una
+    fracción de bytes proporcional a su peso.
+    """
+
+    def __init__(self, pesos: dict):
+        """
+        Args:
+            pesos: clase -> peso (p. ej. bandwidth_guarantee_percent)
+        """
+        self._pesos = pesos
+        self._colas = {clase: deque() for clase in pesos}
+        self._fin_clase = dict.fromkeys(pesos, 0.0)
+        self._ultima = list(pesos)[-1]
+        self._virtual = 0.0
+        self._total = 0
+
+    def __len__(self):
+        return self._total
+
+    def encolar(self, paquete):
+        clase = paquete.clase if paquete.clase in self._colas else self._ultima
+        fin = max(self._virtual, self._fin_clase[clase]) + paquete.tamano / self._pesos[clase]
+        self._fin_clase[clase] = fin
+        self._colas[clase].append((fin, paquete))
+        self._total += 1
+
+    def desencolar(self):
+        mejor = None
+        for cola in self._colas.values():
+            if cola and (mejor is None or cola[0][0] < mejor[0][0]):
+                mejor = cola
+        if mejor is None:
+            raise IndexError('desencolar de una cola vacía')
+        fin, paquete = mejor.popleft()
+        self._virtual = fin
+        self._total -= 1
+        return paquete
+
+
+PLANIFICADORES = ('fifo', 'prioridad', 'wfq')
+
+
+def crear_disciplina(nombre: str, qos: dict):
+    """
+    Fábrica de colas para los canales de enlace
+
+    Args:
+        nombre: 'fifo', 'prioridad' o 'wfq'
+        qos: Tabla ``quality_of_service`` de la topología
+
+    Returns:
+        Función sin argumentos que crea una cola nueva
+    """
+    if nombre == 'fifo':
+        return ColaFIFO
+    if nombre == 'prioridad':
+        clases = list(qos)
+        return lambda: ColaPrioridadEstricta(clases)
+    if nombre == 'wfq':
+        pesos = {clase: max(config.get('bandwidth_guarantee_percent', 1), 1)
+                 for clase, config in qos.items()}
+        return lambda: ColaWFQ(pesos)
+    raise ValueError(f"Planificador desconocido: {nombre} (opciones: {', '.join(PLANIFICADORES)})")
+
+
+class MetricasQoS:
+    """
+    Latencia extremo a extremo y jitter por clase, con violaciones de SLA
+
+    Usa histogramas de memoria acotada; las violaciones se cuentan exactas al
+    registrar cada entrega.
+    """
+
+    def __init__(self, qos: dict):
+        self.qos = qos
+        self.latencias = {clase: HistogramaLatencia() for clase in qos}
+        self.jitter = {clase: HistogramaLatencia() for clase in qos}
+        self.violaciones = {clase: [0, 0] for clase in qos}
+        self._limites = {clase: (config.get('max_latency_ms', math.inf),
+                                 config.get('max_jitter_ms', math.inf))
+                         for clase, config in qos.items()}
+        self._anterior = {}
+
+    def registrar(self, clase: str, latencia_ms: float):
+        """Registra la entrega de un mensaje de ``clase`` con su latencia"""
+        if clase not in self.latencias:
+            return
+        max_latencia, max_jitter = self._limites[clase]
+        self.latencias[clase].registrar(latencia_ms)
+        if latencia_ms > max_latencia:
+            self.violaciones[clase][0] += 1
+        # Jitter: variación respecto al mensaje anterior de la misma clase
+        anterior = self._anterior.get(clase)
+        if anterior is not None:
+            jitter = abs(latencia_ms - anterior)
+            self.jitter[clase].registrar(jitter)
+            if jitter > max_jitter:
+                self.violaciones[clase][1] += 1
+        self._anterior[clase] = latencia_ms
+
+    def resumen(self) -> dict:
+        """clase -> entregas, percentiles p50/p95/p99/max y violaciones de SLA"""
+        resultado = {}
+        for clase in self.qos:
+            max_latencia, max_jitter = self._limites[clase]
+            resultado[clase] = {
+                'entregados': self.latencias[clase].conteo,
+                'latencia_ms': self.latencias[clase].resumen(),
+                'jitter_ms': self.jitter[clase].resumen(),
+                'violaciones_latencia': self.violaciones[clase][0],
+                'violaciones_jitter': self.violaciones[clase][1],
+                'max_latency_ms': max_latencia,
+                'max_jitter_ms': max_jitter,
+            }
+        return resultado
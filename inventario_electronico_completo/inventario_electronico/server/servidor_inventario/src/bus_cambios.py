@@ -0,0 +1,148 @@
+"""
+Bus de cambios entre instancias del Servidor de Inventario
+Cada instancia publica sus escrituras confirmadas en el bus local y aplica las
+de las demás, de modo que el catálogo en memoria, los snapshots y las
+difusiones Socket.IO de todas las instancias reflejan cada cambio.
+
+Un cambio perdido (publicación fallida o escucha desconectada) no se puede
+recuperar del bus: en ese caso las instancias se resincronizan por completo
+desde la base (``DatabaseManager.resincronizar``).
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Callable, Dict
+
+from comun.bus_local import ClienteBus
+
+CANAL_CAMBIOS = 'inventario_cambios'
+# Segundos entre reintentos de escucha y de aviso de resincronización
+REINTENTO_S = 1.0
+
+logger = logging.getLogger('inventario.bus_cambios')
+
+
+class BusCambios:
+    """Propaga las escrituras de DatabaseManager entre procesos servidor"""
+
+    def __init__(self, db_manager, url: str, instancia: str,
+                 iniciar_tarea: Callable = None, canal: str = CANAL_CAMBIOS):
+        """
+        Args:
+            db_manager: Gestor de base de datos compartido por las instancias
+            url: URL del bus (``bus://host:puerto``)
+            instancia: Identificador único de este proceso
+            iniciar_tarea: Función para lanzar el hilo de escucha
+                (``socketio.start_background_task``); por defecto un hilo daemon
+            canal: Canal del bus usado para los cambios
+        """
+        self.db_manager = db_manager
+        self.url = url
+        self.instancia = instancia
+        self.canal = canal
+        self._iniciar_tarea = iniciar_tarea or self._hilo_daemon
+        self._publicador = ClienteBus(url)
+        self._local = threading.local()
+        self._lock_aviso = threading.Lock()
+        self._aviso_pendiente = False
+        # Los contadores se tocan desde peticiones, la escucha y los avisos
+        self._lock_metricas = threading.Lock()
+        self.metricas = {'publicados': 0, 'recibidos': 0, 'aplicados': 0, 'errores': 0,
+                         'resincronizaciones': 0}
+        db_manager.suscribir_cambios(self._publicar)
+
+    @staticmethod
+    def _hilo_daemon(funcion):
+        hilo = threading.Thread(target=funcion, daemon=True)
+        hilo.start()
+        return hilo
+
+    def _contar(self, clave: str):
+        with self._lock_metricas:
+            self.metricas[clave] += 1
+
+    def iniciar(self):
+        """Comienza a escuchar los cambios de las demás instancias"""
+        self._iniciar_tarea(self._escuchar)
+
+    def _publicar(self, tabla: str, id_registro: int):
+        # Los cambios recibidos por el bus no se vuelven a publicar
+        if getattr(self._local, 'aplicando_remoto', False):
+            return
+        mensaje = json.dumps({'instancia': self.instancia, 'tabla': tabla, 'id': id_registro})
+        try:
+            self._publicador.publicar(self.canal, mensaje.encode('utf-8'))
+            self._contar('publicados')
+        except OSError as e:
+            # La escritura ya está confirmada: se pide a las demás que se resincronicen
+            self._contar('errores')
+            logger.error("Error al publicar cambio en el bus (%s): %s", self.url, e)
+            with self._lock_aviso:
+                if self._aviso_pendiente:
+                    return
+                self._aviso_pendiente = True
+            self._iniciar_tarea(self._avisar_resincronizacion)
+
+    def _avisar_resincronizacion(self):
+        """Publica un aviso de resincronización, reintentando hasta que el bus lo acepte"""
+        mensaje = json.dumps({'instancia': self.instancia, 'tipo': 'resincronizar'}).encode('utf-8')
+        while True:
+            try:
+                self._publicador.publicar(self.canal, mensaje)
+                break
+            except OSError:
+                time.sleep(REINTENTO_S)
+        with self._lock_aviso:
+            self._aviso_pendiente = False
+        logger.info("Aviso de resincronización publicado en %s", self.url)
+
+    def _resincronizar(self):
+        """Recarga el catálogo y los snapshots desde la base sin volver a publicar"""
+        self._local.aplicando_remoto = True
+        try:
+            self.db_manager.resincronizar()
+            self._contar('resincronizaciones')
+        finally:
+            self._local.aplicando_remoto = False
+
+    def _escuchar(self):
+        # Cada (re)conexión resincroniza: lo publicado mientras no escuchábamos se perdió
+        while True:
+            try:
+                for _canal, datos in ClienteBus(self.url).escuchar(self.canal, al_conectar=self._resincronizar):
+                    self._aplicar(datos)
+            except Exception as e:
+                self._contar('errores')
+                logger.error("Escucha del bus interrumpida (%s): %s", self.url, e)
+                time.sleep(REINTENTO_S)
+
+    def _aplicar(self, datos: bytes):
+        try:
+            cambio = json.loads(datos)
+        except ValueError:
+            self._contar('errores')
+            return
+        self._contar('recibidos')
+        if cambio.get('instancia') == self.instancia:
+            return
+        if cambio.get('tipo') == 'resincronizar':
+            logger.info("Resincronización pedida por %s", cambio.get('instancia'))
+            self._resincronizar()
+            return
+        self._local.aplicando_remoto = True
+        try:
+            self.db_manager.notificar_cambio_externo(cambio['tabla'], cambio['id'])
+            self._contar('aplicados')
+        except Exception as e:
+            self._contar('errores')
+            logger.error("Error al aplicar cambio remoto %s: %s", cambio, e)
+        finally:
+            self._local.aplicando_remoto = False
+
+    def estado(self) -> Dict:
+        """Identidad de la instancia y contadores del bus"""
+        with self._lock_metricas:
+            metricas = dict(self.metricas)
+        return {'instancia': self.instancia, 'bus': self.url, 'canal': self.canal, **metricas}
@@ -0,0 +1,197 @@
+"""
+Planificador de difusiones Socket.IO del Servidor de Inventario
+Agrupa las escrituras en como máximo una difusión por ventana de tiempo y
+evita encolar estados intermedios a los clientes que aún no procesaron el
+anterior.
+"""
+
+import logging
+import threading
+import time
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger('inventario.difusion')
+
+
+class PlanificadorDifusion:
+    """
+    Coalesce los cambios del inventario en difusiones periódicas
+
+    El primer cambio tras un periodo de calma se difunde de inmediato; los
+    siguientes que lleguen dentro de la ventana se acumulan y salen juntos al
+    cerrarse la ventana, siempre con el estado más reciente.
+
+    Los clientes que confirman cada versión con el evento ``inventario_recibido``
+    se tratan como consumidores con control de flujo: si todavía no confirmaron
+    la última versión enviada se omiten de la difusión, y al confirmar reciben
+    directamente la versión más reciente (los estados intermedios se descartan).
+    Si la confirmación no llega en ``plazo_confirmacion_ms`` (se perdió el ack o
+    el mensaje), la siguiente difusión vuelve a incluir al cliente.
+    """
+
+    def __init__(self, socketio, construir_payload: Callable[[], Dict],
+                 ventana_ms: float = 250, evento: str = 'inventario_actualizado',
+                 trazador=None, plazo_confirmacion_ms: float = 5000):
+        """
+        Args:
+            socketio: Instancia de Flask-SocketIO
+            construir_payload: Función que devuelve el estado actual a enviar
+            ventana_ms: Intervalo mínimo entre difusiones, en milisegundos
+            evento: Nombre del evento Socket.IO emitido
+            trazador: ``comun.trazado.Trazador`` opcional; la difusión continúa
+                la traza del primer cambio de la ventana
+            plazo_confirmacion_ms: Espera máxima de la confirmación de un cliente
+                antes de volver a enviarle el estado
+        """
+        self.socketio = socketio
+        self.construir_payload = construir_payload
+        self.ventana = ventana_ms / 1000.0
+        self.evento = evento
+        self.trazador = trazador
+        self.plazo_confirmacion = plazo_confirmacion_ms / 1000.0
+        self.version = 0
+
+        self._lock = threading.Lock()
+        self._hay_cambios = threading.Event()
+        self._tarea = None
+        self._cambios_pendientes = 0
+        self._primer_cambio: Optional[float] = None
+        self._contexto_primer_cambio = None
+        self._ultimo_envio = 0.0
+        # sid -> [última versión enviada, última versión confirmada, instante del envío]
+        self._consumidores: Dict[str, List] = {}
+
+        self.metricas = {
+            'cambios_recibidos': 0,
+            'difusiones': 0,
+            'envios_directos': 0,
+            'cambios_coalescidos': 0,
+            'omitidos_lentos': 0,
+            'confirmaciones_vencidas': 0,
+            'retraso_total_ms': 0.0,
+            'retraso_max_ms': 0.0,
+        }
+
+    # ==================== ENTRADAS ====================
+
+    def marcar_cambio(self, tabla: str = None, id_registro: int = None):
+        """Registra una escritura; compatible con ``DatabaseManager.suscribir_cambios``"""
+        with self._lock:
+            self._cambios_pendientes += 1
+            self.metricas['cambios_recibidos'] += 1
+            if self._primer_cambio is None:
+                self._primer_cambio = time.monotonic()
+                if self.trazador is not None:
+                    self._contexto_primer_cambio = self.trazador.contexto()
+            if self._tarea is None:
+                self._tarea = self.socketio.start_background_task(self._bucle)
+        self._hay_cambios.set()
+
+    def enviar_a(self, sid: str):
+        """Envía el estado actual solo al cliente indicado"""
+        # La versión se lee antes de construir el payload: si entre medias sale
+        # una difusión, el cliente recibe un estado más nuevo con una versión
+        # más vieja, lo que solo provoca un reenvío al confirmar. Al revés, un
+        # estado viejo etiquetado con la versión nueva quedaría sin corregir.
+        with self._lock:
+            version = self.version
+        payload = self.construir_payload()
+        with self._lock:
+            consumidor = self._consumidores.get(sid)
+            if consumidor is not None:
+                consumidor[0] = max(consumidor[0], version)
+                consumidor[2] = time.monotonic()
+            self.metricas['envios_directos'] += 1
+        payload['version'] = version
+        self.socketio.emit(self.evento, payload, to=sid)
+
+    def confirmar(self, sid: str, version: int):
+        """
+        Registra que un cliente terminó de procesar una versión
+
+        Si mientras tanto se publicó una versión más nueva, se le envía ya.
+        """
+        with self._lock:
+            consumidor = self._consumidores.setdefault(sid, [version, version, time.monotonic()])
+            consumidor[1] = max(consumidor[1], version)
+            atrasado = consumidor[1] < self.version
+        if atrasado:
+            self.enviar_a(sid)
+
+    def desconectar(self, sid: str):
+        """Olvida el estado de control de flujo de un cliente"""
+        with self._lock:
+            self._consumidores.pop(sid, None)
+
+    # ==================== DIFUSIÓN ====================
+
+    def _bucle(self):
+        while True:
+            self._hay_cambios.wait()
+            espera = self._ultimo_envio + self.ventana - time.monotonic()
+            if espera > 0:
+                self.socketio.sleep(espera)
+            with self._lock:
+                self._hay_cambios.clear()
+                cambios = self._cambios_pendientes
+                primer_cambio = self._primer_cambio
+                contexto = self._contexto_primer_cambio
+                self._cambios_pendientes = 0
+                self._primer_cambio = None
+                self._contexto_primer_cambio = None
+            if cambios:
+                try:
+                    self._difundir(cambios, primer_cambio, contexto)
+                except Exception as e:
+                    logger.exception("Error al difundir actualización de inventario: %s", e)
+            self._ultimo_envio = time.monotonic()
+
+    def _difundir(self, cambios: int, primer_cambio: float, contexto=None):
+        payload = self.construir_payload()
+        ahora = time.monotonic()
+        with self._lock:
+            self.version += 1
+            version = self.version
+            lentos = []
+            for sid, consumidor in self._consumidores.items():
+                enviada, confirmada, enviado_en = consumidor
+                if confirmada < enviada:
+                    if ahora - enviado_en < self.plazo_confirmacion:
+                        lentos.append(sid)
+                        continue
+                    # Confirmación perdida: se le vuelve a enviar el estado actual
+                    self.metricas['confirmaciones_vencidas'] += 1
+                consumidor[0] = version
+                consumidor[2] = ahora
+        payload['version'] = version
+        with self._span(contexto, cambios=cambios, version=version, omitidos=len(lentos)):
+            self.socketio.emit(self.evento, payload, skip_sid=lentos or None)
+
+        retraso_ms = (time.monotonic() - primer_cambio) * 1000
+        with self._lock:
+            self.metricas['difusiones'] += 1
+            self.metricas['cambios_coalescidos'] += cambios - 1
+            self.metricas['omitidos_lentos'] += len(lentos)
+            self.metricas['retraso_total_ms'] += retraso_ms
+            self.metricas['retraso_max_ms'] = max(self.metricas['retraso_max_ms'], retraso_ms)
+
+    def _span(self, contexto, **atributos):
+        # Sin cambio trazado (o llegado por el bus de cambios) no hay span
+        if self.trazador is None or contexto is None:
+            return nullcontext()
+        return self.trazador.span(f'emit {self.evento}', 'emit', padre=contexto, **atributos)
+
+    def resumen_metricas(self) -> Dict:
+        """Métricas acumuladas del planificador"""
+        with self._lock:
+            resumen = dict(self.metricas)
+            resumen['cambios_en_cola'] = self._cambios_pendientes
+            resumen['consumidores_con_confirmacion'] = len(self._consumidores)
+            resumen['version'] = self.version
+        difusiones = resumen['difusiones']
+        resumen['retraso_promedio_ms'] = (
+            resumen['retraso_total_ms'] / difusiones if difusiones else 0.0
+        )
+        resumen['ventana_ms'] = self.ventana * 1000
+        return resumen
@@ -1,3 +1,4 @@
+import logging
 import os
 import sys
 from flask import Flask, jsonify, request, send_from_directory
@@ -9,28 +10,130 @@ from datetime import datetime
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.abspath(os.path.join(current_dir, '..', '..', '..'))
 sys.path.append(project_root)
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
 
-from database.database_manager import DatabaseManager
+from database.archivo_libro import ArchivadorLibro
+from database.database_manager import DatabaseManager, StockInsuficiente, ReservaNoActiva, RESERVA_MAX_MINUTOS
+from database.perfilador_sql import PerfiladorSQL
+from comun.configuracion import opciones_socketio, modo_debug
+from comun.instrumentacion import Instrumentacion
+from comun.trazado import Trazador
+from comun.registro import configurar_registro
+from snapshot_catalogo import SnapshotCatalogo, CodificadorSocketIO
+from difusion import PlanificadorDifusion
+from bus_cambios import BusCambios
+
+# Registro estructurado y asíncrono (variables INVENTARIO_LOG_*, ver comun/registro.py)
+configurar_registro('servidor')
+logger = logging.getLogger('inventario.servidor')
 
 # --- Configuración de la Aplicación ---
 app = Flask(__name__, static_folder='static', static_url_path='')
 app.config['SECRET_KEY'] = 'inventario-electronico-2024-servidor'
+# Tiempos por ruta, Server-Timing y registro de peticiones lentas
+instrumentacion = Instrumentacion('servidor').instalar(app)
+# Trazado distribuido (INVENTARIO_TRAZAS_DIR): continúa el traceparent del switch o del cliente
+trazador = Trazador('servidor').instalar(app)
 
 # Configurar CORS para permitir conexiones desde cualquier origen
 CORS(app, resources={r"/api/*": {"origins": "*"}, r"/socket.io/*": {"origins": "*"}})
 
 # Configurar Socket.IO con CORS
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+# (el codificador JSON incrusta los snapshots pre-codificados sin re-serializarlos)
+# (modo asíncrono y cola de mensajes según el entorno, ver comun/configuracion.py)
+socketio = SocketIO(app, cors_allowed_origins="*", json=CodificadorSocketIO,
+                    **opciones_socketio())
+
+# --- Configuración de la Instancia ---
+PUERTO = int(os.environ.get('INVENTARIO_PUERTO', '5000'))
+INSTANCIA = os.environ.get('INVENTARIO_INSTANCIA') or f'servidor-{PUERTO}-{os.getpid()}'
 
 # --- Configuración de la Base de Datos ---
-db_path = os.path.join(project_root, 'database', 'inventario.db')
-db_manager = DatabaseManager(db_path)
+db_path = os.environ.get('INVENTARIO_DB_PATH', os.path.join(project_root, 'database', 'inventario.db'))
+# Catálogo en memoria para lecturas (INVENTARIO_CATALOGO_MEMORIA=0 lo desactiva)
+USAR_CATALOGO_MEMORIA = os.environ.get('INVENTARIO_CATALOGO_MEMORIA', '1') == '1'
+# Perfil de las sentencias SQL (INVENTARIO_PERFILAR_SQL=1), consultable en /api/sql/perfil
+perfilador_sql = None
+if os.environ.get('INVENTARIO_PERFILAR_SQL') == '1':
+    perfilador_sql = PerfiladorSQL(float(os.environ.get('INVENTARIO_SQL_LENTO_MS', '50')))
+# Escrituras por un único hilo con commit agrupado (INVENTARIO_ESCRITURA_AGRUPADA=0 lo desactiva)
+ESCRITURA_AGRUPADA = os.environ.get('INVENTARIO_ESCRITURA_AGRUPADA', '1') == '1'
+db_manager = DatabaseManager(db_path, catalogo_memoria=USAR_CATALOGO_MEMORIA, perfilador=perfilador_sql,
+                             escritura_agrupada=ESCRITURA_AGRUPADA,
+                             espera_grupo_ms=float(os.environ.get('INVENTARIO_ESPERA_GRUPO_MS', '0')))
+instrumentacion.envolver_metodos(db_manager, 'db', excluir=('suscribir_cambios',))
+trazador.envolver_metodos(db_manager, 'db', excluir=('suscribir_cambios',))
+# JSON pre-codificado del catálogo y estadísticas, invalidado en cada escritura
+snapshot = SnapshotCatalogo(db_manager)
+
+# --- Difusión de Actualizaciones ---
+# Como máximo una difusión de inventario por ventana (ms)
+VENTANA_DIFUSION_MS = float(os.environ.get('INVENTARIO_VENTANA_DIFUSION_MS', '250'))
+
+def construir_payload_inventario():
+    return {
+        'productos': snapshot.productos().como_json(),
+        'estadisticas': snapshot.estadisticas().como_json(),
+        'timestamp': datetime.now().isoformat()
+    }
+
+# Sin confirmación en INVENTARIO_PLAZO_CONFIRMACION_MS, el cliente vuelve a recibir el estado
+PLAZO_CONFIRMACION_MS = float(os.environ.get('INVENTARIO_PLAZO_CONFIRMACION_MS', '5000'))
+planificador = PlanificadorDifusion(socketio, construir_payload_inventario, VENTANA_DIFUSION_MS,
+                                    trazador=trazador, plazo_confirmacion_ms=PLAZO_CONFIRMACION_MS)
+db_manager.suscribir_cambios(planificador.marcar_cambio)
+
+# --- Modo Multi-instancia ---
+# Con INVENTARIO_BUS_CAMBIOS=bus://host:puerto varias instancias comparten la base
+# y se reenvían sus escrituras para que todos los dashboards vean cada cambio
+BUS_CAMBIOS_URL = os.environ.get('INVENTARIO_BUS_CAMBIOS')
+bus_cambios = None
+if BUS_CAMBIOS_URL:
+    bus_cambios = BusCambios(db_manager, BUS_CAMBIOS_URL, INSTANCIA, socketio.start_background_task)
+    bus_cambios.iniciar()
+
+# --- Reservas ---
+# Cada INVENTARIO_BARRIDO_RESERVAS_S segundos vuelve al stock lo apartado por reservas vencidas
+BARRIDO_RESERVAS_S = float(os.environ.get('INVENTARIO_BARRIDO_RESERVAS_S', '30'))
+
+def barrer_reservas():
+    while True:
+        socketio.sleep(BARRIDO_RESERVAS_S)
+        try:
+            db_manager.liberar_reservas_vencidas()
+        except Exception as e:
+            logger.error('Error al liberar reservas vencidas: %s', e)
+
+if BARRIDO_RESERVAS_S > 0:
+    socketio.start_background_task(barrer_reservas)
+
+# --- Archivo del Libro de Transacciones ---
+# Con INVENTARIO_ARCHIVO_MESES=N, cada INVENTARIO_ARCHIVO_INTERVALO_S segundos los meses
+# anteriores a los N últimos pasan a sus archivos mensuales (ver database/archivo_libro.py)
+ARCHIVO_MESES = int(os.environ.get('INVENTARIO_ARCHIVO_MESES', '0'))
+ARCHIVO_INTERVALO_S = float(os.environ.get('INVENTARIO_ARCHIVO_INTERVALO_S', '3600'))
+archivador = ArchivadorLibro(db_path, db_manager.archivo_dir, ARCHIVO_MESES,
+                             int(os.environ.get('INVENTARIO_ARCHIVO_LOTE', '2000')),
+                             reintentos=db_manager.reintentos)
+
+def archivar_libro():
+    while True:
+        try:
+            archivador.archivar()
+        except Exception as e:
+            logger.error('Error al archivar el libro de transacciones: %s', e)
+        socketio.sleep(ARCHIVO_INTERVALO_S)
+
+if ARCHIVO_MESES > 0:
+    socketio.start_background_task(archivar_libro)
 
 print("="*20)
 print("Servidor de Inventario Electrónico")
 print("Máquina 1 - Visualización de Inventario")
 print(f"Base de datos inicializada correctamente: {db_path}")
-print(f"Puerto: 5000")
+print(f"Puerto: {PUERTO}")
+print(f"Instancia: {INSTANCIA}" + (f" (bus de cambios: {BUS_CAMBIOS_URL})" if BUS_CAMBIOS_URL else ""))
 print("="*20)
 
 # --- Rutas de la Interfaz Web ---
@@ -42,7 +145,7 @@ def serve_index():
 
 @app.route("/api/status")
 def get_status():
-    return jsonify({"status": "Servidor disponible"})
+    return jsonify({"status": "Servidor disponible", "instancia": INSTANCIA})
 
 @app.route("/api/productos", methods=["GET", "POST"])
 def productos():
@@ -76,59 +179,177 @@ def productos():
                 categoria,
                 proveedor,
             )
-            # Notificar a los clientes sobre el nuevo producto
-            socketio.emit("update", {"message": "Inventario actualizado"})
+            # La difusión a los clientes la agrupa el planificador
             return jsonify({"message": "Producto agregado exitosamente", "product": data}), 201
         except Exception as e:
             return jsonify({"error": f"Error al agregar producto: {str(e)}"}), 500
 
     else:  # GET request
         try:
-            productos_data = db_manager.obtener_productos()
-            return jsonify(productos_data)
+            return snapshot.responder(snapshot.productos(), request.headers)
         except Exception as e:
             return jsonify({"error": f"Error al obtener productos: {str(e)}"}), 500
 
 @app.route("/api/estadisticas")
 def get_stats():
     try:
-        stats = db_manager.obtener_estadisticas()
-        return jsonify(stats)
+        return snapshot.responder(snapshot.estadisticas(), request.headers)
     except Exception as e:
         return jsonify({"error": f"Error al obtener estadísticas: {str(e)}"}), 500
 
+# --- Historial y Ventas (desde el resumen diario, ver database/resumen_diario.py) ---
+
+def rango_fechas():
+    """Lee ``desde`` y ``hasta`` (AAAA-MM-DD) de la petición; ValueError si no son fechas"""
+    fechas = []
+    for nombre in ("desde", "hasta"):
+        valor = request.args.get(nombre)
+        if valor:
+            datetime.strptime(valor, "%Y-%m-%d")
+        fechas.append(valor)
+    return fechas
+
+@app.route("/api/productos/<int:id_producto>/historial")
+def historial_producto(id_producto):
+    try:
+        desde, hasta = rango_fechas()
+    except ValueError:
+        return jsonify({"error": "Las fechas deben tener formato AAAA-MM-DD"}), 400
+    return jsonify({"id_producto": id_producto, "desde": desde, "hasta": hasta,
+                    "dias": db_manager.historial_producto(id_producto, desde, hasta)})
+
+@app.route("/api/productos/<int:id_producto>/movimientos")
+def movimientos_producto(id_producto):
+    limite = max(1, min(request.args.get("limite", 100, type=int), 1000))
+    movimientos = db_manager.movimientos_producto(id_producto, limite, request.args.get("antes_de", type=int))
+    siguiente = movimientos[-1]["id_transaccion"] if len(movimientos) == limite else None
+    return jsonify({"id_producto": id_producto, "movimientos": movimientos, "siguiente": siguiente})
+
+@app.route("/api/ventas/diarias")
+def ventas_diarias():
+    try:
+        desde, hasta = rango_fechas()
+    except ValueError:
+        return jsonify({"error": "Las fechas deben tener formato AAAA-MM-DD"}), 400
+    return jsonify({"desde": desde, "hasta": hasta, "dias": db_manager.ventas_por_dia(desde, hasta)})
+
+@app.route("/api/ventas/top")
+def ventas_top():
+    por = request.args.get("por", "unidades")
+    if por not in ("unidades", "ingresos"):
+        return jsonify({"error": f"Orden no válido: {por}"}), 400
+    try:
+        desde, hasta = rango_fechas()
+    except ValueError:
+        return jsonify({"error": "Las fechas deben tener formato AAAA-MM-DD"}), 400
+    limite = max(1, min(request.args.get("limite", 10, type=int), 1000))
+    return jsonify({"desde": desde, "hasta": hasta, "por": por,
+                    "productos": db_manager.mas_vendidos(desde, hasta, limite, por)})
+
+@app.route("/api/sql/perfil", methods=["GET", "DELETE"])
+def perfil_sql():
+    if perfilador_sql is None:
+        return jsonify({"error": "Perfilador SQL desactivado (arrancar con INVENTARIO_PERFILAR_SQL=1)"}), 404
+    if request.method == "DELETE":
+        perfilador_sql.reiniciar()
+        return jsonify({"message": "Perfil SQL reiniciado"})
+    orden = request.args.get("orden", "total")
+    if orden not in ("total", "max", "llamadas", "filas", "errores"):
+        return jsonify({"error": f"Orden no válido: {orden}"}), 400
+    return jsonify(perfilador_sql.resumen(orden, request.args.get("limite", 50, type=int)))
+
+@app.route("/api/db/escritura")
+def get_escritura():
+    if db_manager.escritor is None:
+        return jsonify({"agrupada": False, "reintentos": db_manager.reintentos.resumen()})
+    return jsonify({"agrupada": True, **db_manager.escritor.resumen()})
+
+@app.route("/api/db/archivo")
+def get_archivo():
+    return jsonify({"activo": ARCHIVO_MESES > 0, **archivador.estado()})
+
+@app.route("/api/reservas", methods=["POST"])
+def crear_reserva():
+    data = request.json
+    if not data or not data.get("lineas"):
+        return jsonify({"error": "La reserva necesita al menos una línea"}), 400
+    try:
+        minutos = float(data.get("minutos", 15))
+    except (TypeError, ValueError):
+        minutos = None
+    if minutos is None or not 0 < minutos <= RESERVA_MAX_MINUTOS:
+        return jsonify({"error": f"minutos debe ser un número mayor que 0 y hasta {RESERVA_MAX_MINUTOS}"}), 400
+    try:
+        lineas = [(int(linea["id_producto"]), int(linea["cantidad"])) for linea in data["lineas"]]
+        id_reserva = db_manager.reservar(lineas, data.get("id_cliente"), minutos, data.get("observaciones", ""))
+    except StockInsuficiente as e:
+        return jsonify({"error": str(e), "id_producto": e.id_producto,
+                        "solicitada": e.solicitada, "disponible": e.disponible}), 409
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Líneas no válidas: {e}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Error al crear reserva: {str(e)}"}), 500
+    return jsonify({"id_reserva": id_reserva}), 201
+
+@app.route("/api/reservas/<int:id_reserva>/confirmar", methods=["POST"])
+def confirmar_reserva(id_reserva):
+    try:
+        transacciones = db_manager.confirmar_reserva(id_reserva)
+    except ReservaNoActiva as e:
+        return jsonify({"error": str(e)}), 404 if e.estado is None else 409
+    except Exception as e:
+        return jsonify({"error": f"Error al confirmar reserva: {str(e)}"}), 500
+    return jsonify({"id_reserva": id_reserva, "transacciones": transacciones})
+
+@app.route("/api/reservas/<int:id_reserva>", methods=["DELETE"])
+def liberar_reserva(id_reserva):
+    try:
+        db_manager.liberar_reserva(id_reserva)
+    except ReservaNoActiva as e:
+        return jsonify({"error": str(e)}), 404 if e.estado is None else 409
+    except Exception as e:
+        return jsonify({"error": f"Error al liberar reserva: {str(e)}"}), 500
+    return jsonify({"message": f"Reserva {id_reserva} liberada"})
+
+@app.route("/api/cluster/estado")
+def get_estado_cluster():
+    if bus_cambios is None:
+        return jsonify({"instancia": INSTANCIA, "bus": None})
+    return jsonify(bus_cambios.estado())
+
+@app.route("/api/difusion/metricas")
+def get_metricas_difusion():
+    return jsonify(planificador.resumen_metricas())
+
 # --- Eventos de Socket.IO ---
 
 @socketio.on('connect')
 def handle_connect():
-    print(f'Cliente conectado: {request.sid}')
-    # Enviar inventario inicial al cliente recién conectado
-    emit_inventory_update()
+    logger.info('Cliente conectado: %s', request.sid)
+    # Enviar inventario inicial solo al cliente recién conectado
+    planificador.enviar_a(request.sid)
 
 @socketio.on('disconnect')
 def handle_disconnect():
-    print(f'Cliente desconectado: {request.sid}')
+    logger.info('Cliente desconectado: %s', request.sid)
+    planificador.desconectar(request.sid)
 
 @socketio.on('solicitar_inventario')
 def handle_solicitar_inventario():
-    # Maneja solicitudes de actualización del inventario
-    emit_inventory_update()
+    # Responde únicamente al cliente que pidió el inventario
+    planificador.enviar_a(request.sid)
 
-def emit_inventory_update():
+@socketio.on('inventario_recibido')
+def handle_inventario_recibido(data=None):
+    # Confirmación del cliente: habilita el control de flujo por consumidor
     try:
-        productos = db_manager.obtener_productos() # Cambiado de get_all_products a obtener_productos
-        stats = db_manager.obtener_estadisticas()
-        socketio.emit('inventario_actualizado', {
-            'productos': productos,
-            'estadisticas': stats,
-            'timestamp': datetime.now().isoformat()
-        })
-    except Exception as e:
-        print(f"Error al emitir actualización de inventario: {e}")
+        planificador.confirmar(request.sid, int((data or {}).get('version', 0)))
+    except (AttributeError, TypeError, ValueError):
+        pass
 
 # ==================== PUNTO DE ENTRADA ====================
 
 if __name__ == '__main__':
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True, allow_unsafe_werkzeug=True)
+    socketio.run(app, host='0.0.0.0', port=PUERTO, debug=modo_debug(), allow_unsafe_werkzeug=True)
 
 
@@ -0,0 +1,237 @@
+"""
+Snapshots pre-codificados del catálogo y las estadísticas
+Guarda el JSON ya serializado (y comprimido bajo demanda) de cada versión del
+inventario. Solo se reconstruye cuando DatabaseManager notifica una escritura,
+de modo que cada GET o difusión Socket.IO es una copia de bytes con ETag fuerte
+(uno distinto por codificación: sufijo ``-gz`` o ``-br``, RFC 9110 8.8.3).
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+import uuid
+from typing import Dict, Optional
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional
+    brotli = None
+
+# Tamaño mínimo para que valga la pena comprimir una respuesta
+COMPRIMIR_DESDE_BYTES = 1024
+
+# Sufijo del ETag de cada representación comprimida
+SUFIJOS_ETAG = {'gzip': '-gz', 'br': '-br'}
+
+
+class JSONPrecodificado:
+    """Fragmento JSON ya serializado que se inserta tal cual al codificar"""
+
+    __slots__ = ('texto',)
+
+    def __init__(self, texto: str):
+        self.texto = texto
+
+
+class PayloadSnapshot:
+    """Una versión inmutable de un documento JSON y sus variantes comprimidas"""
+
+    __slots__ = ('version', 'texto', 'cuerpo', 'etag', '_comprimidos', '_lock')
+
+    def __init__(self, version: int, cuerpo: bytes):
+        self.version = version
+        self.cuerpo = cuerpo
+        self.texto = cuerpo.decode('utf-8')
+        self.etag = '"' + hashlib.blake2b(cuerpo, digest_size=16).hexdigest() + '"'
+        self._comprimidos: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def comprimido(self, codificacion: str) -> bytes:
+        """
+        Devuelve el cuerpo comprimido, calculándolo solo la primera vez
+
+        Args:
+            codificacion: 'gzip' o 'br'
+        """
+        datos = self._comprimidos.get(codificacion)
+        if datos is None:
+            with self._lock:
+                datos = self._comprimidos.get(codificacion)
+                if datos is None:
+                    if codificacion == 'br':
+                        datos = brotli.compress(self.cuerpo, quality=5)
+                    else:
+                        datos = gzip.compress(self.cuerpo, compresslevel=6, mtime=0)
+                    self._comprimidos[codificacion] = datos
+        return datos
+
+    def etag_de(self, codificacion: Optional[str]) -> str:
+        """ETag fuerte de la representación (sin comprimir o con ``codificacion``)"""
+        if codificacion is None:
+            return self.etag
+        return self.etag[:-1] + SUFIJOS_ETAG[codificacion] + '"'
+
+    def como_json(self) -> JSONPrecodificado:
+        """Envoltorio para incrustar el documento en un mensaje Socket.IO"""
+        return JSONPrecodificado(self.texto)
+
+
+class SnapshotCatalogo:
+    """
+    Caché versionada de los documentos JSON del inventario
+
+    Se suscribe a los cambios de DatabaseManager; cada escritura incrementa la
+    versión y la siguiente lectura reconstruye el documento una sola vez.
+    """
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.version = 0
+        self._lock = threading.Lock()
+        self._productos: Optional[PayloadSnapshot] = None
+        self._estadisticas: Optional[PayloadSnapshot] = None
+        self.estadisticas_cache = {'reconstrucciones': 0, 'aciertos': 0, 'no_modificados': 0}
+        db_manager.suscribir_cambios(self.invalidar)
+
+    def invalidar(self, tabla: str = None, id_registro: int = None):
+        """Marca los snapshots como obsoletos tras una escritura"""
+        with self._lock:
+            self.version += 1
+
+    def _contar(self, clave: str):
+        with self._lock:
+            self.estadisticas_cache[clave] += 1
+
+    def productos(self) -> PayloadSnapshot:
+        """Snapshot del listado de productos activos"""
+        snapshot = self._productos
+        if snapshot is None or snapshot.version != self.version:
+            version = self.version
+            snapshot = PayloadSnapshot(version, self.db_manager.obtener_productos_json())
+            self._productos = snapshot
+            self._contar('reconstrucciones')
+        else:
+            self._contar('aciertos')
+        return snapshot
+
+    def estadisticas(self) -> PayloadSnapshot:
+        """Snapshot de las estadísticas generales del inventario"""
+        snapshot = self._estadisticas
+        if snapshot is None or snapshot.version != self.version:
+            version = self.version
+            stats = self.db_manager.obtener_estadisticas()
+            snapshot = PayloadSnapshot(
+                version,
+                json.dumps(stats, separators=(',', ':'), sort_keys=True).encode('utf-8')
+            )
+            self._estadisticas = snapshot
+            self._contar('reconstrucciones')
+        else:
+            self._contar('aciertos')
+        return snapshot
+
+    def responder(self, snapshot: PayloadSnapshot, headers) -> Response:
+        """
+        Construye la respuesta HTTP de un snapshot
+
+        Respeta ``If-None-Match`` (304 sin cuerpo) y ``Accept-Encoding``
+        (br si está instalado, si no gzip). El ETag es el de la representación
+        elegida, así que una caché no confunde la comprimida con la otra.
+
+        Args:
+            snapshot: Documento a enviar
+            headers: Cabeceras de la petición entrante
+        """
+        codificacion = None
+        if len(snapshot.cuerpo) >= COMPRIMIR_DESDE_BYTES:
+            codificacion = elegir_codificacion(headers.get('Accept-Encoding', ''))
+        etag = snapshot.etag_de(codificacion)
+        if _etag_coincide(headers.get('If-None-Match', ''), etag):
+            self._contar('no_modificados')
+            respuesta = Response(status=304)
+        else:
+            cuerpo = snapshot.comprimido(codificacion) if codificacion else snapshot.cuerpo
+            respuesta = Response(cuerpo, mimetype='application/json')
+            if codificacion:
+                respuesta.headers['Content-Encoding'] = codificacion
+        respuesta.headers['ETag'] = etag
+        respuesta.headers['Cache-Control'] = 'no-cache'
+        respuesta.headers['Vary'] = 'Accept-Encoding'
+        return respuesta
+
+
+def _etag_coincide(if_none_match: str, etag: str) -> bool:
+    """Comparación débil de ETags según RFC 9110 (If-None-Match)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    for candidato in if_none_match.split(','):
+        candidato = candidato.strip()
+        if candidato.startswith('W/'):
+            candidato = candidato[2:]
+        if candidato == etag:
+            return True
+    return False
+
+
+def elegir_codificacion(accept_encoding: str) -> Optional[str]:
+    """
+    Elige la mejor codificación aceptada por el cliente
+
+    Args:
+        accept_encoding: Valor de la cabecera Accept-Encoding
+
+    Returns:
+        'br', 'gzip' o None si no se acepta ninguna
+    """
+    aceptadas = {}
+    for parte in accept_encoding.lower().split(','):
+        nombre, _, params = parte.strip().partition(';')
+        calidad = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                calidad = float(params[2:])
+            except ValueError:
+                calidad = 0.0
+        if nombre:
+            aceptadas[nombre] = calidad
+    comodin = aceptadas.get('*', 0.0)
+    if brotli is not None and aceptadas.get('br', comodin) > 0:
+        return 'br'
+    if aceptadas.get('gzip', comodin) > 0:
+        return 'gzip'
+    return None
+
+
+class CodificadorSocketIO:
+    """
+    Módulo JSON para Socket.IO que incrusta ``JSONPrecodificado`` sin volver
+    a serializar su contenido (se pasa como ``SocketIO(app, json=...)``)
+    """
+
+    _marca = '@@json-precodificado-' + uuid.uuid4().hex + '-%d@@'
+
+    @classmethod
+    def dumps(cls, obj, *args, **kwargs):
+        crudos = []
+
+        def _default(o):
+            if isinstance(o, JSONPrecodificado):
+                crudos.append(o.texto)
+                return cls._marca % (len(crudos) - 1)
+            raise TypeError(f'Objeto de tipo {type(o).__name__} no serializable')
+
+        kwargs['default'] = _default
+        texto = json.dumps(obj, *args, **kwargs)
+        for i, crudo in enumerate(crudos):
+            texto = texto.replace('"' + cls._marca % i + '"', crudo, 1)
+        return texto
+
+    @staticmethod
+    def loads(*args, **kwargs):
+        return json.loads(*args, **kwargs)
@@ -72,6 +72,11 @@ function connectSocket() {
             showToast(data.mensaje, 'success');
             addActivityLog(data.mensaje, data.accion || 'update');
         }
+        
+        // Confirmar la versión procesada (el servidor no nos encola estados intermedios)
+        if (data.version !== undefined) {
+            socket.emit('inventario_recibido', { version: data.version });
+        }
     });
     
     socket.on('actualizar_inventario', function(data) {
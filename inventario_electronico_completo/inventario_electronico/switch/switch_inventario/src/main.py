@@ -1,14 +1,28 @@
-import os, sys, json, random, time
+import os, sys, json, random, time, logging
 from datetime import datetime
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+# Raíz del proyecto para los módulos compartidos (comun/)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
 
 from flask import Flask, send_from_directory, request, jsonify, Response
 from flask_cors import CORS
 import requests
+from urllib3.exceptions import NewConnectionError
+from comun.configuracion import modo_debug
+from comun.instrumentacion import Instrumentacion
+from comun.trazado import Trazador
+from comun.registro import configurar_registro
+
+# Registro estructurado y asíncrono (variables INVENTARIO_LOG_*, ver comun/registro.py)
+configurar_registro('switch')
+logger = logging.getLogger('inventario.switch')
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'inventario-electronico-2024-switch'
 CORS(app)  # permite CORS
+instrumentacion = Instrumentacion('switch').instalar(app)
+# Trazado distribuido (INVENTARIO_TRAZAS_DIR): el salto al servidor es un span hijo
+trazador = Trazador('switch').instalar(app)
 
 HEALTH_ENDPOINT = "/api/status"
 
@@ -31,6 +45,14 @@ SERVIDORES_INVENTARIO = [
         'peso': 30
     }
 ]
+# Modo multi-instancia: SWITCH_SERVIDORES=http://127.0.0.1:5000,http://127.0.0.1:5003,...
+if os.environ.get('SWITCH_SERVIDORES'):
+    _urls = [u.strip().rstrip('/') for u in os.environ['SWITCH_SERVIDORES'].split(',') if u.strip()]
+    SERVIDORES_INVENTARIO = [
+        {'id': f'servidor_{i + 1}', 'name': f'Servidor {i + 1} ({u})', 'url': u,
+         'version': '1.0', 'activo': True, 'peso': max(1, 100 // len(_urls))}
+        for i, u in enumerate(_urls)
+    ]
 # Derivar health_check_url
 for s in SERVIDORES_INVENTARIO:
     s['health_check_url'] = s['url'] + HEALTH_ENDPOINT
@@ -44,14 +66,15 @@ estadisticas_switch = {
     'requests_por_servidor': {},
     'errores': 0,
     'uptime_inicio': datetime.now(),
-    'health_checks': 0
+    'health_checks': 0,
+    'failovers': 0
 }
 
 IPS_PERMITIDAS_SWITCH = ['127.0.0.1', 'localhost', '192.168.1.4', '10.0.0.3']
 
 # ==================== UTILIDAD ====================
-def obtener_servidor_disponible():
-    activos = [s for s in SERVIDORES_INVENTARIO if s['activo']]
+def obtener_servidor_disponible(excluir=()):
+    activos = [s for s in SERVIDORES_INVENTARIO if s['activo'] and s['id'] not in excluir]
     if not activos:
         return None
     total_peso = sum(s['peso'] for s in activos)
@@ -63,43 +86,128 @@ def obtener_servidor_disponible():
             return s
     return activos[0]
 
+def comprobar_salud(s, timeout=5):
+    try:
+        r = requests.get(s['health_check_url'], timeout=timeout)
+        s['activo'] = (r.status_code == 200)
+        s['ultimo_check'] = datetime.now()
+        s['latencia'] = r.elapsed.total_seconds() * 1000
+        s.pop('error', None)
+    except Exception as e:
+        s['activo'] = False
+        s['ultimo_check'] = datetime.now()
+        s['error'] = str(e)
+
+@instrumentacion.medir('upstream')
 def verificar_salud_servidores():
     for s in SERVIDORES_INVENTARIO:
-        try:
-            r = requests.get(s['health_check_url'], timeout=5)
-            s['activo'] = (r.status_code == 200)
-            s['ultimo_check'] = datetime.now()
-            s['latencia'] = r.elapsed.total_seconds() * 1000
-            s.pop('error', None)
-        except Exception as e:
-            s['activo'] = False
-            s['ultimo_check'] = datetime.now()
-            s['error'] = str(e)
+        comprobar_salud(s)
     estadisticas_switch['health_checks'] += 1
 
+# Un servidor caído se vuelve a comprobar pasados SWITCH_REVISION_CAIDOS_S segundos
+REVISION_CAIDOS_S = float(os.environ.get('SWITCH_REVISION_CAIDOS_S', '5'))
+
+def revisar_caidos():
+    """Comprueba los servidores inactivos cuya espera ha vencido (salvo los desactivados a mano)"""
+    ahora = time.monotonic()
+    for s in SERVIDORES_INVENTARIO:
+        if s['activo'] or s.get('desactivado_manual') or s.get('proxima_revision', 0) > ahora:
+            continue
+        # Se reserva la revisión antes de hacerla: las peticiones concurrentes no la repiten
+        s['proxima_revision'] = ahora + REVISION_CAIDOS_S
+        comprobar_salud(s, timeout=1)
+        if s['activo']:
+            logger.info("Servidor %s disponible de nuevo", s['url'])
+
+ERROR_CONEXION = "Error de conexión con el servidor"
+# La conexión no llegó a establecerse: la petición no salió y puede repetirse en otro servidor
+ERROR_SIN_ENVIAR = "No se pudo conectar con el servidor"
+
+def _sin_enviar(e):
+    """Si el error de ``requests`` ocurrió antes de enviar la petición"""
+    if isinstance(e, requests.exceptions.ConnectTimeout):
+        return True
+    causa = e.args[0] if e.args else None
+    return isinstance(getattr(causa, 'reason', causa), NewConnectionError)
+
+@instrumentacion.medir('upstream')
 def proxy_request(target_url, method='GET', data=None, headers=None):
     try:
-        excluded = {'host', 'content-length', 'connection'}
+        # El switch decodifica y vuelve a serializar el cuerpo (añade _switch_info):
+        # no reenvía las cabeceras condicionales ni de compresión del cliente, o
+        # recibiría un 304 sin cuerpo o una codificación que quizá no sabe leer
+        excluded = {'host', 'content-length', 'connection',
+                    'if-none-match', 'if-modified-since', 'accept-encoding'}
         proxy_headers = {k: v for k, v in (headers or {}).items() if k.lower() not in excluded}
 
-        if method == 'GET':
-            r = requests.get(target_url, headers=proxy_headers, timeout=30)
-        elif method == 'POST':
-            r = requests.post(target_url, json=data, headers=proxy_headers, timeout=30)
-        elif method == 'PUT':
-            r = requests.put(target_url, json=data, headers=proxy_headers, timeout=30)
-        elif method == 'DELETE':
-            r = requests.delete(target_url, headers=proxy_headers, timeout=30)
-        else:
-            return None, f"Método HTTP no soportado: {method}"
+        with trazador.span(f'proxy {method}', 'http', **{'http.url': target_url}) as span:
+            # El traceparent recibido se sustituye por el de este span
+            trazador.propagar(proxy_headers)
+            if method == 'GET':
+                r = requests.get(target_url, headers=proxy_headers, timeout=30)
+            elif method == 'POST':
+                r = requests.post(target_url, json=data, headers=proxy_headers, timeout=30)
+            elif method == 'PUT':
+                r = requests.put(target_url, json=data, headers=proxy_headers, timeout=30)
+            elif method == 'DELETE':
+                r = requests.delete(target_url, headers=proxy_headers, timeout=30)
+            else:
+                return None, f"Método HTTP no soportado: {method}"
+            span.atributo('http.estado', r.status_code)
         return r, None
-    except requests.exceptions.Timeout:
-        return None, "Timeout en la petición al servidor"
-    except requests.exceptions.ConnectionError:
-        return None, "Error de conexión con el servidor"
+    except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+        if _sin_enviar(e):
+            return None, ERROR_SIN_ENVIAR
+        if isinstance(e, requests.exceptions.Timeout):
+            return None, "Timeout en la petición al servidor"
+        return None, ERROR_CONEXION
     except Exception as e:
         return None, f"Error en proxy: {e}"
 
+def reenviar(ruta, method='GET', data=None):
+    """
+    Reenvía la petición a un servidor activo con failover ante errores de conexión
+
+    Un GET se repite en otro servidor ante cualquier error de conexión; el resto
+    de métodos solo si la petición no llegó a enviarse (si se cortó después, el
+    servidor pudo aplicarla y repetirla duplicaría productos o reservas).
+    """
+    revisar_caidos()
+    intentados = set()
+    while True:
+        s = obtener_servidor_disponible(excluir=intentados)
+        if not s:
+            estadisticas_switch['errores'] += 1
+            if intentados:
+                return jsonify({'success': False, 'error': 'Ningún servidor respondió',
+                                'servidores_intentados': sorted(intentados)}), 502
+            return jsonify({'success': False, 'error': 'No hay servidores disponibles'}), 503
+
+        r, err = proxy_request(f"{s['url']}{ruta}", method=method, data=data, headers=dict(request.headers))
+
+        estadisticas_switch['total_requests'] += 1
+        estadisticas_switch['requests_por_servidor'][s['id']] = estadisticas_switch['requests_por_servidor'].get(s['id'], 0) + 1
+
+        if err == ERROR_SIN_ENVIAR or (err == ERROR_CONEXION and method == 'GET'):
+            # Se marca caído y se reintenta en otro
+            estadisticas_switch['errores'] += 1
+            estadisticas_switch['failovers'] += 1
+            s['activo'] = False
+            s['error'] = err
+            s['proxima_revision'] = time.monotonic() + REVISION_CAIDOS_S
+            intentados.add(s['id'])
+            logger.warning("Failover: %s no responde, se marca inactivo", s['url'])
+            continue
+        if err:
+            estadisticas_switch['errores'] += 1
+            logger.error("Error reenviando %s %s a %s: %s", method, ruta, s['url'], err)
+            return jsonify({'success': False, 'error': err, 'servidor_intentado': s['name']}), 502
+
+        body = r.json() if r.content else {}
+        if isinstance(body, dict):
+            body['_switch_info'] = {'servidor_usado': s['name'], 'servidor_version': s['version'], 'timestamp': datetime.now().isoformat()}
+        return Response(json.dumps(body), status=r.status_code, mimetype='application/json')
+
 # ==================== RUTAS SWITCH ====================
 @app.get('/api/switch/status')
 def switch_status():
@@ -130,94 +238,40 @@ def toggle_servidor(servidor_id):
     if not s:
         return jsonify({'success': False, 'error': f'Servidor {servidor_id} no encontrado'}), 404
     s['activo'] = not s['activo']
+    # La revisión de caídos no reactiva un servidor desactivado a mano
+    s['desactivado_manual'] = not s['activo']
     return jsonify({'success': True, 'mensaje': f'Servidor {servidor_id} {"activado" if s["activo"] else "desactivado"}', 'servidor': s})
 
 # ==================== PROXY ====================
 @app.route('/api/productos', methods=['GET', 'POST'])
 def proxy_productos():
-    s = obtener_servidor_disponible()
-    if not s:
-        estadisticas_switch['errores'] += 1
-        return jsonify({'success': False, 'error': 'No hay servidores disponibles'}), 503
-
     data = request.get_json() if request.method == 'POST' else None
-    r, err = proxy_request(f"{s['url']}/api/productos", method=request.method, data=data, headers=dict(request.headers))
-
-    estadisticas_switch['total_requests'] += 1
-    estadisticas_switch['requests_por_servidor'][s['id']] = estadisticas_switch['requests_por_servidor'].get(s['id'], 0) + 1
-
-    if err:
-        estadisticas_switch['errores'] += 1
-        return jsonify({'success': False, 'error': err, 'servidor_intentado': s['name']}), 502
-
-    body = r.json() if r.content else {}
-    if isinstance(body, dict):
-        body['_switch_info'] = {'servidor_usado': s['name'], 'servidor_version': s['version'], 'timestamp': datetime.now().isoformat()}
-    return Response(json.dumps(body), status=r.status_code, mimetype='application/json')
+    return reenviar('/api/productos', method=request.method, data=data)
 
 @app.route('/api/productos/<int:producto_id>', methods=['GET', 'PUT', 'DELETE'])
 def proxy_producto_especifico(producto_id):
-    s = obtener_servidor_disponible()
-    if not s:
-        estadisticas_switch['errores'] += 1
-        return jsonify({'success': False, 'error': 'No hay servidores disponibles'}), 503
-
     data = request.get_json() if request.method in ['PUT', 'POST'] else None
-    r, err = proxy_request(f"{s['url']}/api/productos/{producto_id}", method=request.method, data=data, headers=dict(request.headers))
+    return reenviar(f'/api/productos/{producto_id}', method=request.method, data=data)
 
-    estadisticas_switch['total_requests'] += 1
-    estadisticas_switch['requests_por_servidor'][s['id']] = estadisticas_switch['requests_por_servidor'].get(s['id'], 0) + 1
+@app.post('/api/reservas')
+def proxy_reservas():
+    return reenviar('/api/reservas', method='POST', data=request.get_json())
 
-    if err:
-        estadisticas_switch['errores'] += 1
-        return jsonify({'success': False, 'error': err, 'servidor_intentado': s['name']}), 502
+@app.post('/api/reservas/<int:reserva_id>/confirmar')
+def proxy_confirmar_reserva(reserva_id):
+    return reenviar(f'/api/reservas/{reserva_id}/confirmar', method='POST')
 
-    body = r.json() if r.content else {}
-    if isinstance(body, dict):
-        body['_switch_info'] = {'servidor_usado': s['name'], 'servidor_version': s['version'], 'timestamp': datetime.now().isoformat()}
-    return Response(json.dumps(body), status=r.status_code, mimetype='application/json')
+@app.delete('/api/reservas/<int:reserva_id>')
+def proxy_liberar_reserva(reserva_id):
+    return reenviar(f'/api/reservas/{reserva_id}', method='DELETE')
 
 @app.get('/api/clientes')
 def proxy_clientes():
-    s = obtener_servidor_disponible()
-    if not s:
-        estadisticas_switch['errores'] += 1
-        return jsonify({'success': False, 'error': 'No hay servidores disponibles'}), 503
-
-    r, err = proxy_request(f"{s['url']}/api/clientes", method='GET', headers=dict(request.headers))
-
-    estadisticas_switch['total_requests'] += 1
-    estadisticas_switch['requests_por_servidor'][s['id']] = estadisticas_switch['requests_por_servidor'].get(s['id'], 0) + 1
-
-    if err:
-        estadisticas_switch['errores'] += 1
-        return jsonify({'success': False, 'error': err, 'servidor_intentado': s['name']}), 502
-
-    body = r.json() if r.content else {}
-    if isinstance(body, dict):
-        body['_switch_info'] = {'servidor_usado': s['name'], 'servidor_version': s['version'], 'timestamp': datetime.now().isoformat()}
-    return Response(json.dumps(body), status=r.status_code, mimetype='application/json')
+    return reenviar('/api/clientes')
 
 @app.get('/api/estadisticas')
 def proxy_estadisticas():
-    s = obtener_servidor_disponible()
-    if not s:
-        estadisticas_switch['errores'] += 1
-        return jsonify({'success': False, 'error': 'No hay servidores disponibles'}), 503
-
-    r, err = proxy_request(f"{s['url']}/api/estadisticas", method='GET', headers=dict(request.headers))
-
-    estadisticas_switch['total_requests'] += 1
-    estadisticas_switch['requests_por_servidor'][s['id']] = estadisticas_switch['requests_por_servidor'].get(s['id'], 0) + 1
-
-    if err:
-        estadisticas_switch['errores'] += 1
-        return jsonify({'success': False, 'error': err, 'servidor_intentado': s['name']}), 502
-
-    body = r.json() if r.content else {}
-    if isinstance(body, dict):
-        body['_switch_info'] = {'servidor_usado': s['name'], 'servidor_version': s['version'], 'timestamp': datetime.now().isoformat()}
-    return Response(json.dumps(body), status=r.status_code, mimetype='application/json')
+    return reenviar('/api/estadisticas')
 
 # Health check periódico
 @app.before_request
@@ -245,5 +299,5 @@ if __name__ == '__main__':
         print(f"  - {s['name']} ({s['url']}) - Peso: {s['peso']}%")
     print("IPs permitidas:", IPS_PERMITIDAS_SWITCH)
     verificar_salud_servidores()
-    app.run(host='0.0.0.0', port=5002, debug=True)
+    app.run(host='0.0.0.0', port=5002, debug=modo_debug())
 